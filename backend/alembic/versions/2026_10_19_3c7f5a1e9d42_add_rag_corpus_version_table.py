@@ -0,0 +1,39 @@
+"""add_rag_corpus_version_table
+
+Revision ID: 3c7f5a1e9d42
+Revises: b61e3d8f0a27
+Create Date: 2026-10-19 23:12:08.540317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c7f5a1e9d42'
+down_revision = 'b61e3d8f0a27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    rag_corpus_version 테이블 생성 (행 하나)
+    - 수집/삭제 트랜잭션마다 version을 1씩 올림 → 검색 결과 캐시가 버전이 바뀌면 비워짐
+    """
+    op.create_table(
+        'rag_corpus_version',
+        sa.Column('id', sa.SmallInteger, primary_key=True, nullable=False, comment='항상 1'),
+        sa.Column('version', sa.BigInteger, nullable=False, server_default='0', comment='코퍼스 버전 (단조 증가)'),
+        sa.Column('updated_at', sa.TIMESTAMP, server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False, comment='수정 시각'),
+        sa.CheckConstraint('id = 1', name='ck_rag_corpus_version_single_row'),
+        comment='RAG 코퍼스 버전 (검색 캐시 무효화용)'
+    )
+    op.execute("INSERT INTO rag_corpus_version (id, version) VALUES (1, 0)")
+
+
+def downgrade() -> None:
+    """
+    rag_corpus_version 테이블 삭제 (롤백)
+    """
+    op.drop_table('rag_corpus_version')
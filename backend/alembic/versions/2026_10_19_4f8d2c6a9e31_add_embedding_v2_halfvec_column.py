@@ -0,0 +1,49 @@
+"""add_embedding_v2_halfvec_column
+
+Revision ID: 4f8d2c6a9e31
+Revises: e7c4a1d93b58
+Create Date: 2026-10-19 21:05:12.448190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import HALFVEC
+
+
+# revision identifiers, used by Alembic.
+revision = '4f8d2c6a9e31'
+down_revision = 'e7c4a1d93b58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    ideal_answer에 embedding_v2 컬럼 추가 (text-embedding-3-small 512차원 halfvec)
+    - 값은 app.llm.rag.embedding_backfill로 채우고, 다 채운 뒤 RAG_EMBEDDING_VERSION=v2로 전환
+    - halfvec은 pgvector 0.7 이상 필요
+    """
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    if 'ideal_answer' not in inspector.get_table_names():
+        return
+    columns = [col['name'] for col in inspector.get_columns('ideal_answer')]
+    if 'embedding_v2' in columns:
+        return
+
+    op.add_column('ideal_answer', sa.Column('embedding_v2', HALFVEC(512), nullable=True,
+                                            comment='text-embedding-3-small 512차원 halfvec (v2)'))
+    # 비어 있는 행은 인덱스에 들어가지 않으므로 백필 전에 만들어 두어도 됨
+    op.create_index('ix_ideal_answer_embedding_v2', 'ideal_answer', ['embedding_v2'],
+                    postgresql_using='hnsw',
+                    postgresql_ops={'embedding_v2': 'halfvec_cosine_ops'})
+
+
+def downgrade() -> None:
+    """
+    embedding_v2 컬럼 삭제 (롤백)
+    """
+    op.drop_index('ix_ideal_answer_embedding_v2', table_name='ideal_answer')
+    op.drop_column('ideal_answer', 'embedding_v2')
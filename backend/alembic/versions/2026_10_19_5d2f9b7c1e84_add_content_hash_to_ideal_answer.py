@@ -0,0 +1,42 @@
+"""add_content_hash_to_ideal_answer
+
+Revision ID: 5d2f9b7c1e84
+Revises: c3a8e1f4b2d7
+Create Date: 2026-10-19 14:03:17.528941
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2f9b7c1e84'
+down_revision = 'c3a8e1f4b2d7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 증분 재수집용 section_hash / content_hash 컬럼 및 book_id 인덱스 추가 (if not exists)
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    
+    # ideal_answer 테이블이 존재하는지 확인
+    if 'ideal_answer' in inspector.get_table_names():
+        columns = [col['name'] for col in inspector.get_columns('ideal_answer')]
+        
+        if 'section_hash' not in columns:
+            op.add_column('ideal_answer', sa.Column('section_hash', sa.String(64), nullable=True))
+        if 'content_hash' not in columns:
+            op.add_column('ideal_answer', sa.Column('content_hash', sa.String(64), nullable=True))
+        
+        indexes = [index['name'] for index in inspector.get_indexes('ideal_answer')]
+        if 'ix_ideal_answer_book_id' not in indexes:
+            op.create_index('ix_ideal_answer_book_id', 'ideal_answer', ['book_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ideal_answer_book_id', table_name='ideal_answer')
+    op.drop_column('ideal_answer', 'content_hash')
+    op.drop_column('ideal_answer', 'section_hash')
@@ -0,0 +1,43 @@
+"""add_rag_ingest_checkpoint_table
+
+Revision ID: 9b4e6a2d7f15
+Revises: 5d2f9b7c1e84
+Create Date: 2026-10-19 16:41:05.217734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b4e6a2d7f15'
+down_revision = '5d2f9b7c1e84'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    rag_ingest_checkpoint 테이블 생성
+    - GCS 대량 수집의 파일별 처리 상태 저장 (재실행 시 같은 generation으로 완료된 파일은 건너뜀)
+    """
+    op.create_table(
+        'rag_ingest_checkpoint',
+        sa.Column('bucket', sa.String(255), primary_key=True, nullable=False, comment='GCS 버킷'),
+        sa.Column('object_name', sa.String(1024), primary_key=True, nullable=False, comment='GCS 객체 이름'),
+        sa.Column('generation', sa.BigInteger, nullable=False, comment='처리한 객체 generation'),
+        sa.Column('size_bytes', sa.BigInteger, nullable=True, comment='객체 크기'),
+        sa.Column('status', sa.String(20), nullable=False, comment='running / done / failed'),
+        sa.Column('chunk_count', sa.Integer, nullable=True, comment='저장된 청크 수'),
+        sa.Column('error', sa.Text, nullable=True, comment='실패 사유'),
+        sa.Column('created_at', sa.TIMESTAMP, server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False, comment='생성 시각'),
+        sa.Column('updated_at', sa.TIMESTAMP, server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False, comment='수정 시각'),
+        comment='RAG 대량 수집 파일별 체크포인트'
+    )
+
+
+def downgrade() -> None:
+    """
+    rag_ingest_checkpoint 테이블 삭제 (롤백)
+    """
+    op.drop_table('rag_ingest_checkpoint')
@@ -0,0 +1,54 @@
+"""add_lexical_tsv_to_ideal_answer
+
+Revision ID: b61e3d8f0a27
+Revises: 4f8d2c6a9e31
+Create Date: 2026-10-19 22:31:47.205613
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b61e3d8f0a27'
+down_revision = '4f8d2c6a9e31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    ideal_answer에 한국어 어휘 검색 컬럼 추가
+    - lexical_terms: 수집 시 Kiwi로 뽑은 내용어 (공백 구분)
+    - lexical_tsv: to_tsvector('simple', lexical_terms) 생성 컬럼 + GIN 인덱스
+    - 기존 행은 python -m app.llm.rag.vector_db.lexical로 채움 (형태소 분석은 DB 밖에서 수행)
+    """
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    if 'ideal_answer' not in inspector.get_table_names():
+        return
+    columns = [col['name'] for col in inspector.get_columns('ideal_answer')]
+
+    if 'lexical_terms' not in columns:
+        op.add_column('ideal_answer', sa.Column('lexical_terms', sa.Text(), nullable=True,
+                                                comment='어휘 검색용 Kiwi 내용어'))
+    if 'lexical_tsv' not in columns:
+        op.add_column('ideal_answer', sa.Column(
+            'lexical_tsv', postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('simple', COALESCE(lexical_terms, ''))", persisted=True),
+            comment='lexical_terms tsvector'
+        ))
+        op.create_index('ix_ideal_answer_lexical_tsv', 'ideal_answer', ['lexical_tsv'],
+                        postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """
+    어휘 검색 컬럼 삭제 (롤백)
+    """
+    op.drop_index('ix_ideal_answer_lexical_tsv', table_name='ideal_answer')
+    op.drop_column('ideal_answer', 'lexical_tsv')
+    op.drop_column('ideal_answer', 'lexical_terms')
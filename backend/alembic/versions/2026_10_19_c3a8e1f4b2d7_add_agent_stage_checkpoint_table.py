@@ -0,0 +1,41 @@
+"""add_agent_stage_checkpoint_table
+
+Revision ID: c3a8e1f4b2d7
+Revises: 94ec1cfbea66
+Create Date: 2026-10-19 10:12:31.402118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3a8e1f4b2d7'
+down_revision = '94ec1cfbea66'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    agent_stage_checkpoint 테이블 생성
+    - Agent 파이프라인 단계별 출력 저장 (재시도 시 마지막 성공 단계부터 재개)
+    """
+    op.create_table(
+        'agent_stage_checkpoint',
+        sa.Column('conv_id', UUID(as_uuid=True), primary_key=True, nullable=False, comment='대화 ID'),
+        sa.Column('stage', sa.String(50), primary_key=True, nullable=False, comment='파이프라인 단계 이름'),
+        sa.Column('input_hash', sa.String(64), nullable=False, comment='단계 입력 해시 (sha256)'),
+        sa.Column('output', JSONB, nullable=False, comment='단계 출력'),
+        sa.Column('created_at', sa.TIMESTAMP, server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False, comment='생성 시각'),
+        sa.Column('updated_at', sa.TIMESTAMP, server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False, comment='수정 시각'),
+        comment='Agent 파이프라인 단계별 체크포인트'
+    )
+
+
+def downgrade() -> None:
+    """
+    agent_stage_checkpoint 테이블 삭제 (롤백)
+    """
+    op.drop_table('agent_stage_checkpoint')
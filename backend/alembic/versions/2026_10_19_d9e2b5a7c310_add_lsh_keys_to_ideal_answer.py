@@ -0,0 +1,51 @@
+"""add_lsh_keys_to_ideal_answer
+
+Revision ID: d9e2b5a7c310
+Revises: 3c7f5a1e9d42
+Create Date: 2026-10-19 23:48:21.317604
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9e2b5a7c310'
+down_revision = '3c7f5a1e9d42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    ideal_answer에 코퍼스 근사 중복 판정 컬럼 추가
+    - minhash: full_text MinHash 서명 (uint32 × 128)
+    - lsh_keys: LSH 밴드 키 + GIN 인덱스 (겹치는 키로 다른 책의 후보 조회)
+    - 기존 TOC 행은 다음 재수집 때 채워짐
+    """
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    if 'ideal_answer' not in inspector.get_table_names():
+        return
+    columns = [col['name'] for col in inspector.get_columns('ideal_answer')]
+
+    if 'minhash' not in columns:
+        op.add_column('ideal_answer', sa.Column('minhash', sa.LargeBinary(), nullable=True,
+                                                comment='근사 중복 판정용 MinHash 서명'))
+    if 'lsh_keys' not in columns:
+        op.add_column('ideal_answer', sa.Column('lsh_keys', postgresql.ARRAY(sa.Text()), nullable=True,
+                                                comment='LSH 밴드 키'))
+        op.create_index('ix_ideal_answer_lsh_keys', 'ideal_answer', ['lsh_keys'],
+                        postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """
+    근사 중복 판정 컬럼 삭제 (롤백)
+    """
+    op.drop_index('ix_ideal_answer_lsh_keys', table_name='ideal_answer')
+    op.drop_column('ideal_answer', 'lsh_keys')
+    op.drop_column('ideal_answer', 'minhash')
@@ -0,0 +1,98 @@
+"""add_ideal_answer_section_table
+
+Revision ID: e7c4a1d93b58
+Revises: 9b4e6a2d7f15
+Create Date: 2026-10-19 18:22:41.093516
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from pgvector.sqlalchemy import Vector
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7c4a1d93b58'
+down_revision = '9b4e6a2d7f15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    ideal_answer_section 테이블 생성
+    - 섹션별 전문/출처/페이지 범위/섹션 임베딩(청크 임베딩 평균)을 수집 시점에 미리 저장
+    - 기존 ideal_answer 청크로 채운 뒤 임베딩 인덱스 생성
+    """
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    if 'ideal_answer_section' in inspector.get_table_names():
+        return
+
+    op.create_table(
+        'ideal_answer_section',
+        sa.Column('section_id', sa.Text(), primary_key=True, nullable=False, comment='ideal_answer.section_id'),
+        sa.Column('book_id', postgresql.UUID(as_uuid=True), nullable=True, comment='책 ID'),
+        sa.Column('book_title', sa.Text(), nullable=True, comment='책 제목'),
+        sa.Column('l1_title', sa.Text(), nullable=True),
+        sa.Column('l2_title', sa.Text(), nullable=True),
+        sa.Column('l3_title', sa.Text(), nullable=True),
+        sa.Column('canonical_path', sa.Text(), nullable=True, comment='대제목 > 중제목 > 소제목'),
+        sa.Column('page_start', sa.Integer(), nullable=True),
+        sa.Column('page_end', sa.Integer(), nullable=True),
+        sa.Column('citations', postgresql.ARRAY(sa.Text()), nullable=False, server_default='{}', comment='인용 목록'),
+        sa.Column('full_text', sa.Text(), nullable=False, server_default='', comment='청크 순서대로 이어 붙인 섹션 전문'),
+        sa.Column('chunk_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('section_hash', sa.String(64), nullable=True),
+        sa.Column('rag_type', sa.String(20), nullable=True),
+        sa.Column('embedding', Vector(1536), nullable=True, comment='청크 임베딩 평균'),
+        sa.Column('updated_at', sa.TIMESTAMP, server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False, comment='갱신 시각'),
+        comment='ideal_answer 섹션 단위 저장소'
+    )
+    op.create_index('ix_ideal_answer_section_book_id', 'ideal_answer_section', ['book_id'])
+
+    # 기존 청크로 섹션 채우기 (섹션 대표값은 첫 청크 기준)
+    if 'ideal_answer' in inspector.get_table_names():
+        first = lambda column: f"(ARRAY_AGG({column} ORDER BY chunk_ix, page_start, page_end))[1]"
+        op.execute(f"""
+            INSERT INTO ideal_answer_section
+                (section_id, book_id, book_title, l1_title, l2_title, l3_title, canonical_path,
+                 page_start, page_end, citations, full_text, chunk_count, section_hash, rag_type,
+                 embedding, updated_at)
+            SELECT section_id,
+                   {first("book_id")},
+                   {first("book_title")},
+                   {first("l1_title")},
+                   {first("l2_title")},
+                   {first("l3_title")},
+                   {first("canonical_path")},
+                   MIN(page_start),
+                   MAX(page_end),
+                   COALESCE(ARRAY_AGG(DISTINCT citation) FILTER (WHERE citation <> ''), '{{}}'),
+                   COALESCE(STRING_AGG(full_text, E'\\n\\n' ORDER BY chunk_ix, page_start, page_end)
+                            FILTER (WHERE full_text <> ''), ''),
+                   COUNT(*),
+                   MAX(section_hash),
+                   MAX(rag_type),
+                   AVG(embedding),
+                   NOW()
+            FROM ideal_answer
+            WHERE section_id IS NOT NULL
+            GROUP BY section_id
+        """)
+
+    # 섹션 수는 청크보다 훨씬 적고 계속 늘어나므로 목록 수 조정이 필요 없는 HNSW 사용
+    op.create_index('ix_ideal_answer_section_embedding', 'ideal_answer_section', ['embedding'],
+                    postgresql_using='hnsw',
+                    postgresql_ops={'embedding': 'vector_cosine_ops'})
+
+
+def downgrade() -> None:
+    """
+    ideal_answer_section 테이블 삭제 (롤백)
+    """
+    op.drop_index('ix_ideal_answer_section_embedding', table_name='ideal_answer_section')
+    op.drop_index('ix_ideal_answer_section_book_id', table_name='ideal_answer_section')
+    op.drop_table('ideal_answer_section')
@@ -1,5 +1,5 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 
@@ -20,6 +20,21 @@ engine = create_engine(
     pool_recycle=300,          # 연결 재사용 시간(초)
 )
 
+
+
+@event.listens_for(engine, "connect")
+def _register_vector_types(dbapi_connection, connection_record):
+    """새 커넥션마다 pgvector 어댑터 등록 (numpy 배열 ↔ vector, 벡터 조회 결과는 numpy float32)"""
+    try:
+        from pgvector.psycopg2 import register_vector
+        register_vector(dbapi_connection, globally=False)
+    except Exception as e:
+        # vector 확장 설치 전(마이그레이션 이전 등)에는 등록 없이 진행
+        print(f"⚠️ pgvector 어댑터 등록 생략: {e}")
+    finally:
+        dbapi_connection.rollback()
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
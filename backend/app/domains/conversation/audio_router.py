@@ -362,6 +362,19 @@ async def update_speaker_mapping(
             "speaker_names": request.speaker_mapping,
             "user_ids": request.user_mapping or {}
         }
+        
+        # 마지막으로 저장된 분석이 같은 매핑으로 만들어졌으면 재분석 생략
+        # (저장된 매핑이 아니라 "save" 체크포인트의 매핑 해시와 비교 → 실패/진행 중인 실행의 매핑은 무시)
+        from app.llm.agent.checkpoint import compute_mapping_hash
+        from app.llm.agent.crud import get_analysis_by_conv_id, get_stage_checkpoint
+        saved_checkpoint = get_stage_checkpoint(db, str(conversation_id), "save")
+        analysis = get_analysis_by_conv_id(db, str(conversation_id))
+        mapping_unchanged = (
+            saved_checkpoint is not None
+            and analysis is not None
+            and saved_checkpoint.get("mapping_hash") == compute_mapping_hash(mapping_data)
+            and str(saved_checkpoint.get("analysis_id")) == analysis["analysis_id"]
+        )
         audio_file.speaker_mapping = mapping_data
         
         # 6. user_mapping이 있으면 conversation content도 업데이트
@@ -380,14 +393,20 @@ async def update_speaker_mapping(
         logger.info(f"화자 매핑 설정 완료 - 대화 ID: {conversation_id}, 매핑: {request.speaker_mapping}, 사용자 매핑: {request.user_mapping}")
         
         # 7. 매핑 완료 후 자동으로 분석 파이프라인 시작
-        try:
-            from app.domains.conversation.router import run_agent_pipeline_async
-            
-            # 백그라운드에서 분석 파이프라인 실행
-            background_tasks.add_task(run_agent_pipeline_async, str(conversation_id), current_user.id)
-            logger.info(f"분석 파이프라인 자동 시작됨 - 대화 ID: {conversation_id}")
-        except Exception as e:
-            logger.warning(f"분석 파이프라인 자동 시작 실패: {str(e)}")
+        #    (매핑만 바뀐 경우 파이프라인이 세그먼트 Feature를 재사용)
+        analysis_started = False
+        if mapping_unchanged:
+            logger.info(f"화자 매핑 변경 없음 - 기존 분석 결과 사용: {conversation_id}")
+        else:
+            try:
+                from app.domains.conversation.router import run_agent_pipeline_async
+                
+                # 백그라운드에서 분석 파이프라인 실행
+                background_tasks.add_task(run_agent_pipeline_async, str(conversation_id), current_user.id)
+                analysis_started = True
+                logger.info(f"분석 파이프라인 자동 시작됨 - 대화 ID: {conversation_id}")
+            except Exception as e:
+                logger.warning(f"분석 파이프라인 자동 시작 실패: {str(e)}")
         
         return SpeakerMappingResponse(
             conversation_id=str(conversation_id),
@@ -395,7 +414,7 @@ async def update_speaker_mapping(
             speaker_mapping=request.speaker_mapping,
             user_mapping=request.user_mapping,
             message="화자 매핑이 성공적으로 설정되었습니다.",
-            analysis_started=True,  # 분석이 백그라운드에서 시작됨
+            analysis_started=analysis_started,  # 분석이 백그라운드에서 시작됨 (매핑 동일 시 False)
             can_proceed=True,  # 사용자는 바로 다음 단계로 진행 가능
             redirect_to="analysis"  # 분석 탭으로 리다이렉트
         )
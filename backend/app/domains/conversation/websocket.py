@@ -3,10 +3,12 @@ WebSocket을 통한 실시간 분석 진행률 알림
 """
 
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import Dict, List
+from typing import Dict, List, Optional
 import json
 import asyncio
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -151,6 +153,15 @@ class ConnectionManager:
         }
         await self.send_to_conversation(conversation_id, message)
     
+    async def broadcast_stream(self, conversation_id: str, stream_data: dict):
+        """리포트/조언 토큰 스트림 프레임 브로드캐스트"""
+        message = {
+            "type": "analysis_stream",
+            "conversationId": conversation_id,
+            "data": stream_data
+        }
+        await self.send_to_conversation(conversation_id, message)
+    
     async def broadcast_error(self, conversation_id: str, error_message: str):
         """분석 실패 브로드캐스트"""
         message = {
@@ -165,6 +176,109 @@ class ConnectionManager:
 manager = ConnectionManager()
 
 
+class TokenStreamCoalescer:
+    """
+    LLM 토큰 조각을 모아 일정 간격(기본 75ms)의 프레임으로 전송
+    - 워커 스레드에서 push() 호출 → 이벤트 루프로 전송 예약 (thread-safe)
+    - 프레임마다 seq를 붙여 클라이언트가 순서를 보장할 수 있게 함
+    - 첫 토큰이 버퍼에 들어오면 간격 뒤 타이머 플러시 예약 (생성이 잠시 멈춰도 버퍼에 남지 않음)
+    - close() 시 남은 버퍼를 done=True 프레임으로 전송
+    """
+    
+    def __init__(
+        self,
+        conversation_id: str,
+        section: str,
+        loop: asyncio.AbstractEventLoop,
+        interval: float = 0.075
+    ):
+        self.conversation_id = conversation_id
+        self.section = section  # "report" | "advice"
+        self.loop = loop
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._buffer: List[str] = []
+        self._seq = 0
+        self._last_flush = time.monotonic()
+        self._timer_pending = False
+        self._closed = False
+    
+    def push(self, delta: str):
+        """토큰 조각 추가 (간격이 지났으면 즉시 프레임 전송, 아니면 타이머 플러시 예약)"""
+        if not delta:
+            return
+        with self._lock:
+            self._buffer.append(delta)
+            elapsed = time.monotonic() - self._last_flush
+            if elapsed < self.interval:
+                if not self._timer_pending:
+                    self._timer_pending = True
+                    self._schedule_flush(self.interval - elapsed)
+                return
+            frame = self._drain(done=False)
+        self._send(frame)
+    
+    def close(self):
+        """남은 토큰을 마지막 프레임으로 전송"""
+        with self._lock:
+            self._closed = True
+            frame = self._drain(done=True)
+        self._send(frame)
+    
+    def _schedule_flush(self, delay: float):
+        # 워커 스레드에서 호출되므로 이벤트 루프 스레드에서 call_later 등록
+        try:
+            self.loop.call_soon_threadsafe(self.loop.call_later, delay, self._timer_flush)
+        except RuntimeError as e:
+            self._timer_pending = False
+            logger.warning(f"📡 스트림 플러시 타이머 예약 실패: {e}")
+    
+    def _timer_flush(self):
+        """타이머 만료: 그 사이 push/close로 비워지지 않았으면 남은 토큰 전송"""
+        with self._lock:
+            self._timer_pending = False
+            if self._closed or not self._buffer:
+                return
+            frame = self._drain(done=False)
+        self._send(frame)
+    
+    def _drain(self, done: bool) -> dict:
+        frame = {
+            "section": self.section,
+            "seq": self._seq,
+            "delta": "".join(self._buffer),
+            "done": done
+        }
+        self._buffer = []
+        self._seq += 1
+        self._last_flush = time.monotonic()
+        return frame
+    
+    def _send(self, frame: dict):
+        # 연결된 클라이언트가 없으면 전송 생략
+        if self.conversation_id not in manager.active_connections:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(
+                manager.broadcast_stream(self.conversation_id, frame), self.loop
+            )
+        except RuntimeError as e:
+            logger.warning(f"📡 스트림 프레임 전송 예약 실패: {e}")
+
+
+def create_token_streamer(
+    conversation_id: str,
+    section: str,
+    loop: Optional[asyncio.AbstractEventLoop] = None
+) -> TokenStreamCoalescer:
+    """현재 이벤트 루프에 묶인 토큰 스트리머 생성"""
+    return TokenStreamCoalescer(
+        conversation_id=conversation_id,
+        section=section,
+        loop=loop or asyncio.get_running_loop()
+    )
+
+
 async def websocket_endpoint(websocket: WebSocket, conversation_id: str):
     """WebSocket 엔드포인트"""
     await manager.connect(websocket, conversation_id)
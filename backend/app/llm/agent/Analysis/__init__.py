@@ -1,6 +1,6 @@
 """Analysis 모듈 초기화
 """
 
-from .graph_analysis import AnalysisGraph
+from .graph_analysis import AnalysisGraph, get_analysis_graph
 
-__all__ = ["AnalysisGraph"]
+__all__ = ["AnalysisGraph", "get_analysis_graph"]
@@ -1,6 +1,7 @@
 from __future__ import annotations
 from dataclasses import dataclass, field
-from typing import Any, Dict, Optional, List
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, List
 import pandas as pd
 from langgraph.graph import StateGraph, END
 from sqlalchemy.orm import Session
@@ -14,6 +15,7 @@ from .nodes import (
     ScoreEvaluator,
     AnalysisSaver,
 )
+from app.llm.agent.checkpoint import StageCheckpointer
 
 # =====================================
 # ✅ State 정의 (DB 세션 추가)
@@ -47,6 +49,18 @@ class AnalysisState:
     meta: Dict[str, Any] = field(default_factory=dict)
     verbose: bool = True
 
+    # 리포트 토큰 스트리밍 콜백 (WebSocket 전송용)
+    on_token: Optional[Callable[[str], None]] = None
+
+    # 단계별 체크포인트 (재시도 시 성공한 단계 재사용)
+    checkpointer: Optional[StageCheckpointer] = None
+
+    # 세그먼트 Feature 체크포인트 (화자 매핑과 무관, 매핑 변경 시에도 재사용)
+    feature_checkpointer: Optional[StageCheckpointer] = None
+
+    # 이번 분석이 사용한 화자 매핑 해시 ("save" 체크포인트에 함께 기록)
+    mapping_hash: Optional[str] = None
+
 
 # =====================================
 # ✅ Graph 설계 (DB 연동)
@@ -146,7 +160,13 @@ class AnalysisGraph:
         if self.verbose:
             print("\n🧠 [RelationResolver_LLM] LLM 기반 관계 추론 중...")
 
-        state.relations = self.llmresolver.resolve(state.conversation_df)
+        if state.checkpointer is not None:
+            state.relations = state.checkpointer.run_stage(
+                "resolve_llm",
+                lambda: {"relations": self.llmresolver.resolve(state.conversation_df)},
+            )["relations"]
+        else:
+            state.relations = self.llmresolver.resolve(state.conversation_df)
 
         print(f"   → 추론된 관계: {len(state.relations)}명")
         return state
@@ -159,16 +179,31 @@ class AnalysisGraph:
             print("\n🧮 [Analyzer] 감정·스타일 분석 수행 중...")
             print(f"   👤 분석 대상 사용자: {state.id}")
 
-        result = self.analyzer.analyze(
-            speaker_segments=state.speaker_segments,
-            user_id=state.id,
-            user_gender=state.user_gender,
-            user_age=state.user_age,
-            user_name=state.user_name,
-            user_speaker_label=state.user_speaker_label,
-            other_speaker_label=state.other_speaker_label,
-            other_display_name=state.other_display_name
-        )
+        def analyze():
+            segment_features = None
+            if state.feature_checkpointer is not None:
+                segment_features = state.feature_checkpointer.run_stage(
+                    "segment_features",
+                    lambda: self.analyzer.extract_segment_features(state.speaker_segments),
+                )
+
+            return self.analyzer.analyze(
+                speaker_segments=state.speaker_segments,
+                user_id=state.id,
+                user_gender=state.user_gender,
+                user_age=state.user_age,
+                user_name=state.user_name,
+                user_speaker_label=state.user_speaker_label,
+                other_speaker_label=state.other_speaker_label,
+                other_display_name=state.other_display_name,
+                on_token=state.on_token,
+                segment_features=segment_features,
+            )
+
+        if state.checkpointer is not None:
+            result = state.checkpointer.run_stage("analyze", analyze)
+        else:
+            result = analyze()
 
         state.analysis_result = result
 
@@ -182,7 +217,17 @@ class AnalysisGraph:
         if self.verbose:
             print("\n💾 [AnalysisSaver] 분석 결과 DB 저장 중...")
 
+        # ✅ 이미 저장된 분석이면 재사용 (중복 INSERT 방지)
+        cached = state.checkpointer.load("save") if state.checkpointer is not None else None
+        if cached is not None:
+            state.meta["analysis_id"] = cached["analysis_id"]
+            print(f"   ✅ 저장: {cached.get('status')} (checkpoint)")
+            return state
+
         saved = self.saver.save(state.db, state.analysis_result, state)
+        if state.checkpointer is not None and saved.get("status") == "saved":
+            # 매핑 변경 요청 시 "저장된 분석이 쓴 매핑"과 비교할 수 있도록 매핑 해시도 기록
+            state.checkpointer.save("save", {**saved, "mapping_hash": state.mapping_hash})
 
         print(f"   ✅ 저장: {saved.get('status')}")
         return state
@@ -202,10 +247,17 @@ class AnalysisGraph:
         user_speaker_label: str = "SPEAKER_0A",
         other_speaker_label: str = "SPEAKER_0B",
         other_display_name: str = "상대방",
-        conversation_df: pd.DataFrame = None  # 하위 호환성
+        conversation_df: pd.DataFrame = None,  # 하위 호환성
+        on_token: Optional[Callable[[str], None]] = None,
+        checkpointer: Optional[StageCheckpointer] = None,
+        feature_checkpointer: Optional[StageCheckpointer] = None,
+        mapping_hash: Optional[str] = None,
     ):
         """
         ✅ Analysis 파이프라인 실행 (DB 연동)
+        - checkpointer가 주어지면 resolve_llm / analyze / save 단계 결과를 재사용
+        - feature_checkpointer가 주어지면 매핑 무관 세그먼트 Feature를 재사용
+        - mapping_hash는 저장 단계 체크포인트에 기록 (화자 매핑 재요청 시 비교용)
         """
         if self.verbose:
             print("\n🚀 [AnalysisGraph] 실행 시작\n" + "=" * 60)
@@ -229,6 +281,10 @@ class AnalysisGraph:
             other_speaker_label=other_speaker_label,
             other_display_name=other_display_name,
             verbose=self.verbose,
+            on_token=on_token,
+            checkpointer=checkpointer,
+            feature_checkpointer=feature_checkpointer,
+            mapping_hash=mapping_hash,
         )
 
         # ✅ 파이프라인 실행
@@ -238,3 +294,15 @@ class AnalysisGraph:
             print("\n✅ [AnalysisGraph] 파이프라인 실행 완료\n" + "=" * 60)
 
         return result_state
+
+
+# =====================================
+# ✅ 프로세스 단위 컴파일 그래프 (재사용)
+# =====================================
+@lru_cache(maxsize=None)
+def get_analysis_graph(verbose: bool = True) -> AnalysisGraph:
+    """
+    컴파일된 AnalysisGraph 싱글턴
+    - 노드는 상태를 갖지 않고 실행별 데이터는 State에만 담기므로 동시 실행에 안전
+    """
+    return AnalysisGraph(verbose=verbose)
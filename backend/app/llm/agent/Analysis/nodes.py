@@ -1,12 +1,12 @@
 # app/agent/Analysis/nodes.py
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Any, Dict, List, Tuple
-from app.core.config import settings
-from langchain_openai import ChatOpenAI
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.llm.agent.clients import get_chat_llm
 import pandas as pd
 from sqlalchemy.orm import Session
 from collections import Counter
+import os
 import re
 import json
 from kiwipiepy import Kiwi
@@ -168,7 +168,7 @@ class RelationResolver_LLM:
         Returns:
             추론된 관계 리스트
         """
-        llm = ChatOpenAI(model="gpt-4o-mini", api_key=settings.openai_api_key)
+        llm = get_chat_llm()
         text_snippet = "\n".join(conversation_df["text"].tolist()[:10])
         
         prompt = f"""
@@ -210,6 +210,74 @@ speaker는 반드시 int 형태로 반환해야해.
 class Analyzer:
     verbose: bool = False
 
+    def extract_segment_features(self, speaker_segments: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        화자 매핑과 무관한 세그먼트 단위 Feature 계산
+        - 세그먼트별 내용어(Kiwi), Prosody 정규화, 감정 흐름, 반응성, Trigger
+        - 매핑만 바뀐 재분석에서는 이 결과를 그대로 재사용
+        """
+        # ----------------------------------
+        # 1) 세그먼트별 내용어 (Kiwi)
+        # ----------------------------------
+        segment_words = [extract_content_words(seg["text"]) for seg in speaker_segments]
+
+        # ----------------------------------
+        # 2) Prosody Normalization
+        # ----------------------------------
+        normalizer = DialectProsodyNormalizer()
+        prosody_norm = normalizer.normalize(speaker_segments)
+
+        # ----------------------------------
+        # 3) 감정 흐름 분석: prosody_norm의 slope 기반
+        # ----------------------------------
+        slopes = [
+            t.get("observed_slope")
+            for t in prosody_norm.get("turn_prosody", [])
+            if t.get("observed_slope") is not None
+        ]
+
+        if slopes:
+            avg_slope = sum(slopes) / len(slopes)
+            if avg_slope > 5:
+                emotion_trajectory = "rising (감정 상승)"
+            elif avg_slope < -5:
+                emotion_trajectory = "falling (감정 하강)"
+            else:
+                emotion_trajectory = "stable (안정적)"
+        else:
+            emotion_trajectory = "unknown"
+
+        # ----------------------------------
+        # 4) 반응성 분석: 발화 간 텀(시간), 발화 길이 기반
+        # ----------------------------------
+        from numpy import mean
+
+        durations = []
+        for seg in speaker_segments:
+            start = seg.get("start")
+            end = seg.get("end")
+            if start is not None and end is not None:
+                durations.append(end - start)
+
+        if durations:
+            avg_len = mean(durations)
+            if avg_len > 5:
+                responsiveness = "slow"
+            elif avg_len < 1.5:
+                responsiveness = "fast"
+            else:
+                responsiveness = "moderate"
+        else:
+            responsiveness = "unknown"
+
+        return {
+            "segment_words": segment_words,
+            "prosody_norm": prosody_norm,
+            "emotion_trajectory": emotion_trajectory,
+            "responsiveness": responsiveness,
+            "trigger": self._detect_triggers(speaker_segments, prosody_norm),
+        }
+
     def analyze(
         self,
         speaker_segments: List[Dict[str, Any]],
@@ -219,8 +287,16 @@ class Analyzer:
         user_name: str,
         user_speaker_label: str,
         other_speaker_label: str,
-        other_display_name: str
+        other_display_name: str,
+        on_token: Optional[Callable[[str], None]] = None,
+        segment_features: Optional[Dict[str, Any]] = None,
     ):
+        """
+        사용자 중심 분석
+        - segment_features가 주어지면 매핑 무관 Feature 계산을 건너뜀
+        """
+        if segment_features is None:
+            segment_features = self.extract_segment_features(speaker_segments)
 
         # ----------------------------------
         # 1) DataFrame 생성
@@ -235,22 +311,18 @@ class Analyzer:
         print(df.head(10))
 
         # ----------------------------------
-        # 2) 텍스트 Feature
+        # 2) 텍스트 Feature (세그먼트 내용어를 화자별로 집계)
         # ----------------------------------
+        is_user = (df["speaker"] == user_speaker_label).tolist()
         user_df = df[df["speaker"] == user_speaker_label]
         other_df = df[df["speaker"] != user_speaker_label]
 
-        print("\n[DEBUG] user_df:", user_df.head())
-        print("[DEBUG] other_df:", other_df.head())
-
-        user_text = " ".join(user_df["text"].tolist())
-        other_text = " ".join(other_df["text"].tolist())
-
-        print("\n[DEBUG] user_text:", user_text)
-        print("[DEBUG] other_text:", other_text)
-
-        user_words = extract_content_words(user_text)
-        other_words = extract_content_words(other_text)
+        user_words = [
+            w for words, mine in zip(segment_features["segment_words"], is_user) if mine for w in words
+        ]
+        other_words = [
+            w for words, mine in zip(segment_features["segment_words"], is_user) if not mine for w in words
+        ]
 
         print("\n[DEBUG] user_words:", user_words)
         print("[DEBUG] other_words:", other_words)
@@ -269,54 +341,14 @@ class Analyzer:
         }
 
         # ----------------------------------
-        # 3) Prosody Normalization
+        # 3) Prosody Normalization (매핑 무관)
         # ----------------------------------
-        normalizer = DialectProsodyNormalizer()
-        prosody_norm = normalizer.normalize(speaker_segments)
+        prosody_norm = segment_features["prosody_norm"]
 
         # ----------------------------------
-        # 4) Surrogate (감정 흐름 + 반응성)
+        # 4) Surrogate (감정 흐름 + 반응성 + 주도성)
         # ----------------------------------
-# (1) 감정 흐름 분석: prosody_norm의 slope 기반
-        slopes = [
-            t.get("observed_slope")
-            for t in prosody_norm.get("turn_prosody", [])
-            if t.get("observed_slope") is not None
-        ]
-
-        if slopes:
-            avg_slope = sum(slopes) / len(slopes)
-            if avg_slope > 5:
-                emotion_trajectory = "rising (감정 상승)"
-            elif avg_slope < -5:
-                emotion_trajectory = "falling (감정 하강)"
-            else:
-                emotion_trajectory = "stable (안정적)"
-        else:
-            emotion_trajectory = "unknown"
-
-        # (2) 반응성 분석: 발화 간 텀(시간), 발화 길이 기반
-        from numpy import mean
-
-        durations = []
-        for seg in speaker_segments:
-            start = seg.get("start")
-            end = seg.get("end")
-            if start is not None and end is not None:
-                durations.append(end - start)
-
-        if durations:
-            avg_len = mean(durations)
-            if avg_len > 5:
-                responsiveness = "slow"
-            elif avg_len < 1.5:
-                responsiveness = "fast"
-            else:
-                responsiveness = "moderate"
-        else:
-            responsiveness = "unknown"
-
-        # (3) 발화 비율 기반 주도성
+        # 발화 비율 기반 주도성 (매핑 의존)
         user_count = len(user_df)
         other_count = len(other_df)
         dominance_ratio = user_count / (user_count + other_count + 1e-6)
@@ -330,16 +362,16 @@ class Analyzer:
 
         # 최종 Surrogate 구성
         surrogate = {
-            "emotion_trajectory": emotion_trajectory,
-            "responsiveness": responsiveness,
+            "emotion_trajectory": segment_features["emotion_trajectory"],
+            "responsiveness": segment_features["responsiveness"],
             "dominance": dominance,
             "relationship_pattern": "neutral",  # 기본값 유지
         }
 
         # ----------------------------------
-        # 5) Trigger Detection
+        # 5) Trigger Detection (매핑 무관)
         # ----------------------------------
-        trigger = self._detect_triggers(speaker_segments, prosody_norm)
+        trigger = segment_features["trigger"]
 
         # ----------------------------------
         # 6) LLM Style Analysis
@@ -376,7 +408,8 @@ class Analyzer:
             statistics=statistics,
             prosody_norm=prosody_norm,
             surrogate=surrogate,
-            trigger=trigger
+            trigger=trigger,
+            on_token=on_token,
         )
 
         return {
@@ -527,7 +560,7 @@ class SafetyLLMAnalyzer:
         surrogate: Dict[str, Any],
         trigger: Dict[str, Any]
     ):
-        llm = ChatOpenAI(model="gpt-4o-mini", api_key=settings.openai_api_key)
+        llm = get_chat_llm()
 
         user_text = "\n".join(df[df["speaker"] == user_speaker_label]["text"].tolist())
         full_context = "\n".join(df["text"].tolist())
@@ -582,8 +615,75 @@ class SafetyLLMAnalyzer:
 # =========================================================
 # SummaryBuilder - LLM 기반 요약 생성
 # =========================================================
+def estimate_tokens(text: str) -> int:
+    """토큰 수 근사치 (한국어 기준 약 2자 = 1토큰)"""
+    return (len(text) + 1) // 2
+
+
+def split_turn_windows(
+    df: pd.DataFrame,
+    window_tokens: int,
+) -> List[List[str]]:
+    """
+    발화(turn) 경계를 유지한 채 대화를 토큰 예산 단위의 구간으로 분할
+    - 하나의 발화는 절대 두 구간으로 쪼개지지 않음
+    - 단일 발화가 예산을 넘으면 그 발화만으로 한 구간 구성
+    """
+    windows: List[List[str]] = []
+    current: List[str] = []
+    current_tokens = 0
+
+    for speaker, text in zip(df["speaker"].tolist(), df["text"].tolist()):
+        line = f"{speaker}: {text}"
+        line_tokens = estimate_tokens(line)
+        if current and current_tokens + line_tokens > window_tokens:
+            windows.append(current)
+            current, current_tokens = [], 0
+        current.append(line)
+        current_tokens += line_tokens
+
+    if current:
+        windows.append(current)
+    return windows
+
+
 @dataclass
 class SummaryBuilder:
+    # 전체 대화가 이 토큰 수를 넘으면 구간 요약(map-reduce) 모드로 전환
+    mapreduce_threshold: int = int(os.getenv("SUMMARY_MAPREDUCE_THRESHOLD", "6000"))
+    window_tokens: int = int(os.getenv("SUMMARY_WINDOW_TOKENS", "2000"))
+    max_concurrency: int = int(os.getenv("SUMMARY_MAX_CONCURRENCY", "4"))
+
+    def _summarize_windows(
+        self,
+        windows: List[List[str]],
+        user_name: str,
+        user_speaker_label: str,
+    ) -> List[str]:
+        """구간별 부분 요약을 병렬 생성 (map 단계)"""
+        llm = get_chat_llm(temperature=0.0)
+        total = len(windows)
+        prompts = [
+            f"""
+다음은 전체 대화 중 {i + 1}/{total} 구간입니다.
+{user_name}님({user_speaker_label})을 중심으로 이 구간을 8문장 이내로 요약하세요.
+- 다룬 주제와 흐름
+- {user_name}님의 감정 표현, 말투, 반응이 드러난 대표 발화(짧게 인용)
+- 상대방과의 상호작용 특징(질문·응답, 주도권, 갈등/공감 순간)
+해석이나 평가는 최소화하고 관찰된 사실 위주로 작성합니다. JSON 출력 금지.
+
+# 대화 구간
+{chr(10).join(lines)}
+"""
+            for i, lines in enumerate(windows)
+        ]
+
+        responses = llm.batch(prompts, config={"max_concurrency": self.max_concurrency})
+        return [
+            (r.content if hasattr(r, "content") else str(r)).strip()
+            for r in responses
+        ]
+
     def build(
         self,
         user_name: str,
@@ -596,11 +696,31 @@ class SummaryBuilder:
         prosody_norm: Dict[str, Any],
         surrogate: Dict[str, Any],
         trigger: Dict[str, Any],
+        on_token: Optional[Callable[[str], None]] = None,
     ):
-        llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.2, api_key=settings.openai_api_key)
+        """
+        리포트 생성
+        - on_token이 주어지면 스트리밍 모드로 생성하며 토큰 조각을 콜백으로 전달
+        """
+        llm = get_chat_llm(temperature=0.2)
         full_context = "\n".join(df["text"].tolist())
         user_text = "\n".join(df[df["speaker"] == user_speaker_label]["text"].tolist())
 
+        context_block = f"""# 전체 대화 내용
+{full_context}
+
+# {user_name}님 발화({user_speaker_label})
+{user_text}"""
+
+        # ✅ 긴 대화는 구간 요약 후 요약본으로 리포트 생성
+        if estimate_tokens(full_context) + estimate_tokens(user_text) > self.mapreduce_threshold:
+            windows = split_turn_windows(df, self.window_tokens)
+            print(f"📚 [SummaryBuilder] 장문 대화 → {len(windows)}개 구간 병렬 요약")
+            partials = self._summarize_windows(windows, user_name, user_speaker_label)
+            context_block = "# 전체 대화 구간별 요약 (시간 순)\n" + "\n\n".join(
+                f"[구간 {i + 1}/{len(partials)}]\n{p}" for i, p in enumerate(partials)
+            )
+
         prompt = f"""
 당신은 대화 분석 리포트를 작성하는 전문가입니다.
 아래 제공된 전체 발화, {user_name}님 정보, 텍스트·음향 분석 결과를 기반으로
@@ -703,11 +823,7 @@ class SummaryBuilder:
 
 ============================================================================
 
-# 전체 대화 내용
-{full_context}
-
-# {user_name}님 발화({user_speaker_label})
-{user_text}
+{context_block}
 
 # 텍스트 통계
 {json.dumps(statistics, ensure_ascii=False, indent=2)}
@@ -725,6 +841,15 @@ class SummaryBuilder:
 {json.dumps(trigger, ensure_ascii=False, indent=2)}
 """
 
+        # ✅ 스트리밍: 토큰 조각을 전달하면서 최종 텍스트는 그대로 누적
+        if on_token is not None:
+            parts: List[str] = []
+            for chunk in llm.stream(prompt):
+                delta = chunk.content if hasattr(chunk, "content") else str(chunk)
+                if delta:
+                    parts.append(delta)
+                    on_token(delta)
+            return "".join(parts).strip()
 
         resp = llm.invoke(prompt)
         summary = resp.content if hasattr(resp, "content") else str(resp)
@@ -2,7 +2,7 @@
 ✅ Analysis 모듈 실행 진입점
 """
 
-from app.llm.agent.Analysis.graph_analysis import AnalysisGraph
+from app.llm.agent.Analysis.graph_analysis import get_analysis_graph
 from app.core.database import SessionLocal
 import pandas as pd
 import pprint
@@ -45,7 +45,7 @@ def run_analysis(conv_id: str = None, id: int = None, conversation_df: pd.DataFr
     
     try:
         # ✅ AnalysisGraph 실행
-        graph = AnalysisGraph(verbose=True)
+        graph = get_analysis_graph(verbose=True)
         result_state = graph.run(
             db=db,
             conversation_df=conversation_df,
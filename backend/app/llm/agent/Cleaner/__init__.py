@@ -1,3 +1,3 @@
 # backend/app/agent/Cleaner/__init__.py
-from .graph_cleaner import CleanerGraph
+from .graph_cleaner import CleanerGraph, get_cleaner_graph
 from .nodes import *
\ No newline at end of file
@@ -1,6 +1,7 @@
 # app/agent/Cleaner/graph_cleaner.py
 from __future__ import annotations
 from dataclasses import dataclass, field
+from functools import lru_cache
 from typing import Any, List, Dict, Optional
 from langgraph.graph import StateGraph, END
 from sqlalchemy.orm import Session
@@ -187,3 +188,15 @@ class CleanerGraph:
             result_state = CleanerState(**result_state)
 
         return result_state
+
+
+# =====================================
+# ✅ 프로세스 단위 컴파일 그래프 (재사용)
+# =====================================
+@lru_cache(maxsize=None)
+def get_cleaner_graph(verbose: bool = True) -> CleanerGraph:
+    """
+    컴파일된 CleanerGraph 싱글턴
+    - 노드는 상태를 갖지 않고 실행별 데이터는 State에만 담기므로 동시 실행에 안전
+    """
+    return CleanerGraph(verbose=verbose)
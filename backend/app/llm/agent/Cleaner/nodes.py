@@ -3,8 +3,7 @@ from __future__ import annotations
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Any, Dict, List, Tuple
-from app.core.config import settings  # ✅ LLM 키 사용
-from langchain_openai import ChatOpenAI  # ✅ LLM 연결
+from app.llm.agent.clients import get_chat_llm  # ✅ LLM 연결 (프로세스 단위 재사용)
 import uuid
 
 try:
@@ -98,36 +97,19 @@ class RawInspector:
 # =========================================
 @dataclass
 class ConversationCleaner:
-    """LLM을 사용해 문장 정제 및 노이즈 제거"""
+    """LLM을 사용해 문장 정제 및 노이즈 제거 (그래프와 함께 프로세스 단위로 재사용되므로 상태를 두지 않음)"""
     verbose: bool = False
-    _cache: dict = None  # 캐시 저장소
-    
-    def __post_init__(self):
-        if self._cache is None:
-            self._cache = {}
 
     def clean(self, df: Any, state=None) -> Any:
         if pd is not None and isinstance(df, pd.DataFrame):
             out = df.copy()
-            llm = ChatOpenAI(model="gpt-4o-mini", api_key=settings.openai_api_key)
+            llm = get_chat_llm()
 
-            # 🚀 병렬 처리 + 캐싱으로 속도 최적화
+            # 🚀 병렬 처리 + 실행 내 중복 제거로 속도 최적화
             from concurrent.futures import ThreadPoolExecutor
-            import hashlib
-            
-            def get_cache_key(text):
-                """텍스트의 해시값으로 캐시 키 생성"""
-                return hashlib.md5(text.encode()).hexdigest()
             
             def clean_single_text(text):
-                """단일 텍스트 정제 (캐싱 적용)"""
-                # 캐시 확인
-                cache_key = get_cache_key(text)
-                if cache_key in self._cache:
-                    if self.verbose:
-                        print(f"💾 [캐시 사용] {text}")
-                    return self._cache[cache_key]
-                
+                """단일 텍스트 정제"""
                 prompt = f"다음 문장에서 철자 오류나 이상한 기호를 자연스럽게 수정해줘:\n{text}"
                 if self.verbose:
                     print(f"🪶 [Cleaner LLM 입력] {text}")
@@ -138,8 +120,6 @@ class ConversationCleaner:
                         if hasattr(response, "content")
                         else str(response)
                     )
-                    # 캐시에 저장
-                    self._cache[cache_key] = cleaned_text
                     if self.verbose:
                         print(f"✅ [Cleaner LLM 결과] {cleaned_text}")
                     return cleaned_text
@@ -148,12 +128,16 @@ class ConversationCleaner:
                         print(f"⚠️ LLM 호출 실패: {e}")
                     return text
 
-            # 병렬 처리 (최대 5개 동시 처리) + 캐싱
+            # 같은 문장은 한 번만 정제 (결과는 이번 실행 안에서만 유지, 사용자 대화를 노드에 남기지 않음)
             texts = out["text"].tolist()
+            unique_texts = list(dict.fromkeys(texts))
+            if self.verbose and len(unique_texts) < len(texts):
+                print(f"💾 [중복 문장 재사용] {len(texts) - len(unique_texts)}개")
+            # 병렬 처리 (최대 5개 동시 처리)
             with ThreadPoolExecutor(max_workers=5) as executor:
-                cleaned = list(executor.map(clean_single_text, texts))
+                cleaned = dict(zip(unique_texts, executor.map(clean_single_text, unique_texts)))
             
-            out["text"] = cleaned
+            out["text"] = [cleaned[text] for text in texts]
             return out
         return df
 
@@ -183,7 +167,7 @@ class ConversationValidator:
 
     def _llm_judge(self, df: Any) -> Tuple[bool, str]:
         """LLM으로 감정 분석 적합 여부 판단"""
-        llm = ChatOpenAI(model="gpt-4o-mini", api_key=settings.openai_api_key)
+        llm = get_chat_llm()
         text = "\n".join(df["text"].astype(str).tolist()[:6])
         prompt = f"다음 대화가 감정분석에 적합한가? '적합' 또는 '부적합'으로만 대답:\n{text}"
         try:
@@ -7,7 +7,7 @@
   - create_date DESC 기준으로 가장 최근 데이터 자동 선택
 """
 
-from app.llm.agent.Cleaner.graph_cleaner import CleanerGraph
+from app.llm.agent.Cleaner.graph_cleaner import get_cleaner_graph
 from app.core.database import SessionLocal
 from sqlalchemy import text
 import traceback
@@ -68,7 +68,7 @@ def run_cleaner(conv_id: str = None, id: int = None):
                 print(f"✅ 조회된 id: {id}")
 
         # ✅ CleanerGraph 실행
-        cg = CleanerGraph(verbose=True)
+        cg = get_cleaner_graph(verbose=True)
         result_state = cg.run(
             db=db,
             conv_id=conv_id,
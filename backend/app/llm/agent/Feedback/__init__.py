@@ -1,3 +1,3 @@
 # backend/app/llm/agent/Feedback/__init__.py
-from .graph_feedback import FeedbackGraph
+from .graph_feedback import FeedbackGraph, get_feedback_graph
 from .nodes import *
\ No newline at end of file
@@ -3,13 +3,15 @@
 
 from __future__ import annotations
 from dataclasses import dataclass, field
-from typing import Optional, Dict, Any, List
+from functools import lru_cache
+from typing import Callable, Optional, Dict, Any, List
 
 import pandas as pd
 from sqlalchemy.orm import Session
 from langgraph.graph import StateGraph, END
 
 from .nodes import SummaryLoaderNode, SummaryToBookQueryNode, RAGAndAdviceNode
+from app.llm.agent.checkpoint import StageCheckpointer
 
 
 @dataclass
@@ -35,12 +37,24 @@ class FeedbackState:
     advice_text: Optional[str] = None
     counsel_sections: List[Dict[str, Any]] = field(default_factory=list)
     talk_sections: List[Dict[str, Any]] = field(default_factory=list)
+    context_tokens: int = 0  # 프롬프트에 넣은 책 문맥 토큰 수
 
     # DB 저장 결과
     save_result: Optional[Dict[str, Any]] = None
 
     verbose: bool = True
 
+    # 조언 토큰 스트리밍 콜백 (WebSocket 전송용)
+    on_token: Optional[Callable[[str], None]] = None
+
+    # 단계별 체크포인트 (재시도 시 성공한 단계 재사용)
+    checkpointer: Optional[StageCheckpointer] = None
+
+
+# 단계별로 체크포인트에 남길 FeedbackState 필드
+_QUERY_FIELDS = ("counsel_query", "talk_query")
+_ADVICE_FIELDS = ("advice_text", "save_result", "counsel_sections", "talk_sections")
+
 
 class FeedbackGraph:
     def __init__(self, verbose: bool = True):
@@ -66,10 +80,25 @@ class FeedbackGraph:
         return self.loader(state)
 
     def node_summary_to_book_query(self, state: FeedbackState) -> FeedbackState:
-        return self.query_maker(state)
+        return self._run_with_checkpoint(state, "book_query", self.query_maker, _QUERY_FIELDS)
 
     def node_rag_and_advice(self, state: FeedbackState) -> FeedbackState:
-        return self.rag_and_advice(state)
+        return self._run_with_checkpoint(state, "rag_and_advice", self.rag_and_advice, _ADVICE_FIELDS)
+
+    def _run_with_checkpoint(self, state: FeedbackState, stage: str, node, fields) -> FeedbackState:
+        """체크포인트가 있으면 저장된 필드를 복원, 없으면 노드 실행 후 저장"""
+        if state.checkpointer is None:
+            return node(state)
+
+        cached = state.checkpointer.load(stage)
+        if cached is not None:
+            for name in fields:
+                setattr(state, name, cached.get(name))
+            return state
+
+        state = node(state)
+        state.checkpointer.save(stage, {name: getattr(state, name) for name in fields})
+        return state
 
     def run(
         self,
@@ -78,6 +107,8 @@ class FeedbackGraph:
         id: int,
         conversation_df: pd.DataFrame,
         analysis_id: Optional[str] = None,
+        on_token: Optional[Callable[[str], None]] = None,
+        checkpointer: Optional[StageCheckpointer] = None,
     ) -> Dict[str, Any]:
         state = FeedbackState(
             db=db,
@@ -86,6 +117,8 @@ class FeedbackGraph:
             conversation_df=conversation_df,
             analysis_id=analysis_id,
             verbose=self.verbose,
+            on_token=on_token,
+            checkpointer=checkpointer,
         )
 
         result_state = self.pipeline.invoke(state)
@@ -101,6 +134,7 @@ class FeedbackGraph:
             save_result_val = get("save_result")
             counsel_sections_val = get("counsel_sections", [])
             talk_sections_val = get("talk_sections", [])
+            context_tokens_val = get("context_tokens", 0)
         else:
             # dataclass FeedbackState인 경우
             conv_id_val = result_state.conv_id
@@ -111,6 +145,7 @@ class FeedbackGraph:
             save_result_val = result_state.save_result
             counsel_sections_val = result_state.counsel_sections
             talk_sections_val = result_state.talk_sections
+            context_tokens_val = result_state.context_tokens
 
         return {
             "conv_id": conv_id_val,
@@ -121,4 +156,17 @@ class FeedbackGraph:
             "save_result": save_result_val,
             "counsel_sections": counsel_sections_val,
             "talk_sections": talk_sections_val,
+            "context_tokens": context_tokens_val,
         }
+
+
+# =====================================
+# ✅ 프로세스 단위 컴파일 그래프 (재사용)
+# =====================================
+@lru_cache(maxsize=None)
+def get_feedback_graph(verbose: bool = True) -> FeedbackGraph:
+    """
+    컴파일된 FeedbackGraph 싱글턴
+    - 노드는 상태를 갖지 않고 실행별 데이터는 State에만 담기므로 동시 실행에 안전
+    """
+    return FeedbackGraph(verbose=verbose)
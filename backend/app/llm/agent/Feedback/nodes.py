@@ -7,16 +7,28 @@ from typing import TYPE_CHECKING, Dict, Any, List
 
 import os
 import json
+from contextlib import closing
+import numpy as np
 import psycopg2
 import psycopg2.extras as extras
 import pandas as pd
 from sqlalchemy.orm import Session
 from openai import OpenAI
-from langchain_openai import ChatOpenAI
 
 from app.core.database import engine
 from app.core.config import settings
+from app.llm.agent.clients import DEFAULT_CHAT_MODEL, get_chat_llm, get_openai_client
 from app.llm.agent.crud import get_analysis_by_conv_id, save_feedback
+from app.llm.rag.context_packer import pack_context
+from app.llm.rag.rerank import DEFAULT_MAX_PER_BOOK, DEFAULT_MMR_LAMBDA, MMR_POOL_FACTOR, mmr_rerank
+from app.llm.rag.retrieval_cache import get_retrieval_cache, text_key
+from app.llm.rag.tokenizer import get_token_counter
+from app.llm.rag.vector_db.embedding_versions import embed_query, get_embedding_version
+from app.llm.rag.vector_db.lexical import (
+    HYBRID_VECTOR_K, hybrid_candidates_sql, hybrid_params, tsquery_text, validate_mode,
+)
+from app.llm.rag.vector_db.local_index import get_local_index
+from app.llm.rag.vector_db.section_store import section_table_name
 
 if TYPE_CHECKING:
     from .graph_feedback import FeedbackState
@@ -67,10 +79,7 @@ class SummaryToBookQueryNode:
         if not summary:
             raise ValueError("❌ SummaryToBookQueryNode: summary 없음")
 
-        llm = ChatOpenAI(
-            model="gpt-4o-mini",
-            api_key=settings.openai_api_key,
-        )
+        llm = get_chat_llm()
 
         prompt = f"""
 너는 상담 관련 책과 대화법 책을 잘 아는 '전문 사서'이다.
@@ -170,16 +179,18 @@ class SummaryToBookQueryNode:
 class RAGAndAdviceNode:
     verbose: bool = True
 
-    def _make_query_embedding(self, client: OpenAI, text: str, model="text-embedding-3-small") -> list:
+    def _make_query_embedding(self, client: OpenAI, text: str) -> np.ndarray:
         t = (text or "").strip()
         if not t:
             raise ValueError("query is empty")
-        return client.embeddings.create(model=model, input=[t]).data[0].embedding
+        # 활성 임베딩 버전(RAG_EMBEDDING_VERSION)의 모델/차원으로 생성
+        # float32 배열로 보관 → pgvector 어댑터가 그대로 vector 파라미터로 변환 (halfvec은 SQL 캐스트)
+        return embed_query(client, t)
 
     def _knn_search(
         self,
         conn,
-        qvec: list,
+        qvec: np.ndarray,
         table: str,
         limit: int = 50,
         for_counsel: bool | None = None,
@@ -194,7 +205,10 @@ class RAGAndAdviceNode:
         elif for_counsel is False:
             where = "WHERE (book_title NOT LIKE '%%상담%%' OR book_title IS NULL)"
 
+        # 쿼리 벡터는 CTE에서 한 번만 바인딩하고 거리 계산/정렬에서는 q.v로 참조
+        version = get_embedding_version()
         sql = f"""
+          WITH q AS (SELECT %s::{version.sql_type} AS v)
           SELECT snippet_id,
                  section_id,
                  canonical_path,
@@ -204,126 +218,342 @@ class RAGAndAdviceNode:
                  citation,
                  full_text,
                  book_title,
-                 (embedding <=> %s::vector) AS distance
-          FROM {table}
+                 ({version.column} <=> q.v) AS distance
+          FROM {table} CROSS JOIN q
           {where}
           ORDER BY distance
           LIMIT %s
         """
         with conn.cursor(cursor_factory=extras.RealDictCursor) as cur:
-            # ⚠️ 여기 파라미터는 두 개만!
-            cur.execute(sql, (qvec, limit))
+            # ⚠️ 여기 파라미터는 두 개만! (qvec은 numpy 배열 → pgvector 어댑터)
+            cur.execute(sql, (np.asarray(qvec, dtype=np.float32), limit))
             return cur.fetchall()
 
-    def _fetch_full_sections(self, conn, table: str, section_ids: list[str]) -> list[dict]:
-        if not section_ids:
-            return []
-
-        sql = f"""
-          SELECT section_id, canonical_path, chunk_ix,
-                 page_start, page_end, citation, full_text, book_title
-          FROM {table}
-          WHERE section_id = ANY(%s)
-          ORDER BY section_id, chunk_ix, page_start, page_end
+    def _retrieve_sections(
+        self,
+        queries: Dict[str, tuple],
+        table: str,
+        sim_threshold: float,
+        knn_limit: int | None = None,
+        max_sections: int = 6,
+        mode: str = "vector",
+        query_texts: Dict[str, str] | None = None,
+        mmr_lambda: float | None = None,
+        max_per_book: int | None = None,
+    ) -> Dict[str, List[Dict[str, Any]]]:
         """
-        with conn.cursor(cursor_factory=extras.RealDictCursor) as cur:
-            cur.execute(sql, (section_ids,))
-            rows = cur.fetchall()
+        queries: {이름: (qvec, for_counsel)}
+        → 한 번의 쿼리로 KNN 후보 → 임계값 필터 → 섹션별 최소 거리 → 섹션 테이블에서 전문/출처 조회
+        → {이름: 거리순 섹션 리스트(최대 max_sections개)}
+        mode="hybrid": query_texts의 Kiwi 어휘 후보 + 벡터 후보(기본 20개)를 RRF로 융합한 순서
+        mmr_lambda: 주면 max_sections × 3개 후보를 받아 섹션 임베딩 MMR(책별 max_per_book개 제한)로 max_sections개 선택
+        """
+        if not queries:
+            return {}
+
+        names = list(queries)
+        pool = max_sections * MMR_POOL_FACTOR if mmr_lambda is not None else max_sections
+        local_index = get_local_index()
+        if validate_mode(mode) == "hybrid":
+            rows = self._db_hybrid_section_rows(
+                queries, query_texts or {}, table, sim_threshold, knn_limit or HYBRID_VECTOR_K, pool
+            )
+        elif local_index is not None and local_index.table == table:
+            rows = self._local_section_rows(local_index, queries, table, sim_threshold, knn_limit or 50, pool)
+        else:
+            rows = self._db_section_rows(queries, table, sim_threshold, knn_limit or 50, pool)
 
-        by: Dict[str, Any] = {}
+        by_name: Dict[str, List[Dict[str, Any]]] = {name: [] for name in names}
         for r in rows:
-            g = by.setdefault(r["section_id"], {
-                "section_id": r["section_id"],
-                "canonical_path": r["canonical_path"],
-                "book_title": r.get("book_title"),
-                "snippets": [],
-                "citations": set(),
-            })
-            g["snippets"].append(r)
-            if r.get("citation"):
-                g["citations"].add(r["citation"])
-
-        sections = []
-        for sec in by.values():
-            text = "\n\n".join(x["full_text"] for x in sec["snippets"] if x.get("full_text"))
-            sections.append({
-                "section_id": sec["section_id"],
-                "canonical_path": sec["canonical_path"],
-                "book_title": sec["book_title"],
-                "text": text.strip(),
-                "citations": sorted(sec["citations"]),
-            })
-        return sections
+            by_name[r["name"]].append(self._to_section(r))
 
-    def _build_sections_with_filter(
+        for name in names:
+            if mmr_lambda is not None:
+                # 관련도는 검색 유사도, 중복도는 섹션 임베딩끼리 비교 → 같은 장/책의 비슷한 섹션을 덜 고름
+                by_name[name] = mmr_rerank(
+                    by_name[name], max_sections, lambda_=mmr_lambda, max_per_group=max_per_book
+                )
+            for sec in by_name[name]:
+                sec.pop("embedding", None)
+
+        if self.verbose:
+            self._print_sections(by_name, f"mode={mode}, sim_threshold={sim_threshold}")
+
+        return by_name
+
+    def _retrieve_sections_cached(
         self,
-        qvec: list,
+        client: OpenAI,
+        queries: Dict[str, tuple],
         table: str,
         sim_threshold: float,
-        for_counsel: bool | None = None,
-    ) -> List[Dict[str, Any]]:
+        max_sections: int = 6,
+        mode: str = "vector",
+        mmr_lambda: float | None = None,
+        max_per_book: int | None = None,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        queries: {이름: (쿼리 텍스트, for_counsel)}
+        → 검색 캐시(쿼리 텍스트 해시 + 검색 조건 → 섹션 ID 순위)에 있으면 임베딩/KNN 없이 섹션 본문만 ID로 조회,
+          없는 쿼리만 임베딩 후 _retrieve_sections로 한 번에 검색하고 결과 순위를 캐시에 저장
+        캐시는 수집 시 올라가는 코퍼스 버전이 바뀌면 비워짐 (app.llm.rag.retrieval_cache)
+        """
+        cache = get_retrieval_cache()
+        version = cache.current_version()
+        conditions = (table, sim_threshold, max_sections, mode, mmr_lambda, max_per_book, get_embedding_version().name)
+        keys = {
+            name: cache.key(text_key(text), for_counsel, *conditions)
+            for name, (text, for_counsel) in queries.items()
+        }
+        cached = {name: cache.get(key) for name, key in keys.items()}
+        misses = {name: query for name, query in queries.items() if cached[name] is None}
+
+        by_name: Dict[str, List[Dict[str, Any]]] = {}
+        if misses:
+            by_name.update(self._retrieve_sections(
+                {
+                    name: (self._make_query_embedding(client, text), for_counsel)
+                    for name, (text, for_counsel) in misses.items()
+                },
+                table, sim_threshold,
+                max_sections=max_sections,
+                mode=mode,
+                query_texts={name: text for name, (text, _) in misses.items()},
+                mmr_lambda=mmr_lambda,
+                max_per_book=max_per_book,
+            ))
+            for name in misses:
+                cache.put(keys[name], [(sec["section_id"], sec["best_dist"]) for sec in by_name[name]], version)
+
+        hits = {name: ranked for name, ranked in cached.items() if ranked is not None}
+        if hits:
+            rows = self._fetch_sections_by_id(
+                table, [(name, sid, dist) for name, ranked in hits.items() for sid, dist in ranked]
+            )
+            cached_sections: Dict[str, List[Dict[str, Any]]] = {name: [] for name in hits}
+            for r in rows:
+                sec = self._to_section(r)
+                sec.pop("embedding", None)
+                cached_sections[r["name"]].append(sec)
+            if self.verbose:
+                self._print_sections(cached_sections, "검색 캐시 히트")
+            by_name.update(cached_sections)
+
+        return {name: by_name[name] for name in queries}
+
+    @staticmethod
+    def _to_section(r: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "section_id": r["section_id"],
+            "canonical_path": r["canonical_path"],
+            "book_title": r["book_title"],
+            "text": (r["text"] or "").strip(),
+            "citations": sorted(r["citations"] or []),
+            "best_dist": float(r["best_dist"]),
+            "similarity": 1.0 - float(r["best_dist"]),
+            "embedding": r.get("embedding"),
+        }
+
+    @staticmethod
+    def _print_sections(by_name: Dict[str, List[Dict[str, Any]]], label: str) -> None:
+        for name, sections in by_name.items():
+            print(f"\n🔎 [RAG] {name}: {label}, 통과 section 수={len(sections)}")
+            for sec in sections:
+                print(
+                    f"   section_id={sec['section_id']}, "
+                    f"book_title={sec.get('book_title')}, "
+                    f"distance={sec['best_dist']:.4f}, sim={1.0 - sec['best_dist']:.4f}"
+                )
+
+    def _db_section_rows(self, queries, table, sim_threshold, knn_limit, max_sections) -> List[Dict[str, Any]]:
+        """pgvector에서 한 번의 쿼리로 KNN부터 섹션 조회까지 수행"""
+        names = list(queries)
+        version = get_embedding_version()
+        values = ", ".join([f"(%s, %s, %s::{version.sql_type}, %s::boolean)"] * len(names))
+        params: List[Any] = []
+        for ord_, name in enumerate(names):
+            qvec, for_counsel = queries[name]
+            params.extend([ord_, name, np.asarray(qvec, dtype=np.float32), for_counsel])
+        params.extend([knn_limit, sim_threshold, max_sections])
+
+        # for_counsel: True → 상담 책만 / False → 상담 아닌 책(제목 없음 포함)만 / NULL → 전체
+        sql = f"""
+          WITH q(ord, name, v, for_counsel) AS (
+            VALUES {values}
+          ),
+          knn AS (
+            SELECT q.ord, q.name, c.section_id, c.distance
+            FROM q
+            CROSS JOIN LATERAL (
+              SELECT t.section_id, (t.{version.column} <=> q.v) AS distance
+              FROM {table} t
+              WHERE q.for_counsel IS NULL
+                 OR COALESCE(t.book_title LIKE '%%상담%%', FALSE) = q.for_counsel
+              ORDER BY t.{version.column} <=> q.v
+              LIMIT %s
+            ) c
+          ),
+          best AS (
+            SELECT ord, name, section_id, MIN(distance) AS best_dist
+            FROM knn
+            WHERE 1 - distance >= %s
+            GROUP BY ord, name, section_id
+          ),
+          ranked AS (
+            SELECT best.*,
+                   ROW_NUMBER() OVER (PARTITION BY ord ORDER BY best_dist, section_id) AS rank
+            FROM best
+          )
+          SELECT r.name,
+                 r.section_id,
+                 r.best_dist,
+                 s.canonical_path,
+                 s.book_title,
+                 s.full_text AS text,
+                 s.citations,
+                 s.embedding
+          FROM ranked r
+          JOIN {section_table_name(table)} s ON s.section_id = r.section_id
+          WHERE r.rank <= %s
+          ORDER BY r.ord, r.rank
+        """
         conn = engine.raw_connection()
         try:
-            rows = self._knn_search(conn, qvec, table=table, limit=50, for_counsel=for_counsel)
+            with conn.cursor(cursor_factory=extras.RealDictCursor) as cur:
+                cur.execute(sql, params)
+                return cur.fetchall()
         finally:
             conn.close()
 
-        if self.verbose:
-            print(f"\n🔎 [RAG] knn 결과 {len(rows)}개 (for_counsel={for_counsel})")
-            for r in rows[:10]:
-                d = float(r["distance"])
-                sim = 1.0 - d
-                print(
-                    f"   section_id={r['section_id']}, "
-                    f"book_title={r.get('book_title')}, "
-                    f"distance={d:.4f}, sim={sim:.4f}"
-                )
-
-        filtered_ids = set()
-        best_dist_map: Dict[str, float] = {}
-
-        for r in rows:
-            d = r.get("distance")
-            if d is None:
-                continue
-            d = float(d)
-            sim = 1.0 - d
+    def _db_hybrid_section_rows(self, queries, query_texts, table, sim_threshold, vector_k, max_sections) -> List[Dict[str, Any]]:
+        """어휘 + 벡터 후보 → 청크별 RRF → 섹션별 최고 점수 → 섹션 테이블 조회 (한 번의 쿼리)"""
+        version = get_embedding_version()
+        params: Dict[str, Any] = {"max_sections": max_sections, **hybrid_params(1 - sim_threshold, vector_k=vector_k)}
+        values = []
+        for ord_, name in enumerate(queries):
+            qvec, for_counsel = queries[name]
+            values.append(
+                f"(%(ord{ord_})s, %(name{ord_})s, %(v{ord_})s::{version.sql_type}, "
+                f"to_tsquery('simple', %(tsq{ord_})s), %(for_counsel{ord_})s::boolean)"
+            )
+            params.update({
+                f"ord{ord_}": ord_,
+                f"name{ord_}": name,
+                f"v{ord_}": np.asarray(qvec, dtype=np.float32),
+                f"tsq{ord_}": tsquery_text(query_texts.get(name, "")),
+                f"for_counsel{ord_}": for_counsel,
+            })
 
-            if sim < sim_threshold:
-                continue
+        candidate_filter = "q.for_counsel IS NULL OR COALESCE(t.book_title LIKE '%%상담%%', FALSE) = q.for_counsel"
+        sql = f"""
+          WITH q(ord, name, v, tsq, for_counsel) AS (
+            VALUES {", ".join(values)}
+          ),
+          {hybrid_candidates_sql(table, version.column, candidate_filter)},
+          best AS (
+            SELECT f.ord, t.section_id, MAX(f.rrf) AS rrf, MIN(f.distance) AS best_dist
+            FROM fused f
+            JOIN {table} t ON t.snippet_id = f.snippet_id
+            WHERE t.section_id IS NOT NULL
+            GROUP BY f.ord, t.section_id
+          ),
+          ranked AS (
+            SELECT best.*,
+                   ROW_NUMBER() OVER (PARTITION BY ord ORDER BY rrf DESC, best_dist, section_id) AS rank
+            FROM best
+          )
+          SELECT q.name,
+                 r.section_id,
+                 r.best_dist,
+                 s.canonical_path,
+                 s.book_title,
+                 s.full_text AS text,
+                 s.citations,
+                 s.embedding
+          FROM ranked r
+          JOIN q ON q.ord = r.ord
+          JOIN {section_table_name(table)} s ON s.section_id = r.section_id
+          WHERE r.rank <= %(max_sections)s
+          ORDER BY r.ord, r.rank
+        """
+        conn = engine.raw_connection()
+        try:
+            with conn.cursor(cursor_factory=extras.RealDictCursor) as cur:
+                cur.execute(sql, params)
+                return cur.fetchall()
+        finally:
+            conn.close()
 
-            sid = r["section_id"]
-            filtered_ids.add(sid)
-            if sid not in best_dist_map or d < best_dist_map[sid]:
-                best_dist_map[sid] = d
+    def _local_section_rows(self, local_index, queries, table, sim_threshold, knn_limit, max_sections) -> List[Dict[str, Any]]:
+        """로컬 메모리 맵 인덱스로 KNN → 섹션별 최소 거리 → 섹션 테이블은 ID로 한 번만 조회"""
+        # 코퍼스 버전이 바뀌었으면 주기와 관계없이 동기화 (검색 캐시에 수집 전 순위가 저장되지 않도록)
+        local_index.maybe_refresh(
+            lambda: closing(engine.raw_connection()),
+            corpus_version=get_retrieval_cache().current_version(),
+        )
 
-        if self.verbose:
-            print(f"   🔍 sim_threshold={sim_threshold}, 통과 section 수={len(filtered_ids)}")
+        ranked: List[tuple] = []
+        for name, (qvec, for_counsel) in queries.items():
+            hits = local_index.search(
+                qvec,
+                knn_limit,
+                category="counsel" if for_counsel is True else None,
+                exclude_category="counsel" if for_counsel is False else None,
+                min_similarity=sim_threshold,
+            )
+            best: Dict[str, float] = {}
+            for hit in hits:
+                sid = hit["section_id"]
+                if sid is not None and hit["distance"] < best.get(sid, float("inf")):
+                    best[sid] = hit["distance"]
+            ranked.extend(
+                (name, sid, dist)
+                for sid, dist in sorted(best.items(), key=lambda item: (item[1], item[0]))[:max_sections]
+            )
+        return self._fetch_sections_by_id(table, ranked)
 
-        if not filtered_ids:
+    def _fetch_sections_by_id(self, table, ranked) -> List[Dict[str, Any]]:
+        """ranked: [(이름, section_id, 거리)] 순서대로 섹션 테이블에서 ID로 한 번에 조회"""
+        if not ranked:
             return []
 
-        conn2 = engine.raw_connection()
+        sql = f"""
+          SELECT section_id, canonical_path, book_title, full_text AS text, citations, embedding
+          FROM {section_table_name(table)}
+          WHERE section_id = ANY(%s)
+        """
+        conn = engine.raw_connection()
         try:
-            sections = self._fetch_full_sections(conn2, table, sorted(filtered_ids))
+            with conn.cursor(cursor_factory=extras.RealDictCursor) as cur:
+                cur.execute(sql, (sorted({sid for _, sid, _ in ranked}),))
+                sections = {r["section_id"]: r for r in cur.fetchall()}
         finally:
-            conn2.close()
+            conn.close()
 
-        for s in sections:
-            s["best_dist"] = best_dist_map.get(s["section_id"])
+        return [
+            {**sections[sid], "name": name, "best_dist": dist}
+            for name, sid, dist in ranked if sid in sections
+        ]
 
-        sections.sort(
-            key=lambda z: (
-                float("inf") if z.get("best_dist") is None else z["best_dist"]
-            )
-        )
-        return sections[:6]
+    def _build_sections_with_filter(
+        self,
+        qvec: np.ndarray,
+        table: str,
+        sim_threshold: float,
+        for_counsel: bool | None = None,
+    ) -> List[Dict[str, Any]]:
+        return self._retrieve_sections({"query": (qvec, for_counsel)}, table, sim_threshold)["query"]
 
 
     def __call__(self, state: "FeedbackState") -> "FeedbackState":
         API_KEY = os.getenv("OPENAI_API_KEY") or settings.openai_api_key
         TABLE   = os.getenv("IDEAL_ANSWER_TABLE") or "ideal_answer"
         SIM_TH  = float(os.getenv("RAG_SIM_THRESHOLD") or 0.45)  # 유사도 0.45 이상만 사용
+        MODE    = os.getenv("RAG_SEARCH_MODE") or "vector"  # vector / hybrid(어휘 + 벡터 RRF)
+        MMR_LAMBDA   = float(os.getenv("RAG_MMR_LAMBDA") or DEFAULT_MMR_LAMBDA)  # 1.0이면 유사도 순서 그대로
+        # 책별 최대 섹션 수 (설정하지 않으면 제한 없음)
+        MAX_PER_BOOK = int(os.getenv("RAG_MAX_PER_BOOK")) if os.getenv("RAG_MAX_PER_BOOK") else DEFAULT_MAX_PER_BOOK
+        CTX_TOKENS   = int(os.getenv("RAG_CONTEXT_TOKENS") or 1500)  # 상담/대화 문맥 각각의 토큰 예산
 
         if not API_KEY:
             raise ValueError("❌ OPENAI_API_KEY 필요")
@@ -342,47 +572,60 @@ class RAGAndAdviceNode:
         if not db:
             raise ValueError("❌ RAGAndAdviceNode: db 세션 없음")
 
-        client = OpenAI(api_key=API_KEY)
-
-        # 1) 쿼리 임베딩
-        qvec_counsel = self._make_query_embedding(client, counsel_query)
-        qvec_talk    = self._make_query_embedding(client, talk_query)
-
-        # 2) ideal_answer에서 섹션 가져오기 (유사도 0.45 이상만)
-        sections_cand_counsel = self._build_sections_with_filter(
-            qvec_counsel, TABLE, SIM_TH, for_counsel=True
+        client = get_openai_client()
+
+        # 1) 쿼리 임베딩 → 2) ideal_answer에서 섹션 가져오기
+        #    (유사도 0.45 이상만, 상담/대화 한 번의 쿼리로, MMR로 중복 섹션 제외, 같은 쿼리/조건은 검색 캐시 재사용)
+        sections = self._retrieve_sections_cached(
+            client,
+            {
+                "counsel": (counsel_query, True),
+                "talk":    (talk_query,    False),
+            },
+            TABLE, SIM_TH,
+            mode=MODE,
+            mmr_lambda=MMR_LAMBDA,
+            max_per_book=MAX_PER_BOOK,
         )
-        sections_cand_talk    = self._build_sections_with_filter(
-            qvec_talk,    TABLE, SIM_TH, for_counsel=False
-        )
-        
-        # 3)이제는 이미 KNN에서 상담/비상담 나눠졌으니까 그대로 씀
-        counsel_sections = sections_cand_counsel
-        talk_sections    = sections_cand_talk
 
-        state.counsel_sections = counsel_sections
-        state.talk_sections    = talk_sections
+        # 3) KNN에서 이미 상담/비상담 나눠졌으니까 그대로 씀
+        # 4) 토큰 예산 안에서 관련도 합이 크도록 섹션을 골라(넘치는 섹션은 본문만 잘라서) 컨텍스트 문자열 만들기
+        counter = get_token_counter(DEFAULT_CHAT_MODEL)
 
-        # 4) 컨텍스트 문자열 만들기
-        def ctx_block(prefix: str, sections: List[Dict[str, Any]]) -> str:
-            if not sections:
-                return f"(관련 {prefix} 문맥 없음)"
-            blocks = []
-            for i, s in enumerate(sections, 1):
-                txt = s["text"]
+        def ctx_block(prefix: str, sections: List[Dict[str, Any]]):
+            def render(i: int, s: Dict[str, Any], body: str) -> str:
                 cite = "; ".join(s["citations"]) or "(no explicit page)"
                 title = s.get("book_title") or ""
-                blocks.append(
+                return (
                     f"[{prefix} Context {i}] {title} / {s['canonical_path']}\n"
-                    f"{txt}\n(출처: {cite})"
+                    f"{body}\n(출처: {cite})"
                 )
-            return "\n\n".join(blocks)
 
-        counsel_ctx_str = ctx_block("상담", counsel_sections)
-        talk_ctx_str    = ctx_block("대화", talk_sections)
+            packed = pack_context(sections, CTX_TOKENS, render, counter=counter)
+            if not packed.items:
+                return f"(관련 {prefix} 문맥 없음)", packed
+            return packed.text, packed
+
+        counsel_ctx_str, counsel_packed = ctx_block("상담", sections["counsel"])
+        talk_ctx_str,    talk_packed    = ctx_block("대화", sections["talk"])
+
+        # 프롬프트에 실제로 들어간 섹션만 출처로 사용
+        counsel_sections = counsel_packed.items
+        talk_sections    = talk_packed.items
+
+        state.counsel_sections = counsel_sections
+        state.talk_sections    = talk_sections
+        state.context_tokens   = counsel_packed.tokens + talk_packed.tokens
+
+        if self.verbose:
+            print(
+                f"\n📦 [RAGAndAdviceNode] 컨텍스트 {state.context_tokens} 토큰 "
+                f"(상담 {counsel_packed.tokens}/{CTX_TOKENS}, 제외 {counsel_packed.dropped}개 · "
+                f"대화 {talk_packed.tokens}/{CTX_TOKENS}, 제외 {talk_packed.dropped}개)"
+            )
 
         # 5) LLM JSON 조언 생성
-        llm = ChatOpenAI(model="gpt-4o-mini", api_key=API_KEY)
+        llm = get_chat_llm()
 
         if conversation_df is not None and not conversation_df.empty:
             conv_text = "\n".join(
@@ -474,8 +717,18 @@ JSON 바깥에는 어떤 텍스트도 쓰지 마세요.
         if self.verbose:
             print("\n🧠 [RAGAndAdviceNode] JSON 조언 생성 중...")
 
-        resp = llm.invoke(prompt)
-        content = resp.content if hasattr(resp, "content") else str(resp)
+        if state.on_token is not None:
+            # 스트리밍: 토큰 조각을 전달하면서 전체 응답은 누적 후 파싱
+            parts: List[str] = []
+            for chunk in llm.stream(prompt):
+                delta = chunk.content if hasattr(chunk, "content") else str(chunk)
+                if delta:
+                    parts.append(delta)
+                    state.on_token(delta)
+            content = "".join(parts)
+        else:
+            resp = llm.invoke(prompt)
+            content = resp.content if hasattr(resp, "content") else str(resp)
 
         # 6) JSON 파싱
         try:
@@ -1,12 +1,13 @@
 # backend/app/llm/agent/Feedback/run_feedback.py
 # -*- coding: utf-8 -*-
 
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, Optional
 import pandas as pd
 from sqlalchemy.orm import Session
 
 from app.core.database import SessionLocal
-from app.llm.agent.Feedback.graph_feedback import FeedbackGraph
+from app.llm.agent.Feedback.graph_feedback import get_feedback_graph
+from app.llm.agent.checkpoint import StageCheckpointer
 
 
 def run_feedback(
@@ -16,6 +17,8 @@ def run_feedback(
     analysis_id: Optional[str] = None,   # ✅ 어떤 분석 결과랑 묶을지 명시
     db: Optional[Session] = None,        # (옵션) 이미 열린 세션 재사용 가능
     verbose: bool = True,
+    on_token: Optional[Callable[[str], None]] = None,  # (옵션) 조언 토큰 스트리밍 콜백
+    checkpointer: Optional[StageCheckpointer] = None,  # (옵션) 단계별 체크포인트
 ) -> Dict[str, Any]:
     if verbose:
         print("\n" + "=" * 60)
@@ -35,13 +38,15 @@ def run_feedback(
         owns_session = True
 
     try:
-        graph = FeedbackGraph(verbose=verbose)
+        graph = get_feedback_graph(verbose=verbose)
         result = graph.run(
             db=db,
             conv_id=conv_id,
             id=id,
             analysis_id=analysis_id,        # ✅ 그래프 state 로 전달
             conversation_df=conversation_df,
+            on_token=on_token,
+            checkpointer=checkpointer,
         )
 
         if verbose:
@@ -4,6 +4,6 @@
 호출 가능하도록 합니다.
 """
 
-from .graph_qa import QAGraph
+from .graph_qa import QAGraph, get_qa_graph
 
-__all__ = ["QAGraph"]
+__all__ = ["QAGraph", "get_qa_graph"]
@@ -1,12 +1,14 @@
 # app/agent/QA/graph_qa.py
 from __future__ import annotations
 from dataclasses import dataclass, field
+from functools import lru_cache
 from typing import Any, Dict, Optional
 import pandas as pd
 from langgraph.graph import StateGraph, END
 from sqlalchemy.orm import Session
 
 from .nodes import ScoreEvaluator, ReAnalyzer, AnalysisSaver
+from app.llm.agent.checkpoint import StageCheckpointer
 
 # =====================================
 # ✅ 상태 정의 (DB 세션 추가)
@@ -29,6 +31,9 @@ class QAState:
     meta: Dict[str, Any] = field(default_factory=dict)
     verbose: bool = True
 
+    # 단계별 체크포인트 (재분석 결과 재사용)
+    checkpointer: Optional[StageCheckpointer] = None
+
 
 # =====================================
 # ✅ 그래프 설계 (DB 연동)
@@ -97,7 +102,13 @@ class QAGraph:
         if state.reason:
             print(f"   ⚠️ 재분석 사유: {state.reason}")
 
-        re_result = self.reanalyzer.reanalyze(state.conversation_df, state.analysis_result)
+        if state.checkpointer is not None:
+            re_result = state.checkpointer.run_stage(
+                "qa_reanalyze",
+                lambda: self.reanalyzer.reanalyze(state.conversation_df, state.analysis_result),
+            )
+        else:
+            re_result = self.reanalyzer.reanalyze(state.conversation_df, state.analysis_result)
         state.final_result = re_result
 
         # ✅ 재분석 후 새 근거 표시
@@ -141,7 +152,8 @@ class QAGraph:
         conversation_df: pd.DataFrame,
         analysis_result: Dict[str, Any],
         id: str,
-        conv_id: str
+        conv_id: str,
+        checkpointer: Optional[StageCheckpointer] = None,
     ) -> Dict[str, Any]:
         """
         ✅ QA 파이프라인 실행 (DB 연동)
@@ -159,6 +171,7 @@ class QAGraph:
             conversation_df=conversation_df,
             analysis_result=analysis_result,
             verbose=self.verbose,
+            checkpointer=checkpointer,
         )
         
         # ✅ 파이프라인 실행
@@ -192,4 +205,16 @@ class QAGraph:
             "reason": result_state.get("reason", ""),
             "needs_reanalysis": result_state.get("needs_reanalysis", False),
             "final_result": save_status,  # ← DB 저장 결과
-        }
\ No newline at end of file
+        }
+
+
+# =====================================
+# ✅ 프로세스 단위 컴파일 그래프 (재사용)
+# =====================================
+@lru_cache(maxsize=None)
+def get_qa_graph(verbose: bool = True) -> QAGraph:
+    """
+    컴파일된 QAGraph 싱글턴
+    - 노드는 상태를 갖지 않고 실행별 데이터는 State에만 담기므로 동시 실행에 안전
+    """
+    return QAGraph(verbose=verbose)
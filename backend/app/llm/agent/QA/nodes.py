@@ -2,8 +2,7 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from typing import Any, Dict
-from app.core.config import settings
-from langchain_openai import ChatOpenAI
+from app.llm.agent.clients import get_chat_llm
 import pandas as pd
 from sqlalchemy.orm import Session
 import logging
@@ -24,7 +23,7 @@ class ScoreEvaluator:
 
     def evaluate(self, result: Dict[str, Any]) -> Dict[str, Any]:
         """분석 결과의 점수와 신뢰도 평가"""
-        llm = ChatOpenAI(model="gpt-4o-mini", api_key=settings.openai_api_key)
+        llm = get_chat_llm()
         
         score = result.get("score", 0.0)
         summary = result.get("summary", "")
@@ -122,7 +121,7 @@ class ReAnalyzer:
 
     def reanalyze(self, conversation_df: pd.DataFrame, prev_result: Dict[str, Any]) -> Dict[str, Any]:
         """대화를 다시 분석"""
-        llm = ChatOpenAI(model="gpt-4o-mini", api_key=settings.openai_api_key)
+        llm = get_chat_llm()
         text = "\n".join(conversation_df["text"].tolist())
         
         prompt = f"""
@@ -322,7 +321,7 @@ class RAGFeedbackGenerator:
             book_advice = []
             try:
                 # 쿼리 임베딩 생성
-                query_embedding = embedding_service.create_embedding(search_query)
+                query_embedding = embedding_service.create_query_embedding(search_query)
                 
                 # 관련 조언 검색 (60% 이상 유사도만)
                 similar_results = vector_db_manager.find_similar(
@@ -348,11 +347,7 @@ class RAGFeedbackGenerator:
                 logger.warning(f"RAG 검색 실패, 기본 피드백으로 진행: {str(e)}")
             
             # LLM을 사용한 피드백 생성
-            llm = ChatOpenAI(
-                model="gpt-4o-mini",
-                temperature=0.3,
-                api_key=settings.openai_api_key
-            )
+            llm = get_chat_llm(temperature=0.3)
             
             # 시스템 프롬프트 (책 조언 포함)
             system_prompt = """
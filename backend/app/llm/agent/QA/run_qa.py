@@ -3,7 +3,8 @@
 ✅ QA 모듈 실행 진입점 (DB 연동)
 """
 
-from app.llm.agent.QA.graph_qa import QAGraph
+from app.llm.agent.QA.graph_qa import get_qa_graph
+from app.llm.agent.checkpoint import StageCheckpointer, compute_input_hash
 from app.core.database import SessionLocal
 import pandas as pd
 import pprint
@@ -37,13 +38,24 @@ def run_qa(
     
     try:
         # QAGraph 실행
-        graph = QAGraph(verbose=verbose)
+        # 동일 입력이면 이전 재분석 결과 재사용
+        checkpointer = StageCheckpointer(
+            conv_id=conv_id,
+            input_hash=compute_input_hash(
+                conversation_df[["speaker", "text"]].to_dict("records"),
+                analysis_result,
+            ),
+            verbose=verbose,
+        )
+
+        graph = get_qa_graph(verbose=verbose)
         result = graph.run(
             db=db,
             conversation_df=conversation_df,
             analysis_result=analysis_result,
             id=str(id),
             conv_id=conv_id,
+            checkpointer=checkpointer,
         )
         
         if verbose:
@@ -0,0 +1,109 @@
+"""
+✅ Agent 파이프라인 단계별 체크포인트
+
+목적:
+- 재시도/재실행 시 마지막으로 성공한 단계부터 재개
+- (conv_id, stage) 단위로 단계 출력을 agent_stage_checkpoint 테이블에 저장
+- input_hash가 바뀌면(세그먼트/매핑/사용자 정보 변경) 기존 체크포인트는 무시됨
+- 체크포인트 조회/저장은 매번 별도의 짧은 세션에서 커밋 → 파이프라인 세션의 트랜잭션에는 영향 없음
+
+사용 예:
+    checkpointer = StageCheckpointer(conv_id, compute_input_hash(segments, mapping))
+    cached = checkpointer.load("analyze")
+    if cached is None:
+        result = ...
+        checkpointer.save("analyze", result)
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+import hashlib
+import json
+import logging
+
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.llm.agent.crud import get_stage_checkpoint, save_stage_checkpoint
+
+logger = logging.getLogger(__name__)
+
+
+def _json_default(obj: Any):
+    """numpy 스칼라 등 기본 JSON 직렬화가 안 되는 값 처리"""
+    if hasattr(obj, "item"):
+        return obj.item()
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    return str(obj)
+
+
+def to_jsonable(value: Any) -> Any:
+    """체크포인트 저장용 JSON 안전 변환 (DataFrame 등은 제외)"""
+    if isinstance(value, dict):
+        return {
+            k: to_jsonable(v) for k, v in value.items()
+            if not hasattr(v, "to_dict")
+        }
+    return json.loads(json.dumps(value, ensure_ascii=False, default=_json_default))
+
+
+def compute_input_hash(*parts: Any) -> str:
+    """파이프라인 입력 해시 (sha256, 키 정렬 JSON 기준)"""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=_json_default)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def compute_mapping_hash(speaker_mapping: Optional[Dict[str, Any]]) -> str:
+    """화자 매핑 해시 ("save" 체크포인트에 분석이 사용한 매핑으로 기록)"""
+    return compute_input_hash(speaker_mapping or {})
+
+
+@dataclass
+class StageCheckpointer:
+    """
+    단계 출력 저장/조회
+    - 체크포인트 실패는 파이프라인 실패로 이어지지 않음 (경고 로그만 남김)
+    - session_factory로 연 세션에서만 커밋/롤백 (호출 측 세션을 커밋하거나 되돌리지 않음)
+    """
+    conv_id: str
+    input_hash: str
+    verbose: bool = True
+    session_factory: Callable[[], Session] = SessionLocal
+
+    def load(self, stage: str) -> Optional[Dict[str, Any]]:
+        db = self.session_factory()
+        try:
+            output = get_stage_checkpoint(db, str(self.conv_id), stage, self.input_hash)
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"⚠️ 체크포인트 조회 실패: stage={stage}, error={e}")
+            return None
+        finally:
+            db.close()
+
+        if output is not None and self.verbose:
+            print(f"   ♻️ [Checkpoint] '{stage}' 단계 결과 재사용")
+        return output
+
+    def save(self, stage: str, output: Dict[str, Any]) -> None:
+        db = self.session_factory()
+        try:
+            save_stage_checkpoint(
+                db, str(self.conv_id), stage, self.input_hash, to_jsonable(output)
+            )
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"⚠️ 체크포인트 저장 실패: stage={stage}, error={e}")
+        finally:
+            db.close()
+
+    def run_stage(self, stage: str, fn: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """체크포인트가 있으면 재사용, 없으면 실행 후 저장"""
+        cached = self.load(stage)
+        if cached is not None:
+            return cached
+        output = fn()
+        self.save(stage, output)
+        return output
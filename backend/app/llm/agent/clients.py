@@ -0,0 +1,35 @@
+"""
+✅ Agent 공용 LLM 클라이언트
+
+목적:
+- 노드 호출마다 ChatOpenAI / OpenAI 클라이언트를 새로 만들지 않고 프로세스 단위로 재사용
+- 두 클라이언트 모두 내부 HTTP 커넥션 풀을 가지며 여러 스레드에서 동시에 사용 가능
+"""
+
+from functools import lru_cache
+from typing import Optional
+
+from langchain_openai import ChatOpenAI
+from openai import OpenAI
+
+from app.core.config import settings
+
+DEFAULT_CHAT_MODEL = "gpt-4o-mini"
+
+
+@lru_cache(maxsize=None)
+def get_chat_llm(
+    model: str = DEFAULT_CHAT_MODEL,
+    temperature: Optional[float] = None,
+) -> ChatOpenAI:
+    """(model, temperature) 별 ChatOpenAI 싱글턴"""
+    kwargs = {"model": model, "api_key": settings.openai_api_key}
+    if temperature is not None:
+        kwargs["temperature"] = temperature
+    return ChatOpenAI(**kwargs)
+
+
+@lru_cache(maxsize=None)
+def get_openai_client() -> OpenAI:
+    """임베딩 등 원시 API 호출용 OpenAI 클라이언트 싱글턴"""
+    return OpenAI(api_key=settings.openai_api_key)
@@ -16,6 +16,8 @@
 8. update_analysis_result()      - QA: 분석 결과 업데이트 (UPDATE)
 9. get_analysis_by_conv_id()     - 분석 결과 조회
 10. save_feedback()              - Feedback: 피드백 저장
+11. get_stage_checkpoint()       - 파이프라인: 단계별 체크포인트 조회
+12. save_stage_checkpoint()      - 파이프라인: 단계별 체크포인트 저장 (UPSERT)
 """
 
 from sqlalchemy.orm import Session
@@ -23,6 +25,7 @@ from sqlalchemy import text
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 import uuid
+import json
 import pandas as pd
 
 
@@ -505,4 +508,70 @@ def save_feedback(
         "score": row[4],
         "confidence_score": row[5],
         "feedback": row[6],
-    }
\ No newline at end of file
+    }
+
+
+# =========================================
+# 5️⃣ Stage Checkpoint 관련 CRUD
+# =========================================
+
+def get_stage_checkpoint(
+    db: Session,
+    conv_id: str,
+    stage: str,
+    input_hash: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    ✅ (conv_id, stage) 체크포인트 조회
+    - input_hash가 다르면 입력이 바뀐 것이므로 None 반환
+    - input_hash가 None이면 입력과 상관없이 마지막으로 저장된 출력 반환
+    """
+    query = text("""
+        SELECT output
+        FROM agent_stage_checkpoint
+        WHERE conv_id = :conv_id
+          AND stage = :stage
+          AND (CAST(:input_hash AS TEXT) IS NULL OR input_hash = :input_hash)
+    """)
+
+    row = db.execute(query, {
+        "conv_id": conv_id,
+        "stage": stage,
+        "input_hash": input_hash,
+    }).fetchone()
+
+    if not row:
+        return None
+
+    output = row[0]
+    if isinstance(output, str):
+        output = json.loads(output)
+    return output
+
+
+def save_stage_checkpoint(
+    db: Session,
+    conv_id: str,
+    stage: str,
+    input_hash: str,
+    output: Dict[str, Any],
+) -> None:
+    """
+    ✅ (conv_id, stage) 체크포인트 저장 (UPSERT)
+    """
+    query = text("""
+        INSERT INTO agent_stage_checkpoint (conv_id, stage, input_hash, output, created_at, updated_at)
+        VALUES (:conv_id, :stage, :input_hash, CAST(:output AS JSONB), NOW(), NOW())
+        ON CONFLICT (conv_id, stage) DO UPDATE
+        SET input_hash = EXCLUDED.input_hash,
+            output     = EXCLUDED.output,
+            updated_at = NOW()
+    """)
+
+    db.execute(query, {
+        "conv_id": conv_id,
+        "stage": stage,
+        "input_hash": input_hash,
+        "output": json.dumps(output, ensure_ascii=False),
+    })
+    db.commit()
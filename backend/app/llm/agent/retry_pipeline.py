@@ -12,8 +12,9 @@ from datetime import datetime
 from app.core.database import SessionLocal
 from app.agent.crud import get_conversation_file_by_conv_id
 from app.llm.agent.Cleaner.graph_cleaner import CleanerGraph
-from app.llm.agent.Analysis.graph_analysis import AnalysisGraph
+from app.llm.agent.Analysis.graph_analysis import get_analysis_graph
 from app.llm.agent.Feedback.run_feedback import run_feedback
+from app.llm.agent.checkpoint import StageCheckpointer, compute_input_hash, compute_mapping_hash
 
 logger = logging.getLogger(__name__)
 
@@ -140,24 +141,50 @@ async def run_agent_pipeline_with_retry(conv_id: str) -> Dict[str, Any]:
         
         logger.info(f"👤 user_id={user_id}, user_label={user_speaker_label}, other_label={other_speaker_label}")
         
+        # 입력(세그먼트 + 매핑 + 사용자 정보)이 같으면 성공한 단계는 재사용
+        checkpointer = StageCheckpointer(
+            conv_id=conv_id,
+            input_hash=compute_input_hash(
+                speaker_segments, speaker_mapping, user_gender, user_age, user_name
+            ),
+        )
+        # 세그먼트 Feature는 매핑과 무관 → 매핑만 바뀐 재분석에서 재사용
+        feature_checkpointer = StageCheckpointer(
+            conv_id=conv_id,
+            input_hash=compute_input_hash(speaker_segments),
+        )
+        
         # -------------------------------------------------
         # 3. Analysis 실행
         # -------------------------------------------------
         logger.info("🔎 Analysis 실행 시작")
-        analysis = AnalysisGraph(verbose=True)
+        analysis = get_analysis_graph(verbose=True)
         
-        analysis_state = analysis.run(
-            db=db,
-            conv_id=conv_id,
-            speaker_segments=speaker_segments,
-            user_id=user_id,
-            user_gender=user_gender,
-            user_age=user_age,
-            user_name=user_name,
-            user_speaker_label=user_speaker_label,
-            other_speaker_label=other_speaker_label,
-            other_display_name=other_display_name,
-        )
+        # 리포트/조언 토큰을 WebSocket으로 스트리밍하기 위해
+        # 그래프는 워커 스레드에서 실행하고 이벤트 루프는 전송에 사용
+        from app.domains.conversation.websocket import create_token_streamer
+        report_streamer = create_token_streamer(conv_id, "report")
+        
+        try:
+            analysis_state = await asyncio.to_thread(
+                analysis.run,
+                db=db,
+                conv_id=conv_id,
+                speaker_segments=speaker_segments,
+                user_id=user_id,
+                user_gender=user_gender,
+                user_age=user_age,
+                user_name=user_name,
+                user_speaker_label=user_speaker_label,
+                other_speaker_label=other_speaker_label,
+                other_display_name=other_display_name,
+                on_token=report_streamer.push,
+                checkpointer=checkpointer,
+                feature_checkpointer=feature_checkpointer,
+                mapping_hash=compute_mapping_hash(speaker_mapping),
+            )
+        finally:
+            report_streamer.close()
         
         logger.info("✅ Analysis 완료")
         
@@ -172,14 +199,22 @@ async def run_agent_pipeline_with_retry(conv_id: str) -> Dict[str, Any]:
         analysis_id = meta.get("analysis_id")
         conversation_df = analysis_state.get('conversation_df')
         
-        feedback_result = run_feedback(
-            conv_id=conv_id,
-            id=user_id,
-            conversation_df=conversation_df,
-            analysis_id=analysis_id,
-            db=db,
-            verbose=True
-        )
+        advice_streamer = create_token_streamer(conv_id, "advice")
+        
+        try:
+            feedback_result = await asyncio.to_thread(
+                run_feedback,
+                conv_id=conv_id,
+                id=user_id,
+                conversation_df=conversation_df,
+                analysis_id=analysis_id,
+                db=db,
+                verbose=True,
+                on_token=advice_streamer.push,
+                checkpointer=checkpointer,
+            )
+        finally:
+            advice_streamer.close()
         
         logger.info("✅ Feedback 완료")
         
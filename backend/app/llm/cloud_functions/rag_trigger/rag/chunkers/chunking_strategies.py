@@ -1,10 +1,17 @@
 """
 문서 청킹 전략들
 확장성을 고려하여 다양한 문서 형식에 맞는 청킹 전략을 구현
+
+- 모든 전략은 원문 위의 (start, end) 인덱스 범위로 분할하고, 청크를 만들 때만 문자열을 슬라이스
+- 청크는 원문 기준 정확한 start/end 오프셋을 가짐
+- 한 번의 chunk() 호출에서 만들어진 청크들은 읽기 전용 메타데이터 하나를 공유
 """
 import logging
+import re
+from bisect import bisect_left
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from types import MappingProxyType
+from typing import List, Dict, Any, Iterable, Iterator, Mapping, Optional, Sequence, Tuple
 from pathlib import Path
 
 # 로깅 모듈 가져오기
@@ -12,23 +19,129 @@ from ..logger import rag_logger
 
 logger = rag_logger
 
+Range = Tuple[int, int]
+
+# 문장 부호 뒤 공백 (그룹 1). 후방 탐색(lookbehind)보다 빠름
+_SENTENCE_BOUNDARY = re.compile(r'[.!?](\s+)')
+_LAST_SENTENCE_BOUNDARY = re.compile(r'.*[.!?](\s+)', re.DOTALL)
+_WHITESPACE = re.compile(r'\s*')
+_MARKDOWN_HEADER = re.compile(r'^#{1,6}\s+.*$', re.MULTILINE)
+
 
 class Chunk:
     """
     청크 정보를 담는 데이터 클래스
+    - start/end: 청킹한 원문 기준 문자 오프셋 [start, end)
+    - metadata: 같은 chunk() 호출의 청크끼리 공유하는 읽기 전용 매핑
     """
-    def __init__(self, 
-                 content: str, 
-                 metadata: Dict[str, Any] = None, 
-                 source: str = None, 
-                 chunk_index: int = 0):
+    __slots__ = ("content", "metadata", "source", "chunk_index", "start", "end")
+    
+    def __init__(self,
+                 content: str,
+                 metadata: Mapping[str, Any] = None,
+                 source: str = None,
+                 chunk_index: int = 0,
+                 start: Optional[int] = None,
+                 end: Optional[int] = None):
         self.content = content
-        self.metadata = metadata or {}
+        self.metadata = metadata if metadata is not None else {}
         self.source = source
         self.chunk_index = chunk_index
+        self.start = start
+        self.end = end
     
     def __repr__(self):
-        return f"Chunk(source='{self.source}', index={self.chunk_index}, content_len={len(self.content)})"
+        return (f"Chunk(source='{self.source}', index={self.chunk_index}, "
+                f"range=[{self.start}, {self.end}), content_len={len(self.content)})")
+
+
+def _shared_metadata(metadata: Optional[Mapping[str, Any]], **extra) -> Mapping[str, Any]:
+    """청크들이 공유할 읽기 전용 메타데이터 (chunk() 호출당 1회만 복사)"""
+    merged = dict(metadata) if metadata else {}
+    merged.update(extra)
+    return MappingProxyType(merged)
+
+
+def _build_chunks(text: str,
+                  ranges: Iterable[Range],
+                  metadata: Mapping[str, Any],
+                  source: str,
+                  start_index: int = 0) -> List[Chunk]:
+    """인덱스 범위 → Chunk 리스트 (문자열 슬라이스는 이 단계에서만 수행)"""
+    return [
+        Chunk(content=text[start:end], metadata=metadata, source=source,
+              chunk_index=i, start=start, end=end)
+        for i, (start, end) in enumerate(ranges, start=start_index)
+    ]
+
+
+class _CharRuler:
+    """문자 수 기준 길이 환산"""
+    
+    def length(self, lo: int, hi: int) -> int:
+        return hi - lo
+    
+    def advance(self, pos: int, n: int) -> int:
+        """pos부터 n 단위 뒤의 위치"""
+        return pos + n
+    
+    def back(self, pos: int, n: int) -> int:
+        """pos에서 n 단위 앞의 위치"""
+        return pos - n
+
+
+class _TokenRuler:
+    """
+    토큰 수 기준 길이 환산
+    원문을 한 번만 토큰화하고, 토큰 시작 오프셋으로 문자 위치 ↔ 토큰 수를 변환
+    """
+    
+    def __init__(self, text: str, token_counter):
+        self.offsets = token_counter.token_offsets(text)
+        self.text_len = len(text)
+    
+    def _index(self, pos: int) -> int:
+        """pos 이전에 시작하는 토큰 수"""
+        return bisect_left(self.offsets, pos)
+    
+    def length(self, lo: int, hi: int) -> int:
+        return self._index(hi) - self._index(lo)
+    
+    def advance(self, pos: int, n: int) -> int:
+        i = self._index(pos) + n
+        return max(pos + 1, self.offsets[i]) if i < len(self.offsets) else self.text_len
+    
+    def back(self, pos: int, n: int) -> int:
+        i = self._index(pos) - n
+        return self.offsets[i] if i > 0 else 0
+
+
+_CHARS = _CharRuler()
+
+
+def _window_ranges(lo: int, hi: int, size: int, overlap: int, ruler=_CHARS) -> List[Range]:
+    """[lo, hi) 구간을 size 크기 창으로 분할 (창 사이 overlap 만큼 겹침)"""
+    if hi <= lo:
+        return []
+    ranges = []
+    start = lo
+    while True:
+        end = min(ruler.advance(start, size), hi)
+        ranges.append((start, end))
+        if end >= hi:
+            return ranges
+        start = max(start + 1, ruler.back(end, overlap))
+
+
+def _overlap_start(prev: Range, piece_start: int, piece_end: int, size: int, overlap: int,
+                   ruler=_CHARS) -> int:
+    """
+    새 청크 시작 위치: 이전 청크 끝에서 overlap 만큼 앞
+    - 이전 청크 시작보다 앞서지 않고, 새 청크가 size를 넘지 않도록 제한
+    """
+    if overlap <= 0:
+        return piece_start
+    return min(piece_start, max(prev[0], ruler.back(prev[1], overlap), ruler.back(piece_end, size)))
 
 
 class BaseChunker(ABC):
@@ -45,7 +158,7 @@ class BaseChunker(ABC):
             text: 청킹할 텍스트
             metadata: 관련 메타데이터 (선택사항)
             source: 소스 식별자 (선택사항)
-            
+        
         Returns:
             Chunk 객체의 리스트
         """
@@ -66,46 +179,16 @@ class CharacterChunker(BaseChunker):
         self.chunk_size = chunk_size
         self.overlap = overlap
     
+    def split_ranges(self, text: str, lo: int = 0, hi: Optional[int] = None) -> List[Range]:
+        """[lo, hi) 구간의 청크 범위"""
+        return _window_ranges(lo, len(text) if hi is None else hi, self.chunk_size, self.overlap)
+    
     def chunk(self, text: str, metadata: Dict[str, Any] = None, source: str = None) -> List[Chunk]:
         """
         텍스트를 문자 단위로 청킹합니다.
         """
-        chunks = []
-        start = 0
-        chunk_index = 0
-        
-        while start < len(text):
-            end = start + self.chunk_size
-            
-            # 텍스트 끝을 넘지 않도록 조정
-            if end > len(text):
-                end = len(text)
-            
-            # 청크 생성
-            chunk_content = text[start:end]
-            chunk_metadata = metadata.copy() if metadata else {}
-            chunk_metadata.update({
-                "chunk_start": start,
-                "chunk_end": end,
-                "chunk_method": "character",
-                "chunk_size": len(chunk_content)
-            })
-            
-            chunk = Chunk(
-                content=chunk_content,
-                metadata=chunk_metadata,
-                source=source,
-                chunk_index=chunk_index
-            )
-            chunks.append(chunk)
-            
-            # 다음 청크 시작 위치 계산 (오버랩 고려)
-            start = end - self.overlap
-            chunk_index += 1
-            
-            # 오버랩이 전체 텍스트를 다시 커버하지 않도록 방지
-            if start >= end:
-                start = end
+        shared = _shared_metadata(metadata, chunk_method="character", max_chunk_size=self.chunk_size)
+        chunks = _build_chunks(text, self.split_ranges(text), shared, source)
         
         logger.info(f"문자 단위 청킹 완료: {len(chunks)}개 청크 생성")
         return chunks
@@ -125,87 +208,54 @@ class SentenceChunker(BaseChunker):
         self.max_chunk_size = max_chunk_size
         self.overlap = overlap
     
-    def chunk(self, text: str, metadata: Dict[str, Any] = None, source: str = None) -> List[Chunk]:
+    def split_ranges(self, text: str) -> List[Range]:
         """
-        텍스트를 문장 단위로 청킹합니다.
+        문장 경계(마침표, 느낌표, 물음표 뒤 공백)로 나눈 문장 범위를 최대 크기까지 병합
+        - 오버랩은 이전 청크 끝 오프셋에서 바로 계산 (원문 재검색 없음)
+        - 최대 크기를 넘는 문장은 문자 단위로 분할
         """
-        import re
-        
-        # 문장 단위로 분할 (마침표, 느낌표, 물음표를 기준으로)
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-        
-        chunks = []
-        current_chunk = ""
-        current_start_pos = 0
-        chunk_index = 0
-        
-        for sentence in sentences:
-            # 새 문장이 현재 청크에 추가될 경우의 길이 계산
-            candidate_chunk = current_chunk + (" " if current_chunk else "") + sentence
+        size = self.max_chunk_size
+        text_len = len(text)
+        ranges: List[Range] = []
+        prev: Optional[Range] = None
+        pos = 0
+        while pos < text_len:
+            # 현재 문장의 끝(문장 부호 뒤 공백 시작)과 다음 문장 시작
+            boundary = _SENTENCE_BOUNDARY.search(text, pos)
+            sentence_end, next_start = boundary.span(1) if boundary else (text_len, text_len)
             
-            if len(candidate_chunk) <= self.max_chunk_size:
-                # 현재 청크에 문장 추가
-                current_chunk = candidate_chunk
+            if sentence_end - pos > size:
+                # 문장 자체가 최대 크기를 초과하는 경우 문자 단위 청킹
+                logger.warning(f"문장이 최대 청크 크기보다 큽니다: {text[pos:pos + 50]}...")
+                ranges.extend(_window_ranges(pos, sentence_end, size, self.overlap))
+                prev = None
+                pos = next_start
+                continue
+            
+            start = _overlap_start(prev, pos, sentence_end, size, self.overlap) \
+                if prev is not None else pos
+            limit = start + size
+            if limit >= text_len:
+                end, pos = text_len, text_len
             else:
-                # 현재 청크가 최대 크기를 초과하면 새 청크 생성
-                if current_chunk:
-                    chunk_metadata = metadata.copy() if metadata else {}
-                    chunk_metadata.update({
-                        "chunk_start": current_start_pos,
-                        "chunk_end": current_start_pos + len(current_chunk),
-                        "chunk_method": "sentence",
-                        "chunk_size": len(current_chunk)
-                    })
-                    
-                    chunk = Chunk(
-                        content=current_chunk,
-                        metadata=chunk_metadata,
-                        source=source,
-                        chunk_index=chunk_index
-                    )
-                    chunks.append(chunk)
-                    
-                    # 오버랩 계산: 마지막 n개의 문자를 새 청크의 시작으로 사용
-                    if self.overlap > 0:
-                        overlap_start = max(0, len(current_chunk) - self.overlap)
-                        current_chunk = current_chunk[overlap_start:]
-                        current_start_pos = text.find(current_chunk, current_start_pos)
-                        chunk_index += 1
-                    else:
-                        current_chunk = ""
-                        current_start_pos = text.find(sentence, current_start_pos + len(current_chunk))
+                # start + size 안에서 끝나는 마지막 문장까지 병합 (역방향 탐색은 정규식 엔진에서 수행)
+                last = _LAST_SENTENCE_BOUNDARY.match(text, next_start, limit + 1)
+                if last and last.start(1) > sentence_end:
+                    end = last.start(1)
+                    pos = _WHITESPACE.match(text, end).end()
                 else:
-                    # 문장 자체가 최대 크기를 초과하는 경우 문자 단위 청킹
-                    logger.warning(f"문장이 최대 청크 크기보다 큽니다: {sentence[:50]}...")
-                    char_chunker = CharacterChunker(chunk_size=self.max_chunk_size, overlap=self.overlap)
-                    sub_chunks = char_chunker.chunk(sentence, metadata, source)
-                    
-                    # 서브 청크의 인덱스를 조정
-                    for sub_chunk in sub_chunks:
-                        sub_chunk.chunk_index = chunk_index
-                        chunks.append(sub_chunk)
-                        chunk_index += 1
-                    
-                    current_chunk = ""
-                    current_start_pos = text.find(sentence, current_start_pos) + len(sentence)
+                    end, pos = sentence_end, next_start
+            prev = (start, end)
+            ranges.append(prev)
         
-        # 마지막 청크 처리
-        if current_chunk:
-            chunk_metadata = metadata.copy() if metadata else {}
-            chunk_metadata.update({
-                "chunk_start": current_start_pos,
-                "chunk_end": current_start_pos + len(current_chunk),
-                "chunk_method": "sentence",
-                "chunk_size": len(current_chunk)
-            })
-            
-            chunk = Chunk(
-                content=current_chunk,
-                metadata=chunk_metadata,
-                source=source,
-                chunk_index=chunk_index
-            )
-            chunks.append(chunk)
+        return ranges
+    
+    def chunk(self, text: str, metadata: Dict[str, Any] = None, source: str = None) -> List[Chunk]:
+        """
+        텍스트를 문장 단위로 청킹합니다.
+        """
+        shared = _shared_metadata(metadata, chunk_method="sentence", max_chunk_size=self.max_chunk_size)
+        chunks = _build_chunks(text, self.split_ranges(text), shared, source)
         
         logger.info(f"문장 단위 청킹 완료: {len(chunks)}개 청크 생성")
         return chunks
@@ -217,243 +267,151 @@ class RecursiveCharacterChunker(BaseChunker):
     여러 분할 기호를 사용하여 의미 있는 단위로 텍스트를 분할
     """
     
-    def __init__(self, 
-                 chunk_sizes: List[int] = [1000, 500, 200], 
-                 separators: List[str] = ["\n\n", "\n", " ", ""],
-                 overlap: int = 100):
+    def __init__(self,
+                 chunk_sizes: Sequence[int] = (1000, 500, 200),
+                 separators: Sequence[str] = ("\n\n", "\n", " ", ""),
+                 overlap: int = 100,
+                 token_counter=None):
         """
         Args:
             chunk_sizes: 다양한 청크 크기 (큰 것에서 작은 것으로)
             separators: 분할 기호 리스트 (큰 단위에서 작은 단위로)
             overlap: 청크 간 겹치는 문자 수
+            token_counter: 지정하면 chunk_sizes/overlap을 토큰 수로 해석
+                           (token_offsets()를 제공하는 객체, 예: tokenizer.get_token_counter())
         """
         self.chunk_sizes = sorted(chunk_sizes, reverse=True)
-        self.separators = separators
+        self.separators = list(separators)
         self.overlap = overlap
+        self.token_counter = token_counter
     
     def chunk(self, text: str, metadata: Dict[str, Any] = None, source: str = None) -> List[Chunk]:
         """
         텍스트를 재귀적 문자 단위로 청킹합니다.
         """
-        return self._recursive_chunk(text, self.chunk_sizes[0], metadata, source, 0)
-    
-    def _recursive_chunk(self, 
-                         text: str, 
-                         chunk_size: int, 
-                         metadata: Dict[str, Any], 
-                         source: str, 
-                         chunk_index: int) -> List[Chunk]:
-        """
-        재귀적으로 텍스트를 청킹합니다.
-        """
-        if len(text) <= chunk_size:
-            # 텍스트가 청크 크기보다 작거나 같으면 그대로 청크로 반환
-            chunk_metadata = metadata.copy() if metadata else {}
-            chunk_metadata.update({
-                "chunk_method": "recursive_character",
-                "chunk_size": len(text),
-                "max_chunk_size": chunk_size
-            })
-            
-            chunk = Chunk(
-                content=text,
-                metadata=chunk_metadata,
-                source=source,
-                chunk_index=chunk_index
-            )
-            return [chunk]
+        shared = _shared_metadata(metadata, chunk_method="recursive_character",
+                                  max_chunk_size=self.chunk_sizes[0],
+                                  size_unit="tokens" if self.token_counter else "chars")
+        chunks = _build_chunks(text, self.split_ranges(text), shared, source)
         
-        # 적절한 구분자로 텍스트 분할
-        separator = self._get_separator(text)
-        splits = text.split(separator)
+        logger.info(f"재귀적 문자 단위 청킹 완료: {len(chunks)}개 청크 생성 (최대 크기: {self.chunk_sizes[0]})")
+        return chunks
+    
+    def split_ranges(self, text: str, lo: int = 0, hi: Optional[int] = None) -> List[Range]:
+        """[lo, hi) 구간의 청크 범위"""
+        ruler = _TokenRuler(text, self.token_counter) if self.token_counter else _CHARS
+        ranges: List[Range] = []
+        self._split(text, lo, len(text) if hi is None else hi, 0, ranges, ruler)
+        return ranges
+    
+    def _split(self, text: str, lo: int, hi: int, level: int, out: List[Range], ruler=_CHARS) -> None:
+        """
+        [lo, hi) 구간을 chunk_sizes[level] 이하 범위로 분할하여 out에 추가합니다.
+        - 가장 큰 분할 기호로 조각을 나누고, 조각을 크기 한도까지 병합
+        - 한도를 넘는 조각은 다음(더 작은) 청크 크기로 재귀 분할, 마지막 크기에서는 문자 단위 분할
+        """
+        size = self.chunk_sizes[level]
+        if ruler.length(lo, hi) <= size:
+            if hi > lo:
+                out.append((lo, hi))
+            return
         
-        # 각 분할에 대해 재귀적으로 처리
-        chunks = []
+        separator = self._get_separator(text, lo, hi)
+        if not separator:
+            out.extend(_window_ranges(lo, hi, size, self.overlap, ruler))
+            return
         
-        current_chunk = ""
-        for split in splits:
-            # 구분자 포함 여부에 따라 추가
-            separator_to_add = separator if current_chunk else ""
-            candidate_chunk = current_chunk + separator_to_add + split
+        # 조각을 하나씩 붙이는 대신, 크기 한도 안에서 가장 먼 분할 기호 위치(rfind)로 바로 이동
+        sep_len = len(separator)
+        prev: Optional[Range] = None  # 오버랩 기준이 되는 직전 병합 청크
+        piece_start = lo
+        while piece_start < hi:
+            piece_end = text.find(separator, piece_start, hi)
+            if piece_end == -1:
+                piece_end = hi
+            
+            if piece_end == piece_start:
+                # 연속된 분할 기호 사이의 빈 조각은 건너뜀
+                piece_start += sep_len
+                continue
             
-            if len(candidate_chunk) <= chunk_size:
-                current_chunk = candidate_chunk
+            if ruler.length(piece_start, piece_end) > size:
+                # 조각이 여전히 너무 크면 더 작은 청크 크기로 재귀 처리
+                if level + 1 < len(self.chunk_sizes):
+                    self._split(text, piece_start, piece_end, level + 1, out, ruler)
+                else:
+                    out.extend(_window_ranges(piece_start, piece_end, size, self.overlap, ruler))
+                prev = None
+                end = piece_end
             else:
-                # 현재 청크가 최대 크기를 초과하면 저장하고 새 청크 시작
-                if current_chunk:
-                    chunk_metadata = metadata.copy() if metadata else {}
-                    chunk_metadata.update({
-                        "chunk_method": "recursive_character",
-                        "max_chunk_size": chunk_size,
-                        "separator": separator
-                    })
-                    
-                    chunk = Chunk(
-                        content=current_chunk,
-                        metadata=chunk_metadata,
-                        source=source,
-                        chunk_index=chunk_index
-                    )
-                    chunks.append(chunk)
-                    chunk_index += 1
-                
-                # 오버랩 처리
-                if len(split) > chunk_size:
-                    # 분할된 텍스트가 여전히 너무 크면 더 작은 청크 크기로 재귀 처리
-                    if len(self.chunk_sizes) > 1:
-                        smaller_chunker = RecursiveCharacterChunker(
-                            chunk_sizes=self.chunk_sizes[1:],
-                            separators=self.separators,
-                            overlap=self.overlap
-                        )
-                        sub_chunks = smaller_chunker.chunk(
-                            split, 
-                            metadata, 
-                            source
-                        )
-                        chunks.extend(sub_chunks)
-                        chunk_index += len(sub_chunks)
-                    else:
-                        # 더 이상 작은 청크 크기가 없으면 현재 청크 크기로 문자 단위 청킹
-                        char_chunker = CharacterChunker(
-                            chunk_size=chunk_size,
-                            overlap=self.overlap
-                        )
-                        sub_chunks = char_chunker.chunk(
-                            split, 
-                            metadata, 
-                            source
-                        )
-                        chunks.extend(sub_chunks)
-                        chunk_index += len(sub_chunks)
+                # 오버랩 적용: 이전 청크의 끝부분부터 새 청크 시작
+                start = _overlap_start(prev, piece_start, piece_end, size, self.overlap, ruler) \
+                    if prev is not None else piece_start
+                limit = ruler.advance(start, size)
+                if limit >= hi:
+                    end = hi
                 else:
-                    # 오버랩 적용: 이전 청크의 끝부분을 새로운 청크의 시작으로 사용
-                    if self.overlap > 0 and chunks:
-                        prev_chunk = chunks[-1].content
-                        overlap_start = max(0, len(prev_chunk) - self.overlap)
-                        current_chunk = prev_chunk[overlap_start:] + separator + split
-                    else:
-                        current_chunk = split
-        
-        # 마지막 청크 처리
-        if current_chunk:
-            chunk_metadata = metadata.copy() if metadata else {}
-            chunk_metadata.update({
-                "chunk_method": "recursive_character",
-                "max_chunk_size": chunk_size,
-                "separator": separator
-            })
-            
-            chunk = Chunk(
-                content=current_chunk,
-                metadata=chunk_metadata,
-                source=source,
-                chunk_index=chunk_index
-            )
-            chunks.append(chunk)
-        
-        logger.info(f"재귀적 문자 단위 청킹 완료: {len(chunks)}개 청크 생성 (최대 크기: {chunk_size})")
-        return chunks
+                    end = max(piece_end, text.rfind(separator, piece_end, min(hi, limit + sep_len)))
+                prev = (start, end)
+                out.append(prev)
+            piece_start = end + sep_len
     
-    def _get_separator(self, text: str) -> str:
+    def _get_separator(self, text: str, lo: int = 0, hi: Optional[int] = None) -> str:
         """
-        텍스트에 가장 적절한 구분자를 선택합니다.
+        텍스트 구간에 가장 적절한 구분자를 선택합니다.
         """
+        hi = len(text) if hi is None else hi
         for sep in self.separators:
-            if sep in text:
+            if sep and text.find(sep, lo, hi) != -1:
                 return sep
-        return self.separators[-1]  # 빈 문자열 반환 (문자 단위 분할)
+        return ""  # 빈 문자열 반환 (문자 단위 분할)
 
 
 class MarkdownChunker(BaseChunker):
     """
     마크다운 문서에 특화된 청킹 전략
-    헤더, 코드 블록 등을 고려하여 청킹
+    헤더 단위로 섹션을 나누고, 큰 섹션은 재귀적으로 청킹
     """
     
-    def __init__(self, max_chunk_size: int = 1000, overlap: int = 100):
+    def __init__(self, max_chunk_size: int = 1000, overlap: int = 100, token_counter=None):
         """
         Args:
             max_chunk_size: 청크당 최대 문자 수
             overlap: 청크 간 겹치는 문자 수
+            token_counter: 지정하면 max_chunk_size/overlap을 토큰 수로 해석 (RecursiveCharacterChunker와 동일)
         """
         self.max_chunk_size = max_chunk_size
         self.overlap = overlap
+        self.token_counter = token_counter
     
     def chunk(self, text: str, metadata: Dict[str, Any] = None, source: str = None) -> List[Chunk]:
         """
         마크다운 문서를 구조에 따라 청킹합니다.
         """
-        import re
+        section_chunker = RecursiveCharacterChunker(
+            chunk_sizes=[self.max_chunk_size] + [size for size in (500, 200) if size < self.max_chunk_size],
+            overlap=self.overlap,
+            token_counter=self.token_counter
+        )
         
-        # 마크다운 헤더로 분할 (h1, h2, h3 등)
-        header_pattern = r'\n#{1,6}\s+.*?(?=\n#{1,6}\s+|\Z)'
-        sections = re.split(header_pattern, text, flags=re.DOTALL)
+        # 헤더 시작 위치로 섹션 경계 계산 (첫 헤더 앞은 헤더 없는 섹션)
+        headers = [(m.start(), m.group().strip()) for m in _MARKDOWN_HEADER.finditer(text)]
+        bounds = [(0, None)] + headers if not headers or headers[0][0] > 0 else headers
         
-        # 헤더 정보도 함께 추출
-        headers = re.findall(header_pattern, text, flags=re.DOTALL)
+        chunks: List[Chunk] = []
+        for i, (start, header) in enumerate(bounds):
+            end = bounds[i + 1][0] if i + 1 < len(bounds) else len(text)
+            if not text[start:end].strip():
+                continue
+            extra = {"chunk_method": "markdown", "max_chunk_size": self.max_chunk_size,
+                     "size_unit": "tokens" if self.token_counter else "chars"}
+            if header is not None:
+                extra["header"] = header
+            shared = _shared_metadata(metadata, **extra)
+            chunks.extend(_build_chunks(
+                text, section_chunker.split_ranges(text, start, end), shared, source, len(chunks)
+            ))
         
-        chunks = []
-        chunk_index = 0
-        
-        # 첫 번째 섹션(헤더 없이 시작하는 부분) 처리
-        if sections and text.startswith(sections[0][:10]):  # 대략적인 확인
-            if len(sections[0]) > 0:
-                char_chunker = CharacterChunker(
-                    chunk_size=self.max_chunk_size,
-                    overlap=self.overlap
-                )
-                sub_chunks = char_chunker.chunk(
-                    sections[0], 
-                    metadata, 
-                    source
-                )
-                
-                for sub_chunk in sub_chunks:
-                    sub_chunk.chunk_index = chunk_index
-                    chunks.append(sub_chunk)
-                    chunk_index += 1
-            sections = sections[1:]
-        
-        # 나머지 섹션(각각 헤더를 포함하는) 처리
-        for header, section in zip(headers, sections):
-            section_with_header = header + section
-            
-            if len(section_with_header) <= self.max_chunk_size:
-                # 섹션이 청크 크기보다 작으면 그대로 청크로 추가
-                chunk_metadata = metadata.copy() if metadata else {}
-                chunk_metadata.update({
-                    "chunk_method": "markdown",
-                    "header": header.strip(),
-                    "chunk_size": len(section_with_header)
-                })
-                
-                chunk = Chunk(
-                    content=section_with_header,
-                    metadata=chunk_metadata,
-                    source=source,
-                    chunk_index=chunk_index
-                )
-                chunks.append(chunk)
-                chunk_index += 1
-            else:
-                # 섹션이 너무 크면 재귀적 청킹
-                recursive_chunker = RecursiveCharacterChunker(
-                    chunk_sizes=[self.max_chunk_size, 500, 200],
-                    separators=["\n\n", "\n", " ", ""],
-                    overlap=self.overlap
-                )
-                sub_chunks = recursive_chunker.chunk(
-                    section_with_header, 
-                    metadata, 
-                    source
-                )
-                
-                for sub_chunk in sub_chunks:
-                    sub_chunk.chunk_index = chunk_index
-                    chunks.append(sub_chunk)
-                    chunk_index += 1
-    
         logger.info(f"마크다운 청킹 완료: {len(chunks)}개 청크 생성")
         return chunks
 
@@ -488,7 +446,7 @@ class ChunkerFactory:
         Args:
             chunker_type: 청킹 전략 유형
             **kwargs: 청커 초기화에 필요한 추가 인자
-            
+        
         Returns:
             BaseChunker 인스턴스
         """
@@ -510,19 +468,74 @@ class ChunkerFactory:
             metadata: 관련 메타데이터 (선택사항)
             source: 소스 식별자 (선택사항)
             **kwargs: 청킹 전략에 전달할 추가 인자
-            
+        
         Returns:
             Chunk 객체의 리스트
         """
-        # 파일 형식에 따라 청킹 전략 선택
+        chunker = self.get_chunker(self._chunker_type_for_format(file_format), **kwargs)
+        return chunker.chunk(text, metadata, source)
+    
+    def iter_chunks(self, documents: Iterable, file_format: str,
+                    source: str = None, **kwargs) -> Iterator[Chunk]:
+        """
+        페이지/섹션 단위 Document 스트림을 받아 청크를 점진적으로 생성합니다.
+        
+        - 각 섹션을 청킹한 뒤 마지막 청크는 다음 섹션과 이어 붙여 다시 청킹하므로
+          페이지 경계에서 문장이 잘리지 않습니다.
+        - 메모리에는 현재 섹션과 이월된 마지막 청크만 유지됩니다.
+        
+        Args:
+            documents: Document 이터러블 (DocumentLoader.iter_documents 결과 등)
+            file_format: 파일 형식 (예: '.pdf', '.epub', '.txt', '.md')
+            source: 소스 식별자 (선택사항)
+            **kwargs: 청킹 전략에 전달할 추가 인자
+        
+        Yields:
+            Chunk 객체 (chunk_index와 start/end는 문서 전체 기준)
+        """
+        chunker = self.get_chunker(self._chunker_type_for_format(file_format), **kwargs)
+        carry = ""
+        carry_metadata = None
+        base = 0  # carry[0]의 스트림 전체 기준 오프셋
+        chunk_index = 0
+        
+        for doc in documents:
+            text = carry + doc.content
+            carry_metadata = doc.metadata
+            chunks = chunker.chunk(text, carry_metadata, source) if text.strip() else []
+            # 마지막 청크는 다음 섹션과 합쳐질 수 있으므로 보류
+            for chunk in chunks[:-1]:
+                yield self._rebase(chunk, base, chunk_index)
+                chunk_index += 1
+            if chunks:
+                last = chunks[-1]
+                cut = last.start if last.start is not None else max(0, text.rfind(last.content))
+                carry = text[cut:]
+                base += cut
+            else:
+                carry = text
+        
+        if carry.strip():
+            for chunk in chunker.chunk(carry, carry_metadata, source):
+                yield self._rebase(chunk, base, chunk_index)
+                chunk_index += 1
+    
+    @staticmethod
+    def _rebase(chunk: Chunk, base: int, chunk_index: int) -> Chunk:
+        """섹션 기준 오프셋/인덱스를 스트림 전체 기준으로 변환"""
+        chunk.chunk_index = chunk_index
+        if chunk.start is not None:
+            chunk.start += base
+            chunk.end += base
+        return chunk
+    
+    @staticmethod
+    def _chunker_type_for_format(file_format: str) -> str:
+        """파일 형식에 따라 청킹 전략 선택"""
         if file_format.lower() in ['.md', '.markdown']:
-            chunker_type = 'markdown'
+            return 'markdown'
         elif file_format.lower() in ['.pdf', '.epub']:
             # PDF와 EPUB은 일반적으로 구조화된 텍스트이므로 재귀적 청킹이 효과적
-            chunker_type = 'recursive'
-        else:
-            # 기본 청킹 전략
-            chunker_type = 'recursive'
-        
-        chunker = self.get_chunker(chunker_type, **kwargs)
-        return chunker.chunk(text, metadata, source)
\ No newline at end of file
+            return 'recursive'
+        # 기본 청킹 전략
+        return 'recursive'
\ No newline at end of file
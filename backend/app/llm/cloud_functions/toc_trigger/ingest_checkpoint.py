@@ -0,0 +1,71 @@
+"""
+수집 이벤트 중복 처리 방지 (rag_ingest_checkpoint 테이블, 대량 수집 CLI와 공유)
+
+Pub/Sub는 같은 OBJECT_FINALIZE 이벤트를 다시 전달할 수 있으므로
+(bucket, object, generation)을 먼저 선점한 호출만 처리합니다.
+- 같은 generation이 이미 완료(done)되었거나 다른 호출이 처리 중이면 선점 실패 → 처리 생략
+- 실패(failed)했거나, 처리 중(running)인 채로 STALE_MINUTES가 지난 기록은 다시 선점 가능
+- 더 새로운 generation이 들어오면 선점 (늦게 도착한 예전 generation 이벤트는 무시)
+"""
+from typing import Optional
+
+from sqlalchemy import text
+
+# 함수 제한 시간(540초)보다 길게: 이 시간이 지나도 running이면 중단된 호출로 간주
+STALE_MINUTES = 15
+
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+def claim_object(engine, bucket: str, object_name: str, generation: int, size_bytes: Optional[int] = None) -> bool:
+    """객체 처리 선점 (선점에 성공한 호출만 True)"""
+    with engine.begin() as conn:
+        row = conn.execute(text(f"""
+            INSERT INTO rag_ingest_checkpoint
+                (bucket, object_name, generation, size_bytes, status, created_at, updated_at)
+            VALUES (:bucket, :object_name, :generation, :size_bytes, '{STATUS_RUNNING}', NOW(), NOW())
+            ON CONFLICT (bucket, object_name) DO UPDATE
+            SET generation  = EXCLUDED.generation,
+                size_bytes  = EXCLUDED.size_bytes,
+                status      = EXCLUDED.status,
+                chunk_count = NULL,
+                error       = NULL,
+                updated_at  = NOW()
+            WHERE rag_ingest_checkpoint.generation < EXCLUDED.generation
+               OR (rag_ingest_checkpoint.generation = EXCLUDED.generation
+                   AND (rag_ingest_checkpoint.status = '{STATUS_FAILED}'
+                        OR (rag_ingest_checkpoint.status = '{STATUS_RUNNING}'
+                            AND rag_ingest_checkpoint.updated_at < NOW() - INTERVAL '{STALE_MINUTES} minutes')))
+            RETURNING generation
+        """), {
+            "bucket": bucket,
+            "object_name": object_name,
+            "generation": generation,
+            "size_bytes": size_bytes,
+        }).fetchone()
+    return row is not None
+
+
+def finish_object(engine,
+                  bucket: str,
+                  object_name: str,
+                  generation: int,
+                  status: str,
+                  chunk_count: Optional[int] = None,
+                  error: Optional[str] = None) -> None:
+    """선점한 객체의 처리 결과 기록 (그사이 더 새로운 generation이 선점했다면 덮어쓰지 않음)"""
+    with engine.begin() as conn:
+        conn.execute(text("""
+            UPDATE rag_ingest_checkpoint
+            SET status = :status, chunk_count = :chunk_count, error = :error, updated_at = NOW()
+            WHERE bucket = :bucket AND object_name = :object_name AND generation = :generation
+        """), {
+            "bucket": bucket,
+            "object_name": object_name,
+            "generation": generation,
+            "status": status,
+            "chunk_count": chunk_count,
+            "error": error,
+        })
@@ -1,71 +1,131 @@
 import functions_framework
+import base64
+import json
 import os
-import sys
-import tempfile
-import logging
+import time
+
+# Cloud Functions의 /tmp는 메모리를 쓰므로 다운로드 캐시는 최소로 유지 (재전달은 체크포인트로 걸러냄)
+os.environ.setdefault("GAON_DOWNLOAD_CACHE_MB", "0")
+
+# 웜 인스턴스에서 재사용 (버킷별 TOCBasedRAG: SQLAlchemy 엔진, OpenAI/GCS 클라이언트 포함)
+_toc_rags = {}
+
+
+def _get_toc_rag(bucket):
+    """버킷별 TOCBasedRAG (최초 호출에서만 무거운 모듈 임포트 및 클라이언트 생성)"""
+    toc_rag = _toc_rags.get(bucket)
+    if toc_rag is not None:
+        return toc_rag
+
+    started = time.perf_counter()
+    from rag_toc_based import TOCBasedRAG
+    from rag_interface import RAGConfig
+
+    # TOC 기반 RAG 설정
+    config = RAGConfig(
+        storage_type="gcp",
+        chunker_type="toc_based",
+        embedding_model="openai",
+        vector_db_type="postgresql",
+        extra_config={
+            "bucket_name": bucket,
+            "embedding_model": "text-embedding-3-small",
+            "table_name": "ideal_answer"
+        }
+    )
+    toc_rag = _toc_rags[bucket] = TOCBasedRAG(config)
+    print(f"❄️ TOC RAG 초기화 완료 ({bucket}): {time.perf_counter() - started:.2f}초")
+    return toc_rag
+
+
+def _object_generation(message, attributes):
+    """객체 generation (Pub/Sub 속성, 없으면 메시지 본문의 객체 메타데이터)"""
+    generation = attributes.get('objectGeneration')
+    if generation is None and message.get('data'):
+        try:
+            generation = json.loads(base64.b64decode(message['data'])).get('generation')
+        except (ValueError, TypeError):
+            generation = None
+    return int(generation) if generation is not None else None
+
 
 @functions_framework.cloud_event
 def toc_pdf_processor(cloud_event):
     """TOC 기반 RAG 시스템으로 PDF 파일 처리"""
-    
+
     try:
         # Pub/Sub 메시지에서 정보 추출
         message = cloud_event.data.get('message', {})
         attributes = message.get('attributes', {})
-        
+
         bucket = attributes.get('bucketId')
         file_name = attributes.get('objectId')
         event_type = attributes.get('eventType')
-        
+
         print(f"TOC RAG 처리 시작: {file_name}")
-        
+
         # rag-data/toc-pdfs 경로만 처리
         if not file_name or not file_name.startswith('rag-data/toc-pdfs/'):
             print(f"TOC RAG 처리 제외: {file_name}")
             return
-        
+
         # 파일 생성 이벤트만 처리
         if event_type != 'OBJECT_FINALIZE':
             print(f"처리하지 않는 이벤트: {event_type}")
             return
-        
+
         # PDF 파일만 처리
         if not file_name.lower().endswith('.pdf'):
             print(f"TOC RAG는 PDF만 지원: {file_name}")
             return
-        
-        # 실제 TOC 기반 파일 처리 수행
-        from rag_toc_based import TOCBasedRAG
-        from rag_interface import RAGConfig
-        
+
+        started = time.perf_counter()
+        toc_rag = _get_toc_rag(bucket)
+
+        # 📌 재전달된 이벤트는 처리하지 않음 ((bucket, object, generation) 선점)
+        from ingest_checkpoint import STATUS_DONE, STATUS_FAILED, claim_object, finish_object
+
+        generation = _object_generation(message, attributes)
+        if generation is None:
+            print("⚠️ objectGeneration이 없어 중복 처리 확인을 건너뜁니다")
+        else:
+            try:
+                claimed = claim_object(toc_rag.engine, bucket, file_name, generation)
+            except Exception as e:
+                print(f"⚠️ 중복 처리 확인 실패, 그대로 처리합니다: {e}")
+                claimed, generation = True, None
+            if not claimed:
+                print(f"⏭️ 이미 처리되었거나 처리 중인 객체: gs://{bucket}/{file_name}#{generation}")
+                return f"중복 이벤트 무시: {file_name}"
+
         print(f"TOC 파일 처리 시작: {file_name}")
-        
+
         # GCS 경로 구성
         gcs_path = f"gs://{bucket}/{file_name}"
-        
-        # TOC 기반 RAG 설정
-        config = RAGConfig(
-            storage_type="gcp",
-            chunker_type="toc_based",
-            embedding_model="openai",
-            vector_db_type="postgresql",
-            extra_config={
-                "bucket_name": bucket,
-                "embedding_model": "text-embedding-3-small",
-                "table_name": "ideal_answer"
-            }
-        )
-        
+
         # TOC RAG 시스템으로 처리
-        toc_rag = TOCBasedRAG(config)
-        results = toc_rag.load_and_process_file(gcs_path)
-        
-        print(f"TOC 파일 처리 완료: {len(results)}개 결과")
+        try:
+            results = toc_rag.load_and_process_file(gcs_path)
+        except Exception as e:
+            if generation is not None:
+                finish_object(toc_rag.engine, bucket, file_name, generation, STATUS_FAILED, error=str(e))
+            raise
+
+        errors = [result for result in results if result.get("status") == "error"]
+        chunk_count = sum(1 for result in results if result.get("status") == "success")
+        if generation is not None:
+            if errors:
+                finish_object(toc_rag.engine, bucket, file_name, generation, STATUS_FAILED,
+                              error=errors[0].get("message"))
+            else:
+                finish_object(toc_rag.engine, bucket, file_name, generation, STATUS_DONE, chunk_count=chunk_count)
+
+        print(f"TOC 파일 처리 완료: {len(results)}개 결과, {time.perf_counter() - started:.2f}초")
         for i, result in enumerate(results[:3]):  # 처음 3개만 로그
             print(f"결과 {i+1}: {result}")
-        
-        return f"TOC 파일 처리 완료: {len(results)}개 청크 생성"
-        
+
+        return f"TOC 파일 처리 완료: {chunk_count}개 청크"
+
     except Exception as e:
         print(f"TOC RAG 처리 실패: {str(e)}")
         import traceback
@@ -0,0 +1,230 @@
+"""
+근사 중복 청크 / 반복 머리말·꼬리말 제거 유틸리티
+
+- 정규화한 본문의 문자 n-gram으로 MinHash 서명을 만들고 LSH 밴딩으로 후보를 좁혀
+  거의 같은 청크(장 요약, 연습 문제 양식 등 반복 상용구)를 임베딩 전에 걸러냄
+- 서명/밴드 키를 DB에 저장해 두면(signature_keys) 다른 책에 이미 있는 청크와도 비교 가능 (is_near)
+- 페이지 위/아래 가장자리 줄 중 여러 페이지에 반복되는 줄(책 제목, 장 제목, 쪽 번호)을 제거
+- numpy 외 의존성이 없어 클라우드 함수(toc_trigger)에도 같은 파일을 복사해 사용
+"""
+import hashlib
+import math
+import re
+import unicodedata
+import zlib
+from collections import Counter
+from typing import Dict, FrozenSet, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# 기본값: 128개 해시를 16밴드 × 8행으로 나눔 (후보가 되는 유사도 ≈ (1/16)^(1/8) ≈ 0.71)
+DEFAULT_NUM_PERM = 128
+DEFAULT_BANDS = 16
+DEFAULT_SHINGLE_SIZE = 5
+DEFAULT_THRESHOLD = 0.8
+
+_SHIFT = np.uint64(32)
+_NON_WORD = re.compile(r"[\W_]+")
+_DIGITS = re.compile(r"\d+")
+
+
+def normalize_text(text: str) -> str:
+    """비교용 정규화 (NFKC, 소문자, 공백/문장부호 제거)"""
+    return _NON_WORD.sub("", unicodedata.normalize("NFKC", text).lower())
+
+
+def _shingle_hashes(text: str, size: int) -> np.ndarray:
+    """문자 n-gram 집합의 crc32 해시"""
+    if len(text) <= size:
+        return np.array([zlib.crc32(text.encode("utf-8"))], dtype=np.uint64)
+    shingles = {zlib.crc32(text[i:i + size].encode("utf-8")) for i in range(len(text) - size + 1)}
+    return np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+
+
+class MinHasher:
+    """multiply-shift 해시 ((a·x + b) mod 2^64의 상위 32비트) num_perm개로 MinHash 서명 계산"""
+
+    def __init__(self, num_perm: int = DEFAULT_NUM_PERM, shingle_size: int = DEFAULT_SHINGLE_SIZE, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self._a = rng.randint(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.randint(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64)
+
+    def signature(self, normalized: str) -> np.ndarray:
+        """정규화된 텍스트의 MinHash 서명 (uint32 × num_perm)"""
+        hashes = _shingle_hashes(normalized, self.shingle_size)
+        permuted = (hashes[:, None] * self._a + self._b) >> _SHIFT
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH 근사 중복 색인
+    - 정규화 결과가 완전히 같으면 서명 계산 없이 바로 중복으로 판단
+    - LSH 후보는 서명 일치율(자카드 유사도 추정치)이 threshold 이상일 때만 중복으로 판단
+    """
+
+    def __init__(self,
+                 threshold: float = DEFAULT_THRESHOLD,
+                 num_perm: int = DEFAULT_NUM_PERM,
+                 bands: int = DEFAULT_BANDS,
+                 shingle_size: int = DEFAULT_SHINGLE_SIZE):
+        if num_perm % bands:
+            raise ValueError(f"num_perm({num_perm})은 bands({bands})로 나누어떨어져야 합니다")
+        self.threshold = threshold
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm, shingle_size)
+        self._exact: Dict[bytes, Hashable] = {}
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+        self._keys: List[Hashable] = []
+        self._signatures: List[np.ndarray] = []
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def find(self, text: str) -> Optional[Hashable]:
+        """text와 거의 같은 항목의 키 (없거나 빈 텍스트면 None, 색인은 바꾸지 않음)"""
+        prepared = self._prepare(text)
+        return self._match(prepared) if prepared is not None else None
+
+    def add(self, key: Hashable, text: str) -> None:
+        """text를 key로 등록 (중복 여부는 확인하지 않음, 빈 텍스트는 등록하지 않음)"""
+        prepared = self._prepare(text)
+        if prepared is not None:
+            self._insert(key, prepared)
+
+    def find_or_add(self, key: Hashable, text: str) -> Optional[Hashable]:
+        """
+        text와 거의 같은 항목이 이미 있으면 그 키를 반환하고,
+        없으면 text를 key로 등록한 뒤 None을 반환합니다. (빈 텍스트는 등록하지 않음)
+        """
+        prepared = self._prepare(text)
+        if prepared is None:
+            return None
+        duplicate_of = self._match(prepared)
+        if duplicate_of is None:
+            self._insert(key, prepared)
+        return duplicate_of
+
+    def signature_keys(self, text: str) -> Optional[Tuple[bytes, List[str]]]:
+        """
+        DB 저장용 (MinHash 서명 bytes, LSH 밴드 키 목록 "<밴드 번호>:<밴드 해시>") — 빈 텍스트면 None
+        밴드 키가 하나라도 겹치는 저장 행이 후보, is_near로 최종 판단
+        """
+        prepared = self._prepare(text)
+        if prepared is None:
+            return None
+        _, signature, band_keys = prepared
+        keys = [
+            f"{band}:{hashlib.blake2b(band_key, digest_size=8).hexdigest()}"
+            for band, band_key in enumerate(band_keys)
+        ]
+        return signature.tobytes(), keys
+
+    def is_near(self, signature: bytes, other: bytes) -> bool:
+        """저장된 두 서명의 일치율(자카드 유사도 추정치)이 threshold 이상인지"""
+        a = np.frombuffer(signature, dtype=np.uint32)
+        b = np.frombuffer(other, dtype=np.uint32)
+        return a.shape == b.shape and np.count_nonzero(a == b) >= self.threshold * len(a)
+
+    def _prepare(self, text: str) -> Optional[Tuple[bytes, np.ndarray, List[bytes]]]:
+        """(정규화 텍스트 다이제스트, 서명, 밴드 키) — 빈 텍스트면 None"""
+        normalized = normalize_text(text)
+        if not normalized:
+            return None
+        digest = hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).digest()
+        signature = self.hasher.signature(normalized)
+        band_keys = [signature[i:i + self.rows].tobytes() for i in range(0, len(signature), self.rows)]
+        return digest, signature, band_keys
+
+    def _match(self, prepared: Tuple[bytes, np.ndarray, List[bytes]]) -> Optional[Hashable]:
+        digest, signature, band_keys = prepared
+        if digest in self._exact:
+            return self._exact[digest]
+
+        min_matches = self.threshold * len(signature)
+        checked = set()
+        for buckets, band_key in zip(self._buckets, band_keys):
+            for candidate in buckets.get(band_key, ()):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+                if np.count_nonzero(self._signatures[candidate] == signature) >= min_matches:
+                    return self._keys[candidate]
+        return None
+
+    def _insert(self, key: Hashable, prepared: Tuple[bytes, np.ndarray, List[bytes]]) -> None:
+        digest, signature, band_keys = prepared
+        item = len(self._keys)
+        self._keys.append(key)
+        self._signatures.append(signature)
+        self._exact.setdefault(digest, key)
+        for buckets, band_key in zip(self._buckets, band_keys):
+            buckets.setdefault(band_key, []).append(item)
+
+
+def _line_key(line: str) -> str:
+    """반복 줄 비교 키 (숫자는 쪽 번호가 같게 취급되도록 0으로 치환)"""
+    return normalize_text(_DIGITS.sub("0", line))
+
+
+class RepeatedLineStripper:
+    """
+    페이지 가장자리(위/아래 edge_lines줄)에 반복되는 머리말/꼬리말 제거기
+    - learn()으로 여러 페이지에서 반복 줄을 찾고, strip()으로 페이지마다 가장자리에서만 제거
+    """
+
+    def __init__(self, repeated: FrozenSet[str] = frozenset(), edge_lines: int = 3):
+        self.repeated = repeated
+        self.edge_lines = edge_lines
+
+    @classmethod
+    def learn(cls,
+              pages: Sequence[str],
+              edge_lines: int = 3,
+              min_ratio: float = 0.3,
+              min_pages: int = 3) -> "RepeatedLineStripper":
+        """
+        페이지의 min_ratio 이상(최소 min_pages쪽)에서 가장자리에 나타나는 줄을 반복 줄로 학습
+        (짝수/홀수 쪽 머리말이 다른 책도 잡히도록 비율은 절반보다 낮게 잡음)
+        """
+        counts: Counter = Counter()
+        for page in pages:
+            lines = [line for line in page.splitlines() if line.strip()]
+            edges = lines[:edge_lines] + lines[-edge_lines:]
+            counts.update({_line_key(line) for line in edges})
+
+        needed = max(min_pages, math.ceil(len(pages) * min_ratio))
+        repeated = frozenset(key for key, count in counts.items() if key and count >= needed)
+        return cls(repeated, edge_lines)
+
+    def strip(self, page: str) -> str:
+        """페이지 위/아래 가장자리의 반복 줄 제거 (본문과 만나는 첫 줄에서 멈춤)"""
+        if not self.repeated:
+            return page
+        lines = page.splitlines(keepends=True)
+        start = self._edge_length(lines)
+        end = len(lines) - self._edge_length(lines[:start - 1:-1] if start else lines[::-1])
+        if start == 0 and end == len(lines):
+            return page
+        return "".join(lines[start:end])
+
+    def _edge_length(self, lines: Sequence[str]) -> int:
+        """lines 앞쪽에서 제거할 줄 수 (마지막 반복 줄까지, 반복 줄은 최대 edge_lines개)"""
+        length = stripped = 0
+        for i, line in enumerate(lines):
+            if not line.strip():
+                continue
+            if stripped >= self.edge_lines or _line_key(line) not in self.repeated:
+                break
+            stripped += 1
+            length = i + 1
+        return length
+
+
+def strip_repeated_lines(pages: Sequence[str], **kwargs) -> List[str]:
+    """페이지 목록에서 반복 머리말/꼬리말을 학습해 제거"""
+    stripper = RepeatedLineStripper.learn(pages, **kwargs)
+    return [stripper.strip(page) for page in pages]
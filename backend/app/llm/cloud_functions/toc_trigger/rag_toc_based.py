@@ -8,15 +8,16 @@ import logging
 from typing import List, Dict, Any, Tuple, Optional
 from uuid import UUID, uuid4, uuid5, NAMESPACE_DNS
 from pathlib import Path
+import numpy as np
 from openai import OpenAI
 
-from sqlalchemy import create_engine, Column, String, Text, Integer
-from sqlalchemy.dialects.postgresql import UUID as PostgreSQLUUID
+from sqlalchemy import create_engine, event, Column, String, Text, Integer, LargeBinary, bindparam, case, cast, select, text, true
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PostgreSQLUUID
 from sqlalchemy.orm import sessionmaker, declarative_base, Session
 
 # pgvector import 시도
 try:
-    from pgvector.sqlalchemy import Vector
+    from pgvector.sqlalchemy import Vector, HALFVEC
     PGVECTOR_AVAILABLE = True
     print("✅ pgvector 임포트 성공")
 except ImportError as e:
@@ -25,16 +26,41 @@ except ImportError as e:
     # 대체 타입 정의
     from sqlalchemy import ARRAY, Float
     Vector = lambda dim: ARRAY(Float, dimensions=dim)
+    HALFVEC = Vector
 
 from rag_interface import AdvancedRAGInterface, RAGConfig
 from toc_utils import TOCExtractor
-from toc_chunker import TOCChunker
+from toc_chunker import TOCChunker, CHUNK_UPDATE_FIELDS, diff_chunks
+from section_store import bump_corpus_version, rebuild_sections
+from near_dedup import DEFAULT_THRESHOLD, NearDuplicateIndex
+from lexical import lexical_terms
+from tokenizer import EMBEDDING_MAX_INPUT_TOKENS, get_token_counter, pack_by_tokens
 from app.utils.gcp_utils import GCPStorageManager
 from config import settings
 
 # 베이스 클래스
 Base = declarative_base()
 
+# 임베딩 API 1회 호출당 입력 수
+EMBED_BATCH_SIZE = 100
+
+# 다른 책 근사 중복 조회 1회당 청크 수 (밴드 키 = 청크 수 × 밴드 수)
+DEDUP_LOOKUP_BATCH = 200
+
+# 임베딩 차원 (text-embedding-3-small)
+EMBEDDING_DIM = 1536
+
+# v2 임베딩 차원 (embedding_v2 halfvec, v1 앞부분을 잘라 정규화한 값)
+EMBEDDING_V2_DIM = 512
+
+
+def derive_embedding_v2(embedding: List[float]) -> np.ndarray:
+    """v1 임베딩 앞 EMBEDDING_V2_DIM개 성분을 잘라 정규화 (text-embedding-3에 dimensions=512를 요청한 결과와 같음)"""
+    vector = np.asarray(embedding, dtype=np.float32)[:EMBEDDING_V2_DIM]
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
 class IdealAnswer(Base):
     """이상적인 답변 테이블 모델"""
     __tablename__ = 'ideal_answer'
@@ -53,8 +79,25 @@ class IdealAnswer(Base):
     citation = Column(Text, nullable=True)
     full_text = Column(Text, nullable=True)
     embed_text = Column(Text, nullable=True)
-    embedding = Column(Vector(1536), nullable=True)
+    embedding = Column(Vector(EMBEDDING_DIM), nullable=True)
+    embedding_v2 = Column(HALFVEC(EMBEDDING_V2_DIM), nullable=True)  # RAG_EMBEDDING_VERSION=v2 검색용
+    lexical_terms = Column(Text, nullable=True)  # 어휘 검색용 Kiwi 내용어 (lexical_tsv는 DB 생성 컬럼)
     rag_type = Column(String(20), nullable=True, default='toc')
+    section_hash = Column(String(64), nullable=True)
+    content_hash = Column(String(64), nullable=True)
+    minhash = Column(LargeBinary, nullable=True)  # 근사 중복 비교용 MinHash 서명 (full_text 기준)
+    lsh_keys = Column(ARRAY(Text), nullable=True)  # LSH 밴드 키 (GIN 인덱스, 다른 책 중복 후보 조회)
+
+
+def _register_vector_types(dbapi_connection, connection_record):
+    """새 커넥션마다 pgvector 어댑터 등록 (numpy 배열 ↔ vector)"""
+    try:
+        from pgvector.psycopg2 import register_vector
+        register_vector(dbapi_connection, globally=False)
+    except Exception as e:
+        print(f"⚠️ pgvector 어댑터 등록 생략: {e}")
+    finally:
+        dbapi_connection.rollback()
 
 
 class TOCBasedRAG(AdvancedRAGInterface):
@@ -68,14 +111,19 @@ class TOCBasedRAG(AdvancedRAGInterface):
         self.engine = self._create_engine()
         self.SessionLocal = sessionmaker(bind=self.engine)
         
-        # 유틸리티 초기화
-        self.toc_extractor = TOCExtractor()
-        self.toc_chunker = TOCChunker()
-        self.gcp_manager = GCPStorageManager(config.extra_config.get("bucket_name"))
-        
         # 설정
         self.table_name = config.extra_config.get("table_name", "ideal_answer")
         self.embedding_model = config.extra_config.get("embedding_model", "text-embedding-3-small")
+        # 임베딩 입력 토큰 한도 (청크 embed_text 예산, 임베딩 요청 전 자르기 기준)
+        self.max_input_tokens = config.extra_config.get("max_input_tokens", EMBEDDING_MAX_INPUT_TOKENS)
+        self.token_counter = get_token_counter(self.embedding_model)
+        
+        # 유틸리티 초기화
+        self.toc_extractor = TOCExtractor()
+        self.toc_chunker = TOCChunker(max_tokens=self.max_input_tokens, token_counter=self.token_counter)
+        # 코퍼스(다른 책) 근사 중복 판정: 서명/밴드 키는 청크 행에 저장해 두고 새 청크와 비교
+        self.dedup_index = NearDuplicateIndex(threshold=self.toc_chunker.dedup_threshold or DEFAULT_THRESHOLD)
+        self.gcp_manager = GCPStorageManager(config.extra_config.get("bucket_name"))
         
     def _create_engine(self):
         """SQLAlchemy 엔진 생성"""
@@ -98,6 +146,8 @@ class TOCBasedRAG(AdvancedRAGInterface):
                 pool_pre_ping=True,
                 pool_recycle=300
             )
+            if PGVECTOR_AVAILABLE:
+                event.listen(engine, "connect", _register_vector_types)
             print("SQLAlchemy 엔진 생성 성공")
             return engine
         except Exception as e:
@@ -141,32 +191,9 @@ class TOCBasedRAG(AdvancedRAGInterface):
             chunks = self.toc_chunker.chunk_pdf_by_toc(local_path, toc_data)
             print(f"청킹 결과: {len(chunks)}개 청크")
             
-            # 3. 각 청크에 대해 임베딩 생성 및 저장
-            for i, chunk in enumerate(chunks):
-                try:
-                    # 임베딩 생성
-                    embedding = self._create_embedding(chunk["embed_text"])
-                    
-                    # 데이터베이스에 저장
-                    chunk_id = self._save_chunk_to_db(chunk, embedding)
-                    
-                    results.append({
-                        "chunk_id": chunk_id,
-                        "section_id": chunk["section_id"],
-                        "canonical_path": chunk["canonical_path"],
-                        "status": "success"
-                    })
-                    
-                    if i % 10 == 0:
-                        print(f"처리 진행률: {i+1}/{len(chunks)}")
-                    
-                except Exception as e:
-                    print(f"청크 {i} 처리 실패: {e}")
-                    results.append({
-                        "chunk_id": chunk.get("chunk_id"),
-                        "status": "error",
-                        "error": str(e)
-                    })
+            # 3. 저장된 청크와 비교해 바뀐 청크만 임베딩/저장, 사라진 청크는 삭제 (책 단위 트랜잭션)
+            if chunks:
+                results = self._sync_book_chunks(chunks)
             
             # 임시 파일 정리
             if local_path != source_path:
@@ -178,6 +205,190 @@ class TOCBasedRAG(AdvancedRAGInterface):
             print(f"파일 처리 실패: {str(e)}")
             return [{"status": "error", "message": f"파일 처리 실패: {str(e)}"}]
     
+    def _sync_book_chunks(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        책 단위 증분 재수집
+        - 저장된 청크를 content_hash로 비교해 새/변경 청크만 임베딩 후 저장
+        - 내용은 같고 위치/페이지 등만 바뀐 청크는 임베딩 없이 필드만 갱신
+        - 새 버전에 없는 청크는 삭제
+        - 새 청크 중 다른 책에 이미 저장된 청크와 거의 같은 것(반복 상용구)은 임베딩 전에 제외
+        - 같은 책의 동시 처리는 advisory lock으로 직렬화, 전체를 하나의 트랜잭션으로 커밋
+        - 커밋 전에 책의 섹션 테이블(ideal_answer_section)을 청크로부터 다시 만듦
+        """
+        book_title = chunks[0].get("book_title", "Unknown")
+        book_id = uuid5(NAMESPACE_DNS, book_title)
+        
+        session = self.SessionLocal()
+        try:
+            session.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": str(book_id)})
+            
+            existing_rows = self._load_book_rows(session, book_id)
+            diff = diff_chunks(existing_rows, chunks)
+            print(
+                f"📚 증분 수집 [{book_title}]: 저장 {len(existing_rows)}개 → "
+                f"신규 {len(diff.insert)}, 갱신 {len(diff.update)}, "
+                f"유지 {len(diff.unchanged)}, 삭제 {len(diff.delete)}"
+            )
+            
+            # 다른 책에 이미 있는 근사 중복 청크는 저장하지 않음
+            inserts = self._drop_corpus_duplicates(session, book_id, diff.insert)
+            
+            # 새/변경 청크만 임베딩
+            embeddings = self._create_embeddings([chunk["embed_text"] for chunk in inserts])
+            
+            if diff.delete:
+                session.query(IdealAnswer).filter(
+                    IdealAnswer.snippet_id.in_([row["snippet_id"] for row in diff.delete])
+                ).delete(synchronize_session=False)
+            
+            for row, chunk in diff.update:
+                session.query(IdealAnswer).filter(
+                    IdealAnswer.snippet_id == row["snippet_id"]
+                ).update(
+                    {field: chunk.get(field) for field in CHUNK_UPDATE_FIELDS},
+                    synchronize_session=False
+                )
+            
+            # 서명이 없는 예전 행은 이번에 채움 (이후 다른 책의 중복 판정에 사용)
+            for row, chunk in diff.update + diff.unchanged:
+                if row.get("needs_lsh"):
+                    session.query(IdealAnswer).filter(
+                        IdealAnswer.snippet_id == row["snippet_id"]
+                    ).update(self._lsh_columns(chunk), synchronize_session=False)
+            
+            new_rows = [
+                self._build_row(chunk, embedding, book_id)
+                for chunk, embedding in zip(inserts, embeddings)
+            ]
+            session.add_all(new_rows)
+            session.flush()
+            
+            # 섹션 테이블도 같은 트랜잭션에서 다시 만듦 (섹션 전문/출처/평균 임베딩)
+            section_count = rebuild_sections(session, book_id=book_id, chunk_table=IdealAnswer.__tablename__)
+            if diff.insert or diff.update or diff.delete:
+                # 검색 결과 캐시 무효화
+                bump_corpus_version(session)
+            session.commit()
+            print(f"📑 섹션 갱신 [{book_title}]: {section_count}개")
+        except Exception as e:
+            session.rollback()
+            print(f"증분 수집 실패 [{book_title}]: {e}")
+            raise
+        finally:
+            session.close()
+        
+        results = [
+            {
+                "chunk_id": str(row.snippet_id),
+                "section_id": row.section_id,
+                "canonical_path": row.canonical_path,
+                "status": "success",
+                "change": "inserted"
+            }
+            for row in new_rows
+        ]
+        for change, pairs in (("updated", diff.update), ("unchanged", diff.unchanged)):
+            results.extend(
+                {
+                    "chunk_id": str(row["snippet_id"]),
+                    "section_id": chunk.get("section_id"),
+                    "canonical_path": chunk.get("canonical_path"),
+                    "status": "success",
+                    "change": change
+                }
+                for row, chunk in pairs
+            )
+        results.extend(
+            {"chunk_id": str(row["snippet_id"]), "status": "deleted"}
+            for row in diff.delete
+        )
+        return results
+    
+    def _load_book_rows(self, session: Session, book_id: UUID) -> List[Dict[str, Any]]:
+        """책의 저장된 청크 메타데이터 조회 (해시가 없는 예전 행만 embed_text 포함)"""
+        rows = session.query(
+            IdealAnswer.snippet_id,
+            IdealAnswer.content_hash,
+            IdealAnswer.section_hash,
+            IdealAnswer.section_id,
+            IdealAnswer.canonical_path,
+            IdealAnswer.chunk_ix,
+            IdealAnswer.page_start,
+            IdealAnswer.page_end,
+            IdealAnswer.citation,
+            case((IdealAnswer.content_hash.is_(None), IdealAnswer.embed_text), else_=None).label("embed_text"),
+            IdealAnswer.lsh_keys.is_(None).label("needs_lsh")
+        ).filter(
+            IdealAnswer.book_id == book_id,
+            IdealAnswer.rag_type == 'toc'
+        ).all()
+        return [dict(row._mapping) for row in rows]
+    
+    def _lsh_columns(self, chunk: Dict[str, Any]) -> Dict[str, Any]:
+        """청크의 MinHash 서명/밴드 키 컬럼 값 (청크에 한 번 계산해 둠)"""
+        if "lsh_keys" not in chunk:
+            keys = self.dedup_index.signature_keys(chunk.get("full_text") or "")
+            chunk["minhash"], chunk["lsh_keys"] = keys if keys is not None else (None, None)
+        return {"minhash": chunk["minhash"], "lsh_keys": chunk["lsh_keys"]}
+    
+    def _drop_corpus_duplicates(self, session: Session, book_id: UUID,
+                                chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        다른 책에 저장된 청크와 거의 같은 새 청크 제외
+        - 밴드 키가 겹치는 행(GIN 인덱스)만 불러와 서명 일치율로 최종 판단
+        """
+        kept = []
+        for start in range(0, len(chunks), DEDUP_LOOKUP_BATCH):
+            batch = chunks[start:start + DEDUP_LOOKUP_BATCH]
+            keys = sorted({key for chunk in batch for key in self._lsh_columns(chunk)["lsh_keys"] or ()})
+            candidates: Dict[str, List[Any]] = {}
+            if keys:
+                rows = session.query(IdealAnswer.minhash, IdealAnswer.lsh_keys, IdealAnswer.book_title).filter(
+                    IdealAnswer.book_id.is_distinct_from(book_id),
+                    IdealAnswer.lsh_keys.overlap(keys)
+                ).all()
+                for row in rows:
+                    for key in row.lsh_keys:
+                        candidates.setdefault(key, []).append(row)
+            for chunk in batch:
+                duplicate_of = next((
+                    row for key in chunk["lsh_keys"] or () for row in candidates.get(key, ())
+                    if self.dedup_index.is_near(chunk["minhash"], row.minhash)
+                ), None)
+                if duplicate_of is None:
+                    kept.append(chunk)
+                else:
+                    print(f"🧹 다른 책 근사 중복 제외: {chunk.get('canonical_path')} ≈ {duplicate_of.book_title}")
+        if len(kept) < len(chunks):
+            print(f"🧹 코퍼스 근사 중복 청크 제거: {len(chunks)} → {len(kept)}")
+        return kept
+    
+    def _build_row(self, chunk: Dict[str, Any], embedding: List[float], book_id: UUID) -> IdealAnswer:
+        """청크 → IdealAnswer 행"""
+        return IdealAnswer(
+            snippet_id=uuid4(),
+            book_id=book_id,
+            book_title=chunk.get("book_title"),
+            l1_title=chunk.get("l1_title"),
+            l2_title=chunk.get("l2_title"),
+            l3_title=chunk.get("l3_title"),
+            canonical_path=chunk.get("canonical_path"),
+            section_id=chunk.get("section_id"),
+            chunk_ix=chunk.get("chunk_ix"),
+            page_start=chunk.get("page_start"),
+            page_end=chunk.get("page_end"),
+            citation=chunk.get("citation"),
+            full_text=chunk.get("full_text"),
+            embed_text=chunk.get("embed_text"),
+            embedding=embedding,
+            embedding_v2=derive_embedding_v2(embedding),
+            lexical_terms=lexical_terms(chunk.get("embed_text") or ""),
+            rag_type='toc',
+            section_hash=chunk.get("section_hash"),
+            content_hash=chunk.get("content_hash"),
+            **self._lsh_columns(chunk)
+        )
+    
     def _save_chunk_to_db(self, chunk: Dict[str, Any], embedding: List[float]) -> str:
         """청크를 데이터베이스에 저장 (SQLAlchemy 방식)"""
         session = self.SessionLocal()
@@ -213,7 +424,10 @@ class TOCBasedRAG(AdvancedRAGInterface):
                 full_text=chunk.get("full_text"),
                 embed_text=chunk.get("embed_text"),
                 embedding=embedding,
-                rag_type='toc'
+                embedding_v2=derive_embedding_v2(embedding),
+                lexical_terms=lexical_terms(chunk.get("embed_text") or ""),
+                rag_type='toc',
+                **self._lsh_columns(chunk)
             )
             
             session.add(ideal_answer)
@@ -236,19 +450,26 @@ class TOCBasedRAG(AdvancedRAGInterface):
         """유사한 텍스트 검색 (SQLAlchemy + pgvector)"""
         session = self.SessionLocal()
         try:
-            # 쿼리 임베딩 생성
-            query_embedding = self._create_embedding(query)
+            # 쿼리 임베딩 생성 (float32 배열)
+            query_embedding = np.asarray(self._create_embedding(query), dtype=np.float32)
             
             if PGVECTOR_AVAILABLE:
-                # pgvector를 사용한 유사도 검색
+                # pgvector를 사용한 유사도 검색 (쿼리 벡터는 CTE에서 한 번만 바인딩)
+                query_vector = select(
+                    cast(bindparam('query_vector', query_embedding, type_=Vector(EMBEDDING_DIM)),
+                         Vector(EMBEDDING_DIM)).label('v')
+                ).cte('q')
+                distance = IdealAnswer.embedding.cosine_distance(query_vector.c.v).label('distance')
                 results = session.query(
                     IdealAnswer.embed_text,
-                    IdealAnswer.embedding.cosine_distance(query_embedding).label('distance'),
+                    distance,
                     IdealAnswer.snippet_id
+                ).select_from(IdealAnswer).join(
+                    query_vector, true()
                 ).filter(
                     IdealAnswer.rag_type == 'toc'
                 ).order_by(
-                    IdealAnswer.embedding.cosine_distance(query_embedding)
+                    distance
                 ).limit(top_k).all()
                 
                 # 거리를 유사도로 변환 (1 - distance)
@@ -272,17 +493,42 @@ class TOCBasedRAG(AdvancedRAGInterface):
             session.close()
     
     def _create_embedding(self, text: str) -> List[float]:
-        """OpenAI 임베딩 생성"""
+        """OpenAI 임베딩 생성 (입력 토큰 한도까지 자름)"""
         try:
             response = self.openai_client.embeddings.create(
                 model=self.embedding_model,
-                input=text
+                input=self.token_counter.truncate(text, self.max_input_tokens)
             )
             return response.data[0].embedding
         except Exception as e:
             print(f"임베딩 생성 실패: {e}")
             raise
     
+    def _create_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        OpenAI 임베딩 일괄 생성
+        - 입력은 토큰 한도까지 자르고, 요청당 토큰 합계/EMBED_BATCH_SIZE개 한도로 묶어 요청
+        """
+        fitted = [self.token_counter.fit(text, self.max_input_tokens) for text in texts]
+        truncated = sum(1 for text, (cut, _) in zip(texts, fitted) if len(cut) < len(text))
+        if truncated:
+            print(f"⚠️ 토큰 한도({self.max_input_tokens}) 초과 입력 {truncated}개 자름")
+        
+        embeddings = []
+        for start, end in pack_by_tokens([count for _, count in fitted], max_inputs=EMBED_BATCH_SIZE):
+            batch = [text for text, _ in fitted[start:end]]
+            try:
+                response = self.openai_client.embeddings.create(
+                    model=self.embedding_model,
+                    input=batch
+                )
+            except Exception as e:
+                print(f"임베딩 일괄 생성 실패: {e}")
+                raise
+            embeddings.extend(data.embedding for data in response.data)
+            print(f"임베딩 진행률: {len(embeddings)}/{len(texts)}")
+        return embeddings
+    
     def add_document(self, text: str, **kwargs) -> UUID:
         """단일 문서 추가"""
         embedding = self._create_embedding(text)
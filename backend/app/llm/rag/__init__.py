@@ -9,7 +9,9 @@ from app.llm.rag.loaders.document_loader import DocumentLoader, Document
 from app.llm.rag.extractors.document_extractors import ExtractorFactory
 from app.llm.rag.storage.storage_adapter import StorageAdapterFactory
 from app.llm.rag.chunkers.chunking_strategies import ChunkerFactory
+from app.llm.rag.chunkers.near_dedup import NearDuplicateIndex
 from app.llm.rag.vector_db.vector_db_manager import VectorDBManager, EmbeddingService
+from app.llm.rag.streaming_pipeline import StreamingIngestPipeline
 from app.llm.rag.logger import rag_logger
 from app.llm.rag.exception import DocumentLoadException, ExtractionException, \
     ChunkingException, StorageException, VectorDBException, EmbeddingException
@@ -46,6 +48,15 @@ class RAGSystem:
             self.chunker_factory = ChunkerFactory()
             self.vector_db_manager = VectorDBManager()
             self.embedding_service = EmbeddingService(self.vector_db_manager)
+            # 이 인스턴스로 수집하는 모든 파일이 공유하는 근사 중복 색인 (저장이 커밋된 청크만 등록됨)
+            self.dedup_index = NearDuplicateIndex()
+            self.ingest_pipeline = StreamingIngestPipeline(
+                document_loader=self.document_loader,
+                chunker_factory=self.chunker_factory,
+                embedding_service=self.embedding_service,
+                vector_db_manager=self.vector_db_manager,
+                dedup_index=self.dedup_index
+            )
             
             # 설정 저장
             self.storage_type = storage_type
@@ -58,59 +69,36 @@ class RAGSystem:
     
     def load_and_process_file(self, 
                              source_path: str, 
-                             chunk_kwargs: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+                             chunk_kwargs: Optional[Dict[str, Any]] = None,
+                             book_id: Optional[UUID] = None,
+                             book_title: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         파일을 로드하고 처리하여 임베딩을 생성합니다.
+        추출이 끝나기 전에 임베딩/저장이 시작되며, 추출·청킹 단계의 메모리 사용량은 파일 크기와 무관합니다.
+        청크 크기는 임베딩 모델 기준 토큰 수로 계산합니다 (chunk_kwargs의 token_counter=None이면 문자 수).
         
         Args:
             source_path: 소스 파일 경로
             chunk_kwargs: 청킹 전략에 전달할 추가 인자 (선택사항)
+            book_id: 저장할 청크의 책 ID (선택사항)
+            book_title: 저장할 청크의 책 제목 (선택사항)
             
         Returns:
             처리 결과 정보
         """
-        if chunk_kwargs is None:
-            chunk_kwargs = {}
+        chunk_kwargs = {"token_counter": self.embedding_service.token_counter, **(chunk_kwargs or {})}
         
         logger.info(f"파일 처리 시작: {source_path}")
         
         try:
-            # 1. 문서 로드
-            documents = self.document_loader.load_documents(source_path)
-            logger.info(f"{len(documents)}개의 문서 로드 완료")
-            
-            # 2. 각 문서 청킹 및 임베딩 생성
-            results = []
-            for doc in documents:
-                chunks = self.chunker_factory.chunk_by_format(
-                    text=doc.content,
-                    file_format=Path(source_path).suffix.lower(),
-                    metadata=doc.metadata,
-                    source=source_path,
-                    **chunk_kwargs
-                )
-                
-                logger.info(f"{len(chunks)}개의 청크 생성 완료")
-                
-                # 3. 각 청크에 대해 임베딩 생성 및 저장
-                for chunk in chunks:
-                    # 임베딩 생성
-                    embedding = self.embedding_service.create_embedding(chunk.content)
-                    
-                    # 벡터 데이터베이스에 저장
-                    record_id = self.vector_db_manager.store_embedding(
-                        embed_text=chunk.content,
-                        embedding=embedding,
-                        full_text=chunk.content
-                    )
-                    
-                    results.append({
-                        'chunk': chunk,
-                        'embedding_id': record_id,
-                        'status': 'success'
-                    })
-                    
-                    logger.info(f"청크 임베딩 저장 완료: {record_id}")
+            # 페이지/섹션 단위 로드 → 점진적 청킹 → 배치 임베딩 → 배치 저장 (단계별 병행)
+            results = self.ingest_pipeline.run(
+                source_path=source_path,
+                file_format=Path(source_path).suffix.lower(),
+                chunk_kwargs=chunk_kwargs,
+                book_id=book_id,
+                book_title=book_title
+            )
             
             logger.info(f"파일 처리 완료: {source_path}, 총 {len(results)}개 청크 처리됨")
             return results
@@ -215,7 +203,8 @@ class RAGSystem:
     def search_similar(self, 
                       query: str, 
                       top_k: int = 5, 
-                      threshold: float = 0.5) -> List[Tuple[str, float, UUID]]:
+                      threshold: float = 0.5,
+                      mode: str = "vector") -> List[Tuple[str, float, UUID]]:
         """
         유사한 문서를 검색합니다.
         
@@ -223,6 +212,7 @@ class RAGSystem:
             query: 쿼리 텍스트
             top_k: 반환할 결과 수
             threshold: 유사도 임계값
+            mode: "vector" 또는 "hybrid"(Kiwi 어휘 검색 + 벡터 검색 RRF 융합)
             
         Returns:
             (원본 텍스트, 유사도 점수, ID)의 튜플 리스트
@@ -231,13 +221,15 @@ class RAGSystem:
         
         try:
             # 1. 쿼리 임베딩 생성
-            query_embedding = self.embedding_service.create_embedding(query)
+            query_embedding = self.embedding_service.create_query_embedding(query)
             
             # 2. 유사한 임베딩 검색
             results = self.vector_db_manager.find_similar(
                 query_embedding=query_embedding,
                 top_k=top_k,
-                threshold=threshold
+                threshold=threshold,
+                mode=mode,
+                query_text=query
             )
             
             logger.info(f"유사도 검색 완료: {len(results)}개 결과 반환")
@@ -0,0 +1,315 @@
+"""
+GCS 코퍼스 대량 수집
+
+- 스토리지 API로 버킷을 나열 (객체 generation/크기 포함)
+- 다운로드는 스레드 풀로 동시 실행하되, 처리 대기 파일 수를 제한해 디스크 사용량을 묶어 둠
+- 책 처리(로드/청킹/임베딩/저장)는 프로세스 풀에서 실행 (프로세스마다 RAGSystem 1개)
+- 파일별 체크포인트(generation + 상태)를 rag_ingest_checkpoint 테이블에 기록해
+  다시 실행하면 같은 generation으로 완료된 파일은 건너뜀
+- 청크는 버킷/객체 이름에서 만든 book_id로 저장하고, 파일을 (다시) 수집하기 전에 그 book_id의 청크를 지움
+  → 실패/중단된 시도가 남긴 청크나 이전 generation의 청크가 중복으로 쌓이지 않음
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from uuid import NAMESPACE_URL, UUID, uuid5
+
+from sqlalchemy import text
+
+from app.utils.download_cache import DownloadCache, gcs_cache_key, get_download_cache, link_or_copy
+
+from .logger import rag_logger
+
+logger = rag_logger
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.epub', '.txt', '.docx', '.md')
+
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+class GCSObject(NamedTuple):
+    """수집 대상 GCS 객체"""
+    name: str
+    generation: int
+    size: int
+
+
+def gcs_book_id(bucket_name: str, object_name: str) -> UUID:
+    """GCS 객체의 책 ID (임시 다운로드 경로와 무관하게 버킷/객체 이름으로 고정)"""
+    return uuid5(NAMESPACE_URL, f"gs://{bucket_name}/{object_name}")
+
+
+def list_gcs_objects(storage_client,
+                     bucket_name: str,
+                     prefix: str = "",
+                     extensions: Tuple[str, ...] = SUPPORTED_EXTENSIONS) -> List[GCSObject]:
+    """버킷의 prefix 아래 지원 확장자 객체 목록 (이름순)"""
+    blobs = storage_client.list_blobs(bucket_name, prefix=prefix or None)
+    objects = [
+        GCSObject(blob.name, int(blob.generation), int(blob.size or 0))
+        for blob in blobs
+        if not blob.name.endswith('/') and blob.name.lower().endswith(extensions)
+    ]
+    return sorted(objects)
+
+
+class IngestCheckpointStore:
+    """
+    파일별 수집 체크포인트 (rag_ingest_checkpoint 테이블)
+    - (bucket, object_name) 단위로 generation, 상태, 청크 수, 오류를 UPSERT
+    """
+
+    def __init__(self, session_factory: Callable):
+        self.session_factory = session_factory
+
+    def load(self, bucket: str) -> Dict[str, Tuple[int, str]]:
+        """버킷의 체크포인트 {object_name: (generation, status)}"""
+        db = self.session_factory()
+        try:
+            rows = db.execute(text("""
+                SELECT object_name, generation, status
+                FROM rag_ingest_checkpoint
+                WHERE bucket = :bucket
+            """), {"bucket": bucket}).fetchall()
+        finally:
+            db.close()
+        return {row[0]: (row[1], row[2]) for row in rows}
+
+    def mark(self,
+             bucket: str,
+             obj: GCSObject,
+             status: str,
+             chunk_count: Optional[int] = None,
+             error: Optional[str] = None) -> None:
+        """체크포인트 저장 (UPSERT)"""
+        db = self.session_factory()
+        try:
+            db.execute(text("""
+                INSERT INTO rag_ingest_checkpoint
+                    (bucket, object_name, generation, size_bytes, status, chunk_count, error, created_at, updated_at)
+                VALUES (:bucket, :object_name, :generation, :size_bytes, :status, :chunk_count, :error, NOW(), NOW())
+                ON CONFLICT (bucket, object_name) DO UPDATE
+                SET generation  = EXCLUDED.generation,
+                    size_bytes  = EXCLUDED.size_bytes,
+                    status      = EXCLUDED.status,
+                    chunk_count = EXCLUDED.chunk_count,
+                    error       = EXCLUDED.error,
+                    updated_at  = NOW()
+            """), {
+                "bucket": bucket,
+                "object_name": obj.name,
+                "generation": obj.generation,
+                "size_bytes": obj.size,
+                "status": status,
+                "chunk_count": chunk_count,
+                "error": error,
+            })
+            db.commit()
+        finally:
+            db.close()
+
+
+def plan_ingest(objects: Iterable[GCSObject],
+                checkpoints: Dict[str, Tuple[int, str]],
+                force: bool = False) -> Tuple[List[GCSObject], List[GCSObject]]:
+    """
+    (처리할 객체, 건너뛸 객체) 분리
+    - 같은 generation으로 완료(done)된 객체만 건너뜀 (실패/중단/내용 변경 객체는 다시 처리)
+    """
+    todo, skipped = [], []
+    for obj in objects:
+        if not force and checkpoints.get(obj.name) == (obj.generation, STATUS_DONE):
+            skipped.append(obj)
+        else:
+            todo.append(obj)
+    return todo, skipped
+
+
+def format_duration(seconds: float) -> str:
+    """초 → H:MM:SS"""
+    seconds = int(max(0, seconds))
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+# ===== 워커 프로세스 =====
+
+_worker_rag = None
+_worker_chunk_kwargs: Dict[str, Any] = {}
+
+
+def _init_worker(chunk_kwargs: Dict[str, Any]) -> None:
+    """워커마다 RAGSystem 1개 생성 (DB 엔진/OpenAI 클라이언트는 프로세스 간 공유하지 않음)"""
+    global _worker_rag, _worker_chunk_kwargs
+    from . import RAGSystem
+    _worker_rag = RAGSystem(storage_type="local")
+    _worker_chunk_kwargs = chunk_kwargs
+
+
+def _ingest_file(local_path: str, book_id: UUID, book_title: str) -> int:
+    """워커: 책의 이전 청크를 지운 뒤 로컬 파일 1개 수집, 저장된 청크 수 반환"""
+    try:
+        removed = _worker_rag.vector_db_manager.delete_book_embeddings(book_id)
+        if removed:
+            logger.info(f"이전 수집 청크 정리: {book_title}, {removed}개")
+        results = _worker_rag.load_and_process_file(
+            local_path, chunk_kwargs=_worker_chunk_kwargs, book_id=book_id, book_title=book_title
+        )
+    except Exception as e:
+        # 원본 예외(DB/OpenAI 오류 등)는 피클링되지 않을 수 있어 메시지만 부모 프로세스로 전달
+        raise RuntimeError(f"{type(e).__name__}: {e}") from None
+    return sum(1 for result in results if result.get('status') == 'success')
+
+
+class BulkIngestRunner:
+    """
+    다운로드(스레드 풀) → 수집(프로세스 풀) 병행 실행기
+    """
+
+    def __init__(self,
+                 storage_client,
+                 bucket_name: str,
+                 checkpoint_store: IngestCheckpointStore,
+                 workers: int = max(1, (os.cpu_count() or 2) - 1),
+                 download_workers: int = 8,
+                 chunk_kwargs: Optional[Dict[str, Any]] = None,
+                 cache: Optional[DownloadCache] = None):
+        """
+        Args:
+            storage_client: google.cloud.storage.Client
+            bucket_name: GCS 버킷 이름
+            checkpoint_store: 체크포인트 저장소
+            workers: 수집 프로세스 수 (1 이하면 현재 프로세스의 스레드 1개에서 처리)
+            download_workers: 동시 다운로드 수
+            chunk_kwargs: 청킹 전략에 전달할 추가 인자
+            cache: 다운로드 캐시 (선택사항, 기본값은 프로세스 공용 캐시)
+        """
+        self.storage_client = storage_client
+        self.bucket_name = bucket_name
+        self.checkpoint_store = checkpoint_store
+        self.workers = max(1, workers)
+        self.download_workers = max(1, download_workers)
+        self.chunk_kwargs = chunk_kwargs or {}
+        self.cache = cache or get_download_cache()
+
+    def run(self, objects: List[GCSObject]) -> Dict[str, int]:
+        """
+        객체들을 수집하고 파일별 체크포인트를 기록합니다.
+
+        Returns:
+            {'done', 'failed', 'chunks'} 집계
+        """
+        total_bytes = sum(obj.size for obj in objects) or 1
+        stats = {"done": 0, "failed": 0, "chunks": 0, "bytes": 0}
+        started = time.perf_counter()
+        pending = deque(objects)
+        downloads: Dict[Any, GCSObject] = {}
+        ingests: Dict[Any, Tuple[GCSObject, str]] = {}
+        # 다운로드 완료 후 처리 대기 중인 파일 수 상한 (디스크 사용량 제한)
+        max_in_flight = self.workers + self.download_workers
+        bucket = self.storage_client.bucket(self.bucket_name)
+        work_dir = tempfile.mkdtemp(prefix="gaon_bulk_ingest_")
+
+        try:
+            with ThreadPoolExecutor(self.download_workers, thread_name_prefix="rag-bulk-download") as download_pool, \
+                 self._ingest_pool() as ingest_pool:
+
+                def refill() -> None:
+                    while pending and len(downloads) + len(ingests) < max_in_flight:
+                        obj = pending.popleft()
+                        self.checkpoint_store.mark(self.bucket_name, obj, STATUS_RUNNING)
+                        downloads[download_pool.submit(self._download, bucket, obj, work_dir)] = obj
+
+                def finish(obj: GCSObject, chunk_count: Optional[int] = None, error: Optional[BaseException] = None) -> None:
+                    stats["bytes"] += obj.size
+                    if error is None:
+                        stats["done"] += 1
+                        stats["chunks"] += chunk_count
+                        self.checkpoint_store.mark(self.bucket_name, obj, STATUS_DONE, chunk_count=chunk_count)
+                        outcome = f"✅ {chunk_count}개 청크"
+                    else:
+                        stats["failed"] += 1
+                        self.checkpoint_store.mark(self.bucket_name, obj, STATUS_FAILED, error=str(error))
+                        outcome = f"❌ {type(error).__name__}: {error}"
+                    self._report(obj, outcome, stats, len(objects), total_bytes, started)
+
+                refill()
+                while downloads or ingests:
+                    done, _ = wait(list(downloads) + list(ingests), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        if future in downloads:
+                            obj = downloads.pop(future)
+                            try:
+                                local_path = future.result()
+                            except Exception as e:
+                                finish(obj, error=e)
+                                continue
+                            ingests[ingest_pool.submit(
+                                _ingest_file, local_path, gcs_book_id(self.bucket_name, obj.name), obj.name
+                            )] = (obj, local_path)
+                        else:
+                            obj, local_path = ingests.pop(future)
+                            shutil.rmtree(os.path.dirname(local_path), ignore_errors=True)
+                            try:
+                                finish(obj, chunk_count=future.result())
+                            except Exception as e:
+                                finish(obj, error=e)
+                    refill()
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        elapsed = time.perf_counter() - started
+        print(
+            f"\n📦 대량 수집 완료: 성공 {stats['done']}개, 실패 {stats['failed']}개, "
+            f"{stats['chunks']}개 청크, 소요 {format_duration(elapsed)}"
+        )
+        return {"done": stats["done"], "failed": stats["failed"], "chunks": stats["chunks"]}
+
+    def _ingest_pool(self):
+        """수집 풀 (다운로드 스레드가 도는 중에 fork하지 않도록 spawn 사용)"""
+        if self.workers > 1:
+            return ProcessPoolExecutor(
+                self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.chunk_kwargs,)
+            )
+        return ThreadPoolExecutor(1, initializer=_init_worker, initargs=(self.chunk_kwargs,))
+
+    def _download(self, bucket, obj: GCSObject, work_dir: str) -> str:
+        """
+        목록 조회 시점의 generation을 고정해 캐시 경유로 다운로드
+        (파일마다 디렉토리를 따로 두어 원본 파일명 유지)
+        """
+        file_dir = tempfile.mkdtemp(dir=work_dir)
+        local_path = os.path.join(file_dir, os.path.basename(obj.name))
+        try:
+            cached = self.cache.fetch(
+                gcs_cache_key(self.bucket_name, obj.name, obj.generation),
+                lambda temp_path: bucket.blob(obj.name, generation=obj.generation).download_to_filename(temp_path),
+                os.path.splitext(obj.name)[1]
+            )
+            link_or_copy(cached, local_path)
+        except Exception:
+            shutil.rmtree(file_dir, ignore_errors=True)
+            raise
+        return local_path
+
+    @staticmethod
+    def _report(obj: GCSObject, outcome: str, stats: Dict[str, int], total: int, total_bytes: int, started: float) -> None:
+        """진행률/처리량/남은 시간 출력 (남은 시간은 바이트 처리 속도 기준)"""
+        elapsed = time.perf_counter() - started
+        finished = stats["done"] + stats["failed"]
+        rate = stats["bytes"] / elapsed if elapsed > 0 else 0.0
+        eta = (total_bytes - stats["bytes"]) / rate if rate > 0 else 0.0
+        print(
+            f"[{finished}/{total}] {obj.name} {outcome} | "
+            f"{rate / (1024 * 1024):.2f} MB/s, {finished / elapsed * 60 if elapsed > 0 else 0:.1f}개/분, "
+            f"경과 {format_duration(elapsed)}, 남은 시간 {format_duration(eta)}"
+        )
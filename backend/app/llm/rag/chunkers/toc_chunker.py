@@ -2,14 +2,92 @@
 TOC 기반 청킹 유틸리티
 rag_test/chunking.py 로직 통합
 """
+import hashlib
 import json
 import uuid
 import re
 import unicodedata
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Tuple, Any
+from typing import List, Dict, Tuple, Any, NamedTuple, Optional
 import fitz
 
+try:
+    from .near_dedup import NearDuplicateIndex, RepeatedLineStripper
+except ImportError:  # 클라우드 함수(toc_trigger)에서는 같은 디렉토리의 모듈로 로드
+    from near_dedup import NearDuplicateIndex, RepeatedLineStripper
+
+
+# 프로세스 풀 사용 시 작업 하나가 맡는 페이지 수
+PAGES_PER_TASK = 32
+
+# 재수집 시 내용이 같은 청크라도 값이 바뀌었으면 임베딩 없이 갱신할 필드
+CHUNK_UPDATE_FIELDS = (
+    "content_hash", "section_hash", "section_id", "canonical_path",
+    "chunk_ix", "page_start", "page_end", "citation",
+)
+
+
+def compute_content_hash(text: str) -> str:
+    """섹션/청크 내용 해시 (sha256 hex)"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def compute_section_id(book_title: str, canonical_path: str, title: str, page_start: int) -> str:
+    """
+    섹션 ID (책/경로/제목/시작 페이지 기준 uuid5)
+    TOC를 다시 추출해도 같은 섹션은 같은 ID → 재수집 비교에서 바뀌지 않은 청크가 갱신으로 잡히지 않음
+    """
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"toc:{book_title}\x1f{canonical_path}\x1f{title}\x1f{page_start}"))
+
+
+class ChunkDiff(NamedTuple):
+    """저장된 청크와 새 청크 비교 결과"""
+    insert: List[Dict[str, Any]]                        # 임베딩 후 새로 저장할 청크
+    update: List[Tuple[Dict[str, Any], Dict[str, Any]]]  # (저장된 행, 새 청크): 임베딩 재사용, 필드만 갱신
+    unchanged: List[Tuple[Dict[str, Any], Dict[str, Any]]]
+    delete: List[Dict[str, Any]]                        # 새 버전에 없는 저장된 행
+
+
+def diff_chunks(existing_rows: List[Dict[str, Any]], chunks: List[Dict[str, Any]]) -> ChunkDiff:
+    """
+    같은 책의 저장된 청크와 새로 만든 청크를 content_hash(embed_text 기준)로 비교
+    - content_hash가 없는 예전 행은 embed_text로 해시를 계산해 비교 (일치하면 해시만 채움)
+    - 같은 해시가 여러 개면 개수만큼만 짝지음 (필드까지 같은 행을 먼저 고르고, 남는 저장 행은 삭제)
+    """
+    stored_by_hash: Dict[str, List[Dict[str, Any]]] = {}
+    for row in existing_rows:
+        key = row.get("content_hash") or compute_content_hash(row.get("embed_text") or "")
+        stored_by_hash.setdefault(key, []).append(row)
+    
+    insert, update, unchanged = [], [], []
+    for chunk in chunks:
+        candidates = stored_by_hash.get(chunk["content_hash"])
+        if not candidates:
+            insert.append(chunk)
+            continue
+        same = next((i for i, row in enumerate(candidates) if not _changed_fields(row, chunk)), None)
+        row = candidates.pop(same if same is not None else -1)
+        if _changed_fields(row, chunk):
+            update.append((row, chunk))
+        else:
+            unchanged.append((row, chunk))
+    
+    delete = [row for rows in stored_by_hash.values() for row in rows]
+    return ChunkDiff(insert=insert, update=update, unchanged=unchanged, delete=delete)
+
+
+def _changed_fields(row: Dict[str, Any], chunk: Dict[str, Any]) -> bool:
+    """저장된 행과 새 청크의 갱신 대상 필드가 다른지"""
+    return any(row.get(field) != chunk.get(field) for field in CHUNK_UPDATE_FIELDS)
+
+
+def _extract_pages(pdf_path: str, pages: List[int]) -> Dict[int, str]:
+    """프로세스 풀 작업: 지정된 페이지들의 텍스트 추출"""
+    with fitz.open(pdf_path) as doc:
+        return {page_num: doc[page_num].get_text() for page_num in pages}
+
 
 class TOCChunker:
     """TOC 기반 청킹 처리기"""
@@ -29,9 +107,22 @@ class TOCChunker:
         "여는말": "여는 말",
     }
     
-    def __init__(self, min_chars: int = 600, max_chars: int = 800):
+    def __init__(self, min_chars: int = 600, max_chars: int = 800, workers: int = 0,
+                 max_tokens: int = None, token_counter=None,
+                 strip_headers: bool = True, dedup_threshold: Optional[float] = 0.8):
+        if max_tokens is not None and token_counter is None:
+            raise ValueError("max_tokens를 사용하려면 token_counter가 필요합니다")
         self.min_chars = min_chars
         self.max_chars = max_chars
+        # 페이지 텍스트 추출 프로세스 수 (0/1 = 단일 프로세스)
+        self.workers = workers
+        # 청크당 최대 토큰 수 (embed_text 기준, count()를 제공하는 토큰 계산기와 함께 사용)
+        self.max_tokens = max_tokens
+        self.token_counter = token_counter
+        # 페이지 가장자리 반복 줄(머리말/꼬리말/쪽 번호) 제거 여부
+        self.strip_headers = strip_headers
+        # 책 안의 근사 중복 청크 제거 기준 (MinHash 자카드 유사도, None = 제거 안 함)
+        self.dedup_threshold = dedup_threshold
     
     def _is_blacklisted(self, title: str) -> bool:
         """제목이 블랙리스트에 포함되는지 확인"""
@@ -55,6 +146,7 @@ class TOCChunker:
     def chunk_pdf_by_toc(self, pdf_path: str, toc_data: List[Dict]) -> List[Dict[str, Any]]:
         """TOC 기반으로 PDF 청킹 (블랙리스트 필터링 포함)"""
         doc = fitz.open(pdf_path)
+        page_count = len(doc)
         
         # 📌 블랙리스트 필터링 적용
         filtered_toc = [entry for entry in toc_data if not self._is_blacklisted(entry.get("title", ""))]
@@ -74,15 +166,29 @@ class TOCChunker:
             if i + 1 < len(leaf_entries):
                 end_page = leaf_entries[i + 1]["page"] - 1
             else:
-                end_page = len(doc) - 1  # 마지막 섹션은 문서 끝까지
+                end_page = page_count - 1  # 마지막 섹션은 문서 끝까지
             
             entry["page_start"] = start_page
             entry["page_end"] = max(start_page, end_page)  # 최소한 시작 페이지와 같거나 큰 값
         
+        # 📌 섹션별 추출 페이지 범위 (한 번의 순회로 계산)
+        extract_ranges = self._compute_extract_ranges(filtered_toc, page_count)
+        
+        # 📌 필요한 페이지만 한 번씩 추출해 캐시
+        needed_pages = set()
+        for entry in leaf_entries:
+            needed_pages.update(range(*extract_ranges[entry["toc_id"]]))
+        page_texts = self._extract_page_texts(doc, pdf_path, needed_pages)
+        doc.close()
+        
+        # 📌 여러 페이지에 반복되는 머리말/꼬리말 제거
+        if self.strip_headers:
+            page_texts = self._strip_repeated_lines(page_texts)
+        
         chunks = []
         for entry in leaf_entries:
-            # 해당 섹션의 텍스트 추출
-            section_text = self._extract_section_text(doc, entry, filtered_toc)
+            # 해당 섹션의 텍스트 (페이지 캐시에서 슬라이스)
+            section_text = self._extract_section_text(page_texts, extract_ranges[entry["toc_id"]])
             
             if not section_text.strip():
                 continue
@@ -94,58 +200,92 @@ class TOCChunker:
             section_chunks = self._chunk_text(section_text, entry, hierarchy)
             chunks.extend(section_chunks)
         
-        doc.close()
+        # 📌 반복 상용구(장 요약, 연습 문제 양식 등) 근사 중복 제거
+        if self.dedup_threshold is not None:
+            chunks = self._drop_near_duplicates(chunks)
+        
         return chunks
     
+    def _strip_repeated_lines(self, page_texts: Dict[int, str]) -> Dict[int, str]:
+        """페이지 가장자리에 반복되는 줄 제거"""
+        stripper = RepeatedLineStripper.learn(list(page_texts.values()))
+        if stripper.repeated:
+            print(f"✂️ 반복 머리말/꼬리말 {len(stripper.repeated)}종 제거")
+        return {page_num: stripper.strip(text) for page_num, text in page_texts.items()}
+    
+    def _drop_near_duplicates(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """본문(full_text)이 앞선 청크와 거의 같은 청크 제거 (처음 나온 청크만 유지)"""
+        index = NearDuplicateIndex(threshold=self.dedup_threshold)
+        kept = [chunk for i, chunk in enumerate(chunks) if index.find_or_add(i, chunk["full_text"]) is None]
+        if len(kept) < len(chunks):
+            print(f"🧹 근사 중복 청크 제거: {len(chunks)} → {len(kept)}")
+        return kept
+    
     def _build_parent_index(self, toc_data: List[Dict]) -> Tuple[Dict[str, Dict], Dict[str, List[Dict]]]:
-        """부모-자식 관계 인덱스 구축"""
+        """부모-자식 관계 인덱스 구축 (레벨 스택 한 번 순회)"""
         parent_index = {}
         children_index = {}
+        stack: List[Dict] = []  # 현재 경로 (레벨이 순증가)
         
-        for i, entry in enumerate(toc_data):
-            entry_id = entry["toc_id"]
+        for entry in toc_data:
             level = entry["level"]
             
-            # 부모 찾기
-            parent = None
-            for j in range(i - 1, -1, -1):
-                if toc_data[j]["level"] < level:
-                    parent = toc_data[j]
-                    break
+            # 같거나 깊은 레벨은 더 이상 부모 후보가 아님
+            while stack and stack[-1]["level"] >= level:
+                stack.pop()
             
-            if parent:
-                parent_id = parent["toc_id"]
-                parent_index[entry_id] = parent
-                
-                if parent_id not in children_index:
-                    children_index[parent_id] = []
-                children_index[parent_id].append(entry)
+            if stack:
+                parent = stack[-1]
+                parent_index[entry["toc_id"]] = parent
+                children_index.setdefault(parent["toc_id"], []).append(entry)
+            
+            stack.append(entry)
         
         return parent_index, children_index
     
-    def _extract_section_text(self, doc: fitz.Document, entry: Dict, toc_data: List[Dict]) -> str:
-        """섹션 텍스트 추출"""
-        start_page = entry["page"] - 1  # 0-based
+    def _compute_extract_ranges(self, toc_data: List[Dict], page_count: int) -> Dict[str, Tuple[int, int]]:
+        """
+        섹션별 텍스트 추출 범위 [start, end) (0-based) 계산
+        - 끝 = 이후 항목 중 페이지가 더 뒤이고 레벨이 같거나 얕은 첫 항목의 이전 페이지
+        - 레벨별 대기열을 두고 TOC를 한 번 순회하며 닫음 (페이지는 TOC 순서대로 증가)
+        """
+        pending: Dict[int, deque] = {}
+        ends: Dict[str, int] = {}
         
-        # 다음 섹션의 시작 페이지 찾기
-        end_page = len(doc) - 1
-        current_level = entry["level"]
+        for entry in toc_data:
+            level, page = entry["level"], entry["page"]
+            for pending_level, queue in pending.items():
+                if pending_level < level:
+                    continue
+                while queue and queue[0]["page"] < page:
+                    ends[queue.popleft()["toc_id"]] = page - 2
+            pending.setdefault(level, deque()).append(entry)
         
-        for other in toc_data:
-            if (other["page"] > entry["page"] and 
-                other["level"] <= current_level):
-                end_page = other["page"] - 2  # 이전 페이지까지
-                break
+        ranges = {}
+        for entry in toc_data:
+            end_page = ends.get(entry["toc_id"], page_count - 1)
+            start = max(0, entry["page"] - 1)
+            ranges[entry["toc_id"]] = (start, max(start, min(page_count, end_page + 1)))
+        return ranges
+    
+    def _extract_page_texts(self, doc: fitz.Document, pdf_path: str, pages: set) -> Dict[int, str]:
+        """페이지별 텍스트를 한 번씩만 추출 (workers > 1이면 프로세스 풀 사용)"""
+        pages = sorted(pages)
         
-        # 텍스트 추출
-        text_parts = []
-        for page_num in range(max(0, start_page), min(len(doc), end_page + 1)):
-            page = doc[page_num]
-            text = page.get_text()
-            if text.strip():
-                text_parts.append(text)
+        if self.workers > 1 and len(pages) >= self.workers * PAGES_PER_TASK:
+            batches = [pages[i:i + PAGES_PER_TASK] for i in range(0, len(pages), PAGES_PER_TASK)]
+            page_texts: Dict[int, str] = {}
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                for part in pool.map(_extract_pages, [pdf_path] * len(batches), batches):
+                    page_texts.update(part)
+            return page_texts
         
-        return "\n\n".join(text_parts)
+        return {page_num: doc[page_num].get_text() for page_num in pages}
+    
+    def _extract_section_text(self, page_texts: Dict[int, str], page_range: Tuple[int, int]) -> str:
+        """섹션 텍스트 추출 (페이지 캐시 사용)"""
+        text_parts = [page_texts[page_num] for page_num in range(*page_range)]
+        return "\n\n".join(text for text in text_parts if text.strip())
     
     def _build_hierarchy(self, entry: Dict, parent_index: Dict[str, Dict]) -> Dict[str, str]:
         """계층 구조 정보 생성"""
@@ -173,18 +313,30 @@ class TOCChunker:
         return hierarchy
     
     def _chunk_text(self, text: str, entry: Dict, hierarchy: Dict[str, str]) -> List[Dict[str, Any]]:
-        """텍스트를 청크로 분할"""
+        """
+        텍스트를 청크로 분할
+        - max_tokens가 있으면 "[canonical_path] " 접두어를 포함한 embed_text가 한도를 넘지 않도록 분할
+          (예산보다 긴 문장은 토큰 기준으로 강제 분할)
+        """
         text = self._norm_text(text)
+        section_hash = compute_content_hash(text)
+        
+        token_budget = None
+        if self.max_tokens is not None:
+            canonical_path = self._canonical_path(hierarchy)
+            prefix_tokens = self.token_counter.count(f"[{canonical_path}] ") if canonical_path else 0
+            token_budget = max(1, self.max_tokens - prefix_tokens)
         
-        if len(text) <= self.max_chars:
+        if len(text) <= self.max_chars and (token_budget is None or self.token_counter.count(text) <= token_budget):
             # 단일 청크
-            return [self._create_chunk(text, entry, hierarchy, 0)]
+            return self._with_section_hash([self._create_chunk(text, entry, hierarchy, 0)], section_hash)
         
         # 여러 청크로 분할
         chunks = []
         sentences = re.split(r'[.!?]\s+', text)
         
         current_chunk = ""
+        current_tokens = 0
         chunk_idx = 0
         
         for sentence in sentences:
@@ -192,48 +344,91 @@ class TOCChunker:
             if not sentence:
                 continue
             
-            # 청크 크기 확인
+            sentence_tokens = self.token_counter.count(sentence) if token_budget is not None else 0
+            if token_budget is not None and sentence_tokens > token_budget:
+                # 한 문장이 예산보다 길면 토큰 기준으로 잘라 각각 별도 청크로 저장 (마지막 조각은 이어 붙임)
+                if current_chunk:
+                    chunks.append(self._create_chunk(current_chunk, entry, hierarchy, chunk_idx))
+                    chunk_idx += 1
+                pieces = self._split_by_tokens(sentence, token_budget)
+                for piece in pieces[:-1]:
+                    chunks.append(self._create_chunk(piece, entry, hierarchy, chunk_idx))
+                    chunk_idx += 1
+                current_chunk = pieces[-1]
+                current_tokens = self.token_counter.count(current_chunk)
+                continue
+            
+            # 청크 크기 확인 (토큰 수는 문장별 합산으로 추정, 이어 붙이는 공백 1토큰)
             potential_chunk = current_chunk + " " + sentence if current_chunk else sentence
+            potential_tokens = current_tokens + sentence_tokens + (1 if current_chunk else 0)
             
-            if len(potential_chunk) > self.max_chars and len(current_chunk) >= self.min_chars:
+            over_chars = len(potential_chunk) > self.max_chars and len(current_chunk) >= self.min_chars
+            over_tokens = token_budget is not None and potential_tokens > token_budget
+            if current_chunk and (over_chars or over_tokens):
                 # 현재 청크 저장
                 chunks.append(self._create_chunk(current_chunk, entry, hierarchy, chunk_idx))
                 current_chunk = sentence
+                current_tokens = sentence_tokens
                 chunk_idx += 1
             else:
                 current_chunk = potential_chunk
+                current_tokens = potential_tokens
         
         # 마지막 청크 저장
         if current_chunk:
             chunks.append(self._create_chunk(current_chunk, entry, hierarchy, chunk_idx))
         
+        return self._with_section_hash(chunks, section_hash)
+    
+    def _split_by_tokens(self, text: str, max_tokens: int) -> List[str]:
+        """max_tokens 이하 조각으로 텍스트를 앞에서부터 자름 (문장 부호가 없는 긴 문단 대비)"""
+        pieces = []
+        rest = text
+        while rest:
+            piece, _ = self.token_counter.fit(rest, max_tokens)
+            if not piece:
+                # 한 글자가 예산을 넘는 경우에도 진행되도록 최소 한 글자
+                piece = rest[:1]
+            pieces.append(piece.strip())
+            rest = rest[len(piece):].lstrip()
+        return [piece for piece in pieces if piece] or [text]
+    
+    def _with_section_hash(self, chunks: List[Dict[str, Any]], section_hash: str) -> List[Dict[str, Any]]:
+        """섹션 내용 해시를 청크에 기록 (재수집 시 변경 섹션 판별용)"""
+        for chunk in chunks:
+            chunk["section_hash"] = section_hash
         return chunks
     
+    def _canonical_path(self, hierarchy: Dict[str, str]) -> str:
+        """대제목 > 중제목 > 소제목 경로"""
+        return " > ".join(
+            hierarchy[level] for level in ["l1_title", "l2_title", "l3_title"]
+            if level in hierarchy and hierarchy[level]
+        )
+    
     def _create_chunk(self, text: str, entry: Dict, hierarchy: Dict[str, str], chunk_idx: int) -> Dict[str, Any]:
         """청크 데이터 생성"""
         # 📌 embed_text 생성: 대제목+중제목+소제목+본문 형식
-        title_parts = []
-        for level in ["l1_title", "l2_title", "l3_title"]:
-            if level in hierarchy and hierarchy[level]:
-                title_parts.append(hierarchy[level])
-        
-        canonical_path = " > ".join(title_parts)
+        canonical_path = self._canonical_path(hierarchy)
         
         # 📌 embed_text 형식: [canonical_path] full_text
         embed_text = f"[{canonical_path}] {text}" if canonical_path else text
         
         # 📌 book_title을 파일명에서 추출
         book_title = Path(entry.get('book_name', 'Unknown')).stem
+        page_start = entry.get("page_start", entry["page"])
         
         return {
             "chunk_id": str(uuid.uuid4()),
-            "section_id": entry["toc_id"],
+            # toc_id는 추출할 때마다 새로 만들어지므로 섹션 ID는 내용 위치로 고정
+            "section_id": compute_section_id(book_title, canonical_path, entry.get("title", ""), page_start),
             "canonical_path": canonical_path,
             "chunk_ix": chunk_idx,
             "page_start": entry.get("page_start", entry["page"]),
             "page_end": entry.get("page_end", entry["page"]),
             "full_text": text,
             "embed_text": embed_text.strip(),
+            "content_hash": compute_content_hash(embed_text.strip()),
             "citation": f"{book_title}, {canonical_path}, p.{entry.get('page_start', entry['page'])}-{entry.get('page_end', entry['page'])}",
             "book_title": book_title,  # 📌 파일명 기반 책 제목
             **hierarchy
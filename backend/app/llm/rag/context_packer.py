@@ -0,0 +1,93 @@
+"""
+토큰 예산 기반 프롬프트 컨텍스트 구성
+
+검색된 섹션/스니펫을 토큰 예산 안에 담아 관련도 합을 최대화합니다 (그리디 배낭 근사).
+- 항목 비용 = 머리말/출처 줄(render 결과에서 본문을 뺀 부분) + 본문 토큰 + 구분자
+- 관련도 ÷ 비용(토큰당 관련도)이 큰 순서로 담고, 다 들어가지 않는 항목은 남은 예산만큼 본문만 잘라 담음
+  (출처/인용 줄은 자르지 않으며, 남은 예산이 min_body_tokens보다 적으면 건너뜀)
+- 최종 순서는 원래 입력(관련도) 순서를 유지하고, 사용한 토큰 수를 함께 반환
+"""
+import re
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from .tokenizer import TokenCounter, get_token_counter
+
+# 잘린 본문 끝 표시
+ELLIPSIS = " …"
+
+# 잘라서 담을 때 본문 최소 토큰 수 (이보다 짧게 자른 조각은 근거로 쓰기 어려움)
+MIN_BODY_TOKENS = 64
+
+# 자른 본문을 문장 경계에 맞출 때 최소로 남길 비율
+_SENTENCE_KEEP_RATIO = 0.5
+_SENTENCE_END = re.compile(r"(?:[.!?。]|다\.|요\.)\s|\n")
+
+
+class PackedContext(NamedTuple):
+    """구성된 컨텍스트"""
+    items: List[Dict[str, Any]]  # 담긴 항목 (잘린 항목은 본문이 잘린 사본, truncated=True)
+    text: str                    # 렌더링된 컨텍스트 문자열
+    tokens: int                  # text의 토큰 수
+    dropped: int                 # 예산 때문에 빠진 항목 수
+
+
+def _trim_to_sentence(text: str) -> str:
+    """가능하면 마지막 문장 경계에서 자름 (절반 이상 남는 경우만)"""
+    ends = [match.end() for match in _SENTENCE_END.finditer(text)]
+    if ends and ends[-1] >= len(text) * _SENTENCE_KEEP_RATIO:
+        return text[:ends[-1]].rstrip()
+    return text.rstrip()
+
+
+def pack_context(items: List[Dict[str, Any]],
+                 budget_tokens: int,
+                 render: Callable[[int, Dict[str, Any], str], str],
+                 text_key: str = "text",
+                 relevance_key: str = "similarity",
+                 separator: str = "\n\n",
+                 counter: Optional[TokenCounter] = None,
+                 min_body_tokens: int = MIN_BODY_TOKENS) -> PackedContext:
+    """
+    토큰 예산 안에서 관련도 합이 크도록 항목을 골라 렌더링
+
+    Args:
+        items: 후보 (관련도 순), text_key에 본문, relevance_key에 관련도(클수록 관련)
+        budget_tokens: 컨텍스트 최대 토큰 수
+        render: (번호, 항목, 본문) → 블록 문자열 (번호는 1부터, 최종 순서 기준)
+        counter: 토큰 계산기 (기본: cl100k 계열)
+
+    Returns:
+        PackedContext
+    """
+    counter = counter or get_token_counter()
+    separator_tokens = counter.count(separator) if separator else 0
+
+    candidates = []
+    for position, item in enumerate(items):
+        body = (item.get(text_key) or "").strip()
+        # 번호 자릿수 차이는 무시 (두 자리 번호를 기준으로 보수적으로 계산)
+        overhead = counter.count(render(10, item, "")) + separator_tokens
+        body_tokens = counter.count(body)
+        relevance = max(float(item.get(relevance_key) or 0.0), 0.0)
+        candidates.append((position, item, body, overhead, body_tokens, relevance))
+
+    chosen: Dict[int, Dict[str, Any]] = {}
+    remaining = budget_tokens + separator_tokens  # 첫 블록 앞에는 구분자가 없음
+    for position, item, body, overhead, body_tokens, relevance in sorted(
+        candidates, key=lambda c: (-c[5] / max(c[3] + c[4], 1), c[0])
+    ):
+        cost = overhead + body_tokens
+        if cost <= remaining:
+            chosen[position] = item
+            remaining -= cost
+            continue
+        room = remaining - overhead - counter.count(ELLIPSIS)
+        if room >= min_body_tokens and body_tokens > room:
+            trimmed = _trim_to_sentence(counter.truncate(body, room)) + ELLIPSIS
+            chosen[position] = {**item, text_key: trimmed, "truncated": True}
+            remaining -= overhead + counter.count(trimmed)
+
+    packed = [chosen[position] for position in sorted(chosen)]
+    blocks = [render(i, item, (item.get(text_key) or "").strip()) for i, item in enumerate(packed, 1)]
+    text = separator.join(blocks)
+    return PackedContext(packed, text, counter.count(text) if text else 0, len(items) - len(packed))
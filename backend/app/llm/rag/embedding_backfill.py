@@ -0,0 +1,226 @@
+"""
+임베딩 버전 컬럼 백필 (예: embedding → embedding_v2 halfvec(512))
+
+- snippet_id 키셋 페이지로 대상 컬럼이 비어 있는 행만 배치 단위로 처리 (중단 후 다시 실행하면 이어서 진행)
+- 기본: 배치 텍스트(embed_text, 없으면 full_text)를 대상 버전의 모델/차원으로 다시 임베딩해 한 번의 UPDATE로 저장
+- derive: 같은 text-embedding-3 모델이면 기존 컬럼 앞부분을 잘라 정규화한 값이 dimensions 요청 결과와 같으므로
+  API 호출 없이 DB 안에서 바로 채움 (subvector + l2_normalize, pgvector 0.7+)
+  source 모델로 만든 것이 확실한 행(derive_where, 기본 TOC 수집 행)만 파생하고,
+  나머지(예전 ada-002로 만든 legacy 행 등)는 이어서 다시 임베딩
+- 배치마다 커밋하고 sleep_seconds만큼 쉬어 서비스 트래픽과 DB/API 한도를 나눠 씀
+"""
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import psycopg2.extras as extras
+
+from .logger import rag_logger
+from .vector_db.embedding_versions import EmbeddingVersion, can_derive, get_embedding_version
+
+logger = rag_logger
+
+# derive 모드에서 source 컬럼을 잘라 쓸 행 조건 (TOC 수집 행만 text-embedding-3-small로 만들어짐)
+DERIVE_WHERE = "rag_type = 'toc'"
+
+_MIN_UUID = "00000000-0000-0000-0000-000000000000"
+
+
+class EmbeddingBackfill:
+    """임베딩 버전 컬럼 백필 작업"""
+
+    def __init__(self,
+                 connect: Callable,
+                 target: EmbeddingVersion,
+                 source: Optional[EmbeddingVersion] = None,
+                 embed: Optional[Callable[[List[str]], Sequence[Sequence[float]]]] = None,
+                 derive: bool = False,
+                 batch_size: int = 500,
+                 sleep_seconds: float = 0.0,
+                 table: str = "ideal_answer",
+                 derive_where: str = DERIVE_WHERE):
+        """
+        Args:
+            connect: psycopg2 호환 연결을 만드는 함수 (예: engine.raw_connection)
+            target: 채울 임베딩 버전
+            source: derive 모드에서 잘라 쓸 버전 (기본 v1)
+            embed: 텍스트 목록 → 임베딩 목록 (기본: 대상 모델/차원의 EmbeddingService)
+            derive: source 모델로 만든 행(derive_where)은 API 호출 없이 source 컬럼에서 파생, 나머지는 재임베딩
+            derive_where: source 컬럼이 source.model로 만들어졌다고 확신할 수 있는 행 조건 (SQL)
+        """
+        self.connect = connect
+        self.target = target
+        self.source = source or get_embedding_version("v1")
+        self.derive = derive
+        self.batch_size = batch_size
+        self.sleep_seconds = sleep_seconds
+        self.table = table
+        self.derive_where = derive_where
+        if derive and not can_derive(self.source, target):
+            raise ValueError(f"{self.source.name} → {target.name}는 잘라서 만들 수 없습니다 (모델/차원 확인)")
+        if derive and target.column == self.source.column:
+            raise ValueError("source와 target 컬럼이 같습니다")
+        self._embed = embed
+
+    def run(self, max_batches: Optional[int] = None) -> Dict[str, int]:
+        """
+        비어 있는 행을 모두(또는 max_batches 배치만큼) 채움
+
+        Returns:
+            {"batches", "updated", "skipped"}
+        """
+        stats = {"batches": 0, "updated": 0, "skipped": 0}
+        started = time.perf_counter()
+        # derive 모드: 파생 가능한 행을 먼저 DB 안에서 채우고, 남은 행은 다시 임베딩
+        phases = [self._derive_batch, self._embed_batch] if self.derive else [self._embed_batch]
+        conn = self.connect()
+        try:
+            for batch_fn in phases:
+                after = _MIN_UUID
+                while max_batches is None or stats["batches"] < max_batches:
+                    with conn.cursor() as cur:
+                        updated, skipped, after = batch_fn(cur, after)
+                    conn.commit()
+                    if after is None:
+                        break
+                    self._record_batch(stats, updated, skipped, started)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        logger.info(
+            f"임베딩 백필 {self.target.name} 완료: {stats['updated']}행 갱신, {stats['skipped']}행 건너뜀 "
+            f"({time.perf_counter() - started:.1f}초)"
+        )
+        return stats
+
+    def _record_batch(self, stats: Dict[str, int], updated: int, skipped: int, started: float) -> None:
+        """배치 통계 누적/진행 로그, 배치 사이 대기"""
+        stats["batches"] += 1
+        stats["updated"] += updated
+        stats["skipped"] += skipped
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"임베딩 백필 {self.target.name}: 배치 {stats['batches']}, "
+            f"누적 {stats['updated']}행 ({stats['updated'] / elapsed if elapsed > 0 else 0:.1f}행/초)"
+        )
+        if self.sleep_seconds:
+            time.sleep(self.sleep_seconds)
+
+    def remaining(self) -> int:
+        """대상 컬럼이 비어 있는 행 수"""
+        conn = self.connect()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT COUNT(*) FROM {self.table} WHERE {self.target.column} IS NULL")
+                return cur.fetchone()[0]
+        finally:
+            conn.close()
+
+    def _derive_batch(self, cur, after: str) -> Tuple[int, int, Optional[str]]:
+        """source 컬럼 앞 target.dimensions개 성분을 잘라 정규화 → 대상 타입으로 저장 (DB 안에서 처리, derive_where 행만)"""
+        cur.execute(f"""
+            WITH batch AS (
+                SELECT snippet_id FROM {self.table}
+                WHERE {self.target.column} IS NULL
+                  AND {self.source.column} IS NOT NULL
+                  AND ({self.derive_where})
+                  AND snippet_id > %s::uuid
+                ORDER BY snippet_id
+                LIMIT %s
+            )
+            UPDATE {self.table} t
+            SET {self.target.column} =
+                l2_normalize(subvector(t.{self.source.column}, 1, {self.target.dimensions}))::{self.target.sql_type}
+            FROM batch
+            WHERE t.snippet_id = batch.snippet_id
+            RETURNING t.snippet_id
+        """, (after, self.batch_size))
+        ids = [str(row[0]) for row in cur.fetchall()]
+        if not ids:
+            return 0, 0, None
+        return len(ids), 0, max(ids)
+
+    def _embed_batch(self, cur, after: str) -> Tuple[int, int, Optional[str]]:
+        """배치 텍스트를 다시 임베딩해 VALUES 목록 한 번으로 UPDATE"""
+        cur.execute(f"""
+            SELECT snippet_id, COALESCE(NULLIF(embed_text, ''), full_text)
+            FROM {self.table}
+            WHERE {self.target.column} IS NULL AND snippet_id > %s::uuid
+            ORDER BY snippet_id
+            LIMIT %s
+        """, (after, self.batch_size))
+        rows = cur.fetchall()
+        if not rows:
+            return 0, 0, None
+
+        last = str(rows[-1][0])
+        todo = [(str(snippet_id), text) for snippet_id, text in rows if text and text.strip()]
+        if not todo:
+            return 0, len(rows), last
+
+        embeddings = self._get_embed()([text for _, text in todo])
+        values = [
+            (snippet_id, self.target.to_array(embedding))
+            for (snippet_id, _), embedding in zip(todo, embeddings)
+        ]
+        extras.execute_values(
+            cur,
+            f"""
+            UPDATE {self.table} t
+            SET {self.target.column} = v.embedding::{self.target.sql_type}
+            FROM (VALUES %s) AS v(snippet_id, embedding)
+            WHERE t.snippet_id = v.snippet_id::uuid
+            """,
+            values,
+            template=f"(%s, %s::vector({self.target.dimensions}))",
+            page_size=len(values)
+        )
+        return len(values), len(rows) - len(values), last
+
+    def _get_embed(self) -> Callable[[List[str]], Sequence[Sequence[float]]]:
+        if self._embed is None:
+            from .vector_db.vector_db_manager import EmbeddingService
+            service = EmbeddingService(
+                None, self.target.model, self.target.request_kwargs().get("dimensions")
+            )
+            self._embed = service.create_embeddings_batch
+        return self._embed
+
+
+def _parse_args():
+    import argparse
+    parser = argparse.ArgumentParser(description="임베딩 버전 컬럼 백필")
+    parser.add_argument("--version", default="v2", help="채울 임베딩 버전")
+    parser.add_argument("--derive", action="store_true",
+                        help="TOC 수집 행은 API 호출 없이 v1 컬럼을 잘라서 채우고 나머지는 재임베딩")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--sleep", type=float, default=0.0, help="배치 사이 대기(초)")
+    parser.add_argument("--max-batches", type=int, default=None)
+    return parser.parse_args()
+
+
+def main():
+    """
+    실행:
+        cd backend
+        python -m app.llm.rag.embedding_backfill --version v2 --batch-size 500 --sleep 0.5
+    """
+    args = _parse_args()
+    from app.core.database import engine
+
+    backfill = EmbeddingBackfill(
+        engine.raw_connection,
+        get_embedding_version(args.version),
+        derive=args.derive,
+        batch_size=args.batch_size,
+        sleep_seconds=args.sleep
+    )
+    print(f"🔄 {args.version} 백필 시작: 남은 행 {backfill.remaining()}개")
+    stats = backfill.run(args.max_batches)
+    print(f"✅ {args.version} 백필: {stats['updated']}행 갱신, 남은 행 {backfill.remaining()}개")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,10 @@
 문서 형식별 추출 유틸리티 클래스들
 """
 import logging
-from typing import List, Dict, Any, Optional
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Iterator, Optional
 from pathlib import Path
 from abc import ABC, abstractmethod
 
@@ -11,6 +14,120 @@ from ..logger import rag_logger
 
 logger = rag_logger
 
+# 병렬 추출 기본 설정 (RAG_EXTRACT_WORKERS=1 이면 단일 프로세스)
+DEFAULT_EXTRACT_WORKERS = int(os.getenv("RAG_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+MIN_PAGES_PER_WORKER = 64
+MIN_EPUB_ITEMS_PER_WORKER = 16
+
+
+def _extract_pdf_range(source: str, start: int, end: int) -> List[str]:
+    """프로세스 풀 작업: [start, end) 페이지 텍스트 추출"""
+    import fitz
+    
+    with fitz.open(source) as doc:
+        return [doc[page_num].get_text() for page_num in range(start, end)]
+
+
+def extract_pdf_pages(source: str, workers: Optional[int] = None) -> List[str]:
+    """
+    PyMuPDF로 PDF 페이지별 텍스트 추출
+    - 페이지 범위를 나눠 프로세스 풀에서 병렬 추출
+    - 처리 속도(pages/sec) 로깅
+    """
+    import fitz
+    
+    workers = DEFAULT_EXTRACT_WORKERS if workers is None else workers
+    started = time.perf_counter()
+    
+    with fitz.open(source) as doc:
+        page_count = len(doc)
+    
+    workers = max(1, min(workers, page_count // MIN_PAGES_PER_WORKER))
+    if workers == 1:
+        pages = _extract_pdf_range(source, 0, page_count)
+    else:
+        step = -(-page_count // workers)
+        starts = list(range(0, page_count, step))
+        ends = [min(start + step, page_count) for start in starts]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pages = [
+                text
+                for part in pool.map(_extract_pdf_range, [source] * len(starts), starts, ends)
+                for text in part
+            ]
+    
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"PDF 추출: {page_count}페이지, {elapsed:.2f}초 "
+        f"({page_count / elapsed if elapsed > 0 else 0:.1f} pages/sec, workers={workers})"
+    )
+    return pages
+
+
+def iter_pdf_pages(source: str) -> Iterator[str]:
+    """
+    PDF 페이지 텍스트를 한 페이지씩 지연 추출 (스트리밍 수집용)
+    - 전체 페이지 리스트를 메모리에 올리지 않음
+    """
+    import fitz
+    
+    with fitz.open(source) as doc:
+        for page in doc:
+            yield page.get_text()
+
+
+def _html_to_text(content: bytes) -> str:
+    """EPUB 문서 항목(XHTML) → 텍스트 (lxml C 파서 사용)"""
+    import lxml.html
+    
+    if not content or not content.strip():
+        return ""
+    try:
+        return lxml.html.fromstring(content).text_content()
+    except Exception:
+        from bs4 import BeautifulSoup
+        return BeautifulSoup(content, 'html.parser').get_text()
+
+
+def extract_epub_items(book, workers: Optional[int] = None) -> List[str]:
+    """
+    EPUB 문서 항목별 텍스트 추출
+    - 항목 수가 많으면 프로세스 풀에서 병렬 파싱
+    """
+    import ebooklib
+    
+    workers = DEFAULT_EXTRACT_WORKERS if workers is None else workers
+    started = time.perf_counter()
+    
+    contents = [
+        item.get_content()
+        for item in book.get_items()
+        if item.get_type() == ebooklib.ITEM_DOCUMENT
+    ]
+    
+    workers = max(1, min(workers, len(contents) // MIN_EPUB_ITEMS_PER_WORKER))
+    if workers == 1:
+        texts = [_html_to_text(content) for content in contents]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            texts = list(pool.map(_html_to_text, contents, chunksize=4))
+    
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"EPUB 추출: {len(contents)}개 항목, {elapsed:.2f}초 "
+        f"({len(contents) / elapsed if elapsed > 0 else 0:.1f} items/sec, workers={workers})"
+    )
+    return texts
+
+
+def iter_epub_items(book) -> Iterator[str]:
+    """EPUB 문서 항목 텍스트를 한 항목씩 지연 추출 (스트리밍 수집용)"""
+    import ebooklib
+    
+    for item in book.get_items():
+        if item.get_type() == ebooklib.ITEM_DOCUMENT:
+            yield _html_to_text(item.get_content())
+
 
 class BaseExtractor(ABC):
     """
@@ -33,9 +150,12 @@ class BaseExtractor(ABC):
 
 class PDFExtractor(BaseExtractor):
     """
-    PDF 파일에서 텍스트를 추출하는 클래스
+    PDF 파일에서 텍스트를 추출하는 클래스 (PyMuPDF, 페이지 범위 병렬 추출)
     """
     
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers
+    
     def extract(self, source: str) -> str:
         """
         PDF 파일에서 텍스트를 추출합니다.
@@ -47,19 +167,12 @@ class PDFExtractor(BaseExtractor):
             추출된 텍스트
         """
         try:
-            import pypdf
+            content = "".join(text + "\n" for text in extract_pdf_pages(source, self.workers))
             
-            with open(source, 'rb') as file:
-                pdf_reader = pypdf.PdfReader(file)
-                
-                content = ""
-                for page in pdf_reader.pages:
-                    content += page.extract_text() + "\n"
-                
             logger.info(f"PDF 파일에서 텍스트 추출 완료: {source}")
             return content
         except ImportError:
-            raise ImportError("PDF 파일 처리를 위해 'pypdf' 패키지를 설치해야 합니다: pip install pypdf")
+            raise ImportError("PDF 파일 처리를 위해 'pymupdf' 패키지를 설치해야 합니다: pip install pymupdf")
         except Exception as e:
             logger.error(f"PDF 파일 추출 오류 {source}: {str(e)}")
             raise
@@ -67,9 +180,12 @@ class PDFExtractor(BaseExtractor):
 
 class EPubExtractor(BaseExtractor):
     """
-    EPUB 파일에서 텍스트를 추출하는 클래스
+    EPUB 파일에서 텍스트를 추출하는 클래스 (lxml 파서, 항목 병렬 파싱)
     """
     
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers
+    
     def extract(self, source: str) -> str:
         """
         EPUB 파일에서 텍스트를 추출합니다.
@@ -81,23 +197,16 @@ class EPubExtractor(BaseExtractor):
             추출된 텍스트
         """
         try:
-            import ebooklib
             from ebooklib import epub
-            from bs4 import BeautifulSoup
             
             book = epub.read_epub(source)
-            
-            content = ""
-            for item in book.get_items():
-                if item.get_type() == ebooklib.ITEM_DOCUMENT:
-                    soup = BeautifulSoup(item.get_content(), 'html.parser')
-                    content += soup.get_text() + "\n"
+            content = "".join(text + "\n" for text in extract_epub_items(book, self.workers))
             
             logger.info(f"EPUB 파일에서 텍스트 추출 완료: {source}")
             return content
         except ImportError:
-            raise ImportError("EPUB 파일 처리를 위해 'ebooklib' 및 'beautifulsoup4' 패키지를 설치해야 합니다: "
-                            "pip install ebooklib beautifulsoup4")
+            raise ImportError("EPUB 파일 처리를 위해 'ebooklib' 및 'lxml' 패키지를 설치해야 합니다: "
+                            "pip install ebooklib lxml")
         except Exception as e:
             logger.error(f"EPUB 파일 추출 오류 {source}: {str(e)}")
             raise
@@ -189,17 +298,19 @@ class DOCXExtractor(BaseExtractor):
             from docx import Document
             
             doc = Document(source)
-            content = ""
+            parts = []
             
             # 단락 텍스트 추출
             for paragraph in doc.paragraphs:
-                content += paragraph.text + "\n"
+                parts.append(paragraph.text + "\n")
             
             # 표의 텍스트 추출
             for table in doc.tables:
                 for row in table.rows:
                     for cell in row.cells:
-                        content += cell.text + "\n"
+                        parts.append(cell.text + "\n")
+            
+            content = "".join(parts)
             
             logger.info(f"DOCX 파일에서 텍스트 추출 완료: {source}")
             return content
@@ -41,8 +41,9 @@ class RAGInterface(ABC):
     def search_similar(self, 
                       query: str, 
                       top_k: int = 5, 
-                      threshold: float = 0.5) -> List[Tuple[str, float, UUID]]:
-        """유사한 문서 검색"""
+                      threshold: float = 0.5,
+                      mode: str = "vector") -> List[Tuple[str, float, UUID]]:
+        """유사한 문서 검색 (mode: "vector" 또는 "hybrid" = 어휘 + 벡터 RRF 융합)"""
         pass
     
     @abstractmethod
@@ -36,9 +36,10 @@ class LegacyRAGAdapter(RAGInterface):
     def search_similar(self, 
                       query: str, 
                       top_k: int = 5, 
-                      threshold: float = 0.5) -> List[Tuple[str, float, UUID]]:
+                      threshold: float = 0.5,
+                      mode: str = "vector") -> List[Tuple[str, float, UUID]]:
         """유사한 문서 검색"""
-        return self.rag_system.search_similar(query, top_k, threshold)
+        return self.rag_system.search_similar(query, top_k, threshold, mode)
     
     def add_document(self, 
                     text: str, 
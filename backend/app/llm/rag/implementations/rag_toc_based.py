@@ -4,6 +4,8 @@ Cloud Functions에서 파일 처리를 담당하므로 검색 기능만 제공
 """
 import json
 import uuid
+from contextlib import nullcontext
+import numpy as np
 import psycopg2
 import psycopg2.extras as extras
 from typing import List, Dict, Any, Tuple, Optional
@@ -11,8 +13,18 @@ from uuid import UUID
 from openai import OpenAI
 
 from .rag_interface import AdvancedRAGInterface, RAGConfig
+from ..context_packer import pack_context
+from ..rerank import DEFAULT_MAX_PER_BOOK, DEFAULT_MMR_LAMBDA, mmr_rerank
+from ..tokenizer import get_token_counter
+from ..vector_db.embedding_versions import embed_query, get_embedding_version
+from ..vector_db.lexical import hybrid_candidates_sql, hybrid_params, tsquery_text, validate_mode
+from ..vector_db.local_index import get_local_index
+from ..vector_db.section_store import section_table_name
 from app.core.config import settings
 
+# 조언 생성 모델
+ADVICE_MODEL = "gpt-4"
+
 
 class TOCBasedRAG(AdvancedRAGInterface):
     """목차 기반 고급 RAG 시스템 - 검색 전용"""
@@ -25,6 +37,14 @@ class TOCBasedRAG(AdvancedRAGInterface):
         # 설정
         self.table_name = config.extra_config.get("table_name", "ideal_answer")
         self.embedding_model = config.extra_config.get("embedding_model", "text-embedding-3-small")
+        self.search_mode = validate_mode(config.extra_config.get("search_mode", "vector"))
+        # 조언 컨텍스트 섹션 MMR 재정렬 (λ=1이면 유사도 순서 그대로)
+        self.mmr_lambda = config.extra_config.get("mmr_lambda", DEFAULT_MMR_LAMBDA)
+        # 책별 최대 섹션 수 (기본 None: 제한 없음)
+        self.max_per_book = config.extra_config.get("max_per_book", DEFAULT_MAX_PER_BOOK)
+        # 조언 프롬프트에 넣을 섹션 후보 수와 컨텍스트 토큰 예산
+        self.advice_candidates = config.extra_config.get("advice_candidates", 6)
+        self.context_tokens = config.extra_config.get("context_tokens", 2000)
         
     def _get_db_connection(self):
         """데이터베이스 연결 생성"""
@@ -32,7 +52,12 @@ class TOCBasedRAG(AdvancedRAGInterface):
         db_url = settings.database_url
         if db_url.startswith("postgresql+psycopg2://"):
             db_url = db_url.replace("postgresql+psycopg2://", "postgresql://")
-        return psycopg2.connect(db_url)
+        conn = psycopg2.connect(db_url)
+        # numpy 배열 ↔ vector 어댑터 등록 (벡터 조회 결과도 numpy float32로 받음)
+        from pgvector.psycopg2 import register_vector
+        register_vector(conn, globally=False)
+        conn.rollback()
+        return conn
     
     def load_and_process_file(self, 
                              source_path: str, 
@@ -49,25 +74,92 @@ class TOCBasedRAG(AdvancedRAGInterface):
     def search_similar(self, 
                       query: str, 
                       top_k: int = 5, 
-                      threshold: float = 0.5) -> List[Tuple[str, float, UUID]]:
-        """벡터 유사도 검색"""
-        query_embedding = self._create_embedding(query)
+                      threshold: float = 0.5,
+                      mode: Optional[str] = None) -> List[Tuple[str, float, UUID]]:
+        """
+        유사도 검색 (mode를 주지 않으면 설정의 search_mode)
+        - vector: 벡터 유사도 (로컬 인덱스가 켜져 있으면 DB 대신 프로세스 내 인덱스 사용)
+        - hybrid: Kiwi 어휘 후보 + 벡터 후보를 한 쿼리에서 RRF로 융합 (융합 순서, 점수는 코사인 유사도)
+        """
+        # 활성 임베딩 버전의 모델/차원/컬럼으로 검색 (섹션 임베딩은 v1 유지)
+        version = get_embedding_version()
+        query_embedding = embed_query(self.openai_client, query, version)
+        
+        if validate_mode(mode or self.search_mode) == "hybrid":
+            return self._search_hybrid(query, query_embedding, top_k, threshold, version)
         
+        local_index = get_local_index()
+        if local_index is not None and local_index.table == self.table_name:
+            local_index.maybe_refresh(lambda: nullcontext(self.db_connection))
+            hits = local_index.search(query_embedding, top_k, min_similarity=threshold)
+            return [(hit['full_text'], hit['similarity'], hit['section_id']) for hit in hits]
+        
+        # 쿼리 벡터는 CTE에서 한 번만 바인딩하고 필터/정렬에서는 q.v로 참조
         sql = f"""
+        WITH q AS (SELECT %s::{version.sql_type} AS v)
         SELECT section_id, canonical_path, full_text, 
-               embedding <=> %s::vector as distance
-        FROM {self.table_name}
-        WHERE embedding <=> %s::vector < %s
-        ORDER BY embedding <=> %s::vector
+               {version.column} <=> q.v as distance
+        FROM {self.table_name} CROSS JOIN q
+        WHERE {version.column} <=> q.v < %s
+        ORDER BY distance
         LIMIT %s
         """
         
         with self.db_connection.cursor(cursor_factory=extras.RealDictCursor) as cur:
-            cur.execute(sql, (query_embedding, query_embedding, 1-threshold, query_embedding, top_k))
+            cur.execute(sql, (query_embedding, 1-threshold, top_k))
             results = cur.fetchall()
         
         return [(row['full_text'], 1-row['distance'], row['section_id']) for row in results]
     
+    def _search_hybrid(self, query: str, query_embedding: np.ndarray, top_k: int, threshold: float, version) -> List[Tuple[str, float, UUID]]:
+        """어휘 + 벡터 하이브리드 검색 (한 SQL 문)"""
+        sql = f"""
+        WITH q AS (
+          SELECT 0 AS ord, %(v)s::{version.sql_type} AS v, to_tsquery('simple', %(tsq)s) AS tsq
+        ),
+        {hybrid_candidates_sql(self.table_name, version.column)}
+        SELECT t.section_id, t.full_text, f.distance
+        FROM fused f
+        JOIN {self.table_name} t ON t.snippet_id = f.snippet_id
+        ORDER BY f.rrf DESC, f.distance
+        LIMIT %(top_k)s
+        """
+        params = {"v": query_embedding, "tsq": tsquery_text(query), "top_k": top_k, **hybrid_params(1 - threshold)}
+        
+        with self.db_connection.cursor(cursor_factory=extras.RealDictCursor) as cur:
+            cur.execute(sql, params)
+            results = cur.fetchall()
+        
+        return [(row['full_text'], 1-row['distance'], row['section_id']) for row in results]
+    
+    def search_sections(self, 
+                        query: str, 
+                        top_k: int = 5, 
+                        threshold: float = 0.5) -> List[Dict[str, Any]]:
+        """섹션 임베딩으로 섹션을 직접 검색 (청크 조회/스티칭 없이 섹션 전문 반환)"""
+        query_embedding = self._create_embedding(query)
+        
+        sql = f"""
+        WITH q AS (SELECT %s::vector AS v)
+        SELECT section_id, canonical_path, book_title, page_start, page_end,
+               full_text, citations, embedding <=> q.v as distance
+        FROM {section_table_name(self.table_name)} CROSS JOIN q
+        WHERE embedding <=> q.v < %s
+        ORDER BY distance
+        LIMIT %s
+        """
+        
+        with self.db_connection.cursor(cursor_factory=extras.RealDictCursor) as cur:
+            cur.execute(sql, (query_embedding, 1-threshold, top_k))
+            results = cur.fetchall()
+        
+        sections = []
+        for row in results:
+            section = dict(row)
+            section['similarity'] = 1 - section.pop('distance')
+            sections.append(section)
+        return sections
+    
     def add_document(self, text: str, **kwargs) -> UUID:
         """단일 문서 추가"""
         embedding = self._create_embedding(text)
@@ -100,7 +192,14 @@ class TOCBasedRAG(AdvancedRAGInterface):
     def search_by_analysis_result(self, 
                                  analysis_id: str, 
                                  **kwargs) -> List[Dict[str, Any]]:
-        """분석 결과 기반 검색"""
+        """분석 결과 기반 검색 (유사도 순 섹션, similarity = 섹션 내 최고 청크 유사도)"""
+        sections = self._search_sections_for_analysis(analysis_id, **kwargs)
+        for sec in sections:
+            sec.pop('embedding', None)
+        return sections
+    
+    def _search_sections_for_analysis(self, analysis_id: str, **kwargs) -> List[Dict[str, Any]]:
+        """분석 요약으로 청크 검색 → 섹션 테이블 조회 (MMR용 섹션 임베딩 포함)"""
         analysis = self._fetch_analysis_by_id(analysis_id)
         if not analysis:
             return []
@@ -112,11 +211,16 @@ class TOCBasedRAG(AdvancedRAGInterface):
         # 벡터 검색
         top_k = kwargs.get('top_k', 10)
         threshold = kwargs.get('threshold', 0.5)
-        results = self.search_similar(summary, top_k, threshold)
+        mode = kwargs.get('mode', self.search_mode)
+        results = self.search_similar(summary, top_k, threshold, mode)
         
-        # 섹션별로 그룹화하고 스티칭
-        section_ids = list(set([result[2] for result in results]))
-        full_sections = self._fetch_full_sections(section_ids)
+        # 유사도 순으로 섹션 ID를 모아 섹션 테이블에서 조회
+        best_similarity: Dict[str, float] = {}
+        for _, similarity, section_id in results:
+            best_similarity.setdefault(section_id, similarity)
+        full_sections = self._fetch_full_sections(list(best_similarity))
+        for sec in full_sections:
+            sec['similarity'] = best_similarity[sec['section_id']]
         
         return full_sections
     
@@ -124,18 +228,35 @@ class TOCBasedRAG(AdvancedRAGInterface):
                        analysis_id: str, 
                        **kwargs) -> Dict[str, Any]:
         """조언 생성"""
-        sections = self.search_by_analysis_result(analysis_id, **kwargs)
+        sections = self._search_sections_for_analysis(analysis_id, **kwargs)
         
         if not sections:
             return {"advice": "관련 정보를 찾을 수 없습니다.", "sources": []}
         
         analysis = self._fetch_analysis_by_id(analysis_id)
         
-        # 컨텍스트 구성
-        context = "\n\n".join([
-            f"[{sec['canonical_path']}]\n{sec['full_text']}" 
-            for sec in sections[:3]  # 상위 3개 섹션만 사용
-        ])
+        # MMR로 같은 장/책의 비슷한 섹션 대신 다른 내용을 고른 뒤, 토큰 예산 안에서 관련도 합이 크도록 담음
+        candidates = mmr_rerank(
+            sections, kwargs.get('advice_candidates', self.advice_candidates),
+            lambda_=kwargs.get('mmr_lambda', self.mmr_lambda),
+            max_per_group=kwargs.get('max_per_book', self.max_per_book)
+        )
+        for sec in sections:
+            sec.pop('embedding', None)
+        
+        # 컨텍스트 구성 (넘치는 섹션은 본문만 자르고 경로/출처는 유지)
+        def render(i: int, sec: Dict[str, Any], body: str) -> str:
+            cites = "; ".join(sec.get('citations') or [])
+            return f"[{sec['canonical_path']}]\n{body}" + (f"\n(출처: {cites})" if cites else "")
+        
+        packed = pack_context(
+            candidates,
+            kwargs.get('context_tokens', self.context_tokens),
+            render,
+            text_key='full_text',
+            counter=get_token_counter(ADVICE_MODEL)
+        )
+        context = packed.text
         
         prompt = f"""
 다음은 가족 대화 분석 결과입니다:
@@ -150,20 +271,22 @@ class TOCBasedRAG(AdvancedRAGInterface):
         
         try:
             response = self.openai_client.chat.completions.create(
-                model="gpt-4",
+                model=ADVICE_MODEL,
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.7,
                 max_tokens=1000
             )
             
             advice = response.choices[0].message.content
+            # 출처는 실제 프롬프트에 담긴 섹션만
             sources = [{"path": sec['canonical_path'], "citations": sec.get('citations', [])} 
-                      for sec in sections]
+                      for sec in packed.items]
             
             return {
                 "advice": advice,
                 "sources": sources,
-                "analysis_id": analysis_id
+                "analysis_id": analysis_id,
+                "context_tokens": packed.tokens
             }
             
         except Exception as e:
@@ -193,15 +316,15 @@ class TOCBasedRAG(AdvancedRAGInterface):
         except Exception:
             return False
     
-    def _create_embedding(self, text: str) -> List[float]:
-        """OpenAI 임베딩 생성"""
+    def _create_embedding(self, text: str) -> np.ndarray:
+        """OpenAI 임베딩 생성 (float32 배열)"""
         response = self.openai_client.embeddings.create(
             model=self.embedding_model,
             input=text
         )
-        return response.data[0].embedding
+        return np.asarray(response.data[0].embedding, dtype=np.float32)
     
-    def _save_chunk_to_db(self, chunk_data: Dict[str, Any], embedding: List[float]) -> str:
+    def _save_chunk_to_db(self, chunk_data: Dict[str, Any], embedding: np.ndarray) -> str:
         """청크 데이터를 데이터베이스에 저장"""
         from app.llm.rag.vector_db.vector_db_manager import VectorDBManager
         
@@ -253,52 +376,19 @@ class TOCBasedRAG(AdvancedRAGInterface):
         return dict(row)
     
     def _fetch_full_sections(self, section_ids: List[str]) -> List[Dict[str, Any]]:
-        """섹션별 전체 텍스트 조회 및 스티칭"""
+        """섹션 테이블에서 섹션 전문 조회 (수집 시 미리 스티칭됨, section_ids 순서 유지)"""
         if not section_ids:
             return []
         
         sql = f"""
-        SELECT section_id, canonical_path, chunk_ix,
-               page_start, page_end, citation, full_text
-        FROM {self.table_name}
+        SELECT section_id, canonical_path, book_title, page_start, page_end,
+               full_text, citations, embedding
+        FROM {section_table_name(self.table_name)}
         WHERE section_id = ANY(%s)
-        ORDER BY section_id, chunk_ix, page_start, page_end
         """
         
         with self.db_connection.cursor(cursor_factory=extras.RealDictCursor) as cur:
-            cur.execute(sql, (section_ids,))
-            rows = cur.fetchall()
-        
-        # 섹션별로 그룹화
-        sections_by_id = {}
-        for row in rows:
-            section_id = row['section_id']
-            if section_id not in sections_by_id:
-                sections_by_id[section_id] = {
-                    'section_id': section_id,
-                    'canonical_path': row['canonical_path'],
-                    'snippets': [],
-                    'citations': set()
-                }
-            
-            sections_by_id[section_id]['snippets'].append(row)
-            if row.get('citation'):
-                sections_by_id[section_id]['citations'].add(row['citation'])
+            cur.execute(sql, (list(section_ids),))
+            rows = {row['section_id']: dict(row) for row in cur.fetchall()}
         
-        # 섹션별 텍스트 스티칭
-        sections = []
-        for section_data in sections_by_id.values():
-            full_text = "\n\n".join([
-                snippet['full_text'] 
-                for snippet in section_data['snippets'] 
-                if snippet.get('full_text')
-            ])
-            
-            sections.append({
-                'section_id': section_data['section_id'],
-                'canonical_path': section_data['canonical_path'],
-                'full_text': full_text,
-                'citations': list(section_data['citations'])
-            })
-        
-        return sections
+        return [rows[section_id] for section_id in section_ids if section_id in rows]
@@ -1,15 +1,21 @@
 import os
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional
 from pathlib import Path
 from urllib.parse import urlparse
 import logging
 
 # 로깅 모듈 가져오기
 from ..logger import rag_logger
+from ..extractors.document_extractors import (
+    extract_pdf_pages, extract_epub_items, iter_pdf_pages, iter_epub_items
+)
 
 logger = rag_logger
 
+# 스트리밍 로드 시 텍스트 파일을 나눠 읽는 블록 크기 (문자 수)
+TEXT_BLOCK_CHARS = 64 * 1024
+
 
 class Document:
     """
@@ -56,19 +62,19 @@ class LocalFileLoader(BaseLoader):
     def __init__(self):
         # 선택적 종속성을 위한 메서드 내부 가져오기
         try:
-            import pypdf
+            import fitz
         except ImportError:
-            pypdf = None
-        self._pypdf = pypdf
+            fitz = None
+        self._fitz = fitz
         
         try:
             from ebooklib import epub
-            import bs4
+            import lxml
         except ImportError:
             epub = None
-            bs4 = None
+            lxml = None
         self._epub_lib = epub
-        self._bs4 = bs4
+        self._lxml = lxml
     
     def load(self, source: str) -> List[Document]:
         """
@@ -94,36 +100,100 @@ class LocalFileLoader(BaseLoader):
             # 다른 텍스트 기반 형식
             return self._load_text_file(source)
     
+    def iter_load(self, source: str) -> Iterator[Document]:
+        """
+        로컬 파일을 페이지/섹션 단위 Document로 지연 로드합니다.
+        
+        - PDF: 페이지마다 1개, EPUB: 문서 항목마다 1개, 텍스트: TEXT_BLOCK_CHARS 블록마다 1개
+        - 각 Document.content를 순서대로 이어 붙이면 load()의 content와 같습니다.
+        
+        Args:
+            source: 로컬 파일의 경로
+            
+        Yields:
+            Document 객체 (metadata에 section_index 포함)
+        """
+        path = Path(source)
+        if not path.exists():
+            raise FileNotFoundError(f"파일이 존재하지 않습니다: {source}")
+        
+        extension = path.suffix.lower()
+        
+        if extension == '.pdf':
+            if not self._fitz:
+                raise ImportError("PDF 파일 로드에는 pymupdf가 필요합니다. 'pip install pymupdf'로 설치하세요.")
+            base_metadata = {"source": source, "file_type": "pdf", "title": os.path.basename(source)}
+            sections = (text + "\n" for text in iter_pdf_pages(source))
+            doc_type = "pdf"
+        elif extension == '.epub':
+            if not self._epub_lib or not self._lxml:
+                raise ImportError("EPUB 파일 로드에는 ebooklib과 lxml이 필요합니다. "
+                                "'pip install ebooklib lxml'로 설치하세요.")
+            book = self._epub_lib.read_epub(source)
+            title = book.get_metadata('DC', 'title')
+            creator = book.get_metadata('DC', 'creator')
+            base_metadata = {
+                "source": source,
+                "file_type": "epub",
+                "title": title[0][0] if title else os.path.basename(source),
+                "author": creator[0][0] if creator else "Unknown"
+            }
+            sections = (text + "\n" for text in iter_epub_items(book))
+            doc_type = "epub"
+        else:
+            base_metadata = {"source": source, "file_type": extension, "title": os.path.basename(source)}
+            sections = self._iter_text_blocks(source)
+            doc_type = "text"
+        
+        count = 0
+        for count, content in enumerate(sections, start=1):
+            metadata = dict(base_metadata)
+            metadata["section_index"] = count - 1
+            yield Document(content=content, metadata=metadata, source=source, doc_type=doc_type)
+        
+        logger.info(f"스트리밍 로드 완료: {source}, {count}개 섹션")
+    
+    def _iter_text_blocks(self, file_path: str) -> Iterator[str]:
+        """
+        텍스트 파일을 TEXT_BLOCK_CHARS 단위로 읽되, 가능하면 줄 경계에서 자릅니다.
+        """
+        with open(file_path, 'r', encoding='utf-8') as file:
+            pending = ""
+            while True:
+                block = file.read(TEXT_BLOCK_CHARS)
+                if not block:
+                    break
+                pending += block
+                cut = pending.rfind("\n") + 1
+                if cut > 0:
+                    yield pending[:cut]
+                    pending = pending[cut:]
+            if pending:
+                yield pending
+    
     def _load_pdf(self, file_path: str) -> List[Document]:
         """
         PDF 파일에서 문서를 로드합니다.
         """
-        if not self._pypdf:
-            raise ImportError("PDF 파일 로드에는 pypdf가 필요합니다. 'pip install pypdf'로 설치하세요.")
+        if not self._fitz:
+            raise ImportError("PDF 파일 로드에는 pymupdf가 필요합니다. 'pip install pymupdf'로 설치하세요.")
         
         try:
-            import pypdf
-            documents = []
+            pages = extract_pdf_pages(file_path)
+            content = "".join(text + "\n" for text in pages)
             
-            with open(file_path, 'rb') as file:
-                pdf_reader = pypdf.PdfReader(file)
-                
-                content = ""
-                for page in pdf_reader.pages:
-                    content += page.extract_text() + "\n"
-                
-                doc = Document(
-                    content=content,
-                    metadata={
-                        "source": file_path,
-                        "file_type": "pdf",
-                        "pages": len(pdf_reader.pages),
-                        "title": os.path.basename(file_path)
-                    },
-                    source=file_path,
-                    doc_type="pdf"
-                )
-                documents.append(doc)
+            doc = Document(
+                content=content,
+                metadata={
+                    "source": file_path,
+                    "file_type": "pdf",
+                    "pages": len(pages),
+                    "title": os.path.basename(file_path)
+                },
+                source=file_path,
+                doc_type="pdf"
+            )
+            documents = [doc]
                 
             logger.info(f"PDF에서 {len(documents)}개 문서 로드 완료: {file_path}")
             return documents
@@ -135,24 +205,17 @@ class LocalFileLoader(BaseLoader):
         """
         EPUB 파일에서 문서를 로드합니다.
         """
-        if not self._epub_lib or not self._bs4:
-            raise ImportError("EPUB 파일 로드에는 ebooklib과 beautifulsoup4가 필요합니다. "
-                            "'pip install ebooklib beautifulsoup4'로 설치하세요.")
+        if not self._epub_lib or not self._lxml:
+            raise ImportError("EPUB 파일 로드에는 ebooklib과 lxml이 필요합니다. "
+                            "'pip install ebooklib lxml'로 설치하세요.")
         
         try:
-            import ebooklib
             from ebooklib import epub
-            from bs4 import BeautifulSoup
             
             documents = []
             
             book = epub.read_epub(file_path)
-            
-            content = ""
-            for item in book.get_items():
-                if item.get_type() == ebooklib.ITEM_DOCUMENT:
-                    soup = BeautifulSoup(item.get_content(), 'html.parser')
-                    content += soup.get_text() + "\n"
+            content = "".join(text + "\n" for text in extract_epub_items(book))
             
             doc = Document(
                 content=content,
@@ -232,4 +295,21 @@ class DocumentLoader:
                 raise NotImplementedError("URL 로딩은 아직 구현되지 않았습니다")
             else:
                 # 클라우드 스토리지 경로 또는 식별자일 수 있음
-                raise NotImplementedError("클라우드 스토리지 로딩은 아직 구현되지 않았습니다")
\ No newline at end of file
+                raise NotImplementedError("클라우드 스토리지 로딩은 아직 구현되지 않았습니다")
+    
+    def iter_documents(self, source: str) -> Iterator[Document]:
+        """
+        지정된 소스에서 페이지/섹션 단위 Document를 지연 로드합니다.
+        
+        Args:
+            source: 로컬 파일 경로 (URL/클라우드 스토리지는 미구현)
+            
+        Returns:
+            Document 이터레이터
+        """
+        if os.path.exists(source) or Path(source).exists():
+            return self.local_file_loader.iter_load(source)
+        parsed = urlparse(source)
+        if parsed.scheme in ['http', 'https']:
+            raise NotImplementedError("URL 로딩은 아직 구현되지 않았습니다")
+        raise NotImplementedError("클라우드 스토리지 로딩은 아직 구현되지 않았습니다")
\ No newline at end of file
@@ -0,0 +1,117 @@
+"""
+검색 후보 다양성 재정렬 (MMR: Maximal Marginal Relevance)
+
+점수 = λ · 관련도 − (1 − λ) · 이미 고른 후보와의 최대 코사인 유사도
+- 관련도는 검색 단계의 유사도(1 − 거리)를 그대로 쓰고, 후보끼리의 유사도만 후보 임베딩으로 계산
+  (쿼리가 다른 임베딩 버전/차원이어도 후보 임베딩끼리만 비교하므로 상관없음)
+- 후보 유사도 행렬을 한 번 계산한 뒤, 고를 때마다 "선택 집합과의 최대 유사도" 벡터만 갱신 → O(k·n) 벡터 연산
+- group_keys/max_per_group으로 같은 책에서 너무 많이 고르지 않도록 제한 (기본 끔)
+  상담 코퍼스는 한두 권에 몰려 있어 책별 제한을 켜면 관련 섹션 대신 덜 관련된 다른 책 섹션이 들어올 수 있으므로
+  필요할 때만 켬: Feedback은 RAG_MAX_PER_BOOK, TOCBasedRAG는 extra_config["max_per_book"]
+- λ=1이면 관련도 순서 그대로 (다양성 미적용)
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# 기본 λ (관련도 비중)
+DEFAULT_MMR_LAMBDA = 0.7
+# 기본 책별 최대 섹션 수 (None이면 제한 없음)
+DEFAULT_MAX_PER_BOOK: Optional[int] = None
+# 재정렬 후보 수 = 최종 개수 × 이 값
+MMR_POOL_FACTOR = 3
+
+
+def mmr_select(relevance: Sequence[float],
+               vectors: Optional[np.ndarray],
+               k: int,
+               lambda_: float = DEFAULT_MMR_LAMBDA,
+               group_keys: Optional[Sequence[Any]] = None,
+               max_per_group: Optional[int] = None) -> List[int]:
+    """
+    MMR로 후보 k개 선택
+
+    Args:
+        relevance: 후보별 관련도 (클수록 관련)
+        vectors: (n, dim) 후보 임베딩 (None이거나 0인 행은 중복 벌점 없음)
+        k: 선택할 개수
+        lambda_: 관련도 비중 (0~1)
+        group_keys: 후보별 그룹 (예: 책 제목, None은 제한 없음)
+        max_per_group: 그룹당 최대 선택 수
+
+    Returns:
+        선택 순서대로 후보 인덱스 (그룹 제한으로 남은 후보가 없으면 k개보다 적을 수 있음)
+    """
+    if not 0.0 <= lambda_ <= 1.0:
+        raise ValueError(f"lambda_는 0~1이어야 합니다: {lambda_}")
+    relevance = np.asarray(relevance, dtype=np.float32)
+    n = len(relevance)
+    k = min(k, n)
+    if k <= 0:
+        return []
+
+    if vectors is not None and lambda_ < 1.0:
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(n, -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+        similarity = matrix @ matrix.T
+    else:
+        similarity = None
+
+    group_ids = None
+    if group_keys is not None and max_per_group is not None:
+        keys = list(group_keys)
+        index = {key: i for i, key in enumerate(dict.fromkeys(key for key in keys if key is not None))}
+        group_ids = np.array([index.get(key, -1) for key in keys])
+        group_counts = np.zeros(len(index), dtype=np.int64)
+
+    available = np.ones(n, dtype=bool)
+    max_similarity = np.full(n, -np.inf if similarity is not None else 0.0, dtype=np.float32)
+    selected: List[int] = []
+    while len(selected) < k and available.any():
+        if similarity is not None and selected:
+            scores = lambda_ * relevance - (1.0 - lambda_) * max_similarity
+        else:
+            scores = relevance.copy()
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        if similarity is not None:
+            np.maximum(max_similarity, similarity[best], out=max_similarity)
+        if group_ids is not None and group_ids[best] >= 0:
+            group_counts[group_ids[best]] += 1
+            if group_counts[group_ids[best]] >= max_per_group:
+                available &= group_ids != group_ids[best]
+    return selected
+
+
+def mmr_rerank(items: List[Dict[str, Any]],
+               k: int,
+               relevance_key: str = "similarity",
+               vector_key: str = "embedding",
+               lambda_: float = DEFAULT_MMR_LAMBDA,
+               group_key: Optional[str] = "book_title",
+               max_per_group: Optional[int] = DEFAULT_MAX_PER_BOOK) -> List[Dict[str, Any]]:
+    """
+    dict 후보 목록을 MMR 순서로 k개 선택 (임베딩이 없는 후보는 0 벡터로 취급)
+    """
+    if not items:
+        return []
+    vectors = None
+    dims = {len(item[vector_key]) for item in items if item.get(vector_key) is not None}
+    if len(dims) == 1:
+        dim = dims.pop()
+        vectors = np.zeros((len(items), dim), dtype=np.float32)
+        for i, item in enumerate(items):
+            if item.get(vector_key) is not None:
+                vectors[i] = np.asarray(item[vector_key], dtype=np.float32)
+    order = mmr_select(
+        [item[relevance_key] for item in items],
+        vectors,
+        k,
+        lambda_=lambda_,
+        group_keys=[item.get(group_key) for item in items] if group_key else None,
+        max_per_group=max_per_group if group_key else None,
+    )
+    return [items[i] for i in order]
@@ -0,0 +1,173 @@
+"""
+검색 결과 캐시 (쿼리 + 검색 조건 → 순위가 매겨진 섹션 ID)
+
+- 키: 쿼리 텍스트 해시(공백 정규화) 또는 양자화한 쿼리 벡터 해시 + 필터/top_k/임계값 등 검색 조건
+- 값: [(section_id, 거리), ...] 순위 목록 → 히트면 임베딩 API 호출과 벡터 검색을 모두 건너뛰고
+  섹션 본문만 ID로 조회
+- 무효화: 수집/삭제 트랜잭션이 rag_corpus_version.version을 올림(section_store.bump_corpus_version)
+  → 버전이 바뀌면 캐시 전체를 비움. 버전 조회는 version_ttl초에 한 번만 하므로
+  수집 직후 최대 version_ttl초 동안은 이전 결과가 나올 수 있음
+- 프로세스 메모리 LRU (워커마다 따로 가짐), 버전을 읽을 수 없으면 캐시를 쓰지 않음
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .logger import rag_logger
+from .vector_db.section_store import CORPUS_VERSION_TABLE
+
+logger = rag_logger
+
+# 기본 최대 항목 수 / 코퍼스 버전 재조회 간격(초)
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_VERSION_TTL = 5.0
+
+# 쿼리 벡터 양자화 단위 (소수 둘째 자리, 거의 같은 벡터는 같은 키)
+VECTOR_DECIMALS = 2
+
+_WHITESPACE = re.compile(r"\s+")
+
+RankedSections = List[Tuple[str, float]]
+
+
+def text_key(text: str) -> str:
+    """쿼리 텍스트 키 (앞뒤/연속 공백 차이는 무시)"""
+    normalized = _WHITESPACE.sub(" ", (text or "").strip())
+    return "t:" + hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def vector_key(vector: Sequence[float], decimals: int = VECTOR_DECIMALS) -> str:
+    """쿼리 벡터 키 (정규화 후 decimals 자리로 반올림한 값의 해시)"""
+    v = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(v)
+    if norm > 0:
+        v = v / norm
+    quantized = np.round(v * 10 ** decimals).astype(np.int16)
+    return "v:" + hashlib.sha256(quantized.tobytes()).hexdigest()
+
+
+def read_corpus_version(conn) -> int:
+    """psycopg2 연결로 현재 코퍼스 버전 조회 (행이 없으면 0)"""
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT version FROM {CORPUS_VERSION_TABLE} WHERE id = 1")
+        row = cur.fetchone()
+    return int(row[0]) if row else 0
+
+
+class RetrievalCache:
+    """코퍼스 버전으로 무효화되는 LRU 검색 결과 캐시 (스레드 안전)"""
+
+    def __init__(self,
+                 load_version: Callable[[], int],
+                 max_entries: int = DEFAULT_CACHE_SIZE,
+                 version_ttl: float = DEFAULT_VERSION_TTL,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            load_version: 현재 코퍼스 버전을 읽는 함수
+            max_entries: 최대 항목 수 (0이면 캐시 끔)
+            version_ttl: 버전 재조회 간격(초)
+        """
+        self.load_version = load_version
+        self.max_entries = max_entries
+        self.version_ttl = version_ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[tuple, RankedSections]" = OrderedDict()
+        self._version: Optional[int] = None
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def key(self, query_key: str, *conditions: Any) -> tuple:
+        """캐시 키 (query_key는 text_key/vector_key 결과, conditions는 필터/top_k/임계값 등 검색 조건)"""
+        return (query_key,) + tuple(conditions)
+
+    def current_version(self) -> Optional[int]:
+        """TTL 안이면 마지막으로 읽은 버전, 아니면 다시 읽음 (바뀌었으면 캐시 비움, 실패하면 None)"""
+        now = self.clock()
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.version_ttl:
+                return self._version
+        try:
+            version = int(self.load_version())
+        except Exception as e:
+            logger.warning(f"코퍼스 버전 조회 실패, 검색 캐시를 사용하지 않습니다: {str(e)}")
+            version = None
+        with self._lock:
+            if version != self._version:
+                if self._entries:
+                    logger.info(f"코퍼스 버전 변경({self._version} → {version}): 검색 캐시 {len(self._entries)}개 비움")
+                self._entries.clear()
+                self._version = version
+            self._checked_at = now
+        return version
+
+    def get(self, key: tuple) -> Optional[RankedSections]:
+        """캐시된 순위 목록 (없거나 버전이 바뀌었으면 None)"""
+        if not self.enabled or self.current_version() is None:
+            return None
+        with self._lock:
+            ranked = self._entries.get(key)
+            if ranked is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(ranked)
+
+    def put(self, key: tuple, ranked: RankedSections, version: Optional[int] = None) -> None:
+        """
+        순위 목록 저장
+        version: 검색 전에 읽은 버전 (검색 도중 버전이 바뀌었으면 저장하지 않음)
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._version is None or (version is not None and version != self._version):
+                return
+            self._entries[key] = list(ranked)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._checked_at = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _load_version_from_engine() -> int:
+    from contextlib import closing
+    from app.core.database import engine
+
+    with closing(engine.raw_connection()) as conn:
+        return read_corpus_version(conn)
+
+
+@lru_cache(maxsize=None)
+def get_retrieval_cache() -> RetrievalCache:
+    """
+    프로세스 단위 검색 캐시 싱글턴
+    - RAG_CACHE_SIZE: 최대 항목 수 (기본 1024, 0이면 끔)
+    - RAG_CACHE_VERSION_TTL: 코퍼스 버전 재조회 간격(초, 기본 5)
+    """
+    return RetrievalCache(
+        _load_version_from_engine,
+        max_entries=int(os.getenv("RAG_CACHE_SIZE") or DEFAULT_CACHE_SIZE),
+        version_ttl=float(os.getenv("RAG_CACHE_VERSION_TTL") or DEFAULT_VERSION_TTL),
+    )
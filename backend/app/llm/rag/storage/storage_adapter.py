@@ -3,13 +3,17 @@
 GCP 스토리지 및 기타 소스에서 문서를 가져오기 위한 확장 가능한 시스템
 """
 import os
+import shutil
 import tempfile
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 import logging
 from urllib.parse import urlparse
 
+from app.utils.download_cache import DownloadCache, fetch_gcs_blobs, gcs_cache_key, get_download_cache, link_or_copy
+
 # 로깅 모듈 가져오기
 from ..logger import rag_logger
 
@@ -61,6 +65,33 @@ class StorageAdapter(ABC):
             파일 존재 여부
         """
         pass
+    
+    def download_prefix(self, 
+                        source_path: str, 
+                        destination_dir: str, 
+                        extensions: Optional[Tuple[str, ...]] = None,
+                        max_workers: int = 8) -> List[str]:
+        """
+        source_path 아래 파일들을 상대 경로를 유지해 destination_dir로 병렬 다운로드합니다.
+        
+        Args:
+            source_path: 소스 디렉토리/접두사
+            destination_dir: 다운로드할 로컬 디렉토리
+            extensions: 포함할 확장자 (선택사항, 소문자)
+            max_workers: 동시 다운로드 수
+            
+        Returns:
+            다운로드된 로컬 파일 경로 목록
+        """
+        identifiers = [
+            identifier for identifier in self.list_files(source_path)
+            if extensions is None or identifier.lower().endswith(extensions)
+        ]
+        destinations = [
+            os.path.join(destination_dir, os.path.relpath(identifier, source_path)) for identifier in identifiers
+        ]
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            return list(pool.map(self.download_file, identifiers, destinations))
 
 
 class LocalStorageAdapter(StorageAdapter):
@@ -68,6 +99,13 @@ class LocalStorageAdapter(StorageAdapter):
     로컬 파일 시스템을 위한 스토리지 어댑터
     """
     
+    def __init__(self, cache: Optional[DownloadCache] = None):
+        """
+        Args:
+            cache: 다운로드 캐시 (선택사항, 키는 경로 + 수정 시각 + 크기, 테스트에서 GCP 캐시 동작 검증용)
+        """
+        self.cache = cache
+    
     def download_file(self, source_identifier: str, destination_path: str) -> str:
         """
         로컬 파일을 지정된 경로로 복사합니다.
@@ -81,8 +119,15 @@ class LocalStorageAdapter(StorageAdapter):
         # 디렉토리 생성
         dest_path.parent.mkdir(parents=True, exist_ok=True)
         
+        if self.cache is not None:
+            stat = source_path.stat()
+            key = ("file", str(source_path.resolve()), stat.st_mtime_ns, stat.st_size)
+            cached = self.cache.fetch(key, lambda temp_path: shutil.copy2(str(source_path), temp_path), source_path.suffix)
+            link_or_copy(cached, str(dest_path))
+            logger.info(f"로컬 파일 복사 완료(캐시 경유): {source_identifier} -> {destination_path}")
+            return str(dest_path)
+        
         # 파일 복사
-        import shutil
         shutil.copy2(str(source_path), str(dest_path))
         
         logger.info(f"로컬 파일 복사 완료: {source_identifier} -> {destination_path}")
@@ -112,15 +157,17 @@ class GCPStorageAdapter(StorageAdapter):
     GCP 스토리지용 스토리지 어댑터
     """
     
-    def __init__(self, bucket_name: str = None, credentials_path: str = None):
+    def __init__(self, bucket_name: str = None, credentials_path: str = None, cache: Optional[DownloadCache] = None):
         """
         GCP 스토리지 어댑터 초기화
         
         Args:
             bucket_name: GCP 버킷 이름
             credentials_path: 서비스 계정 키 파일 경로 (선택사항)
+            cache: 다운로드 캐시 (선택사항, 기본값은 프로세스 공용 캐시)
         """
         self.bucket_name = bucket_name
+        self.cache = cache or get_download_cache()
         
         try:
             from google.cloud import storage
@@ -155,17 +202,20 @@ class GCPStorageAdapter(StorageAdapter):
         
         try:
             bucket = self._storage_client.bucket(bucket_name)
-            blob = bucket.blob(blob_name)
-            
-            # 다운로드 디렉토리 생성
-            dest_path = Path(destination_path)
-            dest_path.parent.mkdir(parents=True, exist_ok=True)
+            # 현재 generation 조회 (같은 generation은 캐시에서 재사용)
+            blob = bucket.get_blob(blob_name)
+            if blob is None:
+                raise FileNotFoundError(f"GCP 스토리지에 파일이 존재하지 않습니다: {source_identifier}")
             
-            # 파일 다운로드
-            blob.download_to_filename(str(dest_path))
+            cached = self.cache.fetch(
+                gcs_cache_key(bucket_name, blob_name, blob.generation),
+                lambda temp_path: bucket.blob(blob_name, generation=blob.generation).download_to_filename(temp_path),
+                Path(blob_name).suffix
+            )
+            dest_path = link_or_copy(cached, destination_path)
             
-            logger.info(f"GCP 스토리지에서 파일 다운로드 완료: {source_identifier} -> {destination_path}")
-            return str(dest_path)
+            logger.info(f"GCP 스토리지에서 파일 다운로드 완료(캐시 경유): {source_identifier} -> {destination_path}")
+            return dest_path
         except Exception as e:
             logger.error(f"GCP 스토리지에서 파일 다운로드 실패 {source_identifier}: {str(e)}")
             raise
@@ -195,6 +245,35 @@ class GCPStorageAdapter(StorageAdapter):
             logger.error(f"GCP 스토리지에서 파일 목록 가져오기 실패 {source_path}: {str(e)}")
             raise
     
+    def download_prefix(self, 
+                        source_path: str, 
+                        destination_dir: str, 
+                        extensions: Optional[Tuple[str, ...]] = None,
+                        max_workers: int = 8) -> List[str]:
+        """
+        접두사 아래 객체들을 상대 경로를 유지해 내려받습니다.
+        캐시에 없는 객체만 transfer manager로 병렬 다운로드합니다.
+        """
+        if self.bucket_name is None:
+            raise ValueError("버킷 이름이 지정되지 않았습니다.")
+        
+        prefix = source_path.lstrip('/')
+        blobs = [
+            blob for blob in self._storage_client.list_blobs(self.bucket_name, prefix=prefix or None)
+            if not blob.name.endswith('/') and (extensions is None or blob.name.lower().endswith(extensions))
+        ]
+        destinations = [os.path.join(destination_dir, blob.name[len(prefix):].lstrip('/')) for blob in blobs]
+        
+        hits = self.cache.hits
+        paths = fetch_gcs_blobs(
+            self._storage_client.bucket(self.bucket_name), blobs, destinations, self.cache, max_workers=max_workers
+        )
+        logger.info(
+            f"GCP 스토리지 접두사 다운로드 완료: gs://{self.bucket_name}/{prefix}, "
+            f"{len(paths)}개 파일 (캐시 {self.cache.hits - hits}개)"
+        )
+        return paths
+    
     def file_exists(self, source_identifier: str) -> bool:
         """
         GCP 스토리지에 파일이 존재하는지 확인합니다.
@@ -0,0 +1,250 @@
+"""
+스트리밍 수집 파이프라인
+
+추출/청킹 → 임베딩 → 저장 3단계를 스레드로 분리하고 단계 사이를 크기 제한 큐로 연결합니다.
+- 로더는 페이지/섹션 단위로 지연 로드, 청커는 청크를 점진적으로 생성
+- 추출(CPU)이 끝나기 전에 임베딩(네트워크)과 저장(DB)이 시작됨
+- 큐 크기가 제한되어 있어 책 크기와 무관하게 메모리 사용량이 일정함
+- PDF는 반복 머리말/꼬리말을 제거하고, 근사 중복 청크는 임베딩 전에 제외
+  (공유 색인에는 저장이 커밋된 청크만 등록 → 실패한 수집을 재시도해도 청크가 빠지지 않음)
+"""
+import itertools
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from uuid import UUID
+
+from .chunkers.near_dedup import NearDuplicateIndex, RepeatedLineStripper
+from .logger import rag_logger
+
+logger = rag_logger
+
+# 임베딩 API 1회 호출당 청크 수 / 단계 사이 큐에 대기 가능한 배치 수
+DEFAULT_EMBED_BATCH_SIZE = int(os.getenv("RAG_INGEST_BATCH_SIZE", "64"))
+DEFAULT_QUEUE_SIZE = int(os.getenv("RAG_INGEST_QUEUE_SIZE", "4"))
+
+# 반복 머리말/꼬리말을 학습할 앞쪽 페이지 수 (이후 페이지는 학습 결과로 바로 제거)
+HEADER_SAMPLE_PAGES = 32
+
+_DONE = object()
+_QUEUE_POLL_TIMEOUT = 0.1
+
+
+class _StageError:
+    """상위 단계에서 발생한 예외를 하위 단계로 전달하기 위한 래퍼"""
+    def __init__(self, exception: BaseException):
+        self.exception = exception
+
+
+def iter_batches(items: Iterable[Any], batch_size: int) -> Iterator[List[Any]]:
+    """이터러블을 batch_size 단위 리스트로 묶습니다."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class StreamingIngestPipeline:
+    """
+    추출/청킹 → 임베딩 → 저장 단계를 겹쳐 실행하는 수집 파이프라인
+    """
+
+    def __init__(self,
+                 document_loader,
+                 chunker_factory,
+                 embedding_service,
+                 vector_db_manager,
+                 batch_size: int = DEFAULT_EMBED_BATCH_SIZE,
+                 queue_size: int = DEFAULT_QUEUE_SIZE,
+                 dedup_index: Optional[NearDuplicateIndex] = None,
+                 strip_headers: bool = True):
+        """
+        Args:
+            document_loader: iter_documents()를 제공하는 DocumentLoader
+            chunker_factory: iter_chunks()를 제공하는 ChunkerFactory
+            embedding_service: create_embeddings_batch()를 제공하는 EmbeddingService
+            vector_db_manager: store_embeddings_batch()를 제공하는 VectorDBManager
+            batch_size: 임베딩/저장 배치 크기
+            queue_size: 단계 사이 큐의 최대 배치 수
+            dedup_index: 근사 중복 색인 (여러 파일에 같은 색인을 쓰면 코퍼스 전체에서 중복 제외, None = 사용 안 함)
+                         저장이 끝난 청크만 등록하며, 같은 파일에서 등록된 청크와의 일치는 무시 (재수집 허용)
+            strip_headers: PDF 페이지의 반복 머리말/꼬리말 제거 여부
+        """
+        self.document_loader = document_loader
+        self.chunker_factory = chunker_factory
+        self.embedding_service = embedding_service
+        self.vector_db_manager = vector_db_manager
+        self.batch_size = max(1, batch_size)
+        self.queue_size = max(1, queue_size)
+        self.dedup_index = dedup_index
+        self.strip_headers = strip_headers
+        self._dedup_lock = threading.Lock()
+
+    def run(self,
+            source_path: str,
+            file_format: str,
+            chunk_kwargs: Optional[Dict[str, Any]] = None,
+            book_id: Optional[UUID] = None,
+            book_title: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        파일을 스트리밍으로 로드/청킹/임베딩/저장합니다.
+
+        Args:
+            source_path: 소스 파일 경로
+            file_format: 파일 확장자 (예: '.pdf')
+            chunk_kwargs: 청킹 전략에 전달할 추가 인자 (선택사항)
+            book_id: 저장할 청크의 책 ID (선택사항, 재수집 시 이 ID로 이전 청크를 정리)
+            book_title: 저장할 청크의 책 제목 (선택사항)
+
+        Returns:
+            청크별 처리 결과 ({'chunk', 'embedding_id', 'status'}) 리스트
+        """
+        chunk_kwargs = chunk_kwargs or {}
+        started = time.perf_counter()
+        stop = threading.Event()
+        chunk_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        embed_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        stats = {"duplicates": 0}
+
+        def produce_chunks() -> None:
+            try:
+                documents = self.document_loader.iter_documents(source_path)
+                if self.strip_headers and file_format == '.pdf':
+                    documents = self._strip_repeated_lines(documents)
+                chunks = self.chunker_factory.iter_chunks(
+                    documents, file_format=file_format, source=source_path, **chunk_kwargs
+                )
+                if self.dedup_index is not None:
+                    chunks = self._drop_near_duplicates(chunks, source_path, stats, NearDuplicateIndex(
+                        threshold=self.dedup_index.threshold
+                    ))
+                for batch in iter_batches(chunks, self.batch_size):
+                    if not self._put(chunk_queue, batch, stop):
+                        return
+                self._put(chunk_queue, _DONE, stop)
+            except BaseException as e:
+                self._put(chunk_queue, _StageError(e), stop)
+
+        def embed_chunks() -> None:
+            while True:
+                batch = self._get(chunk_queue, stop)
+                if batch is None:
+                    return
+                if batch is _DONE or isinstance(batch, _StageError):
+                    self._put(embed_queue, batch, stop)
+                    return
+                try:
+                    embeddings = self.embedding_service.create_embeddings_batch(
+                        [chunk.content for chunk in batch]
+                    )
+                except BaseException as e:
+                    self._put(embed_queue, _StageError(e), stop)
+                    return
+                if not self._put(embed_queue, (batch, embeddings), stop):
+                    return
+
+        workers = [
+            threading.Thread(target=produce_chunks, name="rag-ingest-chunk", daemon=True),
+            threading.Thread(target=embed_chunks, name="rag-ingest-embed", daemon=True),
+        ]
+        for worker in workers:
+            worker.start()
+
+        results = []
+        try:
+            # 저장 단계는 호출 스레드에서 실행 (DB 세션을 호출 측과 같은 스레드에서 사용)
+            while True:
+                item = embed_queue.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, _StageError):
+                    raise item.exception
+
+                batch, embeddings = item
+                contents = [chunk.content for chunk in batch]
+                record_ids = self.vector_db_manager.store_embeddings_batch(
+                    embed_texts=contents,
+                    embeddings=embeddings,
+                    full_texts=contents,
+                    book_ids=[book_id] * len(batch) if book_id is not None else None,
+                    book_titles=[book_title] * len(batch) if book_title is not None else None
+                )
+                if self.dedup_index is not None:
+                    # 커밋된 청크만 공유 색인에 등록
+                    with self._dedup_lock:
+                        for chunk in batch:
+                            self.dedup_index.add((source_path, chunk.start), chunk.content)
+                results.extend(
+                    {'chunk': chunk, 'embedding_id': record_id, 'status': 'success'}
+                    for chunk, record_id in zip(batch, record_ids)
+                )
+                logger.info(f"스트리밍 수집 진행: {len(results)}개 청크 저장됨")
+        finally:
+            stop.set()
+            for worker in workers:
+                worker.join()
+
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"스트리밍 수집 완료: {source_path}, {len(results)}개 청크 (근사 중복 {stats['duplicates']}개 제외), {elapsed:.2f}초 "
+            f"(batch_size={self.batch_size}, queue_size={self.queue_size})"
+        )
+        return results
+
+    def _strip_repeated_lines(self, documents: Iterator[Any]) -> Iterator[Any]:
+        """앞쪽 HEADER_SAMPLE_PAGES쪽으로 반복 머리말/꼬리말을 학습해 모든 페이지에서 제거"""
+        sample = list(itertools.islice(documents, HEADER_SAMPLE_PAGES))
+        stripper = RepeatedLineStripper.learn([document.content for document in sample])
+        for document in itertools.chain(sample, documents):
+            document.content = stripper.strip(document.content)
+            yield document
+
+    def _drop_near_duplicates(self,
+                              chunks: Iterable[Any],
+                              source_path: str,
+                              stats: Dict[str, int],
+                              run_index: NearDuplicateIndex) -> Iterator[Any]:
+        """
+        근사 중복 청크 제외 (키는 (파일 경로, 시작 오프셋))
+        - 공유 색인: 다른 파일에서 저장된 청크와 비교만 함 (등록은 저장 단계에서)
+        - run_index: 이번 수집에서 앞서 나온 청크와 비교 (파일 안 중복)
+        """
+        for chunk in chunks:
+            with self._dedup_lock:
+                duplicate_of = self.dedup_index.find(chunk.content)
+            if duplicate_of is not None and duplicate_of[0] == source_path:
+                duplicate_of = None
+            if duplicate_of is None:
+                duplicate_of = run_index.find_or_add((source_path, chunk.start), chunk.content)
+            if duplicate_of is not None:
+                stats["duplicates"] += 1
+                logger.debug(f"근사 중복 청크 제외: {source_path}@{chunk.start} ≈ {duplicate_of[0]}@{duplicate_of[1]}")
+                continue
+            yield chunk
+
+    @staticmethod
+    def _put(target: queue.Queue, item: Any, stop: threading.Event) -> bool:
+        """큐가 가득 차면 대기하되, 하위 단계가 중단되면 포기합니다."""
+        while not stop.is_set():
+            try:
+                target.put(item, timeout=_QUEUE_POLL_TIMEOUT)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    @staticmethod
+    def _get(source: queue.Queue, stop: threading.Event) -> Any:
+        """큐에서 항목을 꺼내되, 파이프라인이 중단되면 None을 반환합니다."""
+        while not stop.is_set():
+            try:
+                return source.get(timeout=_QUEUE_POLL_TIMEOUT)
+            except queue.Empty:
+                continue
+        return None
@@ -0,0 +1,150 @@
+"""
+토큰 계산 유틸리티 (tiktoken 호환)
+
+- 모델별 인코더는 프로세스 단위로 캐시
+- 청커는 token_offsets()로 원문을 한 번만 토큰화해 문자 위치 ↔ 토큰 수를 환산
+- 임베딩 서비스는 fit()으로 토큰 기준 자르기, pack_by_tokens()로 요청 단위 묶음 계산
+- tiktoken이나 BPE 파일을 쓸 수 없으면 UTF-8 2바이트 = 1토큰의 보수적 근사 사용
+  (한글은 실제보다 약간 많게, ASCII는 2배 가량 많게 계산되어 제한을 넘지 않음)
+"""
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+
+try:
+    from .logger import rag_logger
+except ImportError:  # 클라우드 함수(toc_trigger)에서는 같은 디렉토리 기준으로 로드
+    from rag.logger import rag_logger
+
+logger = rag_logger
+
+DEFAULT_EMBEDDING_MODEL = "text-embedding-3-small"
+FALLBACK_ENCODING = "cl100k_base"
+
+# OpenAI 임베딩 API 제한: 입력 1개당 최대 토큰 / 요청 1회당 토큰 합계·입력 수
+EMBEDDING_MAX_INPUT_TOKENS = 8191
+EMBEDDING_MAX_REQUEST_TOKENS = 300_000
+EMBEDDING_MAX_REQUEST_INPUTS = 2048
+
+_APPROX_BYTES_PER_TOKEN = 2
+
+
+class TokenCounter:
+    """
+    tiktoken 인코딩을 감싼 토큰 계산기
+    encoding이 None이면 UTF-8 바이트 기반 근사를 사용합니다.
+    """
+
+    def __init__(self, encoding=None):
+        self.encoding = encoding
+
+    def count(self, text: str) -> int:
+        """텍스트의 토큰 수"""
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return -(-len(text.encode("utf-8")) // _APPROX_BYTES_PER_TOKEN)
+
+    def token_offsets(self, text: str) -> List[int]:
+        """
+        각 토큰이 시작하는 문자 오프셋 (오름차순)
+        토큰 경계가 한 글자 안에 걸치면 그 글자의 오프셋을 사용합니다.
+        """
+        if self.encoding is not None:
+            tokens = self.encoding.encode(text, disallowed_special=())
+            return self.encoding.decode_with_offsets(tokens)[1]
+
+        offsets = []
+        byte_pos = 0
+        for i, ch in enumerate(text):
+            width = 1 if ch < "\x80" else len(ch.encode("utf-8"))
+            # [byte_pos, byte_pos + width) 안에서 시작하는 근사 토큰 수
+            first = -(-byte_pos // _APPROX_BYTES_PER_TOKEN)
+            last = -(-(byte_pos + width) // _APPROX_BYTES_PER_TOKEN)
+            offsets.extend([i] * (last - first))
+            byte_pos += width
+        return offsets
+
+    def fit(self, text: str, max_tokens: int) -> Tuple[str, int]:
+        """
+        max_tokens 이하가 되도록 텍스트 끝을 자릅니다.
+
+        Returns:
+            (잘린 텍스트, 토큰 수)
+        """
+        if self.encoding is not None:
+            tokens = self.encoding.encode(text, disallowed_special=())
+            if len(tokens) <= max_tokens:
+                return text, len(tokens)
+            # 글자 중간에서 잘리지 않도록 토큰 시작 오프셋 기준으로 자름
+            # (BPE 특성상 잘린 앞부분을 다시 토큰화하면 드물게 늘어날 수 있어 한도 이내가 될 때까지 줄임)
+            offsets = self.encoding.decode_with_offsets(tokens[:max_tokens + 1])[1]
+            budget = max_tokens
+            while True:
+                truncated = text[:offsets[budget]]
+                count = self.count(truncated)
+                if count <= max_tokens:
+                    return truncated, count
+                budget -= count - max_tokens
+
+        count = self.count(text)
+        if count <= max_tokens:
+            return text, count
+        offsets = self.token_offsets(text)
+        text = text[:offsets[max_tokens]]
+        return text, self.count(text)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """max_tokens 이하로 자른 텍스트"""
+        return self.fit(text, max_tokens)[0]
+
+
+@lru_cache(maxsize=None)
+def get_token_counter(model_name: str = DEFAULT_EMBEDDING_MODEL) -> TokenCounter:
+    """
+    모델별 TokenCounter 싱글턴
+    - 모델 이름을 모르면 cl100k_base, 인코더를 불러올 수 없으면 근사 모드
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        logger.warning("tiktoken이 없어 근사 토큰 계산을 사용합니다. 'pip install tiktoken'으로 설치하세요.")
+        return TokenCounter()
+
+    try:
+        try:
+            encoding = tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            encoding = tiktoken.get_encoding(FALLBACK_ENCODING)
+    except Exception as e:
+        logger.warning(f"tiktoken 인코더 로드 실패({model_name}), 근사 토큰 계산을 사용합니다: {str(e)}")
+        return TokenCounter()
+
+    logger.info(f"토큰 인코더 로드 완료: {model_name} ({encoding.name})")
+    return TokenCounter(encoding)
+
+
+def pack_by_tokens(token_counts: Sequence[int],
+                   max_tokens: int = EMBEDDING_MAX_REQUEST_TOKENS,
+                   max_inputs: int = EMBEDDING_MAX_REQUEST_INPUTS) -> List[Tuple[int, int]]:
+    """
+    입력 순서를 유지한 채 요청당 토큰 합계/입력 수 한도까지 채운 [start, end) 인덱스 범위
+
+    Args:
+        token_counts: 입력별 토큰 수
+        max_tokens: 요청 1회당 최대 토큰 합계
+        max_inputs: 요청 1회당 최대 입력 수
+
+    Returns:
+        요청별 (start, end) 인덱스 범위 리스트
+    """
+    ranges = []
+    start = 0
+    total = 0
+    for i, count in enumerate(token_counts):
+        if i > start and (total + count > max_tokens or i - start >= max_inputs):
+            ranges.append((start, i))
+            start = i
+            total = 0
+        total += count
+    if start < len(token_counts):
+        ranges.append((start, len(token_counts)))
+    return ranges
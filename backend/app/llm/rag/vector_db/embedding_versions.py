@@ -0,0 +1,120 @@
+"""
+임베딩 버전 관리 (모델 + 차원 + 저장 형식 → ideal_answer 컬럼)
+
+같은 테이블 안의 벡터는 같은 모델/차원으로 만들어야 비교할 수 있으므로
+임베딩을 버전별 컬럼에 저장하고, 검색은 활성 버전(RAG_EMBEDDING_VERSION)의 컬럼만 사용합니다.
+- v1: text-embedding-3-small 1536차원 vector (기존 embedding 컬럼)
+- v2: text-embedding-3-small 512차원 halfvec (embedding_v2, 인덱스/메모리 약 1/6)
+수집 경로는 v1 임베딩에서 잘라 만들 수 있는 버전 컬럼(v2)을 함께 채우고(version_columns),
+기존 행의 새 버전 컬럼은 embedding_backfill로 채운 뒤 RAG_EMBEDDING_VERSION을 바꿔 전환합니다.
+"""
+import os
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+DEFAULT_EMBEDDING_MODEL = "text-embedding-3-small"
+
+# 출력 차원을 줄여 요청할 수 있는(앞부분 절단과 같은) 모델
+MATRYOSHKA_MODELS = ("text-embedding-3-small", "text-embedding-3-large")
+
+
+class EmbeddingVersion(NamedTuple):
+    """임베딩 버전 정의"""
+    name: str
+    model: str
+    dimensions: int
+    storage: str  # "vector"(float32) / "halfvec"(float16)
+    column: str
+
+    @property
+    def sql_type(self) -> str:
+        """SQL 캐스트용 타입 (예: halfvec(512))"""
+        return f"{self.storage}({self.dimensions})"
+
+    @property
+    def ops(self) -> str:
+        """코사인 거리 인덱스 연산자 클래스"""
+        return f"{self.storage}_cosine_ops"
+
+    def request_kwargs(self) -> Dict[str, Any]:
+        """임베딩 API 요청 인자 (모델 기본 차원이 아니면 dimensions로 축소 요청)"""
+        kwargs: Dict[str, Any] = {"model": self.model}
+        if self.dimensions != MODEL_DIMENSIONS.get(self.model):
+            kwargs["dimensions"] = self.dimensions
+        return kwargs
+
+    def to_array(self, embedding) -> np.ndarray:
+        """임베딩 → 저장/검색용 float32 배열 (halfvec도 전송은 float32, DB 캐스트에서 반정밀도로 변환)"""
+        vector = np.asarray(embedding, dtype=np.float32)
+        if vector.shape != (self.dimensions,):
+            raise ValueError(f"{self.name} 임베딩 차원 불일치: {vector.shape} != ({self.dimensions},)")
+        return vector
+
+
+# 모델 기본 차원
+MODEL_DIMENSIONS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+
+EMBEDDING_VERSIONS: Dict[str, EmbeddingVersion] = {
+    version.name: version for version in (
+        EmbeddingVersion("v1", DEFAULT_EMBEDDING_MODEL, 1536, "vector", "embedding"),
+        EmbeddingVersion("v2", DEFAULT_EMBEDDING_MODEL, 512, "halfvec", "embedding_v2"),
+    )
+}
+
+
+def get_embedding_version(name: Optional[str] = None) -> EmbeddingVersion:
+    """이름의 임베딩 버전 (없으면 RAG_EMBEDDING_VERSION, 기본 v1)"""
+    name = name or os.getenv("RAG_EMBEDDING_VERSION", "v1")
+    try:
+        return EMBEDDING_VERSIONS[name]
+    except KeyError:
+        raise ValueError(f"알 수 없는 임베딩 버전: {name} (가능: {', '.join(EMBEDDING_VERSIONS)})") from None
+
+
+def can_derive(source: EmbeddingVersion, target: EmbeddingVersion) -> bool:
+    """source 컬럼을 잘라 target 컬럼을 만들 수 있는지 (같은 text-embedding-3 모델, 차원 축소)"""
+    return (
+        source.model == target.model
+        and source.model in MATRYOSHKA_MODELS
+        and target.dimensions <= source.dimensions
+    )
+
+
+def derive_embedding(embedding, target: EmbeddingVersion) -> np.ndarray:
+    """임베딩 앞 target.dimensions개 성분을 잘라 정규화 (같은 모델에 dimensions를 요청한 결과와 같음)"""
+    vector = np.asarray(embedding, dtype=np.float32)[:target.dimensions]
+    norm = np.linalg.norm(vector)
+    return target.to_array(vector / norm if norm else vector)
+
+
+def version_columns(embedding, source: Optional[EmbeddingVersion] = None) -> Dict[str, np.ndarray]:
+    """
+    source(기본 v1) 임베딩으로 채울 수 있는 모든 버전 컬럼 값 {컬럼: 배열}
+    수집 시 이 값으로 저장하면 활성 버전이 v2여도 새 행이 검색에서 빠지지 않음
+    """
+    source = source or EMBEDDING_VERSIONS["v1"]
+    vector = source.to_array(embedding)
+    columns = {source.column: vector}
+    for version in EMBEDDING_VERSIONS.values():
+        if version.column not in columns and can_derive(source, version):
+            columns[version.column] = derive_embedding(vector, version)
+    return columns
+
+
+def embed_query(client, text: str, version: Optional[EmbeddingVersion] = None) -> np.ndarray:
+    """검색 쿼리를 버전의 모델/차원으로 임베딩"""
+    version = version or get_embedding_version()
+    response = client.embeddings.create(input=[text], **version.request_kwargs())
+    return version.to_array(response.data[0].embedding)
+
+
+def embed_texts(client, texts: List[str], version: Optional[EmbeddingVersion] = None) -> List[np.ndarray]:
+    """여러 텍스트를 한 번의 요청으로 임베딩 (호출 측이 요청 크기를 나눔)"""
+    version = version or get_embedding_version()
+    response = client.embeddings.create(input=texts, **version.request_kwargs())
+    return [version.to_array(data.embedding) for data in response.data]
@@ -0,0 +1,188 @@
+"""
+한국어 어휘 검색 + 벡터 검색 하이브리드 (Kiwi 형태소 → tsvector, 상호 순위 융합)
+
+- 수집 시 청크 텍스트를 Kiwi로 형태소 분석해 내용어(명사/동사·형용사 어간/어근/외국어/숫자)만
+  공백으로 이어 lexical_terms 컬럼에 저장 → DB가 to_tsvector('simple', lexical_terms)로 lexical_tsv 생성(GIN 인덱스)
+- 검색 시 쿼리도 같은 방식으로 형태소를 뽑아 OR tsquery를 만들고, 한 SQL 문 안에서
+  벡터 KNN 후보와 어휘 후보(ts_rank_cd 순)를 각각 뽑은 뒤 상호 순위 융합(RRF: Σ 1 / (k + 순위))으로 합칩니다
+- 어휘 후보가 기법 이름 같은 키워드 일치를 보완하므로 벡터 후보 수(top-k)를 줄여도 됩니다
+- kiwipiepy가 없으면 공백/구두점 기준 단어로 대신하지만, 수집과 검색이 같은 방식을 써야 일치합니다
+"""
+import re
+from typing import Iterable, List, Optional
+
+try:
+    from kiwipiepy import Kiwi
+except ImportError:  # pragma: no cover - 배포 환경에는 설치됨
+    Kiwi = None
+
+SEARCH_MODES = ("vector", "hybrid")
+
+# RRF 상수 (순위 1과 2의 점수 차이를 완만하게 하는 값, 일반적으로 60)
+RRF_K = 60
+
+# 하이브리드 기본 후보 수 (벡터/어휘 각각)
+HYBRID_VECTOR_K = 20
+HYBRID_LEXICAL_K = 20
+
+# 내용어 품사 (Kiwi 태그)
+_CONTENT_TAGS = ("NNG", "NNP", "NR", "XR", "SL", "SH", "SN", "VV", "VA")
+# 한 글자 용언 어간(하/되/있 등)은 거의 모든 문장에 나오므로 제외
+_STEM_TAGS = ("VV", "VA")
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+_kiwi = None
+
+
+def _get_kiwi():
+    global _kiwi
+    if _kiwi is None and Kiwi is not None:
+        _kiwi = Kiwi()
+    return _kiwi
+
+
+def _clean(form: str) -> str:
+    return _NON_WORD.sub("", form.lower())
+
+
+def extract_terms(text: str) -> List[str]:
+    """텍스트 → 내용어 목록 (등장 순서, 중복 유지)"""
+    if not text or not text.strip():
+        return []
+    kiwi = _get_kiwi()
+    if kiwi is None:
+        return [term for term in (_clean(word) for word in text.split()) if term]
+
+    terms = []
+    for token in kiwi.tokenize(text):
+        if not token.tag.startswith(_CONTENT_TAGS):
+            continue
+        term = _clean(token.form)
+        if not term or (token.tag.startswith(_STEM_TAGS) and len(term) < 2):
+            continue
+        terms.append(term)
+    return terms
+
+
+def lexical_terms(text: str) -> str:
+    """수집용: lexical_terms 컬럼 값 (내용어를 공백으로 연결)"""
+    return " ".join(extract_terms(text))
+
+
+def lexical_terms_batch(texts: Iterable[Optional[str]]) -> List[str]:
+    """여러 텍스트의 lexical_terms"""
+    return [lexical_terms(text or "") for text in texts]
+
+
+def tsquery_text(text: str) -> str:
+    """검색용: to_tsquery('simple', ...)에 넣을 OR 쿼리 (내용어가 없으면 빈 문자열 → 어휘 후보 없음)"""
+    return " | ".join(dict.fromkeys(extract_terms(text)))
+
+
+def validate_mode(mode: str) -> str:
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"지원하지 않는 검색 모드: {mode} (가능: {', '.join(SEARCH_MODES)})")
+    return mode
+
+
+def hybrid_candidates_sql(table: str, column: str, filter_sql: str = "TRUE") -> str:
+    """
+    하이브리드 후보 CTE (앞에 q(ord, v, tsq, ...) CTE가 있어야 함, psycopg2 이름 파라미터 사용)
+
+    q의 행(쿼리)마다 LATERAL로
+    - vec: {column} 코사인 거리 상위 %(vector_k)s개 중 거리 %(max_distance)s 이하
+    - lex: lexical_tsv @@ tsq 일치 행 중 ts_rank_cd 상위 %(lexical_k)s개
+    를 뽑고, fused(ord, snippet_id, rrf, distance)로 합칩니다. filter_sql은 t(청크), q(쿼리) 별칭을 쓸 수 있습니다.
+    """
+    return f"""
+          vec AS (
+            SELECT q.ord, c.snippet_id, c.distance,
+                   ROW_NUMBER() OVER (PARTITION BY q.ord ORDER BY c.distance, c.snippet_id) AS rank
+            FROM q
+            CROSS JOIN LATERAL (
+              SELECT t.snippet_id, (t.{column} <=> q.v) AS distance
+              FROM {table} t
+              WHERE ({filter_sql})
+              ORDER BY t.{column} <=> q.v
+              LIMIT %(vector_k)s
+            ) c
+            WHERE c.distance <= %(max_distance)s
+          ),
+          lex AS (
+            SELECT q.ord, c.snippet_id, c.distance,
+                   ROW_NUMBER() OVER (PARTITION BY q.ord ORDER BY c.score DESC, c.snippet_id) AS rank
+            FROM q
+            CROSS JOIN LATERAL (
+              SELECT t.snippet_id,
+                     ts_rank_cd(t.lexical_tsv, q.tsq) AS score,
+                     (t.{column} <=> q.v) AS distance
+              FROM {table} t
+              WHERE t.lexical_tsv @@ q.tsq AND ({filter_sql})
+              ORDER BY score DESC
+              LIMIT %(lexical_k)s
+            ) c
+          ),
+          fused AS (
+            SELECT ord, snippet_id, SUM(1.0 / (%(rrf_k)s + rank)) AS rrf, MIN(distance) AS distance
+            FROM (
+              SELECT ord, snippet_id, rank, distance FROM vec
+              UNION ALL
+              SELECT ord, snippet_id, rank, distance FROM lex
+            ) r
+            GROUP BY ord, snippet_id
+          )"""
+
+
+def hybrid_params(max_distance: float,
+                  vector_k: int = HYBRID_VECTOR_K,
+                  lexical_k: int = HYBRID_LEXICAL_K,
+                  rrf_k: int = RRF_K) -> dict:
+    """hybrid_candidates_sql 파라미터"""
+    return {"vector_k": vector_k, "lexical_k": lexical_k, "max_distance": max_distance, "rrf_k": rrf_k}
+
+
+def backfill_lexical_terms(conn, table: str = "ideal_answer", batch_size: int = 500) -> int:
+    """
+    lexical_terms가 비어 있는 기존 행을 snippet_id 키셋 배치로 채움 (배치마다 커밋)
+
+    Returns:
+        채운 행 수
+    """
+    import psycopg2.extras as extras
+
+    after, total = "00000000-0000-0000-0000-000000000000", 0
+    while True:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"SELECT snippet_id, COALESCE(NULLIF(embed_text, ''), full_text, '') FROM {table} "
+                f"WHERE lexical_terms IS NULL AND snippet_id > %s::uuid ORDER BY snippet_id LIMIT %s",
+                (after, batch_size)
+            )
+            rows = cur.fetchall()
+            if not rows:
+                break
+            terms = lexical_terms_batch(text for _, text in rows)
+            extras.execute_values(
+                cur,
+                f"UPDATE {table} t SET lexical_terms = v.terms "
+                f"FROM (VALUES %s) AS v(snippet_id, terms) WHERE t.snippet_id = v.snippet_id::uuid",
+                [(str(snippet_id), term) for (snippet_id, _), term in zip(rows, terms)],
+                page_size=len(rows)
+            )
+        conn.commit()
+        after, total = str(rows[-1][0]), total + len(rows)
+        print(f"🔤 lexical_terms 백필: 누적 {total}행")
+    return total
+
+
+if __name__ == "__main__":
+    # 실행: DATABASE_URL=postgresql://... python -m app.llm.rag.vector_db.lexical
+    import os
+    import psycopg2
+
+    connection = psycopg2.connect(os.environ["DATABASE_URL"].replace("postgresql+psycopg2://", "postgresql://"))
+    try:
+        backfill_lexical_terms(connection)
+    finally:
+        connection.close()
@@ -0,0 +1,512 @@
+"""
+프로세스 내 메모리 맵 벡터 인덱스 (pgvector 앞단의 저지연 검색 계층)
+
+ideal_answer 임베딩을 로컬 디렉토리에 스냅샷으로 저장하고, 검색은 행렬-벡터 곱 한 번으로 처리합니다.
+- 벡터는 L2 정규화 후 float32(또는 float16) 행렬로 저장 → 내적 = 코사인 유사도
+- 행별 snippet_id(16바이트), 생존 플래그(삭제 표시), 범주 비트(예: 상담 도서), 메타데이터(JSON lines) 오프셋을 함께 저장
+- 모든 파일을 np.memmap으로 열기 때문에 같은 디렉토리를 여는 워커 프로세스들은 OS 페이지 캐시를 공유
+- refresh()는 DB의 (snippet_id, xmin) 목록과 비교해 새 행만 덧붙이고 사라진 행은 삭제 표시,
+  제자리에서 수정된 행(xmin이 바뀐 행)은 삭제 표시 후 새 행으로 다시 덧붙임 (삭제가 많아지면 새 버전으로 재구축)
+- maybe_refresh(corpus_version=...)는 코퍼스 버전이 동기화 시점보다 새로우면 주기와 관계없이 동기화
+  (검색 캐시가 수집 전 순위를 새 버전으로 저장하지 않도록)
+- 쓰기는 디렉토리 잠금(flock)으로 한 프로세스만 수행하고, 다른 프로세스는 manifest 변경을 보고 다시 엽니다
+- 인덱스는 임베딩 컬럼 하나(기본: 활성 임베딩 버전의 컬럼)로 만들며, halfvec 컬럼은 vector로 캐스트해 읽습니다
+
+디렉토리 구조:
+    {index_dir}/manifest.json         현재 버전, 행 수, 차원, dtype, 임베딩 컬럼, 범주 이름, 동기화한 코퍼스 버전
+    {index_dir}/{version}/vectors.bin (n, dim) 정규화 벡터
+    {index_dir}/{version}/ids.bin     (n, 16) snippet_id 바이트
+    {index_dir}/{version}/alive.bin   (n,) 1=유효, 0=삭제됨
+    {index_dir}/{version}/cats.bin    (n,) 범주 비트
+    {index_dir}/{version}/marks.bin   (n,) 변경 표시 (DB 행의 xmin, 행이 수정되면 바뀜)
+    {index_dir}/{version}/meta.jsonl  행별 메타데이터
+    {index_dir}/{version}/offsets.bin (n, 2) meta.jsonl 안의 (시작, 길이)
+"""
+import fcntl
+import json
+import mmap
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Dict, Iterable, Iterator, List, Optional, Sequence
+from uuid import UUID
+
+import numpy as np
+
+from ..logger import rag_logger
+from .embedding_versions import get_embedding_version
+
+logger = rag_logger
+
+DEFAULT_INDEX_DIR = os.getenv("RAG_LOCAL_INDEX_DIR")
+DEFAULT_DTYPE = os.getenv("RAG_LOCAL_INDEX_DTYPE", "float32")
+DEFAULT_REFRESH_SECONDS = float(os.getenv("RAG_LOCAL_INDEX_REFRESH_SEC", "60"))
+
+# 삭제 표시된 행이 이 비율을 넘으면 새 버전으로 재구축
+COMPACT_DEAD_RATIO = 0.25
+
+# float16 행렬은 이 행 수씩 float32로 올려 곱함 (임시 메모리 상한)
+# float16은 메모리/디스크가 절반이지만 변환 비용 때문에 검색은 float32보다 느림
+BLOCK_ROWS = 1024
+
+# DB에서 새 행을 가져올 때 한 번에 조회할 snippet_id 수
+FETCH_BATCH_SIZE = 1000
+
+# 메타데이터로 저장할 ideal_answer 컬럼
+META_COLUMNS = ("section_id", "canonical_path", "book_title", "citation", "full_text")
+
+# 행 변경 표시: 행이 UPDATE될 때마다 바뀌는 시스템 컬럼 xmin (marks.bin에 저장해 동기화 때 비교)
+MARKER_SQL = "xmin::text::bigint"
+
+# 범주 이름 → 행 메타데이터 판별 함수 (비트 순서 = 정의 순서, 최대 8개)
+DEFAULT_CATEGORIES: Dict[str, Callable[[Dict[str, Any]], bool]] = {
+    # Feedback 노드의 상담 도서 조건(book_title LIKE '%상담%')과 동일
+    "counsel": lambda meta: "상담" in (meta.get("book_title") or ""),
+}
+
+class _Snapshot:
+    """한 시점의 인덱스 파일 뷰 (검색은 스냅샷 하나만 참조하므로 갱신 중에도 안전)"""
+
+    def __init__(self, directory: Path, count: int, dim: int, dtype: str):
+        self.directory = directory
+        self.count = count
+        self.dim = dim
+        if count:
+            self.vectors = np.memmap(directory / "vectors.bin", dtype=dtype, mode="r", shape=(count, dim))
+            self.ids = np.memmap(directory / "ids.bin", dtype=np.uint8, mode="r", shape=(count, 16))
+            self.alive = np.memmap(directory / "alive.bin", dtype=np.uint8, mode="r", shape=(count,))
+            self.cats = np.memmap(directory / "cats.bin", dtype=np.uint8, mode="r", shape=(count,))
+            if (directory / "marks.bin").exists():
+                self.marks = np.memmap(directory / "marks.bin", dtype=np.uint64, mode="r", shape=(count,))
+            else:
+                # 변경 표시 이전 형식: 다음 동기화에서 모든 행이 변경된 것으로 보고 재구축됨
+                self.marks = np.zeros(count, dtype=np.uint64)
+            self.offsets = np.memmap(directory / "offsets.bin", dtype=np.uint64, mode="r", shape=(count, 2))
+            with open(directory / "meta.jsonl", "rb") as f:
+                self.meta = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.vectors = np.empty((0, dim), dtype=dtype)
+            self.ids = np.empty((0, 16), dtype=np.uint8)
+            self.alive = self.cats = np.empty(0, dtype=np.uint8)
+            self.marks = np.empty(0, dtype=np.uint64)
+            self.offsets = np.empty((0, 2), dtype=np.uint64)
+            self.meta = b""
+
+    def read_meta(self, row: int) -> Dict[str, Any]:
+        start, length = (int(v) for v in self.offsets[row])
+        return json.loads(self.meta[start:start + length])
+
+
+class LocalVectorIndex:
+    """메모리 맵 벡터 인덱스"""
+
+    def __init__(self,
+                 index_dir: str,
+                 dtype: str = DEFAULT_DTYPE,
+                 categories: Optional[Dict[str, Callable[[Dict[str, Any]], bool]]] = None,
+                 table: str = "ideal_answer",
+                 refresh_seconds: float = DEFAULT_REFRESH_SECONDS,
+                 column: Optional[str] = None):
+        if np.dtype(dtype) not in (np.float32, np.float16):
+            raise ValueError(f"지원하지 않는 dtype: {dtype}")
+        self.index_dir = Path(index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.dtype = np.dtype(dtype).name
+        self.categories = dict(DEFAULT_CATEGORIES if categories is None else categories)
+        if len(self.categories) > 8:
+            raise ValueError("범주는 최대 8개까지 지원합니다")
+        self.table = table
+        self.column = column or get_embedding_version().column
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._snapshot: Optional[_Snapshot] = None
+        self._manifest_mtime: Optional[int] = None
+        self._id_rows: Optional[Dict[UUID, int]] = None
+        self._corpus_version: Optional[int] = None
+        self._last_sync = 0.0
+        self._reload()
+
+    # ------------------------------------------------------------------ 조회
+
+    @property
+    def count(self) -> int:
+        """삭제되지 않은 행 수"""
+        self._reload_if_changed()
+        snapshot = self._snapshot
+        return int(snapshot.alive.sum()) if snapshot else 0
+
+    def search(self,
+               query_vector: Sequence[float],
+               top_k: int = 10,
+               category: Optional[str] = None,
+               exclude_category: Optional[str] = None,
+               min_similarity: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        코사인 유사도 상위 top_k 검색
+
+        Args:
+            query_vector: 쿼리 임베딩
+            category: 이 범주에 속한 행만 검색
+            exclude_category: 이 범주에 속한 행 제외
+            min_similarity: 이 유사도 미만 제외
+
+        Returns:
+            유사도 내림차순 [{snippet_id, similarity, distance, **메타데이터}]
+        """
+        self._reload_if_changed()
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.count == 0 or top_k <= 0:
+            return []
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        if query.shape != (snapshot.dim,):
+            raise ValueError(f"쿼리 차원 불일치: {query.shape} != ({snapshot.dim},)")
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+        query = query / norm
+
+        scores = self._scores(snapshot, query)
+        mask = np.asarray(snapshot.alive, dtype=bool)
+        if category is not None:
+            mask &= (snapshot.cats & self._category_bit(category)) != 0
+        if exclude_category is not None:
+            mask &= (snapshot.cats & self._category_bit(exclude_category)) == 0
+        if min_similarity is not None:
+            mask &= scores >= min_similarity
+        scores[~mask] = -np.inf
+
+        candidates = int(mask.sum())
+        if candidates == 0:
+            return []
+        k = min(top_k, candidates)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        results = []
+        for row in top:
+            similarity = float(scores[row])
+            results.append({
+                "snippet_id": UUID(bytes=snapshot.ids[row].tobytes()),
+                "similarity": similarity,
+                "distance": 1.0 - similarity,
+                **snapshot.read_meta(int(row)),
+            })
+        return results
+
+    def _scores(self, snapshot: _Snapshot, query: np.ndarray) -> np.ndarray:
+        if snapshot.vectors.dtype == np.float32:
+            return np.asarray(snapshot.vectors @ query, dtype=np.float32)
+        scores = np.empty(snapshot.count, dtype=np.float32)
+        for start in range(0, snapshot.count, BLOCK_ROWS):
+            block = np.asarray(snapshot.vectors[start:start + BLOCK_ROWS], dtype=np.float32)
+            scores[start:start + len(block)] = block @ query
+        return scores
+
+    def _category_bit(self, name: str) -> int:
+        try:
+            return 1 << list(self.categories).index(name)
+        except ValueError:
+            raise KeyError(f"알 수 없는 범주: {name}") from None
+
+    # ------------------------------------------------------------------ 갱신
+
+    def maybe_refresh(self,
+                      connect: Callable[[], ContextManager[Any]],
+                      corpus_version: Optional[int] = None) -> bool:
+        """
+        마지막 동기화 후 refresh_seconds가 지났으면 DB와 동기화합니다.
+        다른 프로세스가 동기화 중이면 기다리지 않고 넘어갑니다 (끝나면 manifest 변경으로 다시 열림).
+        corpus_version이 인덱스가 마지막으로 동기화한 버전보다 새로우면 주기와 관계없이,
+        다른 프로세스의 동기화가 끝나기를 기다려서라도 동기화합니다.
+
+        Args:
+            connect: pgvector 어댑터가 등록된 psycopg2 커넥션을 내주는 컨텍스트 매니저 팩토리
+                     (동기화가 필요할 때만 호출)
+            corpus_version: 현재 코퍼스 버전 (retrieval_cache.RetrievalCache.current_version)
+        """
+        stale = self._is_behind(corpus_version)
+        if not stale and time.monotonic() - self._last_sync < self.refresh_seconds:
+            return False
+        with self._writer(blocking=stale) as acquired:
+            if not acquired:
+                return False
+            if stale and not self._is_behind(corpus_version):
+                # 기다리는 동안 다른 프로세스가 동기화함
+                return False
+            with connect() as conn:
+                self._sync(conn, corpus_version)
+        return True
+
+    def refresh(self, conn, corpus_version: Optional[int] = None) -> None:
+        """DB와 즉시 동기화 (새 행 추가, 사라진 행 삭제 표시, 수정된 행 교체)"""
+        with self._writer(blocking=True):
+            self._sync(conn, corpus_version)
+
+    def _is_behind(self, corpus_version: Optional[int]) -> bool:
+        """corpus_version이 인덱스가 마지막으로 동기화한 코퍼스 버전보다 새로운지"""
+        if corpus_version is None:
+            return False
+        self._reload_if_changed()
+        return self._corpus_version is None or self._corpus_version < corpus_version
+
+    def rebuild(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """행 전체로 새 버전을 만들어 교체 (rows: snippet_id, embedding, 메타데이터 컬럼)"""
+        with self._writer(blocking=True):
+            return self._rebuild(rows)
+
+    def add(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """현재 버전 끝에 행 추가"""
+        with self._writer(blocking=True):
+            return self._append(rows)
+
+    def remove(self, snippet_ids: Iterable[UUID]) -> int:
+        """행 삭제 표시"""
+        with self._writer(blocking=True):
+            return self._mark_dead(snippet_ids)
+
+    def _sync(self, conn, corpus_version: Optional[int] = None) -> None:
+        started = time.perf_counter()
+        self._reload_if_changed()
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT snippet_id, {MARKER_SQL} FROM {self.table} WHERE {self.column} IS NOT NULL")
+            db_marks = {UUID(str(row[0])): int(row[1]) for row in cur.fetchall()}
+
+        local_ids = self._alive_ids()
+        marks = self._snapshot.marks if self._snapshot else None
+        new_ids = [snippet_id for snippet_id in db_marks if snippet_id not in local_ids]
+        changed = [
+            snippet_id for snippet_id, row in local_ids.items()
+            if snippet_id in db_marks and int(marks[row]) != db_marks[snippet_id]
+        ]
+        # 수정된 행은 삭제 표시(tombstone) 후 새 행으로 다시 덧붙임
+        removed = self._mark_dead(local_ids.keys() - db_marks.keys())
+        self._mark_dead(changed)
+
+        snapshot = self._snapshot
+        dead = snapshot.count - int(snapshot.alive.sum()) if snapshot else 0
+        if snapshot and snapshot.count and dead / snapshot.count > COMPACT_DEAD_RATIO:
+            added = self._rebuild(self._fetch_rows(conn, None))
+            logger.info(f"로컬 벡터 인덱스 재구축: {added}개 행 (삭제 {dead}개 정리)")
+        else:
+            added = self._append(self._fetch_rows(conn, new_ids + changed)) if new_ids or changed else 0
+        if self._is_behind(corpus_version):
+            self._mark_synced(corpus_version)
+        self._last_sync = time.monotonic()
+        if added or removed:
+            logger.info(
+                f"로컬 벡터 인덱스 동기화: +{len(new_ids)} / ~{len(changed)} / -{removed}, 총 {self.count}개 "
+                f"({time.perf_counter() - started:.2f}초)"
+            )
+
+    def _mark_synced(self, corpus_version: int) -> None:
+        """동기화한 코퍼스 버전을 manifest에 기록 (다른 프로세스는 이 버전까지는 다시 동기화하지 않음)"""
+        manifest = self._read_manifest()
+        if manifest is None:
+            self._rebuild([])
+            manifest = self._read_manifest()
+        self._write_manifest({**manifest, "corpus_version": corpus_version})
+        self._reload()
+
+    def _fetch_rows(self, conn, snippet_ids: Optional[List[UUID]]) -> Iterator[Dict[str, Any]]:
+        """DB 행 조회 (snippet_ids=None이면 전체), embedding은 pgvector 어댑터로 numpy 배열"""
+        columns = ", ".join(
+            ("snippet_id", f"{self.column}::vector AS embedding", f"{MARKER_SQL} AS marker") + META_COLUMNS
+        )
+        if snippet_ids is None:
+            batches = [None]
+        else:
+            batches = [
+                [str(snippet_id) for snippet_id in snippet_ids[start:start + FETCH_BATCH_SIZE]]
+                for start in range(0, len(snippet_ids), FETCH_BATCH_SIZE)
+            ]
+        for batch in batches:
+            with conn.cursor() as cur:
+                if batch is None:
+                    cur.execute(f"SELECT {columns} FROM {self.table} WHERE {self.column} IS NOT NULL")
+                else:
+                    cur.execute(
+                        f"SELECT {columns} FROM {self.table} WHERE snippet_id = ANY(%s::uuid[]) "
+                        f"AND {self.column} IS NOT NULL",
+                        (batch,)
+                    )
+                names = [column[0] for column in cur.description]
+                for row in cur.fetchall():
+                    yield dict(zip(names, row))
+
+    # ------------------------------------------------------------------ 파일
+
+    def _rebuild(self, rows: Iterable[Dict[str, Any]]) -> int:
+        old = self._read_manifest()
+        version = f"v{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+        (self.index_dir / version).mkdir()
+        self._write_manifest({**(old or {}), "version": version, "count": 0, "dim": None})
+        self._reload()
+        added = self._append(rows)
+        if old and old.get("version") != version:
+            # 이미 열어 둔 프로세스의 매핑은 삭제 후에도 유효
+            shutil.rmtree(self.index_dir / old["version"], ignore_errors=True)
+        return added
+
+    def _append(self, rows: Iterable[Dict[str, Any]]) -> int:
+        manifest = self._read_manifest()
+        if manifest is None:
+            return self._rebuild(rows)
+
+        directory = self.index_dir / manifest["version"]
+        dim = manifest.get("dim")
+        vectors, ids, cats, marks, metas = [], [], [], [], []
+        for row in rows:
+            embedding = np.asarray(row["embedding"], dtype=np.float32)
+            if dim is None:
+                dim = len(embedding)
+            if embedding.shape != (dim,):
+                raise ValueError(f"임베딩 차원 불일치: {embedding.shape} != ({dim},)")
+            norm = np.linalg.norm(embedding)
+            vectors.append(embedding / norm if norm else embedding)
+            ids.append(UUID(str(row["snippet_id"])).bytes)
+            meta = {column: row.get(column) for column in META_COLUMNS}
+            cats.append(sum(1 << bit for bit, test in enumerate(self.categories.values()) if test(meta)))
+            marks.append(int(row.get("marker") or 0))
+            metas.append(json.dumps(meta, ensure_ascii=False).encode("utf-8") + b"\n")
+        if not vectors:
+            return 0
+
+        meta_path = directory / "meta.jsonl"
+        start = meta_path.stat().st_size if meta_path.exists() else 0
+        offsets = []
+        for line in metas:
+            offsets.append((start, len(line)))
+            start += len(line)
+
+        if manifest["count"] and not (directory / "marks.bin").exists():
+            # 변경 표시 이전 형식의 버전에 덧붙이는 경우 기존 행의 표시는 0으로 채움
+            with open(directory / "marks.bin", "wb") as f:
+                f.write(np.zeros(manifest["count"], dtype=np.uint64).tobytes())
+
+        # 데이터 파일을 먼저 쓰고 manifest의 count를 마지막에 올림 (읽는 쪽은 count까지만 봄)
+        for name, payload in (
+            ("vectors.bin", np.stack(vectors).astype(self.dtype).tobytes()),
+            ("ids.bin", b"".join(ids)),
+            ("alive.bin", np.ones(len(vectors), dtype=np.uint8).tobytes()),
+            ("cats.bin", np.asarray(cats, dtype=np.uint8).tobytes()),
+            ("marks.bin", np.asarray(marks, dtype=np.uint64).tobytes()),
+            ("meta.jsonl", b"".join(metas)),
+            ("offsets.bin", np.asarray(offsets, dtype=np.uint64).tobytes()),
+        ):
+            with open(directory / name, "ab") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+
+        self._write_manifest({**manifest, "count": manifest["count"] + len(vectors), "dim": dim})
+        self._reload()
+        return len(vectors)
+
+    def _mark_dead(self, snippet_ids: Iterable[UUID]) -> int:
+        rows = [self._alive_ids().get(UUID(str(snippet_id))) for snippet_id in snippet_ids]
+        rows = [row for row in rows if row is not None]
+        if not rows:
+            return 0
+        snapshot = self._snapshot
+        alive = np.memmap(snapshot.directory / "alive.bin", dtype=np.uint8, mode="r+", shape=(snapshot.count,))
+        alive[rows] = 0
+        alive.flush()
+        del alive
+        # 같은 파일을 공유 매핑으로 연 다른 프로세스에도 즉시 반영되지만, 알림을 위해 manifest 시각 갱신
+        self._write_manifest(self._read_manifest())
+        self._id_rows = None
+        return len(rows)
+
+    def _alive_ids(self) -> Dict[UUID, int]:
+        if self._id_rows is None:
+            snapshot = self._snapshot
+            self._id_rows = {} if snapshot is None else {
+                UUID(bytes=snapshot.ids[row].tobytes()): row
+                for row in np.flatnonzero(snapshot.alive).tolist()
+            }
+        return self._id_rows
+
+    @contextmanager
+    def _writer(self, blocking: bool):
+        """디렉토리 쓰기 잠금 (프로세스 간: flock, 프로세스 안: threading.Lock)"""
+        if not self._lock.acquire(blocking=blocking):
+            yield False
+            return
+        try:
+            with open(self.index_dir / ".lock", "a") as lock_file:
+                flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+                try:
+                    fcntl.flock(lock_file, flags)
+                except BlockingIOError:
+                    yield False
+                    return
+                try:
+                    self._reload_if_changed()
+                    yield True
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        finally:
+            self._lock.release()
+
+    def _read_manifest(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.index_dir / "manifest.json", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_manifest(self, manifest: Dict[str, Any]) -> None:
+        manifest = {**manifest, "dtype": self.dtype, "column": self.column, "categories": list(self.categories)}
+        temp_path = self.index_dir / f"manifest.json.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(temp_path, self.index_dir / "manifest.json")
+
+    def _reload_if_changed(self) -> None:
+        try:
+            mtime = (self.index_dir / "manifest.json").stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime != self._manifest_mtime:
+            self._reload()
+
+    def _reload(self) -> None:
+        path = self.index_dir / "manifest.json"
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            self._snapshot, self._manifest_mtime, self._id_rows, self._corpus_version = None, None, None, None
+            return
+        manifest = self._read_manifest()
+        if manifest.get("categories", list(self.categories)) != list(self.categories):
+            raise ValueError(f"인덱스 범주 불일치: {manifest.get('categories')} != {list(self.categories)}")
+        if manifest.get("dtype", self.dtype) != self.dtype:
+            raise ValueError(f"인덱스 dtype 불일치: {manifest.get('dtype')} != {self.dtype}")
+        if manifest.get("column", self.column) != self.column:
+            raise ValueError(f"인덱스 임베딩 컬럼 불일치: {manifest.get('column')} != {self.column}")
+        self._snapshot = _Snapshot(
+            self.index_dir / manifest["version"], manifest["count"], manifest.get("dim") or 0, self.dtype
+        )
+        self._manifest_mtime = mtime
+        self._id_rows = None
+        self._corpus_version = manifest.get("corpus_version")
+
+
+_default_index: Optional[LocalVectorIndex] = None
+_default_index_lock = threading.Lock()
+
+
+def get_local_index() -> Optional[LocalVectorIndex]:
+    """프로세스 기본 로컬 인덱스 (RAG_LOCAL_INDEX_DIR가 없으면 None → pgvector만 사용)"""
+    global _default_index
+    if not DEFAULT_INDEX_DIR:
+        return None
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = LocalVectorIndex(DEFAULT_INDEX_DIR)
+    return _default_index
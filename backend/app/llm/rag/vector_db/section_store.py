@@ -0,0 +1,95 @@
+"""
+섹션 단위 저장소 ({청크 테이블}_section, 기본 ideal_answer_section)
+
+청크 행(ideal_answer)을 섹션별로 미리 모아 둔 테이블을 수집 시점에 갱신합니다.
+- full_text: 청크 본문을 chunk_ix/페이지 순으로 이어 붙인 섹션 전문
+- citations / page_start / page_end: 섹션에 속한 청크의 출처와 페이지 범위
+- embedding: 청크 임베딩 평균 (코사인 거리는 크기와 무관하므로 정규화하지 않음)
+집계는 모두 DB 안에서 INSERT ... SELECT 한 번으로 수행하므로 임베딩을 다시 받거나 옮기지 않습니다.
+검색 경로는 이 테이블을 section_id로 바로 조회하거나 섹션 임베딩으로 직접 검색합니다.
+수집/삭제 트랜잭션은 bump_corpus_version으로 코퍼스 버전을 올려 검색 결과 캐시를 무효화합니다.
+"""
+from typing import Iterable, Optional
+from uuid import UUID
+
+from sqlalchemy import bindparam, text
+
+DEFAULT_CHUNK_TABLE = "ideal_answer"
+CORPUS_VERSION_TABLE = "rag_corpus_version"
+
+# 섹션 대표값(경로/제목 등)은 섹션의 첫 청크 기준
+_CHUNK_ORDER = "chunk_ix, page_start, page_end"
+
+
+def section_table_name(chunk_table: str = DEFAULT_CHUNK_TABLE) -> str:
+    """청크 테이블에 대응하는 섹션 테이블 이름"""
+    return f"{chunk_table}_section"
+
+
+def _first(column: str) -> str:
+    return f"(ARRAY_AGG({column} ORDER BY {_CHUNK_ORDER}))[1]"
+
+
+def rebuild_sections(conn,
+                     book_id: Optional[UUID] = None,
+                     section_ids: Optional[Iterable[str]] = None,
+                     chunk_table: str = DEFAULT_CHUNK_TABLE) -> int:
+    """
+    책(book_id) 또는 지정한 섹션들의 섹션 행을 청크 테이블로부터 다시 만듭니다.
+    conn은 Session/Connection 모두 가능하며, 호출 측 트랜잭션 안에서 실행됩니다.
+
+    Returns:
+        다시 만든 섹션 수
+    """
+    if book_id is not None:
+        where, params = "book_id = :book_id", {"book_id": book_id}
+        bind = []
+    elif section_ids is not None:
+        section_ids = list(section_ids)
+        if not section_ids:
+            return 0
+        where, params = "section_id IN :section_ids", {"section_ids": section_ids}
+        bind = [bindparam("section_ids", expanding=True)]
+    else:
+        raise ValueError("book_id 또는 section_ids가 필요합니다")
+
+    section_table = section_table_name(chunk_table)
+    conn.execute(text(f"DELETE FROM {section_table} WHERE {where}").bindparams(*bind), params)
+    result = conn.execute(text(f"""
+        INSERT INTO {section_table}
+            (section_id, book_id, book_title, l1_title, l2_title, l3_title, canonical_path,
+             page_start, page_end, citations, full_text, chunk_count, section_hash, rag_type,
+             embedding, updated_at)
+        SELECT section_id,
+               {_first("book_id")},
+               {_first("book_title")},
+               {_first("l1_title")},
+               {_first("l2_title")},
+               {_first("l3_title")},
+               {_first("canonical_path")},
+               MIN(page_start),
+               MAX(page_end),
+               COALESCE(ARRAY_AGG(DISTINCT citation) FILTER (WHERE citation <> ''), '{{}}'),
+               COALESCE(STRING_AGG(full_text, E'\\n\\n' ORDER BY {_CHUNK_ORDER}) FILTER (WHERE full_text <> ''), ''),
+               COUNT(*),
+               MAX(section_hash),
+               MAX(rag_type),
+               AVG(embedding),
+               NOW()
+        FROM {chunk_table}
+        WHERE section_id IS NOT NULL AND {where}
+        GROUP BY section_id
+    """).bindparams(*bind), params)
+    return result.rowcount
+
+
+def bump_corpus_version(conn) -> None:
+    """
+    코퍼스 버전을 1 올림 (호출 측 트랜잭션 안에서 실행 → 커밋되어야 캐시가 무효화됨)
+    같은 행을 갱신하므로 동시에 수집하는 트랜잭션끼리는 커밋 순서대로 직렬화됩니다.
+    """
+    conn.execute(text(f"""
+        INSERT INTO {CORPUS_VERSION_TABLE} (id, version, updated_at) VALUES (1, 1, NOW())
+        ON CONFLICT (id) DO UPDATE
+        SET version = {CORPUS_VERSION_TABLE}.version + 1, updated_at = NOW()
+    """))
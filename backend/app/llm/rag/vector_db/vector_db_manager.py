@@ -7,10 +7,11 @@ from typing import List, Dict, Any, Optional, Tuple
 from uuid import UUID, uuid4
 from datetime import datetime
 
-from sqlalchemy import create_engine, Column, String, Text, DateTime, ForeignKey, Integer
-from sqlalchemy.dialects.postgresql import UUID as PostgreSQLUUID
+import numpy as np
+from sqlalchemy import create_engine, Column, Computed, String, Text, DateTime, ForeignKey, Integer, LargeBinary, bindparam, cast, select, true, func
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR, UUID as PostgreSQLUUID
 from sqlalchemy.orm import sessionmaker, declarative_base, Session
-from pgvector.sqlalchemy import Vector
+from pgvector.sqlalchemy import HALFVEC, Vector
 
 # 기존 데이터베이스 설정 가져오기
 from app.core.config import settings
@@ -18,6 +19,12 @@ from app.core.config import settings
 # 로깅 및 예외 처리 모듈 가져오기
 from ..logger import rag_logger
 from ..exception import VectorDBException as RAGVectorDBException, EmbeddingException as RAGEmbeddingException
+from .embedding_versions import EMBEDDING_VERSIONS, EmbeddingVersion, embed_query, get_embedding_version, \
+    version_columns
+from .lexical import hybrid_candidates_sql, hybrid_params, lexical_terms, tsquery_text, validate_mode
+from .section_store import bump_corpus_version, rebuild_sections
+from ..tokenizer import get_token_counter, pack_by_tokens, EMBEDDING_MAX_INPUT_TOKENS, \
+    EMBEDDING_MAX_REQUEST_TOKENS, EMBEDDING_MAX_REQUEST_INPUTS
 
 logger = rag_logger
 
@@ -67,11 +74,61 @@ class IdealAnswer(Base):
     # 임베딩용 텍스트
     embed_text = Column(Text, nullable=True)
     
-    # 임베딩 (pgvector)
-    embedding = Column(Vector(1536), nullable=True)  # OpenAI text-embedding-3-small 기준
+    # 임베딩 (pgvector) - 버전별 컬럼 (embedding_versions.EMBEDDING_VERSIONS)
+    embedding = Column(Vector(1536), nullable=True)  # v1: OpenAI text-embedding-3-small 기준
+    embedding_v2 = Column(HALFVEC(512), nullable=True)  # v2: text-embedding-3-small 512차원 halfvec (수집 시 v1에서 파생, 기존 행은 백필)
+    
+    # 어휘 검색용 Kiwi 내용어 (lexical.lexical_terms) → DB가 tsvector로 만들어 GIN 인덱스
+    lexical_terms = Column(Text, nullable=True)
+    lexical_tsv = Column(TSVECTOR, Computed("to_tsvector('simple', COALESCE(lexical_terms, ''))", persisted=True))
     
     # RAG 타입 구분
     rag_type = Column(String(20), nullable=True, default='legacy')
+    
+    # 증분 재수집용 해시 (sha256 hex, TOC 청커가 채움)
+    section_hash = Column(String(64), nullable=True)
+    content_hash = Column(String(64), nullable=True)
+    
+    # 다른 책 근사 중복 판정용 MinHash 서명 / LSH 밴드 키 (near_dedup.signature_keys, TOC 수집이 채움)
+    minhash = Column(LargeBinary, nullable=True)
+    lsh_keys = Column(ARRAY(Text), nullable=True)
+
+
+class IdealAnswerSection(Base):
+    """
+    섹션 단위로 미리 모아 둔 ideal_answer (수집 시 section_store.rebuild_sections로 갱신)
+    """
+    __tablename__ = 'ideal_answer_section'
+    
+    # 섹션 ID (ideal_answer.section_id)
+    section_id = Column(Text, primary_key=True)
+    
+    # 책 정보 / 계층 제목 / 원본 경로 (섹션 첫 청크 기준)
+    book_id = Column(PostgreSQLUUID(as_uuid=True), nullable=True, index=True)
+    book_title = Column(Text, nullable=True)
+    l1_title = Column(Text, nullable=True)
+    l2_title = Column(Text, nullable=True)
+    l3_title = Column(Text, nullable=True)
+    canonical_path = Column(Text, nullable=True)
+    
+    # 페이지 범위
+    page_start = Column(Integer, nullable=True)
+    page_end = Column(Integer, nullable=True)
+    
+    # 인용 목록 (중복 제거)
+    citations = Column(ARRAY(Text), nullable=False, default=list)
+    
+    # 청크 본문을 순서대로 이어 붙인 섹션 전문
+    full_text = Column(Text, nullable=False, default='')
+    chunk_count = Column(Integer, nullable=False, default=0)
+    
+    section_hash = Column(String(64), nullable=True)
+    rag_type = Column(String(20), nullable=True)
+    
+    # 섹션 임베딩 (청크 임베딩 평균)
+    embedding = Column(Vector(1536), nullable=True)
+    
+    updated_at = Column(DateTime, nullable=False, server_default=func.now())
 
 
 class VectorDBManager:
@@ -156,7 +213,8 @@ class VectorDBManager:
             ideal_answer = IdealAnswer(
                 embed_text=embed_text,
                 full_text=full_text or embed_text,
-                embedding=embedding,
+                **version_columns(embedding),  # v1 + v1에서 잘라 만드는 버전 컬럼(v2)
+                lexical_terms=lexical_terms(embed_text),
                 book_id=book_id,
                 book_title=book_title,
                 l1_title=l1_title,
@@ -171,8 +229,12 @@ class VectorDBManager:
                 rag_type=rag_type  # rag_type 파라미터 사용
             )
             
-            # 데이터베이스에 추가 및 커밋
+            # 데이터베이스에 추가 및 커밋 (섹션 테이블도 같은 트랜잭션에서 갱신)
             session.add(ideal_answer)
+            if section_id:
+                session.flush()
+                rebuild_sections(session, section_ids=[section_id])
+            bump_corpus_version(session)
             session.commit()
             
             logger.info(f"임베딩 저장 완료: {ideal_answer.snippet_id}")
@@ -223,7 +285,8 @@ class VectorDBManager:
                 ideal_answer = IdealAnswer(
                     embed_text=embed_text,
                     full_text=full_text,
-                    embedding=embedding,
+                    **version_columns(embedding),
+                    lexical_terms=lexical_terms(embed_text),
                     book_id=book_id,
                     book_title=book_title,
                     l1_title=metadata.get('l1_title'),
@@ -241,6 +304,11 @@ class VectorDBManager:
                 session.add(ideal_answer)
                 stored_ids.append(ideal_answer.snippet_id)
             
+            section_ids = {metadata.get('section_id') for metadata in metadata_list or [] if metadata.get('section_id')}
+            if section_ids:
+                session.flush()
+                rebuild_sections(session, section_ids=section_ids)
+            bump_corpus_version(session)
             session.commit()
             
             logger.info(f"{len(stored_ids)}개 임베딩 일괄 저장 완료")
@@ -255,47 +323,60 @@ class VectorDBManager:
     def find_similar(self, 
                      query_embedding: List[float], 
                      top_k: int = 5,
-                     threshold: float = 0.5) -> List[Tuple[str, str, float, UUID]]:
+                     threshold: float = 0.5,
+                     version: Optional[EmbeddingVersion] = None,
+                     mode: str = "vector",
+                     query_text: Optional[str] = None) -> List[Tuple[str, str, float, UUID]]:
         """
         유사한 임베딩을 검색합니다.
         
         Args:
-            query_embedding: 쿼리 임베딩
+            query_embedding: 쿼리 임베딩 (version과 같은 모델/차원)
             top_k: 반환할 결과 수
-            threshold: 유사도 임계값
+            threshold: 유사도 임계값 (hybrid에서는 벡터 후보에만 적용)
+            version: 검색할 임베딩 버전 (기본: 활성 버전 RAG_EMBEDDING_VERSION)
+            mode: "vector"(코사인 거리) 또는 "hybrid"(어휘 + 벡터 RRF 융합, query_text 필요)
+            query_text: hybrid 어휘 검색용 쿼리 텍스트
             
         Returns:
-            (임베딩용 텍스트, 전체 텍스트, 유사도 점수, ID)의 튜플 리스트
+            (임베딩용 텍스트, 전체 텍스트, 유사도 점수, ID)의 튜플 리스트 (hybrid는 융합 점수 순)
         """
+        version = version or get_embedding_version()
+        if validate_mode(mode) == "hybrid":
+            return self._find_hybrid(query_embedding, query_text or "", top_k, threshold, version)
         session = self.get_session()
         
         try:
             # 벡터 유사도 검색: 코사인 유사도 사용
-            from sqlalchemy import text
-            
-            # 벡터 간의 코사인 거리 계산 (1 - 코사인 유사도)
             # pgvector에서는 <=> 연산자가 코사인 거리를 계산함
+            # 쿼리 벡터는 CTE에서 한 번만 바인딩 (numpy float32 → pgvector 타입 변환)
+            vector_type = (HALFVEC if version.storage == "halfvec" else Vector)(version.dimensions)
+            query_vector = select(
+                cast(bindparam('query_vector', version.to_array(query_embedding), type_=vector_type),
+                     vector_type).label('v')
+            ).cte('q')
+            distance = getattr(IdealAnswer, version.column).cosine_distance(query_vector.c.v).label('distance')
+            
             query = session.query(
                 IdealAnswer.embed_text,
                 IdealAnswer.full_text,
+                distance,
                 IdealAnswer.snippet_id
-            ).order_by(
-                IdealAnswer.embedding.cosine_distance(query_embedding)
+            ).select_from(IdealAnswer).join(
+                query_vector, true()
             ).filter(
-                IdealAnswer.embedding.cosine_distance(query_embedding) <= (1 - threshold)
+                distance <= (1 - threshold)
+            ).order_by(
+                distance
             ).limit(top_k)
             
             results = query.all()
             
             # 유사도 점수 계산 (0~1 사이, 높을수록 유사)
-            similar_results = []
-            for embed_text, full_text, snippet_id in results:
-                # 다시 유사도 점수를 계산
-                similarity_score_query = session.query(
-                    1 - IdealAnswer.embedding.cosine_distance(query_embedding).label('similarity')
-                ).filter(IdealAnswer.snippet_id == snippet_id).scalar()
-                
-                similar_results.append((embed_text, full_text, similarity_score_query, snippet_id))
+            similar_results = [
+                (embed_text, full_text, 1 - dist, snippet_id)
+                for embed_text, full_text, dist, snippet_id in results
+            ]
             
             logger.info(f"유사도 검색 완료: {len(similar_results)}개 결과 반환")
             return similar_results
@@ -305,6 +386,44 @@ class VectorDBManager:
         finally:
             session.close()
     
+    def _find_hybrid(self,
+                     query_embedding: List[float],
+                     query_text: str,
+                     top_k: int,
+                     threshold: float,
+                     version: EmbeddingVersion) -> List[Tuple[str, str, float, UUID]]:
+        """어휘 + 벡터 후보를 한 SQL 문에서 뽑아 RRF로 융합"""
+        sql = f"""
+          WITH q AS (
+            SELECT 0 AS ord, %(v)s::{version.sql_type} AS v, to_tsquery('simple', %(tsq)s) AS tsq
+          ),
+          {hybrid_candidates_sql(IdealAnswer.__tablename__, version.column)}
+          SELECT t.embed_text, t.full_text, f.distance, t.snippet_id
+          FROM fused f
+          JOIN {IdealAnswer.__tablename__} t ON t.snippet_id = f.snippet_id
+          ORDER BY f.rrf DESC, f.distance
+          LIMIT %(top_k)s
+        """
+        params = {
+            "v": version.to_array(query_embedding),
+            "tsq": tsquery_text(query_text),
+            "top_k": top_k,
+            **hybrid_params(1 - threshold),
+        }
+        session = self.get_session()
+        try:
+            results = session.connection().exec_driver_sql(sql, params).fetchall()
+            logger.info(f"하이브리드 검색 완료: {len(results)}개 결과 반환")
+            return [
+                (embed_text, full_text, 1 - dist, snippet_id)
+                for embed_text, full_text, dist, snippet_id in results
+            ]
+        except Exception as e:
+            logger.error(f"하이브리드 검색 실패: {str(e)}")
+            raise
+        finally:
+            session.close()
+    
     def get_embedding_by_id(self, snippet_id: UUID) -> Optional[Tuple[str, str, List[float], UUID]]:
         """
         ID를 기반으로 임베딩 정보를 가져옵니다.
@@ -348,7 +467,13 @@ class VectorDBManager:
         session = self.get_session()
         
         try:
+            section_id = session.query(IdealAnswer.section_id).filter(IdealAnswer.snippet_id == snippet_id).scalar()
             result = session.query(IdealAnswer).filter(IdealAnswer.snippet_id == snippet_id).delete()
+            if result > 0:
+                # 섹션 테이블도 같은 트랜잭션에서 갱신 (청크가 모두 사라진 섹션은 삭제됨)
+                if section_id:
+                    rebuild_sections(session, section_ids=[section_id])
+                bump_corpus_version(session)
             session.commit()
             
             if result > 0:
@@ -364,6 +489,35 @@ class VectorDBManager:
         finally:
             session.close()
     
+    def delete_book_embeddings(self, book_id: UUID) -> int:
+        """
+        책(book_id)의 임베딩을 모두 삭제합니다. (재수집 전 이전 시도에서 저장된 청크 정리)
+        
+        Args:
+            book_id: 삭제할 책 ID
+            
+        Returns:
+            삭제된 레코드 수
+        """
+        session = self.get_session()
+        
+        try:
+            result = session.query(IdealAnswer).filter(IdealAnswer.book_id == book_id).delete(synchronize_session=False)
+            if result > 0:
+                rebuild_sections(session, book_id=book_id)
+                bump_corpus_version(session)
+            session.commit()
+            
+            if result > 0:
+                logger.info(f"책 임베딩 삭제 완료: {book_id}, {result}개")
+            return result
+        except Exception as e:
+            session.rollback()
+            logger.error(f"책 임베딩 삭제 실패: {str(e)}")
+            raise
+        finally:
+            session.close()
+    
     def update_embedding(self, snippet_id: UUID, new_embed_text: str = None, 
                          new_full_text: str = None, new_embedding: List[float] = None) -> bool:
         """
@@ -392,8 +546,15 @@ class VectorDBManager:
             if new_full_text is not None:
                 ideal_answer.full_text = new_full_text
             if new_embedding is not None:
-                ideal_answer.embedding = new_embedding
+                for column, value in version_columns(new_embedding).items():
+                    setattr(ideal_answer, column, value)
             
+            # 섹션 전문/평균 임베딩도 같은 트랜잭션에서 갱신
+            if ideal_answer.section_id:
+                session.flush()
+                rebuild_sections(session, section_ids=[ideal_answer.section_id])
+            # 검색 결과 캐시/로컬 인덱스가 바뀐 본문/임베딩을 다시 읽도록 코퍼스 버전 증가
+            bump_corpus_version(session)
             session.commit()
             logger.info(f"임베딩 업데이트 완료: {snippet_id}")
             return True
@@ -410,16 +571,30 @@ class EmbeddingService:
     임베딩 생성 및 관리를 위한 서비스 클래스
     """
     
-    def __init__(self, vector_db_manager: VectorDBManager, model_name: str = "text-embedding-ada-002"):
+    def __init__(self,
+                 vector_db_manager: VectorDBManager,
+                 model_name: str = EMBEDDING_VERSIONS["v1"].model,
+                 dimensions: Optional[int] = None):
         """
         EmbeddingService 초기화
         
         Args:
             vector_db_manager: 벡터 DB 매니저 인스턴스
-            model_name: 임베딩 모델 이름
+            model_name: 임베딩 모델 이름 (기본: 저장 컬럼 embedding과 같은 v1 모델)
+            dimensions: 축소 차원 (text-embedding-3 계열만, 기본은 모델 기본 차원)
         """
         self.vector_db_manager = vector_db_manager
         self.model_name = model_name
+        self.dimensions = dimensions
+        self._request_kwargs = {"model": model_name}
+        if dimensions is not None:
+            self._request_kwargs["dimensions"] = dimensions
+        
+        # 토큰 기준 자르기/요청 묶음 계산용 인코더 (모델별 캐시)
+        self.token_counter = get_token_counter(model_name)
+        self.max_input_tokens = EMBEDDING_MAX_INPUT_TOKENS
+        self.max_request_tokens = EMBEDDING_MAX_REQUEST_TOKENS
+        self.max_request_inputs = EMBEDDING_MAX_REQUEST_INPUTS
         
         # OpenAI 클라이언트 초기화
         try:
@@ -442,15 +617,12 @@ class EmbeddingService:
             임베딩 벡터
         """
         try:
-            # 텍스트가 너무 길 경우 자르기 (OpenAI는 최대 8192토큰)
-            max_length = 8000  # 여유를 두고 8000자로 제한
-            if len(text) > max_length:
-                logger.warning(f"텍스트가 너무 깁니다. {max_length}자로 자릅니다: {text[:50]}...")
-                text = text[:max_length]
+            # 텍스트가 너무 길 경우 토큰 기준으로 자르기
+            text = self._fit_input(text)
             
             response = self.client.embeddings.create(
                 input=text,
-                model=self.model_name
+                **self._request_kwargs
             )
             
             embedding = response.data[0].embedding
@@ -471,28 +643,48 @@ class EmbeddingService:
             임베딩 벡터 목록
         """
         try:
-            # 각 텍스트가 너무 길 경우 자르기
-            processed_texts = []
-            for text in texts:
-                max_length = 8000  # 여유를 두고 8000자로 제한
-                if len(text) > max_length:
-                    logger.warning(f"텍스트가 너무 깁니다. {max_length}자로 자릅니다.")
-                    processed_texts.append(text[:max_length])
-                else:
-                    processed_texts.append(text)
-            
-            response = self.client.embeddings.create(
-                input=processed_texts,
-                model=self.model_name
+            # 각 텍스트를 토큰 기준으로 자른 뒤, 요청당 토큰 합계/입력 수 한도까지 채워 묶음
+            fitted = [self.token_counter.fit(text, self.max_input_tokens) for text in texts]
+            truncated = sum(1 for text, (processed, _) in zip(texts, fitted) if len(processed) < len(text))
+            if truncated:
+                logger.warning(f"텍스트 {truncated}개가 너무 깁니다. {self.max_input_tokens}토큰으로 자릅니다.")
+            request_ranges = pack_by_tokens(
+                [count for _, count in fitted],
+                max_tokens=self.max_request_tokens,
+                max_inputs=self.max_request_inputs
             )
             
-            embeddings = [data.embedding for data in response.data]
-            logger.info(f"{len(embeddings)}개 임베딩 일괄 생성 완료")
+            embeddings = []
+            for start, end in request_ranges:
+                response = self.client.embeddings.create(
+                    input=[processed for processed, _ in fitted[start:end]],
+                    **self._request_kwargs
+                )
+                embeddings.extend(data.embedding for data in response.data)
+            
+            logger.info(f"{len(embeddings)}개 임베딩 일괄 생성 완료 ({len(request_ranges)}회 요청)")
             return embeddings
         except Exception as e:
             logger.error(f"임베딩 일괄 생성 실패: {str(e)}")
             raise
     
+    def create_query_embedding(self, text: str, version: Optional[EmbeddingVersion] = None) -> np.ndarray:
+        """
+        검색 쿼리 임베딩 생성 (저장 모델이 아니라 검색할 버전의 모델/차원 사용)
+        
+        Args:
+            text: 쿼리 텍스트
+            version: 임베딩 버전 (기본: 활성 버전 RAG_EMBEDDING_VERSION)
+        """
+        return embed_query(self.client, self._fit_input(text), version)
+    
+    def _fit_input(self, text: str) -> str:
+        """입력 1개당 토큰 한도에 맞게 자르기"""
+        fitted, _ = self.token_counter.fit(text, self.max_input_tokens)
+        if len(fitted) < len(text):
+            logger.warning(f"텍스트가 너무 깁니다. {self.max_input_tokens}토큰으로 자릅니다: {text[:50]}...")
+        return fitted
+    
     def store_text_with_embedding(self, 
                                   text: str, 
                                   book_id: Optional[UUID] = None,
@@ -96,5 +96,309 @@ class TestAgentPipeline:
             pytest.fail(f"CRUD 함수 import 실패: {str(e)}")
 
 
+class TestSummaryWindowing:
+    """장문 대화 구간 분할 테스트 (LLM 호출 없음)"""
+
+    def test_split_turn_windows_keeps_turns(self):
+        """발화 경계를 유지하며 토큰 예산 단위로 분할되는지 확인"""
+        import pandas as pd
+        from app.llm.agent.Analysis.nodes import split_turn_windows
+
+        df = pd.DataFrame({
+            "speaker": ["SPEAKER_00", "SPEAKER_01"] * 10,
+            "text": ["오늘 하루는 어땠어? 많이 힘들었지?" * 3] * 20,
+        })
+        windows = split_turn_windows(df, window_tokens=200)
+
+        assert len(windows) > 1
+        assert sum(len(w) for w in windows) == len(df)
+        assert all(line.startswith("SPEAKER_") for w in windows for line in w)
+        print(f"✅ {len(df)}개 발화 → {len(windows)}개 구간 분할")
+
+
+class TestStageCheckpoint:
+    """단계별 체크포인트 테스트 (DB 호출은 메모리 저장소로 대체)"""
+
+    def test_run_stage_reuses_saved_output(self, monkeypatch):
+        """같은 입력 해시면 저장된 단계 결과를 재사용하는지 확인"""
+        from unittest.mock import MagicMock
+        from app.llm.agent import checkpoint
+        from app.llm.agent.checkpoint import StageCheckpointer, compute_input_hash
+
+        store = {}
+        monkeypatch.setattr(
+            checkpoint, "get_stage_checkpoint",
+            lambda db, conv_id, stage, input_hash: store.get((conv_id, stage, input_hash)),
+        )
+        monkeypatch.setattr(
+            checkpoint, "save_stage_checkpoint",
+            lambda db, conv_id, stage, input_hash, output: store.__setitem__((conv_id, stage, input_hash), output),
+        )
+
+        segments = [{"speaker": "SPEAKER_00", "text": "안녕"}]
+        input_hash = compute_input_hash(segments, {"user_ids": {"SPEAKER_00": 1}})
+        assert input_hash == compute_input_hash(segments, {"user_ids": {"SPEAKER_00": 1}})
+        assert input_hash != compute_input_hash(segments, {"user_ids": {"SPEAKER_01": 1}})
+
+        calls = []
+        sessions = []
+        checkpointer = StageCheckpointer(
+            conv_id="conv-1", input_hash=input_hash, verbose=False,
+            session_factory=lambda: sessions.append(MagicMock()) or sessions[-1],
+        )
+        first = checkpointer.run_stage("analyze", lambda: calls.append(1) or {"score": 71.5})
+        second = checkpointer.run_stage("analyze", lambda: calls.append(1) or {"score": 0})
+
+        assert first == second == {"score": 71.5}
+        assert len(calls) == 1
+        # 조회/저장마다 별도 세션을 열고 닫음 (파이프라인 세션은 건드리지 않음)
+        assert len(sessions) == 3
+        assert all(s.close.call_count == 1 for s in sessions)
+        print("✅ 체크포인트 재사용 테스트 통과")
+
+    def test_save_checkpoint_records_mapping_hash(self):
+        """저장 단계 체크포인트에 분석이 사용한 화자 매핑 해시가 기록되는지 확인"""
+        from unittest.mock import MagicMock
+        from app.llm.agent.Analysis.graph_analysis import AnalysisGraph, AnalysisState
+        from app.llm.agent.checkpoint import compute_mapping_hash
+
+        mapping_a = {"speaker_names": {"SPEAKER_00": "엄마"}, "user_ids": {"SPEAKER_00": 1}}
+        mapping_b = {"user_ids": {"SPEAKER_00": 1}, "speaker_names": {"SPEAKER_00": "아빠"}}
+        assert compute_mapping_hash(mapping_a) == compute_mapping_hash(dict(reversed(list(mapping_a.items()))))
+        assert compute_mapping_hash(mapping_a) != compute_mapping_hash(mapping_b)
+
+        graph = AnalysisGraph.__new__(AnalysisGraph)
+        graph.verbose = False
+        graph.saver = MagicMock()
+        graph.saver.save.return_value = {"status": "saved", "analysis_id": "a-1"}
+        checkpointer = MagicMock()
+        checkpointer.load.return_value = None
+        state = AnalysisState(
+            db=None, checkpointer=checkpointer, mapping_hash=compute_mapping_hash(mapping_a)
+        )
+        graph.node_save(state)
+
+        checkpointer.save.assert_called_once_with(
+            "save", {"status": "saved", "analysis_id": "a-1", "mapping_hash": compute_mapping_hash(mapping_a)}
+        )
+        print("✅ 저장 체크포인트 매핑 해시 기록 확인")
+
+
+class TestSegmentFeatures:
+    """화자 매핑 무관 세그먼트 Feature 테스트 (LLM 호출 없음)"""
+
+    def test_segment_features_are_mapping_independent(self):
+        """세그먼트 Feature가 세그먼트와 정렬되고 JSON 저장 가능한지 확인"""
+        from app.llm.agent.Analysis.nodes import Analyzer
+        from app.llm.agent.checkpoint import to_jsonable
+
+        segments = [
+            {"speaker": "SPEAKER_00", "text": "오늘 학교에서 친구랑 싸웠어", "start": 0.0, "end": 2.0},
+            {"speaker": "SPEAKER_01", "text": "무슨 일 있었어?", "start": 2.0, "end": 3.0},
+        ]
+        features = Analyzer(False).extract_segment_features(segments)
+
+        assert len(features["segment_words"]) == len(segments)
+        assert "친구" in features["segment_words"][0]
+        assert to_jsonable(features) == features
+        print("✅ 세그먼트 Feature 테스트 통과")
+
+
+class TestGraphReuse:
+    """컴파일된 Graph / LLM 클라이언트 재사용 테스트"""
+
+    def test_graphs_are_compiled_once(self, monkeypatch):
+        """get_*_graph / get_chat_llm이 프로세스 단위 싱글턴을 반환하는지 확인"""
+        monkeypatch.setenv("OPENAI_API_KEY", os.getenv("OPENAI_API_KEY") or "sk-test")
+        from app.llm.agent.Analysis.graph_analysis import get_analysis_graph
+        from app.llm.agent.Feedback.graph_feedback import get_feedback_graph
+        from app.llm.agent.clients import get_chat_llm
+
+        assert get_analysis_graph(verbose=False) is get_analysis_graph(verbose=False)
+        assert get_feedback_graph(verbose=False) is get_feedback_graph(verbose=False)
+        assert get_chat_llm(temperature=0.2) is get_chat_llm(temperature=0.2)
+        assert get_chat_llm(temperature=0.2) is not get_chat_llm()
+        print("✅ Graph / LLM 클라이언트 재사용 확인")
+
+    def test_cleaner_keeps_no_state_between_runs(self, monkeypatch):
+        """재사용되는 Cleaner 노드가 중복 문장은 실행 안에서만 재사용하고 대화 내용을 보관하지 않는지 확인"""
+        import pandas as pd
+        from unittest.mock import MagicMock
+        from app.llm.agent.Cleaner import nodes
+
+        llm = MagicMock()
+        llm.invoke.side_effect = lambda prompt: MagicMock(content=prompt.rsplit("\n", 1)[-1] + "!")
+        monkeypatch.setattr(nodes, "get_chat_llm", lambda: llm)
+
+        cleaner = nodes.ConversationCleaner()
+        df = pd.DataFrame({"speaker": ["A", "B", "A"], "text": ["안녕", "응", "안녕"]})
+        assert cleaner.clean(df)["text"].tolist() == ["안녕!", "응!", "안녕!"]
+        assert llm.invoke.call_count == 2
+        assert vars(cleaner) == {"verbose": False}
+
+        # 다음 실행(다른 사용자)은 이전 실행 결과를 재사용하지 않음
+        cleaner.clean(df)
+        assert llm.invoke.call_count == 4
+        print("✅ Cleaner 노드 무상태 확인")
+
+
+class TestSectionRetrieval:
+    """Feedback 섹션 검색 테스트 (DB는 가짜 커넥션으로 대체)"""
+
+    def test_counsel_and_talk_sections_in_one_query(self, monkeypatch):
+        """상담/대화 섹션을 한 번의 쿼리로 받아 이름별로 나누는지 확인"""
+        from unittest.mock import MagicMock
+        import numpy as np
+        from app.llm.agent.Feedback import nodes
+
+        cursor = MagicMock()
+        cursor.fetchall.return_value = [
+            {"name": "counsel", "section_id": "s1", "best_dist": 0.2, "canonical_path": "1장",
+             "book_title": "상담의 기술", "text": "첫 청크\n\n둘째 청크", "citations": ["p.3", "p.1"]},
+            {"name": "talk", "section_id": "s9", "best_dist": 0.4, "canonical_path": "9장",
+             "book_title": None, "text": None, "citations": None},
+        ]
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = cursor
+        engine = MagicMock()
+        engine.raw_connection.return_value = conn
+        monkeypatch.setattr(nodes, "engine", engine)
+
+        qvec = np.ones(4, dtype=np.float32)
+        sections = nodes.RAGAndAdviceNode(verbose=False)._retrieve_sections(
+            {"counsel": (qvec, True), "talk": (qvec, False)}, "ideal_answer", 0.45
+        )
+
+        assert engine.raw_connection.call_count == 1 and cursor.execute.call_count == 1
+        sql, params = cursor.execute.call_args[0]
+        assert sql.count("%s::vector") == 2 and "JOIN ideal_answer_section s" in sql
+        assert params[:2] == [0, "counsel"] and params[3] is True and params[5] == "talk"
+        assert params[-3:] == [50, 0.45, 6]
+        assert sections["counsel"][0]["citations"] == ["p.1", "p.3"]
+        assert sections["talk"][0]["text"] == "" and sections["talk"][0]["citations"] == []
+        conn.close.assert_called_once()
+        print("✅ 상담/대화 섹션 단일 쿼리 검색 확인")
+
+    def test_hybrid_mode_uses_query_texts(self, monkeypatch):
+        """hybrid 모드가 쿼리 텍스트의 내용어와 작은 벡터 후보 수로 한 번의 쿼리를 보내는지 확인"""
+        from unittest.mock import MagicMock
+        import numpy as np
+        from app.llm.agent.Feedback import nodes
+
+        cursor = MagicMock()
+        cursor.fetchall.return_value = [
+            {"name": "talk", "section_id": "s3", "best_dist": 0.5, "canonical_path": "3장",
+             "book_title": "대화법", "text": "나 전달법 본문", "citations": ["p.7"]},
+        ]
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = cursor
+        engine = MagicMock()
+        engine.raw_connection.return_value = conn
+        monkeypatch.setattr(nodes, "engine", engine)
+
+        qvec = np.ones(4, dtype=np.float32)
+        sections = nodes.RAGAndAdviceNode(verbose=False)._retrieve_sections(
+            {"counsel": (qvec, True), "talk": (qvec, False)}, "ideal_answer", 0.45,
+            mode="hybrid", query_texts={"counsel": "상담 기법", "talk": "나 전달법 대화"},
+        )
+
+        assert cursor.execute.call_count == 1
+        sql, params = cursor.execute.call_args[0]
+        assert sql.count("to_tsquery('simple'") == 2 and "JOIN ideal_answer_section s" in sql
+        assert params["tsq0"] == "상담 | 기법" and "전달" in params["tsq1"]
+        assert params["for_counsel0"] is True and params["for_counsel1"] is False
+        assert params["vector_k"] == 20 and abs(params["max_distance"] - 0.55) < 1e-9
+        assert sections["counsel"] == [] and sections["talk"][0]["section_id"] == "s3"
+        print("✅ 하이브리드 섹션 검색 확인")
+
+    def test_mmr_drops_redundant_sections(self, monkeypatch):
+        """MMR을 켜면 후보를 3배로 받아 같은 책의 비슷한 섹션을 제외하고 max_sections개만 남기는지 확인"""
+        from unittest.mock import MagicMock
+        import numpy as np
+        from app.llm.agent.Feedback import nodes
+
+        same = np.array([1.0, 0.0], dtype=np.float32)
+        cursor = MagicMock()
+        cursor.fetchall.return_value = [
+            {"name": "talk", "section_id": sid, "best_dist": dist, "canonical_path": sid,
+             "book_title": book, "text": sid, "citations": [], "embedding": emb}
+            for sid, dist, book, emb in [
+                ("s1", 0.20, "대화법", same),
+                ("s2", 0.21, "대화법", same),
+                ("s3", 0.30, "감정 코칭", np.array([0.0, 1.0], dtype=np.float32)),
+            ]
+        ]
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = cursor
+        engine = MagicMock()
+        engine.raw_connection.return_value = conn
+        monkeypatch.setattr(nodes, "engine", engine)
+
+        sections = nodes.RAGAndAdviceNode(verbose=False)._retrieve_sections(
+            {"talk": (np.ones(2, dtype=np.float32), False)}, "ideal_answer", 0.45,
+            max_sections=2, mmr_lambda=0.7, max_per_book=2,
+        )
+
+        sql, params = cursor.execute.call_args[0]
+        assert "s.embedding" in sql and params[-1] == 6
+        assert [sec["section_id"] for sec in sections["talk"]] == ["s1", "s3"]
+        assert "embedding" not in sections["talk"][0]
+        print("✅ MMR 섹션 중복 제거 확인")
+
+    def test_retrieval_cache_skips_embedding_and_search(self, monkeypatch):
+        """같은 쿼리/조건의 두 번째 검색은 임베딩과 KNN 없이 캐시된 섹션 ID로 본문만 조회하는지 확인"""
+        from unittest.mock import MagicMock
+        import numpy as np
+        from app.llm.agent.Feedback import nodes
+        from app.llm.rag.retrieval_cache import RetrievalCache
+
+        cache = RetrievalCache(lambda: 1)
+        monkeypatch.setattr(nodes, "get_retrieval_cache", lambda: cache)
+
+        node = nodes.RAGAndAdviceNode(verbose=False)
+        embeds, searches = [], []
+        monkeypatch.setattr(node, "_make_query_embedding", lambda client, text: embeds.append(text) or np.ones(2))
+
+        def fake_retrieve(queries, table, sim_threshold, **kwargs):
+            searches.append(sorted(queries))
+            return {
+                name: [{"section_id": f"{name}-s1", "best_dist": 0.2, "text": "본문", "citations": []}]
+                for name in queries
+            }
+        monkeypatch.setattr(node, "_retrieve_sections", fake_retrieve)
+
+        cursor = MagicMock()
+        cursor.fetchall.return_value = [
+            {"section_id": sid, "canonical_path": "1장", "book_title": "대화법", "text": " 본문 ",
+             "citations": ["p.1"], "embedding": None}
+            for sid in ("counsel-s1", "talk-s1")
+        ]
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = cursor
+        engine = MagicMock()
+        engine.raw_connection.return_value = conn
+        monkeypatch.setattr(nodes, "engine", engine)
+
+        queries = {"counsel": ("엄마와 갈등", True), "talk": ("엄마와 갈등", False)}
+        first = node._retrieve_sections_cached(None, queries, "ideal_answer", 0.45)
+        assert embeds == ["엄마와 갈등", "엄마와 갈등"] and searches == [["counsel", "talk"]]
+        assert engine.raw_connection.call_count == 0
+
+        # 공백만 다른 같은 쿼리
+        second = node._retrieve_sections_cached(
+            None, {"counsel": queries["counsel"], "talk": (" 엄마와  갈등", False)}, "ideal_answer", 0.45
+        )
+        assert len(embeds) == 2 and len(searches) == 1 and cache.hits == 2
+        assert cursor.execute.call_count == 1 and "WHERE section_id = ANY" in cursor.execute.call_args[0][0]
+        assert [sec["section_id"] for sec in second["counsel"]] == [sec["section_id"] for sec in first["counsel"]]
+        assert second["talk"][0]["text"] == "본문" and abs(second["talk"][0]["similarity"] - 0.8) < 1e-9
+        assert "embedding" not in second["talk"][0]
+
+        # 조건(임계값)이 다르면 다시 검색
+        node._retrieve_sections_cached(None, {"talk": queries["talk"]}, "ideal_answer", 0.5)
+        assert searches[-1] == ["talk"] and len(embeds) == 3
+        print("✅ 검색 캐시 히트 시 임베딩/검색 생략 확인")
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -179,5 +179,73 @@ class TestNotificationFunctions:
             pytest.fail(f"분석 실패 알림 함수 실행 실패: {str(e)}")
 
 
+class TestTokenStreamCoalescer:
+    """토큰 스트림 프레임 병합 테스트"""
+    
+    def test_coalesce_tokens_into_frames(self):
+        """짧은 간격의 토큰 조각이 하나의 프레임으로 병합되는지 확인"""
+        import json
+        from app.domains.conversation.websocket import manager, TokenStreamCoalescer
+        
+        conversation_id = "stream-conv-id"
+        mock_websocket = MagicMock()
+        mock_websocket.send_text = AsyncMock()
+        manager.active_connections[conversation_id] = [mock_websocket]
+        
+        async def scenario():
+            streamer = TokenStreamCoalescer(
+                conversation_id, "report", asyncio.get_running_loop(), interval=10.0
+            )
+            # 워커 스레드에서 토큰 전달 (파이프라인과 동일한 방식)
+            await asyncio.to_thread(lambda: [streamer.push(t) for t in ["안녕", "하세", "요"]])
+            streamer.close()
+            await asyncio.sleep(0.05)
+        
+        try:
+            asyncio.run(scenario())
+        finally:
+            manager.active_connections.pop(conversation_id, None)
+        
+        frames = [json.loads(c.args[0]) for c in mock_websocket.send_text.call_args_list]
+        assert len(frames) == 1
+        assert frames[0]["type"] == "analysis_stream"
+        assert frames[0]["data"]["delta"] == "안녕하세요"
+        assert frames[0]["data"]["done"] is True
+        print("✅ 토큰 스트림 프레임 병합 테스트 통과")
+    
+    def test_timer_flushes_buffer_during_pause(self):
+        """생성이 간격보다 오래 멈추면 다음 push/close 없이도 버퍼가 전송되는지 확인"""
+        import json
+        from app.domains.conversation.websocket import manager, TokenStreamCoalescer
+        
+        conversation_id = "stream-pause-conv-id"
+        mock_websocket = MagicMock()
+        mock_websocket.send_text = AsyncMock()
+        manager.active_connections[conversation_id] = [mock_websocket]
+        
+        async def scenario():
+            streamer = TokenStreamCoalescer(
+                conversation_id, "advice", asyncio.get_running_loop(), interval=0.05
+            )
+            await asyncio.to_thread(lambda: [streamer.push(t) for t in ["잠시", " 멈춤"]])
+            await asyncio.sleep(0.2)
+            sent_before_close = mock_websocket.send_text.call_count
+            streamer.close()
+            await asyncio.sleep(0.05)
+            return sent_before_close
+        
+        try:
+            sent_before_close = asyncio.run(scenario())
+        finally:
+            manager.active_connections.pop(conversation_id, None)
+        
+        frames = [json.loads(c.args[0])["data"] for c in mock_websocket.send_text.call_args_list]
+        assert sent_before_close == 1
+        assert frames[0]["delta"] == "잠시 멈춤" and frames[0]["done"] is False
+        assert frames[1]["delta"] == "" and frames[1]["done"] is True
+        assert [f["seq"] for f in frames] == [0, 1]
+        print("✅ 토큰 스트림 타이머 플러시 테스트 통과")
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
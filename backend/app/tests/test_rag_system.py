@@ -316,6 +316,1116 @@ def test_error_handling():
         return False
 
 
+def test_toc_chunker_hierarchy_and_ranges():
+    """
+    TOC 계층(스택 1회 순회) 및 섹션 페이지 범위(1회 스윕) 테스트
+    """
+    logger.info("TOC 계층/페이지 범위 테스트 시작")
+    
+    from app.llm.rag.chunkers.toc_chunker import TOCChunker
+    
+    toc = [
+        {"toc_id": "a", "level": 1, "title": "1장", "page": 1},
+        {"toc_id": "a1", "level": 2, "title": "1-1", "page": 1},
+        {"toc_id": "a2", "level": 2, "title": "1-2", "page": 3},
+        {"toc_id": "b", "level": 1, "title": "2장", "page": 6},
+        {"toc_id": "b1", "level": 2, "title": "2-1", "page": 6},
+    ]
+    chunker = TOCChunker()
+    
+    parent_index, children_index = chunker._build_parent_index(toc)
+    assert parent_index["a2"]["toc_id"] == "a"
+    assert parent_index["b1"]["toc_id"] == "b"
+    assert [c["toc_id"] for c in children_index["a"]] == ["a1", "a2"]
+    
+    # [start, end) 0-based: 다음 동급/상위 항목 이전 페이지까지
+    ranges = chunker._compute_extract_ranges(toc, page_count=10)
+    assert ranges["a1"] == (0, 2)
+    assert ranges["a2"] == (2, 5)
+    assert ranges["a"] == (0, 5)
+    assert ranges["b1"] == (5, 10)
+    
+    logger.info("TOC 계층/페이지 범위 테스트 완료")
+    return True
+
+
+def test_parallel_pdf_extraction():
+    """
+    PyMuPDF 페이지 범위 병렬 추출이 순차 추출과 같은 결과를 내는지 테스트
+    """
+    logger.info("PDF 병렬 추출 테스트 시작")
+    
+    import fitz
+    from app.llm.rag.extractors import document_extractors
+    from app.llm.rag.extractors.document_extractors import extract_pdf_pages
+    
+    file_path = os.path.join(tempfile.gettempdir(), "gaon_parallel_extract_test.pdf")
+    with fitz.open() as doc:
+        for i in range(8):
+            doc.new_page().insert_text((72, 72), f"page {i} content")
+        doc.save(file_path)
+    
+    with patch.object(document_extractors, "MIN_PAGES_PER_WORKER", 2):
+        serial = extract_pdf_pages(file_path, workers=1)
+        parallel = extract_pdf_pages(file_path, workers=3)
+    
+    assert serial == parallel
+    assert [f"page {i} content" in text for i, text in enumerate(parallel)] == [True] * 8
+    
+    logger.info("PDF 병렬 추출 테스트 완료")
+    return True
+
+
+def test_streaming_ingest_pipeline():
+    """
+    스트리밍 수집 파이프라인이 섹션 단위 로드/점진적 청킹/배치 임베딩·저장으로 전체 텍스트를 처리하는지 테스트
+    """
+    logger.info("스트리밍 수집 파이프라인 테스트 시작")
+    
+    from app.llm.rag.loaders import document_loader
+    from app.llm.rag.loaders.document_loader import DocumentLoader
+    from app.llm.rag.chunkers.chunking_strategies import ChunkerFactory
+    from app.llm.rag.streaming_pipeline import StreamingIngestPipeline
+    
+    file_path = os.path.join(tempfile.gettempdir(), "gaon_streaming_ingest_test.txt")
+    lines = [f"{i}번째 문장은 스트리밍 수집 테스트용 문장입니다." for i in range(400)]
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+    
+    embedding_service = MagicMock()
+    embedding_service.create_embeddings_batch.side_effect = lambda texts: [[0.0]] * len(texts)
+    vector_db_manager = MagicMock()
+    vector_db_manager.store_embeddings_batch.side_effect = lambda embed_texts, **_: list(range(len(embed_texts)))
+    
+    pipeline = StreamingIngestPipeline(
+        DocumentLoader(), ChunkerFactory(), embedding_service, vector_db_manager,
+        batch_size=8, queue_size=1
+    )
+    try:
+        with patch.object(document_loader, "TEXT_BLOCK_CHARS", 1024):
+            sections = list(DocumentLoader().iter_documents(file_path))
+            results = pipeline.run(file_path, ".txt", {"chunk_sizes": [500], "overlap": 0})
+    finally:
+        os.remove(file_path)
+    
+    assert len(sections) > 1
+    assert "".join(doc.content for doc in sections) == "\n".join(lines)
+    
+    chunks = [r["chunk"] for r in results]
+    assert [c.chunk_index for c in chunks] == list(range(len(chunks)))
+    assert all(len(c.content) <= 500 for c in chunks)
+    stored_lines = [line for c in chunks for line in c.content.split("\n")]
+    assert stored_lines == lines
+    assert embedding_service.create_embeddings_batch.call_count == -(-len(chunks) // 8)
+    
+    # 임베딩 단계 실패는 호출 측으로 전파되어야 함
+    embedding_service.create_embeddings_batch.side_effect = RuntimeError("embedding down")
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+    try:
+        pipeline.run(file_path, ".txt")
+        assert False, "예외가 전파되지 않았습니다"
+    except RuntimeError as e:
+        assert "embedding down" in str(e)
+    finally:
+        os.remove(file_path)
+    
+    logger.info("스트리밍 수집 파이프라인 테스트 완료")
+    return True
+
+
+def test_chunker_offsets():
+    """
+    청커가 원문 기준 정확한 오프셋과 공유 메타데이터로 크기 제한 내 청크를 만드는지 테스트
+    """
+    logger.info("청커 오프셋 테스트 시작")
+    
+    from app.llm.rag.chunkers.chunking_strategies import (
+        Chunk, CharacterChunker, SentenceChunker, RecursiveCharacterChunker, MarkdownChunker
+    )
+    
+    paragraphs = [
+        " ".join(f"{i}-{j}번째 문장에서 아이가 오늘 있었던 일을 이야기했어요." for j in range(i % 7 + 1))
+        for i in range(60)
+    ]
+    text = "# 가족 대화\n\n" + "\n\n".join(paragraphs) + "\n\n## 마무리\n" + "가" * 900
+    
+    chunkers = [
+        (CharacterChunker(chunk_size=300, overlap=50), 300),
+        (SentenceChunker(max_chunk_size=300, overlap=50), 300),
+        (RecursiveCharacterChunker(chunk_sizes=[400, 200], overlap=50), 400),
+        (MarkdownChunker(max_chunk_size=300, overlap=50), 300),
+    ]
+    for chunker, max_size in chunkers:
+        chunks = chunker.chunk(text, {"book": "test"}, "test")
+        assert chunks, type(chunker).__name__
+        assert [c.chunk_index for c in chunks] == list(range(len(chunks)))
+        assert all(c.content == text[c.start:c.end] for c in chunks)
+        assert all(0 < len(c.content) <= max_size for c in chunks)
+        assert all(c.metadata["book"] == "test" for c in chunks)
+        
+        # 공백이 아닌 모든 문자는 어떤 청크에든 포함되어야 함
+        covered = [False] * len(text)
+        for c in chunks:
+            covered[c.start:c.end] = [True] * (c.end - c.start)
+        assert all(covered[i] or text[i].isspace() for i in range(len(text))), type(chunker).__name__
+    
+    chunks = RecursiveCharacterChunker(chunk_sizes=[400, 200], overlap=50).chunk(text, {"book": "test"})
+    assert chunks[0].metadata is chunks[-1].metadata
+    assert not hasattr(chunks[0], "__dict__") and "start" in Chunk.__slots__
+    
+    logger.info("청커 오프셋 테스트 완료")
+    return True
+
+
+def test_token_budgeted_chunking():
+    """
+    토큰 기준 청킹/자르기와 임베딩 요청 묶음이 토큰 한도를 지키는지 테스트 (근사 토큰 계산기 사용)
+    """
+    logger.info("토큰 기준 청킹 테스트 시작")
+    
+    from app.llm.rag.tokenizer import TokenCounter, pack_by_tokens
+    from app.llm.rag.chunkers.chunking_strategies import RecursiveCharacterChunker
+    from app.llm.rag.chunkers.toc_chunker import TOCChunker
+    from app.llm.rag.vector_db import vector_db_manager
+    from app.llm.rag.vector_db.vector_db_manager import EmbeddingService
+    
+    counter = TokenCounter()
+    text = "\n\n".join(
+        " ".join(f"{i}-{j} 오늘은 가족과 함께 저녁을 먹었어요. Dinner was great!" for j in range(i % 5 + 1))
+        for i in range(40)
+    )
+    
+    # 1. 재귀 청커: chunk_sizes를 토큰 수로 해석
+    chunks = RecursiveCharacterChunker(chunk_sizes=[120, 60], overlap=10, token_counter=counter).chunk(text)
+    assert all(c.content == text[c.start:c.end] for c in chunks)
+    assert all(counter.count(c.content) <= 121 for c in chunks)
+    assert chunks[0].metadata["size_unit"] == "tokens"
+    
+    # 2. TOC 청커: 접두어 포함 embed_text가 max_tokens 이하
+    toc_chunker = TOCChunker(max_tokens=80, token_counter=counter)
+    entry = {"toc_id": "t1", "page": 1, "book_name": "test.pdf"}
+    hierarchy = {"l1_title": "1장 대화", "l2_title": "저녁 시간"}
+    toc_chunks = toc_chunker._chunk_text(text.replace("\n\n", " "), entry, hierarchy)
+    assert len(toc_chunks) > 1
+    assert all(counter.count(c["embed_text"]) <= 80 for c in toc_chunks)
+    
+    # 문장 부호 없이 예산보다 긴 문장도 강제 분할
+    run_on = " ".join(f"{i}번째 구절 가족과 대화" for i in range(60))
+    run_on_chunks = toc_chunker._chunk_text(run_on, entry, hierarchy)
+    assert len(run_on_chunks) > 1
+    assert all(counter.count(c["embed_text"]) <= 80 for c in run_on_chunks)
+    assert [c["chunk_ix"] for c in run_on_chunks] == list(range(len(run_on_chunks)))
+    assert "".join(c["full_text"] for c in run_on_chunks).replace(" ", "") == run_on.replace(" ", "")
+    
+    # 3. 자르기/요청 묶음
+    truncated, count = counter.fit(text, 100)
+    assert count <= 100 and text.startswith(truncated)
+    assert pack_by_tokens([5, 5, 5, 20, 1], max_tokens=10, max_inputs=2) == [(0, 2), (2, 3), (3, 4), (4, 5)]
+    
+    with patch("openai.OpenAI") as client_cls, \
+         patch.object(vector_db_manager, "get_token_counter", return_value=counter):
+        client = client_cls.return_value
+        client.embeddings.create.side_effect = lambda input, model: MagicMock(
+            data=[MagicMock(embedding=[float(len(t))]) for t in input]
+        )
+        service = EmbeddingService(MagicMock())
+        service.max_input_tokens = 50
+        service.max_request_tokens = 120
+        
+        texts = [c.content for c in chunks[:6]] + [text]
+        embeddings = service.create_embeddings_batch(texts)
+    
+    requests = [call.kwargs["input"] for call in client.embeddings.create.call_args_list]
+    assert len(requests) > 1
+    assert all(sum(counter.count(t) for t in batch) <= 120 for batch in requests)
+    assert all(counter.count(t) <= 50 for batch in requests for t in batch)
+    assert [e[0] for e in embeddings] == [float(len(t)) for batch in requests for t in batch]
+    assert len(embeddings) == len(texts)
+    
+    logger.info("토큰 기준 청킹 테스트 완료")
+    return True
+
+
+def test_incremental_reingest_diff():
+    """
+    재수집 시 content_hash 비교로 신규/갱신/유지/삭제 청크를 구분하는지 테스트
+    """
+    logger.info("증분 재수집 비교 테스트 시작")
+    
+    from app.llm.rag.chunkers.toc_chunker import TOCChunker, compute_content_hash, diff_chunks
+    
+    chunker = TOCChunker(min_chars=60, max_chars=80)
+    entry = {"toc_id": "t1", "page": 1, "book_name": "test.pdf"}
+    hierarchy = {"l1_title": "1장 대화", "l2_title": "저녁 시간"}
+    text = " ".join(f"{i}번째 문장은 가족과 함께 나눈 이야기입니다." for i in range(12))
+    chunks = chunker._chunk_text(text, entry, hierarchy)
+    assert len(chunks) > 3
+    assert all(c["content_hash"] == compute_content_hash(c["embed_text"].strip()) for c in chunks)
+    assert len({c["section_hash"] for c in chunks}) == 1
+    
+    def stored(chunk, snippet_id):
+        row = {field: chunk.get(field) for field in ("content_hash", "section_hash", "section_id", "canonical_path",
+                                                     "chunk_ix", "page_start", "page_end", "citation")}
+        row["snippet_id"] = snippet_id
+        return row
+    
+    rows = [stored(c, i) for i, c in enumerate(chunks)]
+    
+    # 1. 같은 책을 다시 넣으면 모두 유지
+    diff = diff_chunks(rows, chunks)
+    assert len(diff.unchanged) == len(chunks) and not (diff.insert or diff.update or diff.delete)
+    
+    # 2. 내용 변경 → 신규, 위치만 변경 → 갱신, 사라진 청크 → 삭제
+    changed = dict(chunks[0], embed_text="바뀐 내용", content_hash=compute_content_hash("바뀐 내용"))
+    moved = dict(chunks[1], chunk_ix=99)
+    new_chunks = [changed, moved] + chunks[2:-1]
+    diff = diff_chunks(rows, new_chunks)
+    assert diff.insert == [changed]
+    assert [(row["snippet_id"], chunk["chunk_ix"]) for row, chunk in diff.update] == [(1, 99)]
+    assert len(diff.unchanged) == len(chunks) - 3
+    assert sorted(row["snippet_id"] for row in diff.delete) == [0, len(chunks) - 1]
+    
+    # 3. 해시가 없는 예전 행은 embed_text로 비교해 해시만 채움 (임베딩 재사용)
+    legacy = dict(stored(chunks[2], "legacy"), content_hash=None, section_hash=None, embed_text=chunks[2]["embed_text"].strip())
+    diff = diff_chunks([legacy], [chunks[2]])
+    assert not diff.insert and not diff.delete
+    assert [row["snippet_id"] for row, _ in diff.update] == ["legacy"]
+    
+    # 4. 같은 PDF에서 TOC를 다시 추출해도 섹션 ID가 같아 모든 청크가 유지 (toc_id는 매번 새로 만들어짐)
+    import fitz
+    from app.llm.rag.chunkers.toc_utils import TOCExtractor
+    
+    pdf_path = os.path.join(tempfile.mkdtemp(prefix="gaon_toc_test_"), "family_talk.pdf")
+    doc = fitz.open()
+    for page_no in range(4):
+        page = doc.new_page()
+        body = " ".join(f"Sentence {page_no}-{i} is about listening to family members." for i in range(30))
+        page.insert_textbox(fitz.Rect(40, 40, 560, 800), body, fontsize=9)
+    doc.set_toc([[1, "Chapter One", 1], [2, "Listening", 1], [2, "Speaking", 3], [1, "Chapter Two", 4]])
+    doc.save(pdf_path)
+    doc.close()
+    
+    def extract():
+        toc = TOCExtractor().extract_toc_from_pdf(pdf_path)
+        return toc, TOCChunker(min_chars=200, max_chars=400, dedup_threshold=None).chunk_pdf_by_toc(pdf_path, toc)
+    
+    first_toc, first_chunks = extract()
+    second_toc, second_chunks = extract()
+    assert {e["toc_id"] for e in first_toc}.isdisjoint(e["toc_id"] for e in second_toc)
+    assert len(first_chunks) > 3 and len({c["section_id"] for c in first_chunks}) == 3
+    diff = diff_chunks([stored(c, i) for i, c in enumerate(first_chunks)], second_chunks)
+    assert len(diff.unchanged) == len(second_chunks) and not (diff.insert or diff.update or diff.delete)
+    
+    logger.info("증분 재수집 비교 테스트 완료")
+    return True
+
+
+def test_near_duplicate_filtering():
+    """
+    반복 머리말/꼬리말 제거와 MinHash/LSH 근사 중복 청크 제외 테스트 (책 안 / 파일 간 / 저장된 서명)
+    """
+    logger.info("근사 중복 제거 테스트 시작")
+    
+    import random
+    from app.llm.rag.chunkers.near_dedup import NearDuplicateIndex, strip_repeated_lines
+    from app.llm.rag.chunkers.toc_chunker import TOCChunker
+    from app.llm.rag.loaders.document_loader import DocumentLoader
+    from app.llm.rag.chunkers.chunking_strategies import ChunkerFactory
+    from app.llm.rag.streaming_pipeline import StreamingIngestPipeline
+    
+    rng = random.Random(7)
+    words = "가족 대화 오늘 학교 아이 부모 감정 이야기 마음 시간 친구 저녁 주말 공감".split()
+    
+    def sentence():
+        return " ".join(rng.choices(words, k=10)) + "."
+    
+    # 1. 홀/짝 쪽 머리말과 쪽 번호는 제거, 본문은 유지
+    bodies = ["\n".join(sentence() for _ in range(5)) for _ in range(12)]
+    pages = [
+        ("가족 대화의 기술" if i % 2 else "3장 공감하기") + f"\n{i + 1}\n{body}\n- {i + 1} -\n"
+        for i, body in enumerate(bodies)
+    ]
+    assert [page.strip() for page in strip_repeated_lines(pages)] == bodies
+    
+    # 2. 거의 같은 텍스트는 먼저 등록된 키를 반환
+    index = NearDuplicateIndex()
+    base = " ".join(sentence() for _ in range(10))
+    assert index.find_or_add("a", base) is None
+    assert index.find_or_add("b", base.replace(".", "!", 1)) == "a"
+    assert index.find_or_add("c", base[:60] + " 주말에 친구와 학교에서 있었던 일을 이야기했어요." + base[-60:]) is None
+    assert index.find_or_add("d", " ".join(sentence() for _ in range(10))) is None
+    assert len(index) == 3
+    # find는 조회만, add는 등록만
+    assert index.find(base + " ") == "a" and index.find("완전히 다른 문장입니다 " * 5) is None
+    index.add("e", "완전히 다른 문장입니다 " * 5)
+    assert index.find("완전히 다른 문장입니다 " * 5) == "e" and len(index) == 4
+    
+    # 3. TOC 청커: 섹션마다 반복되는 연습 문제 양식은 한 번만 남김
+    template = "연습 문제: 오늘 가족과 나눈 대화를 떠올리고 상대의 감정을 한 문장으로 적어 보세요. " * 3
+    chunks = [{"full_text": text} for text in (template, sentence() * 4, template + " ", sentence() * 4)]
+    assert TOCChunker()._drop_near_duplicates(chunks) == [chunks[0], chunks[1], chunks[3]]
+    
+    # 4. 스트리밍 파이프라인: 같은 색인을 공유하면 다른 파일의 중복 청크도 임베딩 전에 제외
+    embedding_service = MagicMock()
+    embedding_service.create_embeddings_batch.side_effect = lambda texts: [[0.0]] * len(texts)
+    vector_db_manager = MagicMock()
+    vector_db_manager.store_embeddings_batch.side_effect = lambda embed_texts, **_: list(range(len(embed_texts)))
+    pipeline = StreamingIngestPipeline(
+        DocumentLoader(), ChunkerFactory(), embedding_service, vector_db_manager,
+        dedup_index=NearDuplicateIndex()
+    )
+    text = "\n\n".join(" ".join(sentence() for _ in range(4)) for _ in range(30))
+    paths = [os.path.join(tempfile.gettempdir(), f"gaon_dedup_test_{i}.txt") for i in range(2)]
+    for path in paths:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+    chunk_kwargs = {"chunk_sizes": [400], "overlap": 0}
+    try:
+        # 5. 저장 실패 후 같은 파일을 재시도하면 청크가 그대로 다시 저장됨 (실패한 수집은 색인에 등록되지 않음)
+        vector_db_manager.store_embeddings_batch.side_effect = RuntimeError("DB 연결 끊김")
+        try:
+            pipeline.run(paths[0], ".txt", chunk_kwargs)
+            assert False, "저장 실패가 전파되어야 합니다"
+        except RuntimeError:
+            pass
+        assert len(pipeline.dedup_index) == 0
+        vector_db_manager.store_embeddings_batch.side_effect = lambda embed_texts, **_: list(range(len(embed_texts)))
+        
+        first = pipeline.run(paths[0], ".txt", chunk_kwargs)
+        second = pipeline.run(paths[1], ".txt", chunk_kwargs)
+        # 같은 파일 재수집은 자기 자신과의 일치로 제외되지 않음
+        again = pipeline.run(paths[0], ".txt", chunk_kwargs)
+    finally:
+        for path in paths:
+            os.remove(path)
+    assert len(first) > 1 and second == []
+    assert len(again) == len(first)
+    
+    # 6. DB에 저장한 서명/밴드 키로 다른 책 청크와 비교 (TOC 수집: 겹치는 밴드 키 후보 → 서명 일치율 판단)
+    index = NearDuplicateIndex()
+    boilerplate = "이 장에서 배운 내용을 정리해 봅시다. 오늘 가족과 나눈 대화에서 감정을 먼저 읽어 주었는지 돌아봅니다. " * 3
+    stored_sig, stored_keys = index.signature_keys(boilerplate)
+    near_sig, near_keys = index.signature_keys(boilerplate.replace("오늘", "어제", 1))
+    other_sig, other_keys = index.signature_keys(" ".join(sentence() for _ in range(8)))
+    assert isinstance(stored_sig, bytes) and len(stored_keys) == 16
+    assert set(stored_keys) & set(near_keys) and index.is_near(stored_sig, near_sig)
+    assert not set(stored_keys) & set(other_keys) and not index.is_near(stored_sig, other_sig)
+    assert index.signature_keys(" ... ") is None
+    
+    logger.info("근사 중복 제거 테스트 완료")
+    return True
+
+
+def test_bulk_ingest_resume():
+    """
+    대량 수집이 체크포인트로 완료 파일을 건너뛰고, 실패/변경 파일만 다시 처리하는지 테스트
+    """
+    logger.info("대량 수집 재개 테스트 시작")
+    
+    from app.llm.rag import bulk_ingest
+    from app.llm.rag.bulk_ingest import BulkIngestRunner, GCSObject, gcs_book_id, list_gcs_objects, plan_ingest
+    from app.utils.download_cache import DownloadCache
+    
+    blobs = [MagicMock(generation=i + 1, size=100 * (i + 1)) for i in range(4)]
+    for i, blob in enumerate(blobs):
+        blob.name = f"rag-data/book{i}.txt"
+    folder = MagicMock(generation=1, size=0)
+    folder.name = "rag-data/"
+    storage_client = MagicMock()
+    storage_client.list_blobs.return_value = blobs + [folder]
+    storage_client.bucket.return_value.blob.side_effect = lambda name, generation: MagicMock(
+        download_to_filename=lambda path: open(path, "w", encoding="utf-8").write(f"{name}@{generation}")
+    )
+    
+    class MemoryCheckpointStore:
+        def __init__(self):
+            self.rows = {}
+        
+        def load(self, bucket):
+            return {name: (gen, status) for (b, name), (gen, status) in self.rows.items() if b == bucket}
+        
+        def mark(self, bucket, obj, status, chunk_count=None, error=None):
+            self.rows[(bucket, obj.name)] = (obj.generation, status)
+    
+    book_ids = []
+    
+    def fake_ingest(local_path, book_id, book_title):
+        with open(local_path, encoding="utf-8") as f:
+            content = f.read()
+        assert book_id == gcs_book_id("bucket", book_title) and content.startswith(book_title)
+        book_ids.append(book_id)
+        if "book2" in content and "@3" in content:
+            raise RuntimeError("embedding down")
+        return len(content)
+    
+    store = MemoryCheckpointStore()
+    objects = list_gcs_objects(storage_client, "bucket", "rag-data/")
+    assert [obj.name for obj in objects] == [blob.name for blob in blobs]
+    
+    with patch.object(bulk_ingest, "_init_worker"), patch.object(bulk_ingest, "_ingest_file", side_effect=fake_ingest):
+        runner = BulkIngestRunner(storage_client, "bucket", store, workers=1, download_workers=2,
+                                  cache=DownloadCache(tempfile.mkdtemp(prefix="gaon_cache_test_")))
+        summary = runner.run(plan_ingest(objects, store.load("bucket"))[0])
+        assert summary["done"] == 3 and summary["failed"] == 1
+        
+        # 재실행: 완료된 파일은 건너뛰고, 실패한 파일과 새 generation 파일만 처리
+        objects[0] = GCSObject(objects[0].name, 10, objects[0].size)
+        objects[2] = GCSObject(objects[2].name, 11, objects[2].size)
+        todo, skipped = plan_ingest(objects, store.load("bucket"))
+        assert [obj.name for obj in todo] == ["rag-data/book0.txt", "rag-data/book2.txt"]
+        assert len(skipped) == 2
+        summary = runner.run(todo)
+        assert summary == {"done": 2, "failed": 0, "chunks": len("rag-data/book0.txt@10") + len("rag-data/book2.txt@11")}
+    
+    assert all(status == "done" for _, status in store.load("bucket").values())
+    # 재시도한 book2는 임시 경로가 달라도 같은 book_id
+    assert book_ids.count(gcs_book_id("bucket", "rag-data/book2.txt")) == 2
+    
+    # 워커: 이전 시도가 남긴 같은 책의 청크를 지운 뒤 book_id를 달아 수집
+    worker_rag = MagicMock()
+    worker_rag.load_and_process_file.side_effect = lambda *args, **kwargs: (
+        worker_rag.vector_db_manager.delete_book_embeddings.assert_called_once_with(kwargs["book_id"]),
+        [{"status": "success"}, {"status": "success"}]
+    )[1]
+    book_id = gcs_book_id("bucket", "rag-data/book2.txt")
+    with patch.object(bulk_ingest, "_worker_rag", worker_rag):
+        assert bulk_ingest._ingest_file("/tmp/x/book2.txt", book_id, "rag-data/book2.txt") == 2
+    assert worker_rag.load_and_process_file.call_args.kwargs["book_id"] == book_id
+    
+    logger.info("대량 수집 재개 테스트 완료")
+    return True
+
+
+def test_download_cache():
+    """
+    다운로드 캐시가 같은 버전 파일을 재사용하고, 크기 상한을 넘으면 오래 안 쓴 파일부터 지우는지 테스트
+    """
+    logger.info("다운로드 캐시 테스트 시작")
+    
+    import shutil
+    from types import SimpleNamespace
+    from app.llm.rag.storage.storage_adapter import LocalStorageAdapter
+    from app.utils.download_cache import DownloadCache, fetch_gcs_blobs
+    
+    work_dir = tempfile.mkdtemp(prefix="gaon_cache_test_")
+    try:
+        source_dir = os.path.join(work_dir, "source")
+        os.makedirs(os.path.join(source_dir, "sub"))
+        for name in ("a.txt", "b.pdf", os.path.join("sub", "c.txt")):
+            with open(os.path.join(source_dir, name), "w", encoding="utf-8") as f:
+                f.write(name * 100)
+        
+        cache = DownloadCache(os.path.join(work_dir, "cache"), max_bytes=10 * 1024 * 1024)
+        adapter = LocalStorageAdapter(cache=cache)
+        
+        # 1. 같은 파일은 한 번만 복사, 받은 파일을 지워도 캐시는 유지
+        first = adapter.download_file(os.path.join(source_dir, "a.txt"), os.path.join(work_dir, "out", "1.txt"))
+        os.remove(first)
+        second = adapter.download_file(os.path.join(source_dir, "a.txt"), os.path.join(work_dir, "out", "2.txt"))
+        assert (cache.hits, cache.misses) == (1, 1)
+        with open(second, encoding="utf-8") as f:
+            assert f.read() == "a.txt" * 100
+        
+        # 2. 원본이 바뀌면(수정 시각/크기) 다시 받음
+        with open(os.path.join(source_dir, "a.txt"), "a", encoding="utf-8") as f:
+            f.write("!")
+        adapter.download_file(os.path.join(source_dir, "a.txt"), os.path.join(work_dir, "out", "3.txt"))
+        assert cache.misses == 2
+        
+        # 3. 접두사 다운로드: 상대 경로 유지, 확장자 필터
+        paths = adapter.download_prefix(source_dir, os.path.join(work_dir, "prefix"), extensions=(".txt",))
+        assert sorted(os.path.relpath(p, os.path.join(work_dir, "prefix")) for p in paths) == ["a.txt", os.path.join("sub", "c.txt")]
+        
+        # 4. LRU: 상한을 넘으면 가장 오래 사용하지 않은 파일부터 삭제
+        small = DownloadCache(os.path.join(work_dir, "small"), max_bytes=2500)
+        write = lambda content: (lambda path: open(path, "w").write(content))
+        small.fetch(("k", 1), write("x" * 1000))
+        small.fetch(("k", 2), write("y" * 1000))
+        os.utime(small.path_for(("k", 1)), (1, 1))
+        os.utime(small.path_for(("k", 2)), (2, 2))
+        small.fetch(("k", 1), write("x" * 1000))  # 사용 시각 갱신
+        small.fetch(("k", 3), write("z" * 1000))
+        assert small.get(("k", 1)) and small.get(("k", 3)) and small.get(("k", 2)) is None
+        
+        # 5. GCS 접두사: 캐시에 없는 객체만 transfer manager로 받음
+        blobs = [MagicMock(generation=7), MagicMock(generation=8)]
+        blobs[0].name, blobs[1].name = "rag-data/x.pdf", "rag-data/y.pdf"
+        bucket = MagicMock()
+        bucket.name = "bucket"
+        cache.fetch(("gs", "bucket", "rag-data/x.pdf", 7), write("cached"), ".pdf")
+        
+        def download_many(pairs, **kwargs):
+            assert [(blob.name, blob.generation) for blob, _ in pairs] == [("rag-data/y.pdf", 8)]
+            for _, path in pairs:
+                open(path, "w").write("downloaded")
+        
+        bucket.blob.side_effect = lambda name, generation: SimpleNamespace(name=name, generation=generation)
+        with patch("google.cloud.storage.transfer_manager.download_many", side_effect=download_many):
+            paths = fetch_gcs_blobs(bucket, blobs, [os.path.join(work_dir, "gcs", n) for n in ("x.pdf", "y.pdf")], cache)
+        contents = [open(path).read() for path in paths]
+        assert contents == ["cached", "downloaded"]
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    
+    logger.info("다운로드 캐시 테스트 완료")
+    return True
+
+
+def test_query_vector_bound_once():
+    """
+    KNN 검색이 쿼리 벡터를 numpy 배열로 한 번만 바인딩하고 CTE로 참조하는지 테스트
+    """
+    logger.info("쿼리 벡터 바인딩 테스트 시작")
+    
+    import numpy as np
+    from pgvector.psycopg2.vector import VectorAdapter
+    from app.llm.rag.implementations.rag_toc_based import TOCBasedRAG
+    
+    cursor = MagicMock()
+    cursor.fetchall.return_value = [
+        {"section_id": "s1", "canonical_path": "1장", "full_text": "본문", "distance": 0.25},
+    ]
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__.return_value = cursor
+    
+    with patch("psycopg2.connect", return_value=conn), \
+         patch("pgvector.psycopg2.register_vector") as register_vector, \
+         patch("app.llm.rag.implementations.rag_toc_based.OpenAI") as openai_cls:
+        openai_cls.return_value.embeddings.create.return_value = MagicMock(
+            data=[MagicMock(embedding=[0.1] * 1536)]
+        )
+        rag = TOCBasedRAG(RAGConfig(extra_config={"table_name": "ideal_answer"}))
+        results = rag.search_similar("육아 조언", top_k=3, threshold=0.5)
+    
+    register_vector.assert_called_once_with(conn, globally=False)
+    sql, params = cursor.execute.call_args[0]
+    assert sql.count("%s::vector") == 1 and "WITH q AS" in sql
+    assert len(params) == 3
+    assert isinstance(params[0], np.ndarray) and params[0].dtype == np.float32 and params[0].shape == (1536,)
+    assert params[1:] == (0.5, 3)
+    assert results == [("본문", 0.75, "s1")]
+    
+    # 등록된 pgvector 어댑터가 numpy 배열을 vector 리터럴로 변환
+    assert VectorAdapter(np.array([1, 2], dtype=np.float32)).getquoted() == b"'[1.0,2.0]'"
+    
+    logger.info("쿼리 벡터 바인딩 테스트 완료")
+    return True
+
+
+def test_section_store():
+    """
+    섹션 테이블 갱신 SQL과 섹션 ID 조회(검색 순서 유지)를 테스트
+    """
+    logger.info("섹션 테이블 테스트 시작")
+    
+    from uuid import uuid4
+    from sqlalchemy.dialects import postgresql
+    from app.llm.rag.vector_db.section_store import rebuild_sections, section_table_name
+    from app.llm.rag.implementations.rag_toc_based import TOCBasedRAG
+    
+    assert section_table_name("ideal_answer") == "ideal_answer_section"
+    
+    # 1. 책 단위 갱신: 같은 트랜잭션에서 DELETE 후 INSERT ... SELECT (DB 안에서 집계)
+    conn = MagicMock()
+    conn.execute.return_value.rowcount = 4
+    book_id = uuid4()
+    assert rebuild_sections(conn, book_id=book_id) == 4
+    (delete_sql, delete_params), (insert_sql, insert_params) = [call.args for call in conn.execute.call_args_list]
+    insert_text = str(insert_sql.compile(dialect=postgresql.dialect()))
+    assert str(delete_sql).startswith("DELETE FROM ideal_answer_section WHERE book_id")
+    assert "AVG(embedding)" in insert_text and "E'\\n\\n'" in insert_text and "'{}'" in insert_text
+    assert delete_params == insert_params == {"book_id": book_id}
+    
+    # 2. 섹션 ID 단위 갱신 (빈 목록이면 아무것도 하지 않음)
+    conn.reset_mock()
+    assert rebuild_sections(MagicMock(), section_ids=[]) == 0
+    rebuild_sections(conn, section_ids={"s1"})
+    assert conn.execute.call_args.args[1] == {"section_ids": ["s1"]}
+    
+    # 3. 섹션 조회: 섹션 테이블에서 바로 읽고 요청한 순서 유지
+    cursor = MagicMock()
+    cursor.fetchall.return_value = [
+        {"section_id": "b", "canonical_path": "2장", "full_text": "둘", "citations": []},
+        {"section_id": "a", "canonical_path": "1장", "full_text": "하나", "citations": ["p.1"]},
+    ]
+    db_connection = MagicMock()
+    db_connection.cursor.return_value.__enter__.return_value = cursor
+    with patch("psycopg2.connect", return_value=db_connection), \
+         patch("pgvector.psycopg2.register_vector"), \
+         patch("app.llm.rag.implementations.rag_toc_based.OpenAI"):
+        rag = TOCBasedRAG(RAGConfig(extra_config={"table_name": "ideal_answer"}))
+        sections = rag._fetch_full_sections(["a", "missing", "b"])
+    
+    assert "FROM ideal_answer_section" in cursor.execute.call_args.args[0]
+    assert [section["section_id"] for section in sections] == ["a", "b"]
+    
+    # 4. 단건 삭제/수정도 커밋 전에 해당 섹션을 다시 만들고 코퍼스 버전을 올림
+    from app.llm.rag.vector_db import vector_db_manager
+    from app.llm.rag.vector_db.vector_db_manager import VectorDBManager
+    
+    session = MagicMock()
+    session.query.return_value.filter.return_value.scalar.return_value = "s1"
+    session.query.return_value.filter.return_value.delete.return_value = 1
+    session.query.return_value.filter.return_value.first.return_value = MagicMock(section_id="s2")
+    manager = VectorDBManager.__new__(VectorDBManager)
+    manager.SessionLocal = lambda: session
+    with patch.object(vector_db_manager, "rebuild_sections") as rebuild, \
+         patch.object(vector_db_manager, "bump_corpus_version") as bump:
+        session.commit.side_effect = lambda: (rebuild.assert_called(), bump.assert_called_once_with(session))
+        assert manager.delete_embedding(uuid4()) is True
+        assert rebuild.call_args.kwargs == {"section_ids": ["s1"]}
+        rebuild.reset_mock()
+        bump.reset_mock()
+        assert manager.update_embedding(uuid4(), new_embed_text="새 본문") is True
+        assert rebuild.call_args.kwargs == {"section_ids": ["s2"]}
+    
+    logger.info("섹션 테이블 테스트 완료")
+    return True
+
+
+def test_local_vector_index():
+    """
+    메모리 맵 로컬 벡터 인덱스의 검색, 범주 마스크, 증분 동기화, 프로세스 간 공유(같은 디렉토리 재오픈)를 테스트
+    """
+    logger.info("로컬 벡터 인덱스 테스트 시작")
+    
+    import shutil
+    import uuid
+    import numpy as np
+    import time
+    from contextlib import nullcontext
+    from app.llm.rag.vector_db.local_index import LocalVectorIndex, MARKER_SQL
+    
+    rng = np.random.default_rng(7)
+    rows = [
+        {
+            "snippet_id": uuid.uuid4(),
+            "embedding": rng.normal(size=16).astype(np.float32),
+            "section_id": f"s{i}",
+            "book_title": "부모 상담 가이드" if i % 2 else "대화의 기술",
+            "full_text": f"본문 {i}",
+        }
+        for i in range(30)
+    ]
+    
+    def fake_connection(db_rows):
+        """(snippet_id, xmin) 목록 조회 / ID로 행 조회에 응답하는 가짜 psycopg2 커넥션 (행의 xmin은 marker, 기본 1)"""
+        cursor = MagicMock()
+        
+        def value(row, name):
+            if name == "snippet_id":
+                return str(row["snippet_id"])
+            if name in ("marker", MARKER_SQL):
+                return row.get("marker", 1)
+            return row.get(name)
+        
+        def execute(sql, params=None):
+            names = [name.split(" AS ")[-1].strip() for name in sql.split("SELECT")[1].split("FROM")[0].split(",")]
+            cursor.description = [(name,) for name in names]
+            cursor.fetchall.return_value = [
+                tuple(value(row, name) for name in names) for row in db_rows
+                if params is None or str(row["snippet_id"]) in params[0]
+            ]
+        
+        cursor.execute.side_effect = execute
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = cursor
+        return conn
+    
+    work_dir = tempfile.mkdtemp(prefix="gaon_local_index_test_")
+    try:
+        for dtype in ("float32", "float16"):
+            index_dir = os.path.join(work_dir, dtype)
+            index = LocalVectorIndex(index_dir, dtype=dtype)
+            
+            # 1. 첫 동기화로 전체 스냅샷 생성, 자기 자신이 1위
+            index.refresh(fake_connection(rows[:20]))
+            assert index.count == 20
+            hits = index.search(rows[5]["embedding"], top_k=3)
+            assert hits[0]["section_id"] == "s5" and abs(hits[0]["similarity"] - 1.0) < 1e-2
+            assert hits[0]["snippet_id"] == rows[5]["snippet_id"] and hits[0]["full_text"] == "본문 5"
+            
+            # 2. 범주 마스크 (상담 도서만 / 상담 도서 제외)
+            assert all("상담" in hit["book_title"] for hit in index.search(rows[5]["embedding"], 5, category="counsel"))
+            assert all("상담" not in hit["book_title"]
+                       for hit in index.search(rows[5]["embedding"], 5, exclude_category="counsel"))
+            
+            # 3. 같은 디렉토리를 연 다른 인스턴스(다른 워커)도 같은 결과
+            reader = LocalVectorIndex(index_dir, dtype=dtype)
+            assert [hit["section_id"] for hit in reader.search(rows[5]["embedding"], 3)] == \
+                   [hit["section_id"] for hit in hits]
+            
+            # 4. 증분 동기화: 새 행만 추가, 사라진 행은 삭제 표시 → 다른 인스턴스에도 반영
+            index.refresh(fake_connection(rows[1:25]))
+            assert index.count == 24 and reader.count == 24
+            assert reader.search(rows[22]["embedding"], 1)[0]["section_id"] == "s22"
+            assert all(hit["section_id"] != "s0" for hit in reader.search(rows[0]["embedding"], 30))
+            
+            # 4-1. 제자리에서 수정된 행(xmin 변경)은 삭제 표시 후 새 행으로 다시 추가
+            edited = [
+                {**row, "full_text": "수정된 본문 3", "marker": 2} if row is rows[3] else row
+                for row in rows[1:25]
+            ]
+            index.refresh(fake_connection(edited))
+            assert index.count == 24 and reader.count == 24
+            assert reader.search(rows[3]["embedding"], 1)[0]["full_text"] == "수정된 본문 3"
+            
+            # 4-2. 주기 전이라도 코퍼스 버전이 새로우면 동기화, 한 번 동기화한 버전은 다른 인스턴스도 건너뜀
+            index.refresh_seconds = reader.refresh_seconds = 3600
+            index._last_sync = reader._last_sync = time.monotonic()
+            connect = lambda: nullcontext(fake_connection(edited))
+            assert index.maybe_refresh(connect) is False
+            assert index.maybe_refresh(connect, corpus_version=5) is True
+            assert index.maybe_refresh(connect, corpus_version=5) is False
+            assert reader.maybe_refresh(connect, corpus_version=5) is False
+            assert reader.maybe_refresh(connect, corpus_version=6) is True
+            
+            # 5. 삭제가 많으면 새 버전으로 재구축 (이전 버전 디렉토리 정리)
+            index.refresh(fake_connection(rows[20:30]))
+            assert index.count == 10 and reader.count == 10
+            assert len([p for p in os.listdir(index_dir) if p.startswith("v")]) == 1
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    
+    logger.info("로컬 벡터 인덱스 테스트 완료")
+    return True
+
+
+def test_embedding_versions():
+    """
+    임베딩 버전(모델/차원/저장 형식) 요청 인자, 활성 버전 선택, 버전 컬럼 백필(재임베딩/파생 SQL), 수집 시 버전 컬럼을 테스트
+    """
+    logger.info("임베딩 버전 테스트 시작")
+    
+    import uuid
+    import numpy as np
+    from app.llm.rag.embedding_backfill import EmbeddingBackfill, can_derive
+    from app.llm.rag.vector_db.embedding_versions import embed_query, get_embedding_version, version_columns
+    
+    v1, v2 = get_embedding_version("v1"), get_embedding_version("v2")
+    
+    # 1. 모델 기본 차원이면 dimensions 생략, 축소 차원이면 요청에 포함
+    assert v1.request_kwargs() == {"model": "text-embedding-3-small"}
+    assert v2.request_kwargs() == {"model": "text-embedding-3-small", "dimensions": 512}
+    assert v2.sql_type == "halfvec(512)" and v2.ops == "halfvec_cosine_ops" and v2.column == "embedding_v2"
+    
+    # 2. 활성 버전은 RAG_EMBEDDING_VERSION으로 선택, 쿼리 임베딩은 그 버전의 차원으로 요청
+    client = MagicMock()
+    client.embeddings.create.return_value.data = [MagicMock(embedding=[0.1] * 512)]
+    with patch.dict(os.environ, {"RAG_EMBEDDING_VERSION": "v2"}):
+        assert get_embedding_version() == v2
+        vector = embed_query(client, "아이와 대화하는 법")
+    assert vector.dtype == np.float32 and vector.shape == (512,)
+    assert client.embeddings.create.call_args.kwargs["dimensions"] == 512
+    try:
+        v1.to_array(vector)
+        assert False, "차원 불일치는 오류여야 합니다"
+    except ValueError:
+        pass
+    try:
+        get_embedding_version("v9")
+        assert False, "없는 버전은 오류여야 합니다"
+    except ValueError:
+        pass
+    
+    # 3. 재임베딩 백필: 키셋 배치, 빈 텍스트는 건너뛰고 VALUES 한 번으로 UPDATE
+    ids = sorted(str(uuid.uuid4()) for _ in range(3))
+    cursor = MagicMock()
+    cursor.fetchall.side_effect = [
+        [(ids[0], "첫 청크"), (ids[1], ""), (ids[2], "셋째 청크")],
+        [],
+    ]
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__.return_value = cursor
+    embed = MagicMock(side_effect=lambda texts: [[0.2] * 512 for _ in texts])
+    with patch("app.llm.rag.embedding_backfill.extras.execute_values") as execute_values:
+        stats = EmbeddingBackfill(lambda: conn, v2, embed=embed, batch_size=3).run()
+    assert stats == {"batches": 1, "updated": 2, "skipped": 1}
+    embed.assert_called_once_with(["첫 청크", "셋째 청크"])
+    sql, values = execute_values.call_args.args[1:3]
+    assert "embedding_v2 = v.embedding::halfvec(512)" in sql
+    assert [snippet_id for snippet_id, _ in values] == [ids[0], ids[2]]
+    assert cursor.execute.call_args_list[1].args[1] == (ids[2], 3)  # 다음 배치는 마지막 ID 이후부터
+    assert conn.commit.call_count == 2 and conn.close.called
+    
+    # 4. 파생 백필: 같은 text-embedding-3 모델로 만든 TOC 행만 DB 안에서 잘라 정규화, 나머지(legacy)는 재임베딩
+    assert can_derive(v1, v2) and not can_derive(v2, v1)
+    cursor.reset_mock()
+    cursor.fetchall.side_effect = [[(ids[0],), (ids[1],)], [], [(ids[2], "legacy 청크")], []]
+    embed.reset_mock()
+    with patch("app.llm.rag.embedding_backfill.extras.execute_values"):
+        stats = EmbeddingBackfill(lambda: conn, v2, embed=embed, derive=True, batch_size=2).run()
+    assert stats == {"batches": 2, "updated": 3, "skipped": 0}
+    derive_sql = cursor.execute.call_args_list[0].args[0]
+    assert "l2_normalize(subvector(t.embedding, 1, 512))::halfvec(512)" in derive_sql
+    assert "rag_type = 'toc'" in derive_sql
+    embed.assert_called_once_with(["legacy 청크"])
+    assert cursor.execute.call_args_list[2].args[1] == ("00000000-0000-0000-0000-000000000000", 2)
+    
+    # 5. 수집 경로: v1 임베딩과 함께 v2 컬럼(앞 512개 성분 정규화)도 채움
+    embedding = np.arange(1, 1537, dtype=np.float32)
+    columns = version_columns(embedding)
+    assert set(columns) == {"embedding", "embedding_v2"}
+    expected = embedding[:512] / np.linalg.norm(embedding[:512])
+    assert np.allclose(columns["embedding_v2"], expected) and columns["embedding_v2"].shape == (512,)
+    
+    logger.info("임베딩 버전 테스트 완료")
+    return True
+
+
+def test_hybrid_search():
+    """
+    Kiwi 내용어 추출(수집/검색 공통)과 어휘 + 벡터 하이브리드 검색 SQL(한 문장, RRF 융합)을 테스트
+    """
+    logger.info("하이브리드 검색 테스트 시작")
+    
+    import numpy as np
+    from app.llm.rag.implementations.rag_toc_based import TOCBasedRAG
+    from app.llm.rag.vector_db.lexical import extract_terms, lexical_terms, tsquery_text
+    
+    # 1. 조사/어미는 빠지고 내용어만 남음 (수집 값과 쿼리 값이 같은 형태소)
+    terms = extract_terms("아이가 화를 낼 때 I-메시지 기법으로 감정을 표현하도록 도와주세요")
+    assert {"아이", "메시지", "기법", "감정", "표현"} <= set(terms)
+    assert "가" not in terms and "으로" not in terms
+    assert lexical_terms("감정 코칭의 다섯 단계") == " ".join(extract_terms("감정 코칭의 다섯 단계"))
+    assert tsquery_text("감정 코칭, 감정 표현") == "감정 | 코칭 | 표현"
+    assert tsquery_text("...") == ""
+    
+    # 2. 하이브리드 검색: 벡터/어휘 후보와 RRF 융합을 한 SQL 문으로 실행
+    cursor = MagicMock()
+    cursor.fetchall.return_value = [
+        {"section_id": "s2", "full_text": "감정 코칭 본문", "distance": 0.6},
+        {"section_id": "s1", "full_text": "본문", "distance": 0.3},
+    ]
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__.return_value = cursor
+    
+    with patch("psycopg2.connect", return_value=conn), \
+         patch("pgvector.psycopg2.register_vector"), \
+         patch("app.llm.rag.implementations.rag_toc_based.OpenAI") as openai_cls:
+        openai_cls.return_value.embeddings.create.return_value = MagicMock(
+            data=[MagicMock(embedding=[0.1] * 1536)]
+        )
+        rag = TOCBasedRAG(RAGConfig(extra_config={"table_name": "ideal_answer"}))
+        results = rag.search_similar("감정 코칭 방법", top_k=4, threshold=0.5, mode="hybrid")
+        try:
+            rag.search_similar("감정 코칭", mode="bm25")
+            assert False, "지원하지 않는 모드는 오류여야 합니다"
+        except ValueError:
+            pass
+        # mode를 주지 않으면 설정의 search_mode를 따름
+        hybrid_rag = TOCBasedRAG(RAGConfig(extra_config={"table_name": "ideal_answer", "search_mode": "hybrid"}))
+        hybrid_rag.search_similar("감정 코칭 방법", top_k=4)
+    
+    assert cursor.execute.call_count == 2
+    assert "ORDER BY f.rrf DESC" in cursor.execute.call_args_list[1][0][0]
+    sql, params = cursor.execute.call_args_list[0][0]
+    assert "lexical_tsv @@ q.tsq" in sql and "UNION ALL" in sql and "ORDER BY f.rrf DESC" in sql
+    assert "%(v)s::vector(1536)" in sql and "to_tsquery('simple', %(tsq)s)" in sql
+    assert isinstance(params["v"], np.ndarray) and params["tsq"] == "감정 | 코칭 | 방법"
+    assert params["vector_k"] == 20 and params["lexical_k"] == 20 and params["max_distance"] == 0.5
+    assert params["top_k"] == 4
+    # 어휘로만 찾은 후보(유사도 0.4)도 융합 순서대로 반환
+    assert results == [("감정 코칭 본문", 0.4, "s2"), ("본문", 0.7, "s1")]
+    
+    logger.info("하이브리드 검색 테스트 완료")
+    return True
+
+
+def test_mmr_rerank():
+    """
+    MMR 다양성 재정렬(λ, 책별 제한)과 조언 컨텍스트 섹션 선택을 테스트
+    """
+    logger.info("MMR 재정렬 테스트 시작")
+    
+    import numpy as np
+    from app.llm.rag.implementations.rag_toc_based import TOCBasedRAG
+    from app.llm.rag.rerank import mmr_rerank, mmr_select
+    
+    # 후보 0~2는 거의 같은 내용(같은 장), 3은 다른 내용
+    base = np.array([1.0, 0.0, 0.0])
+    vectors = np.stack([base, base + [0, 0.05, 0], base + [0, 0, 0.05], np.array([0.0, 1.0, 0.0])])
+    relevance = [0.90, 0.89, 0.88, 0.80]
+    
+    # 1. λ=1이면 관련도 순서, λ<1이면 중복 후보 대신 다른 내용을 두 번째로 고름
+    assert mmr_select(relevance, vectors, 3, lambda_=1.0) == [0, 1, 2]
+    assert mmr_select(relevance, vectors, 2, lambda_=0.7) == [0, 3]
+    assert mmr_select(relevance, None, 2) == [0, 1]
+    try:
+        mmr_select(relevance, vectors, 2, lambda_=1.5)
+        assert False, "λ 범위 밖은 오류여야 합니다"
+    except ValueError:
+        pass
+    
+    # 2. 책별 제한: 같은 책은 max_per_group개까지만 (책 정보가 없는 후보는 제한 없음)
+    books = ["A", "A", "A", None]
+    assert mmr_select(relevance, vectors, 4, lambda_=1.0, group_keys=books, max_per_group=2) == [0, 1, 3]
+    
+    # 3. dict 후보: 임베딩이 없는 후보는 중복 벌점 없이 관련도로만 비교
+    items = [
+        {"section_id": f"s{i}", "similarity": rel, "embedding": vec, "book_title": book}
+        for i, (rel, vec, book) in enumerate(zip(relevance, vectors, ["A", "A", "B", "C"]))
+    ]
+    items[3]["embedding"] = None
+    assert [item["section_id"] for item in mmr_rerank(items, 2, max_per_group=1)] == ["s0", "s3"]
+    # 책별 제한은 기본으로 꺼져 있음 (한 책에 몰린 코퍼스도 관련 섹션을 모두 고를 수 있음)
+    same_book = [{**item, "book_title": "A"} for item in items]
+    assert [item["section_id"] for item in mmr_rerank(same_book, 3, lambda_=1.0)] == ["s0", "s1", "s2"]
+    
+    # 4. 조언 생성: 섹션 후보 중 MMR로 고른 3개만 컨텍스트에 사용
+    with patch("psycopg2.connect"), patch("pgvector.psycopg2.register_vector"), \
+         patch("app.llm.rag.implementations.rag_toc_based.OpenAI") as openai_cls:
+        openai_cls.return_value.chat.completions.create.return_value = MagicMock(
+            choices=[MagicMock(message=MagicMock(content="조언"))]
+        )
+        rag = TOCBasedRAG(RAGConfig(extra_config={"mmr_lambda": 0.5, "max_per_book": 1}))
+        sections = [
+            {**item, "canonical_path": f"{i}장", "full_text": f"본문{i}", "citations": []}
+            for i, item in enumerate(items)
+        ]
+        with patch.object(rag, "_search_sections_for_analysis", return_value=sections), \
+             patch.object(rag, "_fetch_analysis_by_id", return_value={"summary": "요약"}):
+            result = rag.generate_advice("analysis-1")
+    
+    prompt = openai_cls.return_value.chat.completions.create.call_args.kwargs["messages"][0]["content"]
+    assert "본문0" in prompt and "본문3" in prompt and "본문2" in prompt and "본문1" not in prompt
+    assert result["advice"] == "조언"
+    # 출처는 프롬프트에 담긴 섹션만 (MMR에서 빠진 1장은 제외)
+    assert [src["path"] for src in result["sources"]] == ["0장", "3장", "2장"]
+    assert all("embedding" not in sec for sec in sections)
+    
+    logger.info("MMR 재정렬 테스트 완료")
+    return True
+
+
+def test_context_packer():
+    """
+    토큰 예산 기반 컨텍스트 구성(관련도/토큰 그리디, 본문 자르기, 출처 유지)과 조언 프롬프트 적용을 테스트
+    """
+    logger.info("컨텍스트 구성 테스트 시작")
+    
+    from app.llm.rag.context_packer import ELLIPSIS, pack_context
+    from app.llm.rag.implementations.rag_toc_based import TOCBasedRAG
+    from app.llm.rag.tokenizer import TokenCounter
+    
+    counter = TokenCounter()  # 근사 모드 (결과가 환경과 무관하도록)
+    render = lambda i, s, body: f"[{i}] {s['title']}\n{body}\n(출처: {s['cite']})"
+    long_body = "나 전달법은 감정을 말하는 방법이다. " * 30
+    items = [
+        {"title": "짧은 섹션", "cite": "p.1", "text": "공감은 상대 감정을 먼저 읽는 것이다.", "similarity": 0.9},
+        {"title": "긴 섹션", "cite": "p.2-9", "text": long_body, "similarity": 0.85},
+        {"title": "덜 관련된 섹션", "cite": "p.30", "text": "짧은 참고 문장.", "similarity": 0.3},
+    ]
+    
+    # 1. 예산이 충분하면 모두 그대로, 순서 유지
+    packed = pack_context(items, 10_000, render, counter=counter)
+    assert [s["title"] for s in packed.items] == ["짧은 섹션", "긴 섹션", "덜 관련된 섹션"]
+    assert packed.dropped == 0 and packed.tokens == counter.count(packed.text)
+    
+    # 2. 예산이 부족하면 토큰당 관련도가 큰 짧은 섹션을 담고, 긴 섹션은 본문만 문장 경계에서 잘라 담음
+    packed = pack_context(items, 300, render, counter=counter)
+    assert packed.tokens <= 300 and packed.tokens == counter.count(packed.text)
+    assert [s["title"] for s in packed.items] == ["짧은 섹션", "긴 섹션", "덜 관련된 섹션"]
+    trimmed = packed.items[1]
+    assert trimmed["truncated"] and trimmed["text"].endswith("다." + ELLIPSIS)
+    assert "truncated" not in items[1] and items[1]["text"] == long_body
+    assert all(f"(출처: {s['cite']})" in packed.text for s in items)
+    assert packed.text.startswith("[1] 짧은 섹션") and "[3] 덜 관련된 섹션" in packed.text
+    
+    # 3. 잘라도 최소 본문이 안 들어가면 제외
+    packed = pack_context(items, 80, render, counter=counter)
+    assert "긴 섹션" not in packed.text and packed.dropped == 1 and packed.tokens <= 80
+    assert pack_context([], 100, render, counter=counter) == ([], "", 0, 0)
+    
+    # 4. 조언 생성: 섹션 길이와 상관없이 컨텍스트가 예산 이내
+    with patch("psycopg2.connect"), patch("pgvector.psycopg2.register_vector"), \
+         patch("app.llm.rag.implementations.rag_toc_based.OpenAI") as openai_cls:
+        openai_cls.return_value.chat.completions.create.return_value = MagicMock(
+            choices=[MagicMock(message=MagicMock(content="조언"))]
+        )
+        rag = TOCBasedRAG(RAGConfig(extra_config={"context_tokens": 400, "mmr_lambda": 1.0}))
+        sections = [
+            {"section_id": f"s{i}", "canonical_path": f"{i}장", "full_text": f"본문{i} " + long_body * 3,
+             "citations": [f"p.{i}"], "similarity": 0.9 - i * 0.1, "book_title": f"책{i}", "embedding": None}
+            for i in range(4)
+        ]
+        with patch.object(rag, "_search_sections_for_analysis", return_value=sections), \
+             patch.object(rag, "_fetch_analysis_by_id", return_value={"summary": "요약"}):
+            result = rag.generate_advice("analysis-1")
+    
+    prompt = openai_cls.return_value.chat.completions.create.call_args.kwargs["messages"][0]["content"]
+    assert 0 < result["context_tokens"] <= 400 and "[0장]" in prompt and "(출처: p.0)" in prompt
+    # 출처는 예산 안에 담긴 섹션만
+    packed_paths = [f"{i}장" for i in range(4) if f"[{i}장]" in prompt]
+    assert [src["path"] for src in result["sources"]] == packed_paths and len(packed_paths) < 4
+    
+    logger.info("컨텍스트 구성 테스트 완료")
+    return True
+
+
+def test_retrieval_cache():
+    """
+    검색 결과 캐시 키(텍스트/벡터), LRU, 코퍼스 버전 무효화와 수집 시 버전 증가를 테스트
+    """
+    logger.info("검색 캐시 테스트 시작")
+    
+    import numpy as np
+    from app.llm.rag.retrieval_cache import RetrievalCache, read_corpus_version, text_key, vector_key
+    from app.llm.rag.vector_db.section_store import bump_corpus_version
+    
+    # 1. 키: 공백 차이는 같은 키, 거의 같은 벡터는 같은 키
+    assert text_key(" 엄마와  갈등\n") == text_key("엄마와 갈등") != text_key("엄마와 화해")
+    v = np.array([0.6, 0.8, 0.0])
+    assert vector_key(v) == vector_key(v * 3 + 0.0001) != vector_key([0.8, 0.6, 0.0])
+    
+    # 2. 히트/미스, LRU (가장 오래 안 쓴 항목부터 제거)
+    version, now = {"v": 1}, {"t": 0.0}
+    cache = RetrievalCache(lambda: version["v"], max_entries=2, version_ttl=5, clock=lambda: now["t"])
+    k1, k2, k3 = (cache.key(text_key(q), True, "ideal_answer", 0.45, 6) for q in ("a", "b", "c"))
+    assert cache.get(k1) is None
+    cache.put(k1, [("s1", 0.2), ("s2", 0.3)])
+    cache.put(k2, [])
+    assert cache.get(k1) == [("s1", 0.2), ("s2", 0.3)] and cache.get(k2) == []
+    cache.get(k1)
+    cache.put(k3, [("s3", 0.1)])
+    assert len(cache) == 2 and cache.get(k2) is None and cache.get(k1) is not None
+    
+    # 3. 버전이 바뀌어도 TTL 안에서는 그대로, TTL이 지나면 전부 비움
+    version["v"] = 2
+    assert cache.get(k1) is not None
+    now["t"] = 10.0
+    assert cache.get(k1) is None and len(cache) == 0
+    
+    # 4. 검색 도중 버전이 바뀐 결과는 저장하지 않음
+    cache.put(k1, [("s1", 0.2)], version=1)
+    assert len(cache) == 0
+    cache.put(k1, [("s1", 0.2)], version=2)
+    assert len(cache) == 1
+    
+    # 5. 버전을 읽을 수 없으면 캐시를 쓰지 않음, 크기 0이면 끔
+    def broken():
+        raise RuntimeError("relation does not exist")
+    failing = RetrievalCache(broken)
+    failing.put(k1, [("s1", 0.2)])
+    assert failing.get(k1) is None and len(failing) == 0
+    disabled = RetrievalCache(lambda: 1, max_entries=0)
+    disabled.put(k1, [("s1", 0.2)])
+    assert disabled.get(k1) is None
+    
+    # 6. 버전 조회/증가 SQL
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__.return_value.fetchone.return_value = (7,)
+    assert read_corpus_version(conn) == 7
+    session = MagicMock()
+    bump_corpus_version(session)
+    sql = str(session.execute.call_args.args[0])
+    assert "rag_corpus_version" in sql and "version + 1" in sql and "ON CONFLICT" in sql
+    
+    logger.info("검색 캐시 테스트 완료")
+    return True
+
+
 def run_all_tests():
     """
     모든 테스트 실행
@@ -327,6 +1437,23 @@ def run_all_tests():
         ("RAG 매니저 테스트", test_rag_manager),
         ("TOC 기반 RAG 테스트", test_toc_rag_basic),
         ("TOC 유틸리티 테스트", test_toc_utilities),
+        ("TOC 계층/페이지 범위 테스트", test_toc_chunker_hierarchy_and_ranges),
+        ("PDF 병렬 추출 테스트", test_parallel_pdf_extraction),
+        ("스트리밍 수집 파이프라인 테스트", test_streaming_ingest_pipeline),
+        ("청커 오프셋 테스트", test_chunker_offsets),
+        ("토큰 기준 청킹 테스트", test_token_budgeted_chunking),
+        ("증분 재수집 비교 테스트", test_incremental_reingest_diff),
+        ("근사 중복 제거 테스트", test_near_duplicate_filtering),
+        ("대량 수집 재개 테스트", test_bulk_ingest_resume),
+        ("다운로드 캐시 테스트", test_download_cache),
+        ("쿼리 벡터 바인딩 테스트", test_query_vector_bound_once),
+        ("섹션 테이블 테스트", test_section_store),
+        ("로컬 벡터 인덱스 테스트", test_local_vector_index),
+        ("임베딩 버전 테스트", test_embedding_versions),
+        ("하이브리드 검색 테스트", test_hybrid_search),
+        ("MMR 재정렬 테스트", test_mmr_rerank),
+        ("컨텍스트 구성 테스트", test_context_packer),
+        ("검색 캐시 테스트", test_retrieval_cache),
         ("예외 처리 테스트", test_error_handling)
     ]
     
@@ -0,0 +1,186 @@
+"""
+다운로드 로컬 디스크 캐시
+
+- (저장소, 버킷, 객체, generation) 키의 해시로 파일을 저장하는 내용 주소 방식 캐시
+  (generation이 같으면 내용이 같으므로 재시도/재처리 시 다시 받지 않음)
+- 전체 크기 상한을 넘으면 가장 오래 사용하지 않은 파일부터 삭제 (LRU, 파일 mtime 기준)
+- 호출 측에는 하드 링크(불가능하면 복사)를 넘겨 주므로, 호출 측이 파일을 지워도 캐시는 유지됨
+- 임시 파일에 받은 뒤 원자적으로 교체하므로 여러 프로세스가 같은 디렉토리를 함께 써도 안전
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+DEFAULT_CACHE_DIR = os.getenv("GAON_DOWNLOAD_CACHE_DIR", os.path.join(tempfile.gettempdir(), "gaon_download_cache"))
+DEFAULT_MAX_BYTES = int(os.getenv("GAON_DOWNLOAD_CACHE_MB", "2048")) * 1024 * 1024
+
+_TEMP_SUFFIX = ".part"
+
+
+class DownloadCache:
+    """크기 상한과 LRU 삭제를 갖춘 다운로드 캐시"""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir or DEFAULT_CACHE_DIR)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+
+    def path_for(self, key: Tuple[Hashable, ...], suffix: str = "") -> Path:
+        """키의 캐시 파일 경로 (확장자는 로더가 형식을 판별할 수 있도록 유지)"""
+        digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        return self.cache_dir / digest[:2] / f"{digest}{suffix}"
+
+    def get(self, key: Tuple[Hashable, ...], suffix: str = "") -> Optional[str]:
+        """캐시된 파일 경로 (없으면 None), 사용 시각을 갱신"""
+        path = self.path_for(key, suffix)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return str(path)
+
+    def temp_path(self, key: Tuple[Hashable, ...], suffix: str = "") -> str:
+        """다운로드용 임시 파일 경로 (캐시 디렉토리 안, commit()으로 확정)"""
+        final_path = self.path_for(key, suffix)
+        final_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=final_path.parent, prefix=final_path.stem, suffix=_TEMP_SUFFIX)
+        os.close(fd)
+        return temp_path
+
+    def commit(self, key: Tuple[Hashable, ...], temp_path: str, suffix: str = "", evict: bool = True) -> str:
+        """임시 파일을 캐시에 확정하고 상한을 넘으면 오래된 파일 삭제 (evict=False면 호출 측에서 한 번에 정리)"""
+        path = self.path_for(key, suffix)
+        os.replace(temp_path, path)
+        if evict:
+            self.evict(keep=path)
+        return str(path)
+
+    def fetch(self, key: Tuple[Hashable, ...], download: Callable[[str], Any], suffix: str = "") -> str:
+        """
+        캐시에 있으면 바로, 없으면 download(임시 경로)로 받아 캐시한 뒤 경로를 반환합니다.
+        같은 프로세스에서 같은 키를 동시에 요청하면 한 번만 받습니다.
+        """
+        with self._lock:
+            key_lock = self._key_locks.setdefault(str(self.path_for(key, suffix)), threading.Lock())
+        with key_lock:
+            cached = self.get(key, suffix)
+            if cached is not None:
+                self.hits += 1
+                return cached
+            self.misses += 1
+            temp_path = self.temp_path(key, suffix)
+            try:
+                download(temp_path)
+            except BaseException:
+                Path(temp_path).unlink(missing_ok=True)
+                raise
+            return self.commit(key, temp_path, suffix)
+
+    def evict(self, keep: Optional[Path] = None) -> int:
+        """전체 크기가 max_bytes 이하가 될 때까지 오래 사용하지 않은 파일부터 삭제, 삭제한 파일 수 반환"""
+        entries = []
+        total = 0
+        for path in self.cache_dir.glob("*/*"):
+            if path.name.endswith(_TEMP_SUFFIX):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        removed = 0
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
+
+
+def link_or_copy(source: str, destination: str) -> str:
+    """캐시 파일을 destination에 하드 링크 (다른 파일 시스템 등으로 불가능하면 복사)"""
+    dest_path = Path(destination)
+    dest_path.parent.mkdir(parents=True, exist_ok=True)
+    dest_path.unlink(missing_ok=True)
+    try:
+        os.link(source, dest_path)
+    except OSError:
+        shutil.copyfile(source, dest_path)
+    return str(dest_path)
+
+
+def gcs_cache_key(bucket_name: str, blob_name: str, generation: int) -> Tuple[str, str, str, int]:
+    """GCS 객체 캐시 키"""
+    return ("gs", bucket_name, blob_name, int(generation))
+
+
+def fetch_gcs_blobs(bucket,
+                    blobs: Sequence[Any],
+                    destinations: Sequence[str],
+                    cache: DownloadCache,
+                    max_workers: int = 8) -> List[str]:
+    """
+    목록 조회로 얻은 blob(이름/generation 포함)들을 캐시를 거쳐 destinations에 내려받습니다.
+    캐시에 없는 객체만 transfer manager로 병렬 다운로드하며, 각 파일은 확정 즉시 destination에 연결합니다.
+
+    Returns:
+        destination 경로 리스트 (blobs 순서)
+    """
+    keys = [gcs_cache_key(bucket.name, blob.name, blob.generation) for blob in blobs]
+    suffixes = [Path(blob.name).suffix for blob in blobs]
+
+    misses = []
+    for i, (key, suffix) in enumerate(zip(keys, suffixes)):
+        cached = cache.get(key, suffix)
+        if cached is None:
+            misses.append(i)
+        else:
+            link_or_copy(cached, destinations[i])
+    cache.hits += len(blobs) - len(misses)
+    cache.misses += len(misses)
+
+    if misses:
+        from google.cloud.storage import transfer_manager
+
+        temp_paths = [cache.temp_path(keys[i], suffixes[i]) for i in misses]
+        pairs = [
+            (bucket.blob(blobs[i].name, generation=blobs[i].generation), temp_path)
+            for i, temp_path in zip(misses, temp_paths)
+        ]
+        try:
+            transfer_manager.download_many(
+                pairs, max_workers=max_workers, worker_type=transfer_manager.THREAD, raise_exception=True
+            )
+        except BaseException:
+            for temp_path in temp_paths:
+                Path(temp_path).unlink(missing_ok=True)
+            raise
+        for i, temp_path in zip(misses, temp_paths):
+            link_or_copy(cache.commit(keys[i], temp_path, suffixes[i], evict=False), destinations[i])
+        cache.evict()
+
+    return [str(destination) for destination in destinations]
+
+
+_default_cache: Optional[DownloadCache] = None
+
+
+def get_download_cache() -> DownloadCache:
+    """프로세스 기본 캐시 (GAON_DOWNLOAD_CACHE_DIR / GAON_DOWNLOAD_CACHE_MB)"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = DownloadCache()
+    return _default_cache
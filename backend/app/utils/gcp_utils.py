@@ -9,41 +9,45 @@ from typing import List, Optional
 from google.cloud import storage
 
 from app.core.config import settings
+from app.utils.download_cache import DownloadCache, fetch_gcs_blobs, gcs_cache_key, get_download_cache, link_or_copy
 
 
 class GCPStorageManager:
     """GCP 스토리지 관리자"""
     
-    def __init__(self, bucket_name: Optional[str] = None):
+    def __init__(self, bucket_name: Optional[str] = None, cache: Optional[DownloadCache] = None):
         self.bucket_name = bucket_name or settings.extra_config.get("bucket_name", "gaon-cloud-data")
         self.client = storage.Client()
         self.bucket = self.client.bucket(self.bucket_name)
+        # (버킷, 객체, generation) 단위 로컬 캐시 (재시도/재처리 시 다시 받지 않음)
+        self.cache = cache or get_download_cache()
     
-    def download_pdfs_from_prefix(self, prefix: str = "rag-data/pdf변환/") -> List[str]:
-        """지정된 prefix에서 PDF 파일들을 임시 디렉토리로 다운로드"""
+    def download_pdfs_from_prefix(self, prefix: str = "rag-data/pdf변환/", max_workers: int = 8) -> List[str]:
+        """지정된 prefix에서 PDF 파일들을 임시 디렉토리로 다운로드 (캐시에 없는 파일만 병렬 다운로드)"""
         temp_dir = Path(tempfile.mkdtemp(prefix="gaon_rag_"))
-        downloaded_files = []
         
-        blobs = self.client.list_blobs(self.bucket_name, prefix=prefix)
+        blobs = [
+            blob for blob in self.client.list_blobs(self.bucket_name, prefix=prefix)
+            if not blob.name.endswith("/") and blob.name.lower().endswith(".pdf")
+        ]
         
-        for blob in blobs:
-            if blob.name.endswith("/") or not blob.name.lower().endswith(".pdf"):
-                continue
-            
-            # 상대 경로 생성
-            rel_path = Path(blob.name[len(prefix):])
-            dest_path = temp_dir / rel_path
-            dest_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            # 파일 다운로드
-            blob.download_to_filename(str(dest_path))
-            downloaded_files.append(str(dest_path))
+        # 상대 경로 유지
+        destinations = [str(temp_dir / blob.name[len(prefix):]) for blob in blobs]
         
-        return downloaded_files
+        return fetch_gcs_blobs(self.bucket, blobs, destinations, self.cache, max_workers=max_workers)
     
     def download_single_file(self, blob_path: str) -> str:
-        """단일 파일을 임시 위치로 다운로드"""
-        blob = self.bucket.blob(blob_path)
+        """단일 파일을 임시 위치로 다운로드 (gs://bucket/path 형식도 허용)"""
+        if blob_path.startswith("gs://"):
+            path_parts = blob_path.split("/", 3)
+            if len(path_parts) <= 3:
+                raise ValueError(f"잘못된 GCS 경로: {blob_path}")
+            blob_path = path_parts[3]
+        
+        # 현재 generation 조회 (같은 generation은 캐시에서 재사용)
+        blob = self.bucket.get_blob(blob_path)
+        if blob is None:
+            raise FileNotFoundError(f"파일이 존재하지 않음: {blob_path}")
         
         # 임시 파일 생성
         suffix = Path(blob_path).suffix
@@ -51,10 +55,13 @@ class GCPStorageManager:
         temp_path = temp_file.name
         temp_file.close()
         
-        # 파일 다운로드
-        blob.download_to_filename(temp_path)
-        
-        return temp_path
+        # 캐시 경유 다운로드 (호출 측이 임시 파일을 지워도 캐시는 유지)
+        cached = self.cache.fetch(
+            gcs_cache_key(self.bucket_name, blob_path, blob.generation),
+            lambda download_path: self.bucket.blob(blob_path, generation=blob.generation).download_to_filename(download_path),
+            suffix
+        )
+        return link_or_copy(cached, temp_path)
     
     def upload_file(self, local_path: str, blob_path: str) -> bool:
         """로컬 파일을 GCP 스토리지에 업로드"""
@@ -0,0 +1,95 @@
+"""
+청킹 전략 처리량/메모리 마이크로 벤치마크
+
+수 MB 크기의 한국어 텍스트(문단/문장/마크다운 헤더 포함)를 생성해
+각 청킹 전략의 처리량(MB/s)과 tracemalloc 기준 최대 메모리(peak)를 측정합니다.
+
+실행:
+    cd backend
+    python -m benchmarks.bench_chunking --mb 4 --runs 3
+"""
+
+import argparse
+import logging
+import random
+import time
+import tracemalloc
+
+from app.llm.rag.logger import rag_logger
+from app.llm.rag.chunkers.chunking_strategies import ChunkerFactory
+
+WORDS = (
+    "가족 대화 오늘 학교 아이 부모 감정 이야기 마음 시간 친구 저녁 주말 "
+    "함께 정말 조금 많이 다시 생각 표현 공감 질문 대답 하루"
+).split()
+ENDINGS = ["했어요.", "그랬구나.", "좋겠다!", "어땠어?", "말해 줘서 고마워."]
+
+STRATEGIES = {
+    "recursive": {"chunk_sizes": [1000, 500, 200], "overlap": 100},
+    "sentence": {"max_chunk_size": 1000, "overlap": 100},
+    "markdown": {"max_chunk_size": 1000, "overlap": 100},
+    "character": {"chunk_size": 1000, "overlap": 100},
+}
+
+
+def make_korean_text(target_mb: float, seed: int = 42) -> str:
+    """문단/문장/헤더가 섞인 한국어 텍스트 생성 (UTF-8 기준 target_mb)"""
+    rng = random.Random(seed)
+    target_bytes = int(target_mb * 1024 * 1024)
+    parts = []
+    size = 0
+    section = 0
+    while size < target_bytes:
+        if rng.random() < 0.05:
+            section += 1
+            block = f"## {section}장 {rng.choice(WORDS)}에 대하여\n\n"
+        else:
+            sentences = [
+                " ".join(rng.choices(WORDS, k=rng.randint(4, 14))) + " " + rng.choice(ENDINGS)
+                for _ in range(rng.randint(2, 8))
+            ]
+            block = " ".join(sentences) + ("\n\n" if rng.random() < 0.7 else "\n")
+        parts.append(block)
+        size += len(block.encode("utf-8"))
+    return "".join(parts)
+
+
+def run_once(strategy: str, text: str) -> int:
+    chunker = ChunkerFactory().get_chunker(strategy, **STRATEGIES[strategy])
+    return len(chunker.chunk(text, {"source": "bench"}, "bench"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="청킹 전략 처리량/메모리 벤치마크")
+    parser.add_argument("--mb", type=float, default=4.0, help="생성할 텍스트 크기 (MB)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--strategies", default=",".join(STRATEGIES))
+    args = parser.parse_args()
+
+    rag_logger.setLevel(logging.ERROR)
+    text = make_korean_text(args.mb)
+    text_mb = len(text.encode("utf-8")) / (1024 * 1024)
+
+    print("=" * 60)
+    print(f"📊 청킹 벤치마크: {text_mb:.1f} MB, {len(text):,}자, {args.runs}회 평균")
+    print("=" * 60)
+    for strategy in args.strategies.split(","):
+        run_once(strategy, text)  # 워밍업
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            count = run_once(strategy, text)
+        elapsed = (time.perf_counter() - start) / args.runs
+
+        tracemalloc.start()
+        run_once(strategy, text)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(
+            f"   {strategy:<10} {count:>7,}개 청크  {elapsed * 1000:9.1f} ms  "
+            f"{text_mb / elapsed:7.1f} MB/s  peak {peak / (1024 * 1024):7.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+임베딩 버전별 검색 품질/지연 비교 (예: v1 vector(1536) vs v2 halfvec(512))
+
+두 버전 컬럼이 모두 채워진 ideal_answer 행을 쿼리로 뽑아(행 자신의 임베딩 사용, 자기 자신은 제외)
+- 정답: 기준 버전(v1) 컬럼의 정확 검색(인덱스 미사용) top-k
+- 품질: 각 버전 인덱스 검색 결과의 recall@k
+- 지연: 각 버전 인덱스 검색의 p50/p95 (ms)
+- 크기: 버전별 인덱스 크기와 행당 평균 컬럼 크기
+를 측정해 JSON으로 출력합니다. (백필이 끝난 뒤 RAG_EMBEDDING_VERSION 전환 전에 실행)
+
+실행:
+    cd backend
+    python -m benchmarks.bench_embedding_versions --queries 200 --top-k 10 --out embedding_versions.json
+"""
+
+import argparse
+import json
+import statistics
+import time
+from typing import Dict, List, Sequence
+
+import psycopg2
+
+from app.core.config import settings
+from app.llm.rag.vector_db.embedding_versions import EMBEDDING_VERSIONS, EmbeddingVersion
+
+TABLE = "ideal_answer"
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def sample_queries(cur, versions: List[EmbeddingVersion], n: int, seed: int) -> List[Dict]:
+    """모든 버전 컬럼이 채워진 행을 고정 순서(시드 해시)로 n개 선택"""
+    not_null = " AND ".join(f"{v.column} IS NOT NULL" for v in versions)
+    columns = ", ".join(f"{v.column}::text AS {v.name}" for v in versions)
+    cur.execute(
+        f"SELECT snippet_id, {columns} FROM {TABLE} WHERE {not_null} "
+        f"ORDER BY md5(snippet_id::text || %s) LIMIT %s",
+        (str(seed), n)
+    )
+    names = [column[0] for column in cur.description]
+    return [dict(zip(names, row)) for row in cur.fetchall()]
+
+
+def knn(cur, version: EmbeddingVersion, query_text: str, exclude_id, top_k: int) -> List[str]:
+    cur.execute(
+        f"""
+        WITH q AS (SELECT %s::{version.sql_type} AS v)
+        SELECT snippet_id FROM {TABLE} CROSS JOIN q
+        WHERE {version.column} IS NOT NULL AND snippet_id <> %s
+        ORDER BY {version.column} <=> q.v
+        LIMIT %s
+        """,
+        (query_text, exclude_id, top_k)
+    )
+    return [str(row[0]) for row in cur.fetchall()]
+
+
+def storage_stats(cur, version: EmbeddingVersion) -> Dict[str, float]:
+    cur.execute(
+        f"SELECT AVG(pg_column_size({version.column})) FROM {TABLE} WHERE {version.column} IS NOT NULL"
+    )
+    avg_bytes = cur.fetchone()[0]
+    cur.execute(
+        """
+        SELECT COALESCE(SUM(pg_relation_size(i.indexrelid)), 0)
+        FROM pg_index i
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+        WHERE i.indrelid = %s::regclass AND a.attname = %s
+        """,
+        (TABLE, version.column)
+    )
+    return {
+        "avg_column_bytes": float(avg_bytes or 0),
+        "index_mb": cur.fetchone()[0] / (1024 * 1024),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="임베딩 버전별 recall/지연 비교")
+    parser.add_argument("--versions", default=",".join(EMBEDDING_VERSIONS), help="비교할 버전 (첫 번째가 정답 기준)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--ef-search", type=int, default=None, help="hnsw.ef_search (기본: 서버 설정)")
+    parser.add_argument("--out", default=None, help="JSON 결과 파일 (기본: 표준 출력만)")
+    args = parser.parse_args()
+
+    versions = [EMBEDDING_VERSIONS[name] for name in args.versions.split(",")]
+    baseline = versions[0]
+    db_url = settings.database_url.replace("postgresql+psycopg2://", "postgresql://")
+    conn = psycopg2.connect(db_url)
+    conn.autocommit = True
+
+    with conn.cursor() as cur:
+        if args.ef_search:
+            cur.execute("SET hnsw.ef_search = %s", (args.ef_search,))
+        queries = sample_queries(cur, versions, args.queries, args.seed)
+        if not queries:
+            raise SystemExit("모든 버전 컬럼이 채워진 행이 없습니다 (embedding_backfill 먼저 실행)")
+
+        # 정답: 기준 버전 정확 검색 (인덱스 끄고 순차 탐색)
+        cur.execute("SET enable_indexscan = off")
+        truth = {
+            str(q["snippet_id"]): set(knn(cur, baseline, q[baseline.name], q["snippet_id"], args.top_k))
+            for q in queries
+        }
+        cur.execute("RESET enable_indexscan")
+
+        report = {"queries": len(queries), "top_k": args.top_k, "baseline": baseline.name, "versions": {}}
+        for version in versions:
+            latencies, recalls = [], []
+            for q in queries:
+                started = time.perf_counter()
+                found = knn(cur, version, q[version.name], q["snippet_id"], args.top_k)
+                latencies.append((time.perf_counter() - started) * 1000)
+                expected = truth[str(q["snippet_id"])]
+                recalls.append(len(expected.intersection(found)) / len(expected) if expected else 1.0)
+            report["versions"][version.name] = {
+                "model": version.model,
+                "dimensions": version.dimensions,
+                "storage": version.storage,
+                f"recall@{args.top_k}": statistics.mean(recalls),
+                "p50_ms": percentile(latencies, 0.50),
+                "p95_ms": percentile(latencies, 0.95),
+                **storage_stats(cur, version),
+            }
+    conn.close()
+
+    print(f"{'version':<8} {'dims':>5} {'storage':<8} {'recall':>7} {'p50(ms)':>8} {'p95(ms)':>8} {'index(MB)':>10} {'bytes/row':>10}")
+    for name, result in report["versions"].items():
+        print(
+            f"{name:<8} {result['dimensions']:>5} {result['storage']:<8} {result[f'recall@{args.top_k}']:>7.3f} "
+            f"{result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['index_mb']:>10.1f} {result['avg_column_bytes']:>10.0f}"
+        )
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"결과 저장: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Agent 파이프라인 실행당 준비(setup) 비용 벤치마크
+
+비교 대상:
+- before: 실행마다 Graph 생성/컴파일 + 노드 호출마다 ChatOpenAI 생성
+- after : 프로세스 단위로 컴파일된 Graph + 공용 LLM 클라이언트 재사용
+
+LLM/DB 호출 없이 준비 비용만 측정합니다.
+
+실행:
+    cd backend
+    python -m benchmarks.bench_graph_setup --runs 50
+"""
+
+import argparse
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from langchain_openai import ChatOpenAI
+
+from app.core.config import settings
+from app.llm.agent.clients import get_chat_llm
+from app.llm.agent.Analysis.graph_analysis import AnalysisGraph, get_analysis_graph
+from app.llm.agent.Feedback.graph_feedback import FeedbackGraph, get_feedback_graph
+
+# 한 번의 파이프라인 실행에서 생성되던 LLM 클라이언트 수
+# (관계 추론 1 + 스타일 1 + 리포트 1 + 책 쿼리 1 + 조언 1)
+LLM_CLIENTS_PER_RUN = 5
+
+
+def setup_before():
+    AnalysisGraph(verbose=False)
+    FeedbackGraph(verbose=False)
+    for _ in range(LLM_CLIENTS_PER_RUN):
+        ChatOpenAI(model="gpt-4o-mini", api_key=settings.openai_api_key or "sk-benchmark")
+
+
+def setup_after():
+    get_analysis_graph(verbose=False)
+    get_feedback_graph(verbose=False)
+    for _ in range(LLM_CLIENTS_PER_RUN):
+        get_chat_llm()
+
+
+def measure(fn, runs: int) -> float:
+    """실행당 평균 소요 시간(ms)"""
+    fn()  # import/첫 컴파일 비용 제외를 위한 워밍업
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - start) / runs * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Graph/LLM 클라이언트 준비 비용 벤치마크")
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    before_ms = measure(setup_before, args.runs)
+    after_ms = measure(setup_after, args.runs)
+
+    print("=" * 60)
+    print(f"📊 실행당 준비 비용 ({args.runs}회 평균)")
+    print("=" * 60)
+    print(f"   before (매 실행 생성/컴파일): {before_ms:8.3f} ms")
+    print(f"   after  (프로세스 단위 재사용): {after_ms:8.3f} ms")
+    if after_ms > 0:
+        print(f"   → {before_ms / after_ms:,.0f}배 감소")
+
+
+if __name__ == "__main__":
+    main()
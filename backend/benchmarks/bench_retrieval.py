@@ -0,0 +1,520 @@
+"""
+검색 경로별 품질/지연 회귀 벤치마크
+
+고정 코퍼스와 정답 섹션이 붙은 쿼리 세트(benchmarks/fixtures/retrieval_eval.json)를 로컬 Postgres+pgvector
+벤치마크 DB에 적재하고, 각 검색 경로를 같은 조건으로 실행해
+- 품질: 섹션 단위 recall@k, MRR
+- 지연: 호출당 p50/p95 (ms), 순차 실행 QPS
+를 JSON 리포트로 출력합니다. 청크 크기(TOCChunker min/max_chars), 임계값(RAG_SIM_THRESHOLD),
+인덱스 설정(hnsw/ivfflat, lists, probes, ef_search)을 바꿔 가며 돌리고 --baseline과 비교해 회귀를 확인합니다.
+
+검색 경로:
+- find_similar     : VectorDBManager.find_similar (청크 → 섹션 순서로 환산)
+- toc_search       : TOCBasedRAG.search_similar (쿼리 임베딩 포함)
+- feedback_knn     : Feedback RAGAndAdviceNode._knn_search (상담/비상담 필터, 임계값 없음)
+- feedback_sections: Feedback RAGAndAdviceNode._retrieve_sections (실제 조언 경로, MMR 제외)
+
+임베딩:
+- stub(기본): 텍스트의 Kiwi 내용어를 해시해 만든 결정적 벡터 (API 호출 없음, 같은 입력 → 같은 결과)
+  유사도가 어휘 겹침 기준이라 실제 모델보다 낮게 나오므로 임계값 튜닝은 --embedder openai로 확인
+- openai: 실제 임베딩 API (코퍼스/쿼리를 한 번씩만 호출해 메모리에 보관)
+
+주의: 대상 DB의 ideal_answer / ideal_answer_section을 비우고 다시 채우므로
+이름에 "bench"가 들어간 전용 DB만 허용합니다 (--allow-any-db로 해제).
+
+실행:
+    cd backend
+    createdb gaon_bench
+    python -m benchmarks.bench_retrieval --database-url postgresql://postgres@localhost:5432/gaon_bench \\
+        --top-k 5 --threshold 0.2 --index hnsw --ef-search 40 --distractors 20000 --out retrieval.json
+    python -m benchmarks.bench_retrieval ... --max-chars 300 --min-chars 200 --baseline retrieval.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+DATA_PATH = Path(__file__).parent / "fixtures" / "retrieval_eval.json"
+TABLE = "ideal_answer"
+PATHS = ("find_similar", "toc_search", "feedback_knn", "feedback_sections")
+
+# 잡음 청크 한 개의 내용어 수 / 섹션당 청크 수
+DISTRACTOR_TERMS = 40
+DISTRACTOR_CHUNKS_PER_SECTION = 4
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def stub_embedding(terms: Sequence[str], dimensions: int) -> np.ndarray:
+    """내용어 해시 벡터 (부호 있는 feature hashing, L2 정규화)"""
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for term in terms:
+        digest = hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], "little") % dimensions
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        vector[0] = 1.0
+        return vector
+    return vector / norm
+
+
+class _Embedding:
+    def __init__(self, embedding):
+        self.embedding = embedding
+
+
+class _Response:
+    def __init__(self, embeddings):
+        self.data = [_Embedding(embedding) for embedding in embeddings]
+
+
+class StubEmbeddingClient:
+    """OpenAI 클라이언트의 embeddings.create만 흉내 내는 결정적 임베딩 (결과는 입력별로 메모)"""
+
+    def __init__(self, extract_terms: Callable[[str], List[str]]):
+        self.extract_terms = extract_terms
+        self.embeddings = self
+        self._memo: Dict[tuple, np.ndarray] = {}
+
+    def create(self, input, model: str = None, dimensions: Optional[int] = None, **kwargs):
+        texts = [input] if isinstance(input, str) else list(input)
+        dimensions = dimensions or 1536
+        return _Response([self.embed(text, dimensions) for text in texts])
+
+    def embed(self, text: str, dimensions: int) -> np.ndarray:
+        key = (text, dimensions)
+        if key not in self._memo:
+            self._memo[key] = stub_embedding(self.extract_terms(text), dimensions)
+        return self._memo[key]
+
+
+class MemoEmbeddingClient:
+    """실제 OpenAI 임베딩을 입력별로 한 번만 호출 (반복 측정에 API 지연이 섞이지 않도록)"""
+
+    def __init__(self, client):
+        self.client = client
+        self.embeddings = self
+        self._memo: Dict[tuple, list] = {}
+
+    def create(self, input, model: str = None, dimensions: Optional[int] = None, **kwargs):
+        texts = [input] if isinstance(input, str) else list(input)
+        todo = [text for text in dict.fromkeys(texts) if (text, model, dimensions) not in self._memo]
+        for start in range(0, len(todo), 256):
+            batch = todo[start:start + 256]
+            request = {"model": model, **({"dimensions": dimensions} if dimensions else {})}
+            response = self.client.embeddings.create(input=batch, **request)
+            for text, item in zip(batch, response.data):
+                self._memo[(text, model, dimensions)] = item.embedding
+        return _Response([self._memo[(text, model, dimensions)] for text in texts])
+
+
+def ranked_sections(section_ids: Sequence[Optional[str]], k: int) -> List[str]:
+    """청크/섹션 결과의 섹션 ID를 첫 등장 순서로 k개"""
+    return [sid for sid in dict.fromkeys(sid for sid in section_ids if sid)][:k]
+
+
+def score_query(found: Sequence[str], relevant: Sequence[str]) -> Dict[str, float]:
+    """섹션 단위 recall@k와 reciprocal rank"""
+    relevant = set(relevant)
+    hits = [i for i, sid in enumerate(found) if sid in relevant]
+    return {
+        "recall": len(relevant.intersection(found)) / len(relevant) if relevant else 1.0,
+        "rr": 1.0 / (hits[0] + 1) if hits else 0.0,
+    }
+
+
+def chunk_corpus(data: Dict[str, Any], min_chars: int, max_chars: int) -> List[Dict[str, Any]]:
+    """고정 코퍼스 섹션을 수집과 같은 TOCChunker 규칙으로 청킹"""
+    from app.llm.rag.chunkers.toc_chunker import TOCChunker
+
+    chunker = TOCChunker(min_chars=min_chars, max_chars=max_chars, dedup_threshold=None)
+    chunks = []
+    for book in data["books"]:
+        for section in book["sections"]:
+            entry = {
+                "toc_id": section["section_id"],
+                "page": section["page_start"],
+                "page_start": section["page_start"],
+                "page_end": section["page_end"],
+                "book_name": book["title"],
+                "level": 2,
+            }
+            hierarchy = {"l1_title": section["l1_title"], "l2_title": section["l2_title"]}
+            for chunk in chunker._chunk_text(section["text"], entry, hierarchy):
+                chunks.append({**chunk, "book_id": book["book_id"], "book_title": book["title"]})
+    return chunks
+
+
+def distractor_chunks(vocabulary: Sequence[str], count: int, seed: int) -> List[Dict[str, Any]]:
+    """코퍼스 어휘를 무작위로 섞은 잡음 청크 (정답과 경쟁하는 후보, 테이블/인덱스 규모 확대용)"""
+    rng = random.Random(seed)
+    books = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(max(1, count // 1000))]
+    chunks = []
+    for i in range(count):
+        terms = rng.choices(vocabulary, k=DISTRACTOR_TERMS)
+        section_id = f"noise-{i // DISTRACTOR_CHUNKS_PER_SECTION}"
+        book_ix = (i // DISTRACTOR_CHUNKS_PER_SECTION) % len(books)
+        text = " ".join(terms)
+        chunks.append({
+            "section_id": section_id,
+            "canonical_path": f"잡음 {section_id}",
+            "chunk_ix": i % DISTRACTOR_CHUNKS_PER_SECTION,
+            "page_start": 1,
+            "page_end": 1,
+            "full_text": text,
+            "embed_text": text,
+            "citation": f"잡음 도서 {book_ix}, p.1",
+            "book_id": books[book_ix],
+            "book_title": f"잡음 도서 {book_ix}",
+            "terms": terms,
+        })
+    return chunks
+
+
+def load_corpus(conn, database_url: str, chunks: List[Dict[str, Any]],
+                embed: Callable[[List[Dict[str, Any]], int], List[np.ndarray]],
+                lexical_terms: Callable[[str], str], versions) -> None:
+    """ideal_answer를 비우고 청크를 적재한 뒤 섹션 테이블을 책별로 다시 만듦"""
+    import psycopg2.extras as extras
+    from sqlalchemy import create_engine
+    from app.llm.rag.vector_db.section_store import rebuild_sections, section_table_name
+
+    with conn.cursor() as cur:
+        cur.execute(f"TRUNCATE {TABLE}, {section_table_name(TABLE)}")
+    conn.commit()
+
+    columns = [version.column for version in versions]
+    template = "(" + ", ".join(["%s"] * 15 + [f"%s::{version.sql_type}" for version in versions]) + ")"
+    for start in range(0, len(chunks), 1000):
+        batch = chunks[start:start + 1000]
+        vectors = [embed(batch, version.dimensions) for version in versions]
+        rows = [
+            (
+                str(uuid.uuid4()), chunk["book_id"], chunk["book_title"], chunk.get("l1_title"),
+                chunk.get("l2_title"), chunk["canonical_path"], chunk["section_id"], chunk["chunk_ix"],
+                chunk["page_start"], chunk["page_end"], chunk["citation"], chunk["full_text"], chunk["embed_text"],
+                " ".join(chunk["terms"]) if "terms" in chunk else lexical_terms(chunk["embed_text"]), "toc",
+                *(np.asarray(column_vectors[i], dtype=np.float32) for column_vectors in vectors),
+            )
+            for i, chunk in enumerate(batch)
+        ]
+        with conn.cursor() as cur:
+            extras.execute_values(
+                cur,
+                f"""
+                INSERT INTO {TABLE}
+                    (snippet_id, book_id, book_title, l1_title, l2_title, canonical_path, section_id, chunk_ix,
+                     page_start, page_end, citation, full_text, embed_text, lexical_terms, rag_type,
+                     {", ".join(columns)})
+                VALUES %s
+                """,
+                rows,
+                template=template,
+                page_size=len(rows)
+            )
+        conn.commit()
+
+    engine = create_engine(database_url)
+    with engine.begin() as connection:
+        for book_id in dict.fromkeys(chunk["book_id"] for chunk in chunks):
+            rebuild_sections(connection, book_id=book_id, chunk_table=TABLE)
+    engine.dispose()
+
+
+def build_index(conn, version, index: str, lists: int, m: int, ef_construction: int) -> float:
+    """검색 컬럼 인덱스를 다시 만들고 걸린 시간(초) 반환"""
+    name = f"ix_bench_{TABLE}_{version.column}"
+    started = time.perf_counter()
+    with conn.cursor() as cur:
+        cur.execute(f"DROP INDEX IF EXISTS {name}")
+        if index == "hnsw":
+            cur.execute(
+                f"CREATE INDEX {name} ON {TABLE} USING hnsw ({version.column} {version.ops}) "
+                f"WITH (m = {m}, ef_construction = {ef_construction})"
+            )
+        elif index == "ivfflat":
+            cur.execute(
+                f"CREATE INDEX {name} ON {TABLE} USING ivfflat ({version.column} {version.ops}) "
+                f"WITH (lists = {lists})"
+            )
+        cur.execute(f"ANALYZE {TABLE}")
+    conn.commit()
+    return time.perf_counter() - started
+
+
+def run_path(search: Callable[[Dict[str, Any]], List[str]], queries: List[Dict[str, Any]],
+             top_k: int, repeat: int, warmup: int) -> Dict[str, Any]:
+    """쿼리 세트를 repeat번 실행 (품질은 첫 회차 기준, 지연/QPS는 전체 호출 기준)"""
+    for query in queries[:warmup]:
+        search(query)
+
+    latencies, scores, empty = [], [], 0
+    started = time.perf_counter()
+    for round_ix in range(repeat):
+        for query in queries:
+            call_started = time.perf_counter()
+            found = search(query)
+            latencies.append((time.perf_counter() - call_started) * 1000)
+            if round_ix == 0:
+                scores.append(score_query(found[:top_k], query["relevant"]))
+                empty += not found
+    elapsed = time.perf_counter() - started
+    return {
+        f"recall@{top_k}": statistics.mean(score["recall"] for score in scores),
+        "mrr": statistics.mean(score["rr"] for score in scores),
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "qps": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "empty_results": empty,
+        "calls": len(latencies),
+    }
+
+
+def build_searches(args, client, version) -> Dict[str, Callable[[Dict[str, Any]], List[str]]]:
+    """경로별 search(query) → 섹션 ID 순위 (쿼리 벡터는 미리 만들어 두고 toc_search만 내부에서 임베딩)"""
+    from app.core.database import engine
+    from app.llm.agent.Feedback.nodes import RAGAndAdviceNode
+    from app.llm.rag.implementations.rag_interface import RAGConfig
+    from app.llm.rag.implementations.rag_toc_based import TOCBasedRAG
+    from app.llm.rag.vector_db.embedding_versions import embed_query
+    from app.llm.rag.vector_db.vector_db_manager import VectorDBManager
+
+    vectors = {}
+
+    def qvec(query):
+        if query["id"] not in vectors:
+            vectors[query["id"]] = embed_query(client, query["text"], version)
+        return vectors[query["id"]]
+
+    manager = VectorDBManager(os.environ["DATABASE_URL"])
+    snippet_sections: Dict[str, str] = {}
+    with manager.engine.connect() as connection:
+        for snippet_id, section_id in connection.exec_driver_sql(f"SELECT snippet_id, section_id FROM {TABLE}"):
+            snippet_sections[str(snippet_id)] = section_id
+
+    rag = TOCBasedRAG(RAGConfig(extra_config={"table_name": TABLE, "search_mode": args.mode}))
+    rag.openai_client = client
+    node = RAGAndAdviceNode(verbose=False)
+    feedback_conn = engine.raw_connection()
+    # 후보를 넉넉히 받아 섹션 단위로 환산 (청크 여러 개가 같은 섹션일 수 있음)
+    chunk_k = args.top_k * args.chunk_factor
+
+    def find_similar(query):
+        results = manager.find_similar(
+            qvec(query), chunk_k, args.threshold, version=version, mode=args.mode, query_text=query["text"]
+        )
+        return ranked_sections([snippet_sections.get(str(snippet_id)) for *_, snippet_id in results], args.top_k)
+
+    def toc_search(query):
+        results = rag.search_similar(query["text"], chunk_k, args.threshold, args.mode)
+        return ranked_sections([section_id for *_, section_id in results], args.top_k)
+
+    def feedback_knn(query):
+        rows = node._knn_search(feedback_conn, qvec(query), TABLE, chunk_k, for_counsel=query.get("for_counsel"))
+        return ranked_sections([row["section_id"] for row in rows], args.top_k)
+
+    def feedback_sections(query):
+        sections = node._retrieve_sections(
+            {"query": (qvec(query), query.get("for_counsel"))}, TABLE, args.threshold,
+            max_sections=args.top_k, mode=args.mode, query_texts={"query": query["text"]},
+        )["query"]
+        return [sec["section_id"] for sec in sections]
+
+    searches = {
+        "find_similar": find_similar,
+        "toc_search": toc_search,
+        "feedback_knn": feedback_knn,
+        "feedback_sections": feedback_sections,
+    }
+    return {name: searches[name] for name in args.paths.split(",")}
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], max_recall_drop: float, max_p95_ratio: float) -> List[str]:
+    """기준 리포트 대비 회귀 항목 (recall/MRR 하락, p95 증가 비율 초과)"""
+    regressions = []
+    recall_key = f"recall@{report['config']['top_k']}"
+    for name, result in report["paths"].items():
+        before = baseline.get("paths", {}).get(name)
+        if not before:
+            continue
+        for metric in (recall_key, "mrr"):
+            if metric in before and result[metric] < before[metric] - max_recall_drop:
+                regressions.append(f"{name} {metric}: {before[metric]:.3f} → {result[metric]:.3f}")
+        if before.get("p95_ms") and result["p95_ms"] > before["p95_ms"] * max_p95_ratio:
+            regressions.append(f"{name} p95_ms: {before['p95_ms']:.2f} → {result['p95_ms']:.2f}")
+    return regressions
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="검색 경로별 recall/MRR/지연 회귀 벤치마크")
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL"),
+                        help="벤치마크 전용 DB (기본: BENCH_DATABASE_URL)")
+    parser.add_argument("--allow-any-db", action="store_true", help="DB 이름에 bench가 없어도 실행")
+    parser.add_argument("--data", default=str(DATA_PATH), help="코퍼스/쿼리 JSON")
+    parser.add_argument("--paths", default=",".join(PATHS), help=f"실행할 경로 ({', '.join(PATHS)})")
+    parser.add_argument("--embedder", choices=("stub", "openai"), default="stub")
+    parser.add_argument("--embedding-version", default=None, help="검색 임베딩 버전 (기본: RAG_EMBEDDING_VERSION)")
+    parser.add_argument("--mode", choices=("vector", "hybrid"), default="vector")
+    parser.add_argument("--top-k", type=int, default=5, help="섹션 단위 k")
+    parser.add_argument("--chunk-factor", type=int, default=3, help="청크 후보 수 = top_k × 이 값")
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("RAG_SIM_THRESHOLD") or 0.45),
+                        help="유사도 임계값 (기본: RAG_SIM_THRESHOLD 또는 0.45)")
+    parser.add_argument("--min-chars", type=int, default=600, help="TOCChunker min_chars")
+    parser.add_argument("--max-chars", type=int, default=800, help="TOCChunker max_chars")
+    parser.add_argument("--distractors", type=int, default=0, help="잡음 청크 수")
+    parser.add_argument("--index", choices=("none", "hnsw", "ivfflat"), default="hnsw")
+    parser.add_argument("--lists", type=int, default=100, help="ivfflat lists")
+    parser.add_argument("--probes", type=int, default=None, help="ivfflat.probes")
+    parser.add_argument("--m", type=int, default=16, help="hnsw m")
+    parser.add_argument("--ef-construction", type=int, default=64, help="hnsw ef_construction")
+    parser.add_argument("--ef-search", type=int, default=None, help="hnsw.ef_search")
+    parser.add_argument("--repeat", type=int, default=5, help="지연 측정 반복 횟수")
+    parser.add_argument("--warmup", type=int, default=5, help="경로별 워밍업 쿼리 수")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-load", action="store_true", help="이미 적재된 DB 재사용 (같은 옵션으로 적재했을 때만)")
+    parser.add_argument("--out", default=None, help="JSON 결과 파일 (기본: 표준 출력만)")
+    parser.add_argument("--baseline", default=None, help="비교할 이전 JSON 결과 (회귀가 있으면 종료 코드 1)")
+    parser.add_argument("--max-recall-drop", type=float, default=0.02)
+    parser.add_argument("--max-p95-ratio", type=float, default=1.5)
+    return parser.parse_args()
+
+
+def main():
+    args = _parse_args()
+    if not args.database_url:
+        raise SystemExit("--database-url 또는 BENCH_DATABASE_URL이 필요합니다")
+    db_name = args.database_url.rsplit("/", 1)[-1].split("?")[0]
+    if "bench" not in db_name and not args.allow_any_db:
+        raise SystemExit(f"'{db_name}'은 벤치마크 전용 DB로 보이지 않습니다 (테이블을 비웁니다, --allow-any-db)")
+
+    # 앱 모듈(설정/엔진)이 벤치마크 DB를 보도록 임포트 전에 환경 변수 설정
+    # 인덱스 검색 파라미터는 libpq PGOPTIONS로 모든 연결에 적용
+    sqlalchemy_url = args.database_url.replace("postgresql://", "postgresql+psycopg2://", 1)
+    psycopg_url = sqlalchemy_url.replace("postgresql+psycopg2://", "postgresql://", 1)
+    os.environ["DATABASE_URL"] = sqlalchemy_url
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    if args.embedding_version:
+        os.environ["RAG_EMBEDDING_VERSION"] = args.embedding_version
+    options = []
+    if args.ef_search:
+        options.append(f"-c hnsw.ef_search={args.ef_search}")
+    if args.probes:
+        options.append(f"-c ivfflat.probes={args.probes}")
+    if options:
+        os.environ["PGOPTIONS"] = " ".join(filter(None, [os.getenv("PGOPTIONS"), *options]))
+
+    import psycopg2
+    from pgvector.psycopg2 import register_vector
+    from app.llm.rag.vector_db.embedding_versions import EMBEDDING_VERSIONS, get_embedding_version
+    from app.llm.rag.vector_db.lexical import extract_terms, lexical_terms
+
+    version = get_embedding_version()
+    if args.embedder == "stub":
+        client = StubEmbeddingClient(extract_terms)
+
+        def embed(chunks, dimensions):
+            return [
+                stub_embedding(chunk["terms"], dimensions) if "terms" in chunk
+                else client.embed(chunk["embed_text"], dimensions)
+                for chunk in chunks
+            ]
+    else:
+        from openai import OpenAI
+        from app.core.config import settings
+        client = MemoEmbeddingClient(OpenAI(api_key=settings.openai_api_key))
+
+        def embed(chunks, dimensions):
+            request = next(v for v in EMBEDDING_VERSIONS.values() if v.dimensions == dimensions).request_kwargs()
+            response = client.create([chunk["embed_text"] for chunk in chunks], **request)
+            return [np.asarray(item.embedding, dtype=np.float32) for item in response.data]
+
+    with open(args.data, encoding="utf-8") as f:
+        data = json.load(f)
+    data_hash = hashlib.sha256(Path(args.data).read_bytes()).hexdigest()[:16]
+    queries = data["queries"]
+
+    conn = psycopg2.connect(psycopg_url)
+    with conn.cursor() as cur:
+        cur.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    conn.commit()
+    register_vector(conn)
+
+    # 스키마는 ORM 모델 기준으로 생성 (마이그레이션을 적용한 DB라면 그대로 사용)
+    from app.llm.rag.vector_db.vector_db_manager import VectorDBManager
+    VectorDBManager(sqlalchemy_url).engine.dispose()
+
+    chunks = chunk_corpus(data, args.min_chars, args.max_chars)
+    corpus_chunks = len(chunks)
+    if args.distractors:
+        vocabulary = sorted({term for chunk in chunks for term in extract_terms(chunk["embed_text"])})
+        chunks += distractor_chunks(vocabulary, args.distractors, args.seed)
+
+    load_seconds = index_seconds = 0.0
+    if not args.skip_load:
+        started = time.perf_counter()
+        load_corpus(conn, sqlalchemy_url, chunks, embed, lexical_terms, list(EMBEDDING_VERSIONS.values()))
+        load_seconds = time.perf_counter() - started
+        print(f"📥 적재 완료: 청크 {len(chunks)}개 (코퍼스 {corpus_chunks}, 잡음 {args.distractors}), {load_seconds:.1f}초")
+    if args.index != "none" and not args.skip_load:
+        index_seconds = build_index(conn, version, args.index, args.lists, args.m, args.ef_construction)
+        print(f"🗂️ {args.index} 인덱스 생성: {index_seconds:.1f}초")
+    conn.close()
+
+    report = {
+        "dataset": {"name": data.get("name"), "version": data.get("version"), "sha256": data_hash,
+                    "queries": len(queries), "corpus_chunks": corpus_chunks, "total_chunks": len(chunks),
+                    "sections": len({chunk["section_id"] for chunk in chunks})},
+        "config": {key: getattr(args, key) for key in (
+            "embedder", "mode", "top_k", "chunk_factor", "threshold", "min_chars", "max_chars", "distractors",
+            "index", "lists", "probes", "m", "ef_construction", "ef_search", "repeat", "seed",
+        )},
+        "embedding_version": version.name,
+        "local_index": bool(os.getenv("RAG_LOCAL_INDEX_DIR")),
+        "load_seconds": load_seconds,
+        "index_seconds": index_seconds,
+        "paths": {},
+    }
+
+    for name, search in build_searches(args, client, version).items():
+        report["paths"][name] = run_path(search, queries, args.top_k, args.repeat, args.warmup)
+
+    recall_key = f"recall@{args.top_k}"
+    print(f"\n{'path':<18} {recall_key:>9} {'mrr':>6} {'p50(ms)':>8} {'p95(ms)':>8} {'qps':>8} {'empty':>6}")
+    for name, result in report["paths"].items():
+        print(
+            f"{name:<18} {result[recall_key]:>9.3f} {result['mrr']:>6.3f} {result['p50_ms']:>8.2f} "
+            f"{result['p95_ms']:>8.2f} {result['qps']:>8.1f} {result['empty_results']:>6}"
+        )
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"결과 저장: {args.out}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.max_recall_drop, args.max_p95_ratio)
+        if regressions:
+            print("\n❌ 기준 대비 회귀:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print("\n✅ 기준 대비 회귀 없음")
+
+
+if __name__ == "__main__":
+    main()